@@ -0,0 +1,3 @@
+"""
+init module
+"""
@@ -0,0 +1,186 @@
+"""
+asyncio api front end benchmark,
+compares the prefork waitress stack with the asyncio api server on the same
+exported synthetic models under many concurrent and idle keep-alive connections
+run from the repository root: python -m benchmarks.async_api_benchmark
+"""
+import os
+import sys
+import time
+import signal
+import socket
+import asyncio
+import tempfile
+import subprocess
+import urllib.parse
+from ml_models.fused_ensemble import compile_fused_ensemble
+from benchmarks.bench_utils import percentiles, synthetic_corpus, synthetic_models, \
+    synthetic_reviews
+
+API_PATH = '/api/v1/prediction/'
+# seconds, a request not answered in time counts as an error and ends its client
+REQUEST_TIMEOUT = 10
+
+SERVERS = (('waitress prefork', 'flask_webapp.prefork'),
+           ('asyncio', 'flask_webapp.async_api'))
+
+# (active connections, requests per active connection, idle keep-alive connections)
+SCENARIOS = ((16, 100, 0),
+             (256, 8, 0),
+             (16, 100, 2000))
+
+def _request_bodies(count, seed=0):
+    """
+    function generating distinct urlencoded review forms,
+    so the requests are scored and not answered by the prediction cache
+    :param count:
+    :param seed:
+    :return: list of bytes
+    """
+    return [urllib.parse.urlencode({'Input_Text': review}).encode('utf8')
+            for review in synthetic_reviews(count, seed=seed)]
+
+
+async def _read_response(reader):
+    """
+    function reading one response with a Content-Length body
+    :param reader:
+    :return: status code
+    """
+    head = await reader.readuntil(b'\r\n\r\n')
+    content_length = 0
+    for line in head.split(b'\r\n'):
+        if line.lower().startswith(b'content-length:'):
+            content_length = int(line.split(b':')[1])
+    await reader.readexactly(content_length)
+    return int(head.split(b' ', 2)[1])
+
+
+async def _async_http_load(port, bodies, connections, requests_per_connection,
+                           idle_connections):
+    """
+    function running closed loop keep-alive clients on one event loop,
+    the idle connections send one request each and then stay open
+    :return: dict with throughput, errors and latency percentiles
+    """
+    latencies = []
+    errors = []
+
+    async def _request(reader, writer, body):
+        writer.write(f'POST {API_PATH} HTTP/1.1\r\nHost: 127.0.0.1\r\n'
+                     f'Content-Type: application/x-www-form-urlencoded\r\n'
+                     f'Content-Length: {len(body)}\r\n\r\n'.encode('latin-1') + body)
+        return await asyncio.wait_for(_read_response(reader), REQUEST_TIMEOUT)
+
+    async def _idle_connection():
+        try:
+            reader, writer = await asyncio.wait_for(
+                asyncio.open_connection('127.0.0.1', port), REQUEST_TIMEOUT)
+            await _request(reader, writer, bodies[0])
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError):
+            return None
+        return writer
+
+    idle_writers = []
+    for start in range(0, idle_connections, 100):
+        idle_writers.extend(await asyncio.gather(
+            *(_idle_connection() for _ in range(start, min(start + 100, idle_connections)))))
+
+    async def _client(index):
+        try:
+            reader, writer = await asyncio.wait_for(
+                asyncio.open_connection('127.0.0.1', port), REQUEST_TIMEOUT)
+        except (OSError, asyncio.TimeoutError):
+            errors.append(requests_per_connection)
+            return
+        for request in range(requests_per_connection):
+            body = bodies[(index * requests_per_connection + request) % len(bodies)]
+            started = time.perf_counter()
+            try:
+                if await _request(reader, writer, body) >= 500:
+                    errors.append(1)
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError):
+                errors.append(requests_per_connection - request)
+                break
+            latencies.append(time.perf_counter() - started)
+        writer.close()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(_client(index) for index in range(connections)))
+    elapsed = time.perf_counter() - started
+
+    for writer in idle_writers:
+        if writer is not None:
+            writer.close()
+
+    return {'idle_served': sum(writer is not None for writer in idle_writers),
+            'requests': len(latencies),
+            'errors': sum(errors),
+            'requests_per_second': round(len(latencies) / elapsed, 1),
+            **percentiles(latencies)}
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _wait_listening(port, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise TimeoutError(f"server on port {port} did not start")
+
+
+def async_api_benchmark(artifacts_dir, bodies):
+    """
+    function starting each server in turn and running the load scenarios
+    :param artifacts_dir: exported model artifacts
+    :param bodies: request bodies
+    :return: dict of server -> list of scenario results
+    """
+    results = {}
+    for server_name, server_module in SERVERS:
+        port = _free_port()
+        environment = dict(os.environ, MODEL_ARTIFACTS_DIR=artifacts_dir, PORT=str(port),
+                           WEB_CONCURRENCY='1', INFERENCE_WORKERS='1')
+        server = subprocess.Popen([sys.executable, '-m', server_module], env=environment,
+                                  stdout=subprocess.DEVNULL)
+        try:
+            _wait_listening(port)
+            # warm up the scoring process
+            asyncio.run(_async_http_load(port, bodies[-100:], 4, 25, 0))
+            results[server_name] = []
+            # each scenario sends texts not seen before by the prediction cache
+            offset = 0
+            for connections, requests_per_connection, idle_connections in SCENARIOS:
+                results[server_name].append(
+                    {'connections': connections, 'idle': idle_connections,
+                     **asyncio.run(_async_http_load(port, bodies[offset:], connections,
+                                                    requests_per_connection,
+                                                    idle_connections))})
+                offset += connections * requests_per_connection
+        finally:
+            server.send_signal(signal.SIGTERM)
+            server.wait(timeout=30)
+    return results
+
+
+if __name__ == "__main__":
+    TEXTS, LABELS = synthetic_corpus()
+    BODIES = _request_bodies(20000)
+
+    with tempfile.TemporaryDirectory() as MODELS_DIR:
+        compile_fused_ensemble(*synthetic_models(TEXTS, LABELS), (0.345, 0.326, 0.329)) \
+            .export(os.path.join(MODELS_DIR, 'artifacts'))
+
+        for SERVER_NAME, SERVER_RESULTS in async_api_benchmark(
+                os.path.join(MODELS_DIR, 'artifacts'), BODIES).items():
+            for RESULT in SERVER_RESULTS:
+                print(f"{SERVER_NAME:<18}" +
+                      ''.join(f"{key} {value!s:<10}" for key, value in RESULT.items()))
@@ -0,0 +1,225 @@
+"""
+shared benchmark helpers module
+"""
+import http.client
+import logging
+import random
+import threading
+import time
+import urllib.parse
+from waitress.server import create_server
+
+
+def percentiles(latencies, points=(50, 95, 99)) -> dict:
+    """
+    function computing nearest-rank latency percentiles
+    :param latencies: list of seconds
+    :param points:
+    :return: dict of 'p50' etc. -> milliseconds
+    """
+    ordered = sorted(latencies)
+    if not ordered:
+        return {f'p{point}': None for point in points}
+
+    return {f'p{point}': round(ordered[min(len(ordered) - 1,
+                                           max(0, -(-point * len(ordered) // 100) - 1))] * 1000, 3)
+            for point in points}
+
+
+def http_load(url, body=None, headers=None, method='POST', concurrency=8, requests_per_client=200):
+    """
+    function running a closed loop http load generator,
+    each client thread keeps one keep-alive connection
+    :param url:
+    :param body: request body bytes
+    :param headers:
+    :param method:
+    :param concurrency: client threads count
+    :param requests_per_client:
+    :return: dict with throughput, errors and latency percentiles
+    """
+    parsed_url = urllib.parse.urlparse(url)
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+
+    def _client():
+        conn = http.client.HTTPConnection(parsed_url.hostname, parsed_url.port, timeout=30)
+        client_latencies = []
+        client_errors = 0
+        for _ in range(requests_per_client):
+            started = time.perf_counter()
+            try:
+                conn.request(method, parsed_url.path, body=body, headers=headers or {})
+                response = conn.getresponse()
+                response.read()
+                if response.status >= 500:
+                    client_errors += 1
+            except (OSError, http.client.HTTPException):
+                client_errors += 1
+                conn.close()
+                conn = http.client.HTTPConnection(parsed_url.hostname, parsed_url.port,
+                                                  timeout=30)
+            client_latencies.append(time.perf_counter() - started)
+        conn.close()
+        with lock:
+            latencies.extend(client_latencies)
+            errors.append(client_errors)
+
+    threads = [threading.Thread(target=_client) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    return {'requests': len(latencies),
+            'errors': sum(errors),
+            'requests_per_second': round(len(latencies) / elapsed, 1),
+            **percentiles(latencies)}
+
+
+def serve_in_thread(app, threads=8):
+    """
+    function serving the wsgi app by waitress from a daemon thread on a free local port
+    :param app:
+    :param threads: waitress worker threads count
+    :return: tuple (base url, stop function)
+    """
+    # waitress warns on every queued task under a saturating load
+    logging.getLogger('waitress.queue').setLevel(logging.ERROR)
+
+    server = create_server(app, host='127.0.0.1', port=0, threads=threads)
+    threading.Thread(target=server.run, daemon=True).start()
+
+    def _stop():
+        # let the in-flight tasks finish, then close the server sockets
+        # from inside the server loop thread
+        server.task_dispatcher.shutdown()
+        server.trigger.pull_trigger(server.close)
+
+    return f'http://127.0.0.1:{server.effective_port}', _stop
+
+
+def measure_latencies(function, inputs, min_seconds=1.0, min_calls=5, max_calls=200000,
+                      items_per_call=1):
+    """
+    function calling the function on the inputs in turn until both min_seconds
+    passed and min_calls were made, timing each call
+    :param function: function of one argument
+    :param inputs: list of arguments, cycled through
+    :param min_seconds:
+    :param min_calls:
+    :param max_calls:
+    :param items_per_call: e.g. the batch size, scales the throughput
+    :return: dict with calls, items per second and latency percentiles
+    """
+    # warm up the caches and the lazily built objects
+    for argument in inputs[:3]:
+        function(argument)
+
+    latencies = []
+    started = time.perf_counter()
+    deadline = started + min_seconds
+    perf_counter = time.perf_counter
+    while len(latencies) < max_calls and \
+            (len(latencies) < min_calls or perf_counter() < deadline):
+        argument = inputs[len(latencies) % len(inputs)]
+        call_started = perf_counter()
+        function(argument)
+        latencies.append(perf_counter() - call_started)
+    elapsed = time.perf_counter() - started
+
+    return {'calls': len(latencies),
+            'items_per_second': round(len(latencies) * items_per_call / elapsed, 1),
+            **percentiles(latencies)}
+
+
+# every review contains a Czech specific character, so the texts pass the language gate
+CZECH_REVIEW_WORDS = ('film', 'herec', 'příběh', 'děj', 'hudba', 'scénář', 'režie', 'konec',
+                      'skvělý', 'hrozný', 'nudný', 'výborný', 'průměrný', 'krásný', 'slabý',
+                      'zajímavý', 'dlouhý', 'vtipný', 'smutný', 'napínavý', 'kamera', 'postava',
+                      'herečka', 'zápletka', 'dialogy', 'efekty', 'atmosféra', 'pokračování')
+
+
+def synthetic_reviews(count, words_per_review=12, seed=0):
+    """
+    function generating distinct Czech review-like texts,
+    distinct texts are not answered by the prediction cache
+    :param count:
+    :param words_per_review:
+    :param seed:
+    :return: list of texts
+    """
+    rng = random.Random(seed)
+    return ['řekl bych ' + ' '.join(rng.choices(CZECH_REVIEW_WORDS, k=words_per_review))
+            for _ in range(count)]
+
+
+def synthetic_corpus(documents=23000, vocabulary_size=50000, words_per_document=20, seed=0):
+    """
+    function generating a labelled corpus of random stemmed-like words,
+    the shipped reviews sample is too small to train realistic models
+    :param documents:
+    :param vocabulary_size:
+    :param words_per_document:
+    :param seed:
+    :return: tuple (texts, labels) with 'neg'/'pos' labels
+    """
+    rng = random.Random(seed)
+    letters = 'abcdeghijklmnoprstuvyz'
+    vocabulary = sorted({''.join(rng.choices(letters, k=rng.randint(3, 9)))
+                         for _ in range(vocabulary_size)})
+    rng.shuffle(vocabulary)
+    # zipf distributed word frequencies, so frequent bigrams exist as in real text
+    zipf_weights = [1 / rank for rank in range(1, len(vocabulary) + 1)]
+    # every word leans to one sentiment
+    word_labels = {word: rng.choice(('neg', 'pos')) for word in vocabulary}
+
+    texts, labels = [], []
+    for _ in range(documents):
+        label = rng.choice(('neg', 'pos'))
+        words = [word for word in rng.choices(vocabulary, weights=zipf_weights,
+                                              k=words_per_document * 2)
+                 if word_labels[word] == label or rng.random() < 0.4][:words_per_document]
+        texts.append(' '.join(words))
+        labels.append(label)
+    return texts, labels
+
+
+def synthetic_models(texts, labels):
+    """
+    function fitting the three models the way the data processors do
+    :param texts:
+    :param labels:
+    :return: tuple (vector_nb, model_nb, vector_lr, model_lr, model_svm GridSearchCV)
+    """
+    # imported here, the measured worker processes must not import sklearn
+    import sklearn
+    from sklearn.feature_extraction.text import CountVectorizer, TfidfTransformer
+    from sklearn.linear_model import LogisticRegression, SGDClassifier
+    from sklearn.model_selection import GridSearchCV
+    from sklearn.naive_bayes import MultinomialNB
+    from sklearn.pipeline import Pipeline
+
+    # the SGDClassifier 'log' loss was renamed to 'log_loss' in scikit-learn 1.1
+    sgd_log_loss = 'log_loss' \
+        if tuple(int(x) for x in sklearn.__version__.split('.')[:2]) >= (1, 1) else 'log'
+
+    vector_nb = CountVectorizer().fit(texts)
+    model_nb = MultinomialNB().fit(vector_nb.transform(texts),
+                                   [0 if label == 'neg' else 1 for label in labels])
+
+    vector_lr = CountVectorizer(min_df=5, ngram_range=(2, 2)).fit(texts)
+    model_lr = LogisticRegression(max_iter=1000).fit(vector_lr.transform(texts), labels)
+
+    model_svm = GridSearchCV(Pipeline([
+        ('vect', CountVectorizer()),
+        ('tfidf', TfidfTransformer()),
+        ('clf', SGDClassifier(loss=sgd_log_loss, penalty='l2', alpha=1e-3,
+                              random_state=42, max_iter=5, tol=None)),
+    ]), {'vect__ngram_range': [(1, 1), (1, 2)], 'clf__alpha': (1e-2, 1e-3)}, cv=3)
+    model_svm.fit(texts, labels)
+
+    return vector_nb, model_nb, vector_lr, model_lr, model_svm
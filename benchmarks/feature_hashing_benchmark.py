@@ -0,0 +1,208 @@
+"""
+feature hashing benchmark,
+trains the three models with the vocabulary based vectorizers and with the
+hashing vectorizers of 2^16, 2^18 and 2^20 features and compares the test
+accuracy, the pickled size, the memory of the loaded models (in a fresh
+interpreter) and the vectorizer transform throughput
+the corpus is a synthetic one unless --corpus points to the scraped reviews csv
+run from the repository root:
+python -m benchmarks.feature_hashing_benchmark [--corpus reviews.csv] [--output report.json]
+"""
+import os
+import sys
+import json
+import time
+import pickle
+import argparse
+import tempfile
+import subprocess
+from benchmarks.bench_utils import synthetic_corpus
+
+# None is the vocabulary based variant
+N_FEATURES_EXPONENTS = (None, 16, 18, 20)
+TRANSFORM_BATCH_SIZE = 64
+TRANSFORM_MIN_SECONDS = 1.0
+MODEL_TYPES = ('naive_bayes', 'logistic_regression', 'support_vector_machine')
+
+
+def _rss_kb():
+    """
+    function reading the process resident memory
+    :return: kB
+    """
+    with open('/proc/self/status', encoding='utf8') as status_file:
+        for line in status_file:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1])
+    return 0
+
+
+def _corpus_texts(corpus_path):
+    """
+    function reading the cleaned Czech reviews balanced the way the trainers do
+    :param corpus_path: scraped reviews csv or None for the synthetic corpus
+    :return: tuple (texts, labels) with 'neg'/'pos' labels
+    """
+    if corpus_path is None:
+        return synthetic_corpus()
+
+    from data_preparation import corpus_cache
+
+    records = [(text, 'neg' if rank < 0 else 'pos')
+               for text, rank in corpus_cache.load_corpus(corpus_path).records(language='cs')]
+    records = [x for x in records if x[1] == 'neg'][:11500] + \
+              [x for x in records if x[1] == 'pos'][:11500]
+    return [text for text, _ in records], [label for _, label in records]
+
+
+def _fit_models(train_texts, train_labels, feature_hashing, n_features_exponent):
+    """
+    function fitting the three models by the trainers vectorizers and estimators
+    :param train_texts:
+    :param train_labels:
+    :param feature_hashing:
+    :param n_features_exponent:
+    :return: dict of model type -> (vectorizer or None, model)
+    """
+    from sklearn.naive_bayes import MultinomialNB
+    from sklearn.linear_model import LogisticRegression
+    from ml_models.naive_bayes import data_processor_naive_bayes
+    from ml_models.logistic_regression import data_processor_logistic_regression
+    from ml_models.support_vector_machine import data_processor_support_vector_machine
+
+    vector_nb = data_processor_naive_bayes.build_vectorizer(feature_hashing, n_features_exponent)
+    model_nb = MultinomialNB().fit(vector_nb.fit_transform(train_texts), train_labels)
+
+    vector_lr = data_processor_logistic_regression.build_vectorizer(feature_hashing,
+                                                                    n_features_exponent)
+    model_lr = LogisticRegression(max_iter=1000).fit(vector_lr.fit_transform(train_texts),
+                                                     train_labels)
+
+    model_svm = data_processor_support_vector_machine.slim_model(
+        data_processor_support_vector_machine.build_pipeline(feature_hashing, n_features_exponent)
+        .fit(train_texts, train_labels))
+
+    return {'naive_bayes': (vector_nb, model_nb),
+            'logistic_regression': (vector_lr, model_lr),
+            'support_vector_machine': (None, model_svm)}
+
+
+def _transform_texts_per_second(vectorizer, texts):
+    """
+    function measuring the vectorizer transform throughput on batches of texts
+    :param vectorizer:
+    :param texts:
+    :return: texts per second
+    """
+    batches = [texts[start:start + TRANSFORM_BATCH_SIZE]
+               for start in range(0, len(texts) - TRANSFORM_BATCH_SIZE + 1, TRANSFORM_BATCH_SIZE)]
+    transformed = 0
+    started = time.perf_counter()
+    while time.perf_counter() - started < TRANSFORM_MIN_SECONDS:
+        for batch in batches:
+            vectorizer.transform(batch)
+            transformed += len(batch)
+    return round(transformed / (time.perf_counter() - started))
+
+
+def _measure_rss(models_dir):
+    """
+    function run in a fresh interpreter: the resident memory taken by unpickling the models
+    :param models_dir:
+    :return: dict of model type -> kB
+    """
+    # sklearn, numpy and scipy are not a part of the models memory
+    import sklearn.pipeline  # noqa: F401
+    import sklearn.feature_extraction.text  # noqa: F401
+    import sklearn.linear_model  # noqa: F401
+    import sklearn.naive_bayes  # noqa: F401
+
+    rss_kb = {}
+    loaded = []
+    for model_type in MODEL_TYPES:
+        before = _rss_kb()
+        for file_name in sorted(os.listdir(os.path.join(models_dir, model_type))):
+            loaded.append(pickle.load(open(os.path.join(models_dir, model_type, file_name), 'rb')))
+        rss_kb[model_type] = _rss_kb() - before
+    return rss_kb
+
+
+def feature_hashing_benchmark(texts, labels, n_features_exponents=N_FEATURES_EXPONENTS):
+    """
+    function training and measuring the variants
+    :param texts:
+    :param labels:
+    :param n_features_exponents: None is the vocabulary based variant
+    :return: dict of variant -> model type -> measurements
+    """
+    from sklearn import model_selection
+
+    train_texts, test_texts, train_labels, test_labels = model_selection.train_test_split(
+        texts, labels, test_size=0.2, random_state=42)
+
+    results = {}
+    for n_features_exponent in n_features_exponents:
+        variant = 'vocabulary' if n_features_exponent is None else f'hashing 2^{n_features_exponent}'
+        started = time.perf_counter()
+        models = _fit_models(train_texts, train_labels, n_features_exponent is not None,
+                             n_features_exponent)
+        fit_seconds = time.perf_counter() - started
+
+        with tempfile.TemporaryDirectory() as models_dir:
+            for model_type, (vectorizer, model) in models.items():
+                os.makedirs(os.path.join(models_dir, model_type))
+                if vectorizer is not None:
+                    pickle.dump(vectorizer, open(os.path.join(models_dir, model_type,
+                                                              'vectorizer.pkl'), 'wb'))
+                pickle.dump(model, open(os.path.join(models_dir, model_type, 'model.pkl'), 'wb'))
+
+            rss_kb = json.loads(subprocess.run(
+                [sys.executable, '-m', 'benchmarks.feature_hashing_benchmark',
+                 '--measure-rss', models_dir],
+                check=True, capture_output=True, text=True).stdout.strip().splitlines()[-1])
+
+            results[variant] = {'fit_seconds': round(fit_seconds, 1)}
+            for model_type, (vectorizer, model) in models.items():
+                if vectorizer is None:
+                    # the svm pipeline vectorizes the texts itself
+                    accuracy = model.score(test_texts, test_labels)
+                    vectorizer = model[0]
+                else:
+                    accuracy = model.score(vectorizer.transform(test_texts), test_labels)
+
+                results[variant][model_type] = {
+                    'accuracy': round(float(accuracy), 4),
+                    'pickle_bytes': sum(
+                        os.path.getsize(os.path.join(models_dir, model_type, file_name))
+                        for file_name in os.listdir(os.path.join(models_dir, model_type))),
+                    'rss_kb': rss_kb[model_type],
+                    'transform_texts_per_second': _transform_texts_per_second(vectorizer,
+                                                                              test_texts)}
+    return results
+
+
+if __name__ == "__main__":
+    PARSER = argparse.ArgumentParser(description='feature hashing vs vocabulary vectorizers')
+    PARSER.add_argument('--corpus', help='scraped reviews csv, a synthetic corpus when omitted')
+    PARSER.add_argument('--output', help='JSON report file')
+    PARSER.add_argument('--measure-rss', help=argparse.SUPPRESS)
+    ARGS = PARSER.parse_args()
+
+    if ARGS.measure_rss:
+        print(json.dumps(_measure_rss(ARGS.measure_rss)))
+        sys.exit(0)
+
+    RESULTS = feature_hashing_benchmark(*_corpus_texts(ARGS.corpus))
+
+    print(f"{'variant':<16}{'model':<25}{'accuracy':>10}{'pickle MB':>11}{'RSS MB':>9}"
+          f"{'transform texts/s':>19}")
+    for VARIANT, VARIANT_RESULTS in RESULTS.items():
+        for MODEL_TYPE in MODEL_TYPES:
+            RESULT = VARIANT_RESULTS[MODEL_TYPE]
+            print(f"{VARIANT:<16}{MODEL_TYPE:<25}{RESULT['accuracy']:>10}"
+                  f"{RESULT['pickle_bytes'] / 1e6:>11.2f}{RESULT['rss_kb'] / 1024:>9.1f}"
+                  f"{RESULT['transform_texts_per_second']:>19}")
+
+    if ARGS.output:
+        with open(ARGS.output, 'w', encoding='utf8') as output_file:
+            json.dump(RESULTS, output_file, indent=2)
@@ -0,0 +1,232 @@
+"""
+prediction hot path benchmark suite,
+measures the throughput and the p50/p95/p99 latency of the text preparation,
+the ml models scoring, the stats chart data preparation and the api requests
+through the Flask test client, the results are saved as JSON so that the runs
+of two commits can be diffed
+the models are synthetic ones exported to a temporary directory, so the runs
+are reproducible without the trained models, --repo-models uses the repo ones
+run from the repository root:
+python -m benchmarks.hot_path_benchmark [--output results.json] [--quick] [--repo-models]
+python -m benchmarks.hot_path_benchmark --compare before.json after.json
+"""
+import os
+import sys
+import json
+import random
+import platform
+import argparse
+import tempfile
+import subprocess
+from datetime import date, datetime, timedelta, timezone
+from benchmarks.bench_utils import measure_latencies, synthetic_corpus, synthetic_models, \
+    synthetic_reviews
+
+REVIEWS_SAMPLE_FILE_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '..',
+                                                        'data_preparation',
+                                                        'reviews_with_ranks_sample.csv'))
+
+BATCH_SIZES = (1, 8, 64, 256)
+CHART_ROWS = (10000, 100000, 1000000)
+API_BATCH_SIZE = 64
+SENTIMENT_VALUES = ('negative', 'positive', 'uncertain')
+
+
+def _review_texts(count):
+    """
+    function returning the reviews sample texts topped up by synthetic reviews
+    :param count:
+    :return: list of texts
+    """
+    from utils.language_gate import _read_reviews
+
+    sample_texts = [text for text in _read_reviews(REVIEWS_SAMPLE_FILE_PATH) if text.strip()]
+    return sample_texts + synthetic_reviews(count - len(sample_texts))
+
+
+def _chart_rows(count, seed=42):
+    """
+    function generating the stats rows fetched for the stats charts
+    :param count:
+    :param seed:
+    :return: list of (iso date, sentiment) tuples
+    """
+    rng = random.Random(seed)
+    first_date = date(2020, 1, 1)
+    return [((first_date + timedelta(days=rng.randint(0, 30))).isoformat(),
+             rng.choice(SENTIMENT_VALUES)) for _ in range(count)]
+
+
+def _export_synthetic_models(artifacts_dir):
+    """
+    function exporting synthetic models as the memory-mapped artifacts
+    :param artifacts_dir:
+    :return:
+    """
+    from ml_models.fused_ensemble import compile_fused_ensemble
+
+    texts, labels = synthetic_corpus()
+    compile_fused_ensemble(*synthetic_models(texts, labels), (0.345, 0.326, 0.329)) \
+        .export(artifacts_dir)
+
+
+def hot_path_benchmark(min_seconds=1.0, chart_rows=CHART_ROWS):
+    """
+    function running the benchmark cases, the models are loaded from
+    the MODEL_ARTIFACTS_DIR env. variable directory when set
+    :param min_seconds: minimum measuring time of each case
+    :param chart_rows: chart data preparator input sizes
+    :return: dict of case name -> measurements
+    """
+    # imported here, MODEL_ARTIFACTS_DIR must be set before the models are loaded
+    from data_preparation import czech_stemmer
+    from utils.utilities import ProjectCommon, Webapp
+    from ml_models import webapp_interface
+
+    texts = _review_texts(2000)
+    lowered_texts = [text.lower() for text in texts]
+    normalized_texts = [ProjectCommon.remove_all(text) for text in lowered_texts]
+    prepared_texts = [Webapp.input_text_preparator(text)[0] or text for text in texts]
+
+    results = {
+        'remove_all': measure_latencies(ProjectCommon.remove_all, texts, min_seconds),
+        'czech_stemmer.stemmer': measure_latencies(czech_stemmer.stemmer, normalized_texts,
+                                                   min_seconds),
+        'input_string_preparator': measure_latencies(Webapp.input_string_preparator,
+                                                     lowered_texts, min_seconds),
+    }
+
+    for batch_size in BATCH_SIZES:
+        batches = [prepared_texts[start:start + batch_size]
+                   for start in range(0, len(prepared_texts) - batch_size + 1, batch_size)]
+        results[f'ml_model_evaluator[batch={batch_size}]'] = measure_latencies(
+            webapp_interface.ml_model_batch_evaluator, batches, min_seconds,
+            items_per_call=batch_size)
+
+    for rows_count in chart_rows:
+        results[f'chart_data_preparator[rows={rows_count}]'] = measure_latencies(
+            Webapp.chart_data_preparator, [_chart_rows(rows_count)], min_seconds, min_calls=3)
+
+    results.update(_api_benchmark(texts, min_seconds))
+    return results
+
+
+def _api_benchmark(texts, min_seconds):
+    """
+    function measuring the api routes through the Flask test client
+    :param texts:
+    :param min_seconds:
+    :return: dict of case name -> measurements
+    """
+    from flask_webapp.app import APP, STATS_WRITER, INFERENCE_EXECUTOR
+
+    client = APP.test_client()
+    api_prefix = APP.config['api_prefix']
+    # distinct texts miss the prediction cache and are scored by the models
+    distinct_texts = iter(synthetic_reviews(200000, seed=1))
+
+    def _post_distinct(_):
+        client.post(api_prefix, data={'Input_Text': next(distinct_texts)})
+
+    def _post_cached(text):
+        client.post(api_prefix, data={'Input_Text': text})
+
+    def _post_batch(batch):
+        client.post(api_prefix + 'batch/', json=batch)
+
+    try:
+        return {
+            'api[distinct texts]': measure_latencies(_post_distinct, [None], min_seconds),
+            'api[cached text]': measure_latencies(_post_cached, texts[:1], min_seconds),
+            f'api batch[{API_BATCH_SIZE} texts]': measure_latencies(
+                _post_batch, [texts[start:start + API_BATCH_SIZE]
+                              for start in range(0, len(texts) - API_BATCH_SIZE + 1,
+                                                 API_BATCH_SIZE)],
+                min_seconds, items_per_call=API_BATCH_SIZE),
+        }
+    finally:
+        if INFERENCE_EXECUTOR is not None:
+            INFERENCE_EXECUTOR.shutdown()
+        STATS_WRITER.close()
+
+
+def _environment(models):
+    """
+    function describing the benchmarked code and machine
+    :param models: 'synthetic' or 'repo'
+    :return: dict
+    """
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                                text=True, check=True,
+                                cwd=os.path.dirname(__file__)).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {'commit': commit,
+            'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'models': models,
+            'latency_unit': 'ms'}
+
+
+def compare(before, after):
+    """
+    function printing the p50 latency and throughput changes of two result files
+    :param before: results dict
+    :param after: results dict
+    :return:
+    """
+    print(f"{before['environment']['commit']} -> {after['environment']['commit']}")
+    print(f"{'case':<40}{'p50 ms before':>15}{'p50 ms after':>14}{'p50 change':>12}"
+          f"{'throughput change':>20}")
+    for case, after_result in after['results'].items():
+        before_result = before['results'].get(case)
+        if before_result is None:
+            print(f"{case:<40}{'new':>15}{after_result['p50']:>14}")
+            continue
+        p50_change = (after_result['p50'] / before_result['p50'] - 1) * 100 \
+            if before_result['p50'] else 0.0
+        throughput_change = (after_result['items_per_second'] /
+                             before_result['items_per_second'] - 1) * 100
+        print(f"{case:<40}{before_result['p50']:>15}{after_result['p50']:>14}"
+              f"{p50_change:>+11.1f}%{throughput_change:>+19.1f}%")
+
+
+if __name__ == "__main__":
+    PARSER = argparse.ArgumentParser(description='prediction hot path benchmark suite')
+    PARSER.add_argument('--output', help='JSON results file, printed when omitted')
+    PARSER.add_argument('--quick', action='store_true',
+                        help='0.2 s per case and no 1M rows chart case, a smoke run')
+    PARSER.add_argument('--repo-models', action='store_true',
+                        help='benchmark the models of the repo instead of synthetic ones')
+    PARSER.add_argument('--compare', nargs=2, metavar=('BEFORE', 'AFTER'),
+                        help='compare two JSON results files')
+    ARGS = PARSER.parse_args()
+
+    if ARGS.compare:
+        with open(ARGS.compare[0], encoding='utf8') as before_file, \
+                open(ARGS.compare[1], encoding='utf8') as after_file:
+            compare(json.load(before_file), json.load(after_file))
+        sys.exit(0)
+
+    with tempfile.TemporaryDirectory() as MODELS_DIR:
+        if not ARGS.repo_models:
+            os.environ['MODEL_ARTIFACTS_DIR'] = os.path.join(MODELS_DIR, 'artifacts')
+            _export_synthetic_models(os.environ['MODEL_ARTIFACTS_DIR'])
+
+        RESULTS = {'environment': _environment('repo' if ARGS.repo_models else 'synthetic'),
+                   'results': hot_path_benchmark(
+                       min_seconds=0.2 if ARGS.quick else 1.0,
+                       chart_rows=CHART_ROWS[:-1] if ARGS.quick else CHART_ROWS)}
+
+    OUTPUT = json.dumps(RESULTS, indent=2, ensure_ascii=False)
+    if ARGS.output:
+        with open(ARGS.output, 'w', encoding='utf8') as output_file:
+            output_file.write(OUTPUT + '\n')
+        for CASE, RESULT in RESULTS['results'].items():
+            print(f"{CASE:<40}" + ''.join(f"{key} {value!s:<12}" for key, value in RESULT.items()))
+    else:
+        print(OUTPUT)
@@ -0,0 +1,91 @@
+"""
+language gate benchmark,
+compares the n-gram language gate with langdetect throughput and agreement
+on the review texts
+run from the repository root: python -m benchmarks.language_gate_benchmark [reviews csv]
+"""
+import os
+import sys
+import time
+from utils.language_gate import NgramLanguageGate, LangdetectGate, _read_reviews
+
+REVIEWS_SAMPLE_FILE_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '..',
+                                                        'data_preparation',
+                                                        'reviews_with_ranks_sample.csv'))
+
+ACCEPTABLE_LANGUAGE_CODES = ('cs', 'sk', 'sl', 'hr')
+
+# used on top of the reviews file, the shipped sample holds a single review
+FALLBACK_TEXTS = (
+    'Tenhle film byl naprosto úžasný, herci byli skvělí a hudba nádherná.',
+    'Nuda, špatný scénář a ještě horší herecké výkony, nedoporučuji.',
+    'Tenhle film byl naprosto uzasny, herci byli skveli a hudba nadherna.',
+    'Nuda, spatny scenar a jeste horsi herecke vykony, nedoporucuji.',
+    'Režie bez chyby, kamera výborná, rozhodně doporučuji všem fanouškům žánru.',
+    'Rezie bez chyby, kamera vyborna, rozhodne doporucuji vsem fanouskum zanru.',
+    'Příběh se táhne, postavy jsou ploché a konec je předvídatelný.',
+    'Pribeh se tahne, postavy jsou ploche a konec je predvidatelny.',
+    'Tento film bol naozaj vynikajúci, herci boli skvelí.',
+    'Ovaj film je bio stvarno odličan, glumci su bili sjajni.',
+    'This movie was really great, the actors were brilliant.',
+    'Der Film war wirklich toll und die Schauspieler waren super.',
+    'Film był naprawdę świetny, aktorzy byli znakomici.',
+    'Le film était vraiment excellent, les acteurs étaient brillants.',
+)
+
+
+def _throughput(language_gate, texts):
+    """
+    function detecting all the texts
+    :param language_gate:
+    :param texts:
+    :return: tuple (texts per second, detected languages)
+    """
+    started = time.perf_counter()
+    detected = [language_gate.detect(text) for text in texts]
+    return len(texts) / (time.perf_counter() - started), detected
+
+
+def language_gate_benchmark(texts):
+    """
+    function running the benchmark
+    :param texts:
+    :return: dict
+    """
+    started = time.perf_counter()
+    ngram_gate = NgramLanguageGate.from_langdetect_profiles()
+    ngram_build_seconds = time.perf_counter() - started
+
+    langdetect_gate = LangdetectGate(seed=0)
+    # the first langdetect call loads all its profiles
+    langdetect_gate.detect(texts[0])
+
+    ngram_throughput, ngram_detected = _throughput(ngram_gate, texts)
+    langdetect_throughput, langdetect_detected = _throughput(langdetect_gate, texts)
+
+    language_agreement = sum(ngram == langdetect for ngram, langdetect
+                             in zip(ngram_detected, langdetect_detected))
+    gate_agreement = sum((ngram in ACCEPTABLE_LANGUAGE_CODES) ==
+                         (langdetect in ACCEPTABLE_LANGUAGE_CODES)
+                         for ngram, langdetect in zip(ngram_detected, langdetect_detected))
+
+    return {'texts': len(texts),
+            'ngram_build_seconds': round(ngram_build_seconds, 3),
+            'ngram_texts_per_second': round(ngram_throughput),
+            'langdetect_texts_per_second': round(langdetect_throughput),
+            'speedup': round(ngram_throughput / langdetect_throughput, 1),
+            'language_agreement': round(language_agreement / len(texts), 4),
+            'gate_agreement': round(gate_agreement / len(texts), 4),
+            'gate_disagreements': [(text, ngram, langdetect) for text, ngram, langdetect
+                                   in zip(texts, ngram_detected, langdetect_detected)
+                                   if (ngram in ACCEPTABLE_LANGUAGE_CODES) !=
+                                   (langdetect in ACCEPTABLE_LANGUAGE_CODES)][:10]}
+
+
+if __name__ == "__main__":
+    REVIEWS_PATH = sys.argv[1] if len(sys.argv) > 1 else REVIEWS_SAMPLE_FILE_PATH
+    TEXTS = [text for text in _read_reviews(REVIEWS_PATH) if text.strip()] + \
+        list(FALLBACK_TEXTS)
+
+    for key, value in language_gate_benchmark(TEXTS).items():
+        print(f"{key:<30}{value}")
@@ -0,0 +1,161 @@
+"""
+model loading benchmark,
+compares the pickled sklearn models with the memory-mapped model artifacts
+on the cold start time and on the memory of forked web server workers
+run from the repository root: python -m benchmarks.model_loading_benchmark
+"""
+import os
+import gc
+import sys
+import json
+import time
+import pickle
+import tempfile
+import subprocess
+from ml_models.fused_ensemble import FusedEnsemble, compile_fused_ensemble
+from benchmarks.bench_utils import synthetic_corpus, synthetic_models
+
+WORKERS = 4
+REQUESTS_PER_WORKER = 500
+
+MODEL_FILES = (('naive_bayes', 'vectorizer.pkl'),
+               ('naive_bayes', 'model.pkl'),
+               ('logistic_regression', 'vectorizer.pkl'),
+               ('logistic_regression', 'model.pkl'),
+               ('support_vector_machine', 'model.pkl'))
+
+ENSEMBLE_WEIGHTS = (0.345, 0.326, 0.329)
+
+
+def _memory_kb():
+    """
+    function reading the process memory counters
+    :return: dict of Rss, Pss, Private kB
+    """
+    memory = {}
+    with open('/proc/self/smaps_rollup', encoding='utf8') as smaps_file:
+        for line in smaps_file:
+            key, _, value = line.partition(':')
+            if key in ('Rss', 'Pss', 'Private_Clean', 'Private_Dirty'):
+                memory[key] = int(value.split()[0])
+    return {'rss_kb': memory['Rss'], 'pss_kb': memory['Pss'],
+            'private_kb': memory['Private_Clean'] + memory['Private_Dirty']}
+
+
+def _load(variant, models_dir):
+    """
+    function loading the models, returning the scoring function
+    :param variant: 'pickle' or 'mmap'
+    :param models_dir:
+    :return: function scoring a list of strings
+    """
+    if variant == 'mmap':
+        fused_ensemble = FusedEnsemble.load_artifacts(os.path.join(models_dir, 'artifacts'))
+        return fused_ensemble.predict_proba
+
+    vector_nb, model_nb, vector_lr, model_lr, model_svm = [
+        pickle.load(open(os.path.join(models_dir, model_type, file_name), 'rb'))
+        for model_type, file_name in MODEL_FILES]
+
+    def _score(input_strings):
+        return (model_nb.predict_proba(vector_nb.transform(input_strings))[:, 0] *
+                ENSEMBLE_WEIGHTS[0]) + \
+               (model_lr.predict_proba(vector_lr.transform(input_strings))[:, 0] *
+                ENSEMBLE_WEIGHTS[1]) + \
+               (model_svm.predict_proba(input_strings)[:, 0] * ENSEMBLE_WEIGHTS[2])
+
+    return _score
+
+
+def _measure(variant, models_dir, texts):
+    """
+    function run in a fresh interpreter: loads the models, forks the workers
+    and reports the cold start time and the workers memory
+    :param variant:
+    :param models_dir:
+    :param texts:
+    :return: dict
+    """
+    started = time.perf_counter()
+    score = _load(variant, models_dir)
+    score(texts[:1])
+    cold_start_seconds = time.perf_counter() - started
+
+    workers = []
+    for _ in range(WORKERS):
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            for request in range(REQUESTS_PER_WORKER):
+                score([texts[request % len(texts)]])
+            # a full collection, as eventually happens in a long running worker
+            gc.collect()
+            os.write(write_fd, json.dumps(_memory_kb()).encode('utf8'))
+            os._exit(0)
+        os.close(write_fd)
+        workers.append((pid, read_fd))
+
+    worker_memory = []
+    for pid, read_fd in workers:
+        with os.fdopen(read_fd, 'rb') as read_file:
+            worker_memory.append(json.loads(read_file.read()))
+        os.waitpid(pid, 0)
+
+    return {'cold_start_seconds': round(cold_start_seconds, 4),
+            **{key: round(sum(memory[key] for memory in worker_memory) / WORKERS)
+               for key in worker_memory[0]}}
+
+
+def model_loading_benchmark(models_dir):
+    """
+    function measuring both variants, each in a fresh interpreter
+    :param models_dir:
+    :return: dict of variant -> measurements
+    """
+    results = {}
+    for variant in ('pickle', 'mmap'):
+        output = subprocess.run([sys.executable, '-m', 'benchmarks.model_loading_benchmark',
+                                 '--measure', variant, models_dir],
+                                check=True, capture_output=True, text=True).stdout
+        results[variant] = json.loads(output.strip().splitlines()[-1])
+    return results
+
+
+def _export_models(models_dir, texts, labels):
+    """
+    function writing the synthetic models in both formats
+    :param models_dir:
+    :param texts:
+    :param labels:
+    :return: pickled and exported sizes in bytes
+    """
+    models = synthetic_models(texts, labels)
+    for (model_type, file_name), model in zip(MODEL_FILES, models):
+        os.makedirs(os.path.join(models_dir, model_type), exist_ok=True)
+        pickle.dump(model, open(os.path.join(models_dir, model_type, file_name), 'wb'))
+
+    compile_fused_ensemble(*models, ENSEMBLE_WEIGHTS).export(os.path.join(models_dir, 'artifacts'))
+
+    def _size(directory):
+        return sum(os.path.getsize(os.path.join(root, file_name))
+                   for root, _, file_names in os.walk(directory) for file_name in file_names)
+
+    return (sum(_size(os.path.join(models_dir, model_type)) for model_type, _ in MODEL_FILES[::2]),
+            _size(os.path.join(models_dir, 'artifacts')))
+
+
+if __name__ == "__main__":
+    TEXTS, LABELS = synthetic_corpus()
+
+    if len(sys.argv) == 4 and sys.argv[1] == '--measure':
+        print(json.dumps(_measure(sys.argv[2], sys.argv[3], TEXTS[:REQUESTS_PER_WORKER])))
+        sys.exit(0)
+
+    with tempfile.TemporaryDirectory() as MODELS_DIR:
+        PICKLE_BYTES, ARTIFACTS_BYTES = _export_models(MODELS_DIR, TEXTS, LABELS)
+        print(f"pickles {PICKLE_BYTES / 1e6:.1f} MB, artifacts {ARTIFACTS_BYTES / 1e6:.1f} MB")
+        print(f"per worker averages of {WORKERS} forked workers after "
+              f"{REQUESTS_PER_WORKER} requests each")
+        for VARIANT, RESULT in model_loading_benchmark(MODELS_DIR).items():
+            print(f"{VARIANT:<8}" + ''.join(f"{key} {value:<12}" for key, value in RESULT.items()))
@@ -0,0 +1,57 @@
+"""
+request metrics overhead micro-benchmark,
+compares the instrumented validation path with the request metrics on and off
+run from the repository root: python -m benchmarks.request_metrics_benchmark
+"""
+import timeit
+from utils.utilities import Webapp
+from utils.metrics import REQUEST_METRICS
+
+REPEAT = 5
+NUMBER = 2000
+
+# a typical prediction request, a short movie review
+REQUEST_TEXT = 'Tenhle film byl naprosto úžasný, herci byli skvělí a hudba ' \
+               'nádherná. Režie (až na konec) bez chyby - rozhodně doporučuji!'
+
+
+def _best_of(statement):
+    """
+    function returning the best per call time in microseconds
+    :param statement:
+    :return:
+    """
+    return min(timeit.repeat(statement, repeat=REPEAT, number=NUMBER)) / NUMBER * 1e6
+
+
+def _validate():
+    with REQUEST_METRICS.stage('validation'):
+        Webapp.input_text_preparator(REQUEST_TEXT)
+    Webapp.input_language_validator(REQUEST_TEXT, ['cs'])
+
+
+def _empty_stage():
+    with REQUEST_METRICS.stage('empty'):
+        pass
+
+
+def request_metrics_benchmark():
+    """
+    function running the benchmark cases
+    :return: dict of case name -> (metrics off us, metrics on us)
+    """
+    results = {}
+    for case, statement in (('empty stage', _empty_stage),
+                            ('validation + input_string_preparator + detect', _validate)):
+        timings = []
+        for enabled in (False, True):
+            REQUEST_METRICS.enabled = enabled
+            timings.append(_best_of(statement))
+        results[case] = tuple(timings)
+    return results
+
+
+if __name__ == "__main__":
+    print(f"{'case':<50}{'off us':>10}{'on us':>10}{'overhead us':>14}")
+    for CASE, (OFF, ON) in request_metrics_benchmark().items():
+        print(f"{CASE:<50}{OFF:>10.2f}{ON:>10.2f}{ON - OFF:>14.2f}")
@@ -0,0 +1,83 @@
+"""
+stats writer benchmark,
+compares the request latency of a synchronous INSERT+COMMIT per request
+with the background batched StatsWriter under concurrent load
+run from the repository root: python -m benchmarks.stats_writer_benchmark
+"""
+import os
+import tempfile
+from datetime import datetime
+from flask import Flask, g
+from flask_webapp.database.database_interface import Database
+from flask_webapp.database.stats_writer import StatsWriter
+from benchmarks.bench_utils import http_load, serve_in_thread
+
+CONCURRENCY = 16
+REQUESTS_PER_CLIENT = 200
+
+
+def _stats_app(database, stats_writer):
+    """
+    function creating a minimal app with the two stats writing strategies
+    :param database:
+    :param stats_writer:
+    :return:
+    """
+    app = Flask(__name__)
+
+    def get_db():
+        conn = getattr(g, '_database', None)
+        if conn is None:
+            conn = g._database = database.connect()
+        return conn
+
+    @app.teardown_appcontext
+    def close_connection(exception):
+        conn = getattr(g, '_database', None)
+        if conn is not None:
+            conn.close()
+
+    @app.route('/sync', methods=['POST'])
+    def sync_write():
+        cur = get_db().cursor()
+        cur.execute(database.db_insert_stats_query, (datetime.now(), 'positive'))
+        get_db().commit()
+        return 'ok'
+
+    @app.route('/async', methods=['POST'])
+    def async_write():
+        stats_writer.write('positive')
+        return 'ok'
+
+    return app
+
+
+def stats_writer_benchmark():
+    """
+    function running the load for both routes
+    :return: dict of route -> load results
+    """
+    with tempfile.TemporaryDirectory() as temp_dir:
+        database = Database('local', db_location=os.path.join(temp_dir, 'stats.db'))
+        database.db_builder()
+        stats_writer = StatsWriter(database)
+
+        base_url, stop = serve_in_thread(_stats_app(database, stats_writer),
+                                         threads=CONCURRENCY)
+        try:
+            results = {route: http_load(f'{base_url}/{route}',
+                                        concurrency=CONCURRENCY,
+                                        requests_per_client=REQUESTS_PER_CLIENT)
+                       for route in ('sync', 'async')}
+        finally:
+            stop()
+            stats_writer.close()
+
+    return results
+
+
+if __name__ == "__main__":
+    print(f"{'route':<8}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    for route, result in stats_writer_benchmark().items():
+        print(f"{route:<8}{result['requests_per_second']:>10}{result['p50']:>10}"
+              f"{result['p95']:>10}{result['p99']:>10}{result['errors']:>8}")
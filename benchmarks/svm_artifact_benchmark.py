@@ -0,0 +1,28 @@
+"""
+SVM artifact benchmark,
+compares the pickled GridSearchCV with the slimmed inference only pipeline
+run from the repository root: python -m benchmarks.svm_artifact_benchmark [model.pkl]
+without a model file the models are trained on a synthetic corpus
+"""
+import sys
+import pickle
+from ml_models.support_vector_machine.data_processor_support_vector_machine import \
+    slim_model, slim_model_report
+from benchmarks.bench_utils import synthetic_corpus, synthetic_models
+
+EVAL_TEXTS_COUNT = 1000
+
+
+if __name__ == "__main__":
+    TEXTS, LABELS = synthetic_corpus()
+
+    if len(sys.argv) > 1:
+        MODEL_SVM = pickle.load(open(sys.argv[1], 'rb'))
+    else:
+        MODEL_SVM = synthetic_models(TEXTS, LABELS)[-1]
+
+    REPORT = slim_model_report(MODEL_SVM, slim_model(MODEL_SVM), TEXTS[:EVAL_TEXTS_COUNT])
+
+    for KEY, VALUE in REPORT.items():
+        print(f"{KEY:<25}{VALUE}")
+    print(f"{'size ratio':<25}{REPORT['slim_pickle_bytes'] / REPORT['pickle_bytes']:.3f}")
@@ -0,0 +1,47 @@
+"""
+text normalizer micro-benchmark,
+compares the original chained str.replace pipeline with the TextNormalizer engine
+run from the repository root: python -m benchmarks.text_normalizer_benchmark
+"""
+import timeit
+from utils.utilities import ProjectCommon, Webapp
+from tests import legacy_text_pipeline
+
+REPEAT = 5
+NUMBER = 200
+
+# a typical prediction request, a short movie review
+REQUEST_TEXT = 'Tenhle film byl naprosto úžasný, herci byli skvělí a hudba ' \
+               'nádherná. Režie (až na konec) bez chyby - rozhodně doporučuji!'
+
+
+def _best_of(statement):
+    """
+    function returning the best per call time in microseconds
+    :param statement:
+    :return:
+    """
+    return min(timeit.repeat(statement, repeat=REPEAT, number=NUMBER)) / NUMBER * 1e6
+
+
+def text_normalizer_benchmark():
+    """
+    function running the benchmark cases
+    :return: dict of case name -> (legacy us, engine us)
+    """
+    request_text_lowered = REQUEST_TEXT.lower()
+
+    return {
+        'remove_all': (
+            _best_of(lambda: legacy_text_pipeline.remove_all(REQUEST_TEXT)),
+            _best_of(lambda: ProjectCommon.remove_all(REQUEST_TEXT))),
+        'input_string_preparator (per request)': (
+            _best_of(lambda: legacy_text_pipeline.input_string_preparator(request_text_lowered)),
+            _best_of(lambda: Webapp.input_string_preparator(request_text_lowered))),
+    }
+
+
+if __name__ == "__main__":
+    print(f"{'case':<40}{'legacy us':>12}{'engine us':>12}{'speedup':>10}")
+    for case, (legacy, engine) in text_normalizer_benchmark().items():
+        print(f"{case:<40}{legacy:>12.1f}{engine:>12.1f}{legacy / engine:>9.1f}x")
@@ -0,0 +1,340 @@
+"""
+preprocessed training corpus cache module
+
+The scraped reviews csv is split into chunks of rows, each chunk is cleaned
+(language detection and ProjectCommon.remove_all) by a process pool worker and
+written to its own columnar .npz file, so an interrupted run resumes from the
+last finished chunk. The finished chunks are merged into one corpus file.
+The cache directory is keyed by a hash of the input file, the chunk size
+and the text normalizer version, so a changed input or normalizer starts over.
+"""
+import os
+import random
+import shutil
+import hashlib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+from sklearn import model_selection
+from langdetect import DetectorFactory, detect, lang_detect_exception
+from utils.utilities import ProjectCommon, NORMALIZER_VERSION
+
+REVIEWS_FILE_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__),
+                                                 'reviews_with_ranks.csv'))
+
+CORPUS_CACHE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), 'corpus_cache'))
+
+CORPUS_FILE_NAME = 'corpus.npz'
+
+DEFAULT_CHUNK_SIZE = 5000
+
+# the training set is balanced to the same count of negative and positive reviews
+BALANCED_CLASS_SIZE = 11500
+
+
+def _parse_row(row):
+    """
+    function parsing one scraped reviews csv row, the rank is the last column
+    so commas inside the quoted review text are kept
+    :param row:
+    :return: tuple (text, rank) or None for a malformed row
+    """
+    try:
+        text, rank = row.rsplit(',', 1)
+        return text.replace('"', ''), int(rank)
+    except ValueError:
+        return None
+
+
+def _detect_language(text):
+    """
+    function detecting the review language, '' when langdetect finds no features
+    :param text:
+    :return:
+    """
+    try:
+        return detect(ProjectCommon.remove_non_alpha_chars_and_html(text))
+    except lang_detect_exception.LangDetectException:
+        return ''
+
+
+def _write_columns(file_path, texts, ranks, langs):
+    """
+    function writing the records as columns, the texts as one utf8 blob with offsets,
+    written to a temporary file first so a crash never leaves a partial file
+    :param file_path:
+    :param texts:
+    :param ranks:
+    :param langs:
+    :return:
+    """
+    encoded_texts = [text.encode('utf8') for text in texts]
+    text_offsets = np.zeros(len(encoded_texts) + 1, dtype=np.int64)
+    np.cumsum([len(encoded_text) for encoded_text in encoded_texts], out=text_offsets[1:])
+
+    temp_file_path = file_path + '.tmp.npz'
+    np.savez(temp_file_path,
+             text_blob=np.frombuffer(b''.join(encoded_texts), dtype=np.uint8),
+             text_offsets=text_offsets,
+             ranks=np.array(ranks, dtype=np.int16),
+             langs=np.array(langs, dtype='U8'))
+    os.replace(temp_file_path, file_path)
+
+
+def _read_columns(file_path):
+    """
+    function reading the records columns
+    :param file_path:
+    :return: tuple (texts, ranks, langs)
+    """
+    with np.load(file_path, allow_pickle=False) as arrays:
+        text_blob = arrays['text_blob'].tobytes()
+        text_offsets = arrays['text_offsets'].tolist()
+        texts = [text_blob[start:end].decode('utf8')
+                 for start, end in zip(text_offsets[:-1], text_offsets[1:])]
+        return texts, arrays['ranks'].tolist(), arrays['langs'].tolist()
+
+
+def _clean_rows(rows, detect_language=True):
+    """
+    function cleaning the scraped reviews csv rows
+    :param rows:
+    :param detect_language: False leaves the languages '', the detection takes most of the time
+    :return: tuple (texts, ranks, langs)
+    """
+    # langdetect runs randomized trials, a fixed seed makes the cache reproducible
+    DetectorFactory.seed = 0
+
+    texts, ranks, langs = [], [], []
+    for row in rows:
+        parsed_row = _parse_row(row)
+        if parsed_row is None:
+            continue
+        text, rank = parsed_row
+        texts.append(ProjectCommon.remove_all(text))
+        ranks.append(rank)
+        langs.append(_detect_language(text) if detect_language else '')
+    return texts, ranks, langs
+
+
+def _process_chunk(rows, chunk_file_path):
+    """
+    process pool worker function cleaning one chunk of rows
+    :param rows:
+    :param chunk_file_path:
+    :return: the chunk file path
+    """
+    _write_columns(chunk_file_path, *_clean_rows(rows))
+    return chunk_file_path
+
+
+def corpus_cache_key(input_path, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    function hashing the input file content, the chunk size and the normalizer version
+    :param input_path:
+    :param chunk_size:
+    :return:
+    """
+    cache_key = hashlib.sha256(f'{NORMALIZER_VERSION}:{chunk_size}:'.encode('utf8'))
+    with open(input_path, 'rb') as input_file:
+        for block in iter(lambda: input_file.read(1 << 20), b''):
+            cache_key.update(block)
+    return cache_key.hexdigest()[:16]
+
+
+def _read_chunks(input_path, chunk_size):
+    """
+    read the input file in chunks of rows generator
+    :param input_path:
+    :param chunk_size:
+    :return: yield lists of rows
+    """
+    chunk = []
+    with open(input_path, encoding='utf8') as input_file:
+        for row in input_file:
+            chunk.append(row)
+            if len(chunk) == chunk_size:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
+
+
+def _read_row_chunks(input_path, chunk_size, start_offset):
+    """
+    read the complete rows of the input file from a byte offset in chunks generator,
+    a last row without its newline is being written by the scraper and is left out
+    :param input_path:
+    :param chunk_size:
+    :param start_offset:
+    :return: yield tuples (list of rows, byte offset after the chunk)
+    """
+    rows = []
+    end_offset = start_offset
+    with open(input_path, 'rb') as input_file:
+        input_file.seek(start_offset)
+        for row in input_file:
+            if not row.endswith(b'\n'):
+                break
+            rows.append(row.decode('utf8'))
+            end_offset += len(row)
+            if len(rows) == chunk_size:
+                yield rows, end_offset
+                rows = []
+    if rows:
+        yield rows, end_offset
+
+
+def _language_records(columns, language):
+    """
+    function filtering the cleaned columns to the records of one language
+    :param columns: tuple (texts, ranks, langs)
+    :param language: detected language code, None for all records
+    :return: list of (text, rank) tuples
+    """
+    return [(text, rank) for text, rank, lang in zip(*columns)
+            if language is None or lang == language]
+
+
+def read_record_chunks(input_path=REVIEWS_FILE_PATH, chunk_size=DEFAULT_CHUNK_SIZE,
+                       start_offset=0, language='cs', max_workers=None):
+    """
+    read the cleaned records of the input file in chunks generator,
+    the chunks are cleaned by a process pool a few chunks ahead of the consumer,
+    so only those chunks are held in memory and the input file may be any size
+    :param input_path:
+    :param chunk_size: rows cleaned by one worker task
+    :param start_offset: byte offset of the first row, the end offset of an earlier read
+    :param language: detected language code, None for all records (no language detection)
+    :param max_workers: process pool size, defaults to the cpu count
+    :return: yield tuples (list of (text, rank) tuples in the input file order,
+    byte offset after the chunk)
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        pending = deque()
+        for rows, end_offset in _read_row_chunks(input_path, chunk_size, start_offset):
+            pending.append((executor.submit(_clean_rows, rows, language is not None),
+                            end_offset))
+            if len(pending) > max_workers:
+                future, chunk_end_offset = pending.popleft()
+                yield _language_records(future.result(), language), chunk_end_offset
+        while pending:
+            future, chunk_end_offset = pending.popleft()
+            yield _language_records(future.result(), language), chunk_end_offset
+
+
+def preprocess_corpus(input_path=REVIEWS_FILE_PATH, cache_dir=CORPUS_CACHE_DIR,
+                      chunk_size=DEFAULT_CHUNK_SIZE, max_workers=None):
+    """
+    function preprocessing the reviews csv to the cached corpus file,
+    an up to date corpus file is returned right away
+    :param input_path:
+    :param cache_dir:
+    :param chunk_size: rows processed by one worker task
+    :param max_workers: process pool size, defaults to the cpu count
+    :return: the corpus file path
+    """
+    cache_key_dir = os.path.join(cache_dir, corpus_cache_key(input_path, chunk_size))
+    corpus_file_path = os.path.join(cache_key_dir, CORPUS_FILE_NAME)
+
+    if os.path.isfile(corpus_file_path):
+        return corpus_file_path
+
+    chunks_dir = os.path.join(cache_key_dir, 'chunks')
+    os.makedirs(chunks_dir, exist_ok=True)
+
+    chunk_file_paths = []
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = []
+        for chunk_number, chunk in enumerate(_read_chunks(input_path, chunk_size)):
+            chunk_file_path = os.path.join(chunks_dir, f'chunk_{chunk_number:06d}.npz')
+            chunk_file_paths.append(chunk_file_path)
+            # resume, the chunks finished by an interrupted run are kept
+            if not os.path.isfile(chunk_file_path):
+                futures.append(executor.submit(_process_chunk, chunk, chunk_file_path))
+
+        for finished, future in enumerate(as_completed(futures), start=1):
+            future.result()
+            print(f"Preprocessed chunk {finished}/{len(futures)}")
+
+    texts, ranks, langs = [], [], []
+    for chunk_file_path in chunk_file_paths:
+        chunk_texts, chunk_ranks, chunk_langs = _read_columns(chunk_file_path)
+        texts.extend(chunk_texts)
+        ranks.extend(chunk_ranks)
+        langs.extend(chunk_langs)
+
+    _write_columns(corpus_file_path, texts, ranks, langs)
+    shutil.rmtree(chunks_dir, ignore_errors=True)
+
+    return corpus_file_path
+
+
+class Corpus:
+    """
+    preprocessed training corpus class
+    """
+    def __init__(self, texts, ranks, langs):
+        self.texts = texts
+        self.ranks = ranks
+        self.langs = langs
+
+    def __repr__(self):
+        return f"Corpus(records={len(self.texts)})"
+
+    def __len__(self):
+        return len(self.texts)
+
+    def records(self, language='cs'):
+        """
+        the cleaned records of one language method
+        :param language: detected language code, None for all records
+        :return: list of (text, rank) tuples in the input file order
+        """
+        return [(text, rank) for text, rank, lang in zip(self.texts, self.ranks, self.langs)
+                if language is None or lang == language]
+
+    def balanced_split(self, language='cs', class_size=BALANCED_CLASS_SIZE, test_size=0.2,
+                       random_state=None):
+        """
+        the class-balanced train/test split shared by the trainers method,
+        the first class_size negative and positive records, shuffled and split
+        with the same class ratio in the train and the test set
+        :param language: detected language code, None for all records
+        :param class_size: records of each class
+        :param test_size: test set ratio
+        :param random_state: seed of the shuffle and the split, None for a random one
+        :return: tuple (train texts, test texts, train labels, test labels), 'neg'/'pos' labels
+        """
+        records = [(text, 'neg' if rank < 0 else 'pos') for text, rank in self.records(language)]
+        records = [x for x in records if x[1] == 'neg'][:class_size] + \
+                  [x for x in records if x[1] == 'pos'][:class_size]
+
+        random.Random(random_state).shuffle(records)
+
+        return model_selection.train_test_split([x[0] for x in records], [x[1] for x in records],
+                                                test_size=test_size,
+                                                stratify=[x[1] for x in records],
+                                                random_state=random_state)
+
+
+def load_corpus(input_path=REVIEWS_FILE_PATH, cache_dir=CORPUS_CACHE_DIR,
+                chunk_size=DEFAULT_CHUNK_SIZE, max_workers=None):
+    """
+    function loading the preprocessed corpus, preprocessing it first when not cached
+    :param input_path:
+    :param cache_dir:
+    :param chunk_size:
+    :param max_workers:
+    :return: Corpus
+    """
+    return Corpus(*_read_columns(preprocess_corpus(input_path, cache_dir, chunk_size,
+                                                   max_workers)))
+
+
+if __name__ == "__main__":
+    import sys
+
+    INPUT_PATH = sys.argv[1] if len(sys.argv) > 1 else REVIEWS_FILE_PATH
+    print(f"Preprocessed {INPUT_PATH} to {preprocess_corpus(INPUT_PATH)}")
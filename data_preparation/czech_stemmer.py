@@ -5,24 +5,127 @@ Copyright © 2010 Luís Gomes <luismsgomes@gmail.com>.
 Ported from the Java implementation available at:
     http://members.unine.ch/jacques.savoy/clef/index.html
 
+The suffix rules are compiled into per suffix length lookup dicts, checked
+from the longest suffix to the shortest one, and stemmed words are memoized
+in a bounded LRU cache.
 '''
 import re
+import functools
+
+DEFAULT_CACHE_SIZE = 2 ** 16
+
+_WORD_RE = re.compile("^\\w+$")
+
+
+def _compile_rules(*rules):
+    """
+    compile the rules into a tuple of (suffix length, minimal word length, suffix dict),
+    each rule is (minimal word length exclusive, (cut, palatalise), suffixes),
+    rules are listed in the original checking order so the first match wins
+    """
+    compiled = []
+    for min_length, action, suffixes in rules:
+        suffix_length = len(suffixes[0])
+        if compiled and compiled[-1][0] == suffix_length and compiled[-1][1] == min_length:
+            table = compiled[-1][2]
+        else:
+            table = {}
+            compiled.append((suffix_length, min_length, table))
+        for suffix in suffixes:
+            table.setdefault(suffix, action)
+    return tuple(compiled)
+
+
+_STRIP = False
+_PALATALISE = True
+
+_CASE_RULES = _compile_rules(
+    (7, (5, _STRIP), ("atech",)),
+    (6, (3, _PALATALISE), ("ětem",)),
+    (6, (4, _STRIP), ("atům",)),
+    (5, (2, _PALATALISE), ("ech", "ich", "ích", "ého", "ěmi", "emi", "ému",
+                           "ete", "eti", "iho", "ího", "ími", "imu")),
+    (5, (3, _STRIP), ("ách", "ata", "aty", "ých", "ama", "ami",
+                      "ové", "ovi", "ými")),
+    (4, (1, _PALATALISE), ("em",)),
+    (4, (2, _PALATALISE), ("es", "ém", "ím")),
+    (4, (2, _STRIP), ("ům", "at", "ám", "os", "us", "ým", "mi", "ou")),
+    (3, (0, _PALATALISE), tuple("eiíě")),
+    (3, (1, _STRIP), tuple("uyůaoáéý")),
+)
+
+_POSSESSIVES_RULES = _compile_rules(
+    (5, (2, _STRIP), ("ov", "ův")),
+    (5, (1, _PALATALISE), ("in",)),
+)
+
+_COMPARATIVE_RULES = _compile_rules(
+    (5, (2, _PALATALISE), ("ejš", "ějš")),
+)
+
+_DIMINUTIVE_RULES = _compile_rules(
+    (7, (5, _STRIP), ("oušek",)),
+    (6, (3, _PALATALISE), ("eček", "éček", "iček", "íček", "enek", "ének",
+                           "inek", "ínek")),
+    (6, (4, _PALATALISE), ("áček", "aček", "oček", "uček", "anek", "onek",
+                           "unek", "ánek")),
+    (5, (3, _PALATALISE), ("ečk", "éčk", "ičk", "íčk", "enk", "énk",
+                           "ink", "ínk")),
+    (5, (3, _STRIP), ("áčk", "ačk", "očk", "učk", "ank", "onk",
+                      "unk", "átk", "ánk", "ušk")),
+    (4, (1, _PALATALISE), ("ek", "ék", "ík", "ik")),
+    (4, (1, _STRIP), ("ák", "ak", "ok", "uk")),
+    (3, (1, _STRIP), ("k",)),
+)
+
+_AUGMENTATIVE_RULES = _compile_rules(
+    (6, (4, _STRIP), ("ajzn",)),
+    (5, (2, _PALATALISE), ("izn", "isk")),
+    (4, (2, _STRIP), ("ák",)),
+)
+
+_DERIVATIONAL_RULES = _compile_rules(
+    (8, (6, _STRIP), ("obinec",)),
+    (7, (4, _PALATALISE), ("ionář",)),
+    (7, (5, _STRIP), ("ovisk", "ovstv", "ovišt", "ovník")),
+    (6, (4, _STRIP), ("ásek", "loun", "nost", "teln", "ovec", "ovík",
+                      "ovtv", "ovin", "štin")),
+    (6, (3, _PALATALISE), ("enic", "inec", "itel")),
+    (5, (3, _STRIP), ("árn",)),
+    (5, (2, _PALATALISE), ("ěnk", "ián", "ist", "isk", "išt", "itb", "írn")),
+    (5, (3, _STRIP), ("och", "ost", "ovn", "oun", "out", "ouš",
+                      "ušk", "kyn", "čan", "kář", "néř", "ník",
+                      "ctv", "stv")),
+    (4, (2, _STRIP), ("áč", "ač", "án", "an", "ář", "as")),
+    (4, (1, _PALATALISE), ("ec", "en", "ěn", "éř", "íř", "ic", "in", "ín",
+                           "it", "iv")),
+    (4, (2, _STRIP), ("ob", "ot", "ov", "oň", "ul", "yn", "čk", "čn",
+                      "dl", "nk", "tv", "tk", "vk")),
+    (3, (1, _STRIP), tuple("cčklnt")),
+)
+
+_PALATALISE_RULES = (
+    (2, {"ci": "k", "ce": "k", "či": "k", "če": "k",
+         "zi": "h", "ze": "h", "ži": "h", "že": "h"}),
+    (3, {"čtě": "ck", "čti": "ck", "čtí": "ck",
+         "ště": "sk", "šti": "sk", "ští": "sk"}),
+)
 
 
 def _cz_stem(word, aggressive):
-    if not re.match("^\\w+$", word):
+    if not _WORD_RE.match(word):
         return word
     if not word.islower() and not word.istitle() and not word.isupper():
         # skip word
         return ''
     s = word.lower()  # all our pattern matching is done in lowercase
-    s = _remove_case(s)
-    s = _remove_possessives(s)
+    s = _apply_rules(s, _CASE_RULES)
+    s = _apply_rules(s, _POSSESSIVES_RULES)
     if aggressive:
-        s = _remove_comparative(s)
-        s = _remove_diminutive(s)
-        s = _remove_augmentative(s)
-        s = _remove_derivational(s)
+        s = _apply_rules(s, _COMPARATIVE_RULES)
+        s = _apply_rules(s, _DIMINUTIVE_RULES)
+        s = _apply_rules(s, _AUGMENTATIVE_RULES)
+        s = _apply_rules(s, _DERIVATIONAL_RULES)
     if word.isupper():
         return s.upper()
     if word.istitle():
@@ -30,140 +133,73 @@ def _cz_stem(word, aggressive):
     return s
 
 
-def _remove_case(word):
-    if len(word) > 7 and word.endswith("atech"):
-        return word[:-5]
-    if len(word) > 6:
-        if word.endswith("ětem"):
-            return _palatalise(word[:-3])
-        if word.endswith("atům"):
-            return word[:-4]
-    if len(word) > 5:
-        if word[-3:] in {"ech", "ich", "ích", "ého", "ěmi", "emi", "ému",
-                         "ete", "eti", "iho", "ího", "ími", "imu"}:
-            return _palatalise(word[:-2])
-        if word[-3:] in {"ách", "ata", "aty", "ých", "ama", "ami",
-                         "ové", "ovi", "ými"}:
-            return word[:-3]
-    if len(word) > 4:
-        if word.endswith("em"):
-            return _palatalise(word[:-1])
-        if word[-2:] in {"es", "ém", "ím"}:
-            return _palatalise(word[:-2])
-        if word[-2:] in {"ům", "at", "ám", "os", "us", "ým", "mi", "ou"}:
-            return word[:-2]
-    if len(word) > 3:
-        if word[-1] in "eiíě":
-            return _palatalise(word)
-        if word[-1] in "uyůaoáéý":
-            return word[:-1]
+def _apply_rules(word, rules):
+    length = len(word)
+    for suffix_length, min_length, suffixes in rules:
+        if length > min_length:
+            action = suffixes.get(word[-suffix_length:])
+            if action is not None:
+                cut, palatalise = action
+                if cut:
+                    word = word[:-cut]
+                return _palatalise(word) if palatalise else word
     return word
 
 
-def _remove_possessives(word):
-    if len(word) > 5:
-        if word[-2:] in {"ov", "ův"}:
-            return word[:-2]
-        if word.endswith("in"):
-            return _palatalise(word[:-1])
-    return word
+def _palatalise(word):
+    for suffix_length, suffixes in _PALATALISE_RULES:
+        replacement = suffixes.get(word[-suffix_length:])
+        if replacement is not None:
+            return word[:-suffix_length] + replacement
+    return word[:-1]
 
 
-def _remove_comparative(word):
-    if len(word) > 5:
-        if word[-3:] in {"ejš", "ějš"}:
-            return _palatalise(word[:-2])
-    return word
+class CzechStemmer:
+    """
+    Czech stemmer with a bounded word -> stem LRU cache
+    """
+    def __init__(self, aggressive=True, cache_size=DEFAULT_CACHE_SIZE):
+        self.aggressive = aggressive
+        self.cache_size = cache_size
+        self.stem_word = functools.lru_cache(maxsize=cache_size)(self._stem_word)
 
+    def __repr__(self):
+        return f"CzechStemmer(aggressive={self.aggressive}, cache_size={self.cache_size})"
 
-def _remove_diminutive(word):
-    if len(word) > 7 and word.endswith("oušek"):
-        return word[:-5]
-    if len(word) > 6:
-        if word[-4:] in {"eček", "éček", "iček", "íček", "enek", "ének",
-                         "inek", "ínek"}:
-            return _palatalise(word[:-3])
-        if word[-4:] in {"áček", "aček", "oček", "uček", "anek", "onek",
-                         "unek", "ánek"}:
-            return _palatalise(word[:-4])
-    if len(word) > 5:
-        if word[-3:] in {"ečk", "éčk", "ičk", "íčk", "enk", "énk",
-                         "ink", "ínk"}:
-            return _palatalise(word[:-3])
-        if word[-3:] in {"áčk", "ačk", "očk", "učk", "ank", "onk",
-                         "unk", "átk", "ánk", "ušk"}:
-            return word[:-3]
-    if len(word) > 4:
-        if word[-2:] in {"ek", "ék", "ík", "ik"}:
-            return _palatalise(word[:-1])
-        if word[-2:] in {"ák", "ak", "ok", "uk"}:
-            return word[:-1]
-    if len(word) > 3 and word[-1] == "k":
-        return word[:-1]
-    return word
+    def _stem_word(self, word):
+        return _cz_stem(word, aggressive=self.aggressive)
 
+    def stem(self, string):
+        stem_word = self.stem_word
+        return ' '.join([stem_word(word) for word in string.split(' ')]).replace('  ', '')
 
-def _remove_augmentative(word):
-    if len(word) > 6 and word.endswith("ajzn"):
-        return word[:-4]
-    if len(word) > 5 and word[-3:] in {"izn", "isk"}:
-        return _palatalise(word[:-2])
-    if len(word) > 4 and word.endswith("ák"):
-        return word[:-2]
-    return word
+    def cache_info(self):
+        """
+        word -> stem cache counters
+        :return: dict with hits, misses, maxsize and currsize
+        """
+        return self.stem_word.cache_info()._asdict()
 
+    def cache_clear(self):
+        self.stem_word.cache_clear()
 
-def _remove_derivational(word):
-    if len(word) > 8 and word.endswith("obinec"):
-        return word[:-6]
-    if len(word) > 7:
-        if word.endswith("ionář"):
-            return _palatalise(word[:-4])
-        if word[-5:] in {"ovisk", "ovstv", "ovišt", "ovník"}:
-            return word[:-5]
-    if len(word) > 6:
-        if word[-4:] in {"ásek", "loun", "nost", "teln", "ovec", "ovík",
-                         "ovtv", "ovin", "štin"}:
-            return word[:-4]
-        if word[-4:] in {"enic", "inec", "itel"}:
-            return _palatalise(word[:-3])
-    if len(word) > 5:
-        if word.endswith("árn"):
-            return word[:-3]
-        if word[-3:] in {"ěnk", "ián", "ist", "isk", "išt", "itb", "írn"}:
-            return _palatalise(word[:-2])
-        if word[-3:] in {"och", "ost", "ovn", "oun", "out", "ouš",
-                         "ušk", "kyn", "čan", "kář", "néř", "ník",
-                         "ctv", "stv"}:
-            return word[:-3]
-    if len(word) > 4:
-        if word[-2:] in {"áč", "ač", "án", "an", "ář", "as"}:
-            return word[:-2]
-        if word[-2:] in {"ec", "en", "ěn", "éř", "íř", "ic", "in", "ín",
-                         "it", "iv"}:
-            return _palatalise(word[:-1])
-        if word[-2:] in {"ob", "ot", "ov", "oň", "ul", "yn", "čk", "čn",
-                         "dl", "nk", "tv", "tk", "vk"}:
-            return word[:-2]
-    if len(word) > 3 and word[-1] in "cčklnt":
-        return word[:-1]
-    return word
 
+_STEMMER = CzechStemmer()
 
-def _palatalise(word):
-    if word[-2:] in {"ci", "ce", "či", "če"}:
-        return word[:-2] + "k"
 
-    if word[-2:] in {"zi", "ze", "ži", "že"}:
-        return word[:-2] + "h"
+def configure_stemmer_cache(cache_size):
+    """
+    replace the stemmer used by stemmer() with one having a cache of cache_size words,
+    None means unbounded and 0 disables the caching
+    """
+    global _STEMMER
+    _STEMMER = CzechStemmer(aggressive=True, cache_size=cache_size)
+    return _STEMMER
 
-    if word[-3:] in {"čtě", "čti", "čtí"}:
-        return word[:-3] + "ck"
 
-    if word[-3:] in {"ště", "šti", "ští"}:
-        return word[:-3] + "sk"
-    return word[:-1]
+def stemmer_cache_info():
+    return _STEMMER.cache_info()
 
 
 def stemmer(string):
-    return ' '.join(map(str, [_cz_stem(word, aggressive=True) for word in string.split(' ')])).replace('  ', '')
+    return _STEMMER.stem(string)
@@ -2,16 +2,26 @@
 __main__.py
 """
 import os
-from datetime import date, datetime, timedelta
-from flask import Flask, render_template, send_from_directory, request, jsonify, g
+import hmac
+import atexit
+import threading
+from itertools import islice
+from datetime import date, timedelta
+from flask import Flask, render_template, send_from_directory, request, jsonify, g, abort, \
+    stream_with_context, json
 from flaskext.markdown import Markdown
 from flask_caching import Cache
 from waitress import serve
-from langdetect import detect
 from flask_webapp.database import __env__
 from flask_webapp.database.database_interface import Database
+from flask_webapp.database.stats_writer import StatsWriter
 from utils.utilities import Webapp
-from ml_models import webapp_interface
+from utils.language_gate import configure_language_gate
+from ml_models import webapp_interface, model_registry
+from ml_models.inference_executor import InferenceExecutor, InferenceUnavailable
+from ml_models.micro_batcher import MicroBatcher
+from ml_models.model_registry import ModelRegistryWatcher, ModelRegistryError
+from utils.metrics import REQUEST_METRICS, prometheus_histogram, prometheus_metric
 
 
 def create_app():
@@ -32,6 +42,12 @@ APP.config['md_content'] = Webapp.markdown_reader()
 
 # api base url setup
 APP.config['api_prefix'] = '/api/v1/prediction/'
+# maximum count of texts accepted by the batch api route in one request
+APP.config['api_batch_max_size'] = 1000
+# the NDJSON stream api route scores the texts in batches of this size,
+# a result batch is streamed back as soon as it is evaluated
+APP.config['api_stream_batch_size'] = 64
+APP.config['api_stream_max_line_size'] = 64 * 1024
 
 # setup Cache ext.
 APP.config['CACHE_TYPE'] = 'simple'
@@ -42,46 +58,336 @@ APP.cache = Cache(APP)
 # Slovak, Slovenian, Croatian allowed because langdetect module,
 # when submitting Czech text without the diacritics detects one of these
 APP.config['acceptable_detected_language_codes'] = ['cs', 'sk', 'sl', 'hr']
+# 'ngram' deterministic character n-gram gate or 'langdetect' with a fixed seed
+APP.config['language_gate'] = os.environ.get('LANGUAGE_GATE', 'ngram')
+configure_language_gate(APP.config['language_gate'])
 
 # run the build DB script on app startup, instantiate the Db object
 # if __env__ is local ( env. variable DATABASE_URL not set ) -> Sqlite3
 # if __env__ is remote ( env. variable DATABASE_URL configured for Heroku Postgres) -> Postgres
-DB_OBJ = Database(__env__)
+# the pooled connections are shared by the waitress worker threads
+APP.config['waitress_threads'] = 4
+APP.config['db_pool_max_lifetime'] = 3600
+
+DB_OBJ = Database(__env__,
+                  pool_size=APP.config['waitress_threads'],
+                  pool_max_lifetime=APP.config['db_pool_max_lifetime'])
 DB_OBJ.db_builder()
 
+# stats rows are written by a background worker thread in batches,
+# flushed every `stats_writer_batch_size` rows or `stats_writer_flush_interval_ms`
+APP.config['stats_writer_batch_size'] = 100
+APP.config['stats_writer_flush_interval_ms'] = 500
+APP.config['stats_writer_synchronous'] = False
+
+STATS_WRITER = StatsWriter(DB_OBJ,
+                           batch_size=APP.config['stats_writer_batch_size'],
+                           flush_interval_ms=APP.config['stats_writer_flush_interval_ms'],
+                           synchronous=APP.config['stats_writer_synchronous'])
+# write the pending stats rows on interpreter shutdown
+atexit.register(STATS_WRITER.close)
+
+# `python -m flask_webapp.prefork` forks `prefork_workers` processes sharing the loaded models,
+# a worker is replaced after serving `prefork_max_requests` (+ random jitter) requests
+APP.config['prefork_workers'] = int(os.environ.get('WEB_CONCURRENCY', 2))
+APP.config['prefork_max_requests'] = 10000
+APP.config['prefork_max_requests_jitter'] = 1000
+APP.config['prefork_graceful_timeout'] = 10
+
+# `python -m flask_webapp.async_api` serves the api routes from one asyncio event loop,
+# idle keep-alive connections are closed after `async_keep_alive_timeout` seconds
+APP.config['async_keep_alive_timeout'] = 75
+APP.config['async_max_body_size'] = 8 * 1024 * 1024
+
+# prediction results cache keyed by the models version and the normalized input text,
+# PREDICTION_CACHE_PATH env. variable points to a Sqlite3 file shared by the worker processes
+APP.config['prediction_cache_size'] = 10000
+APP.config['prediction_cache_ttl'] = 3600
+APP.config['prediction_cache_store_path'] = os.environ.get('PREDICTION_CACHE_PATH')
+
+webapp_interface.configure_prediction_cache(
+    maxsize=APP.config['prediction_cache_size'],
+    ttl=APP.config['prediction_cache_ttl'],
+    store_path=APP.config['prediction_cache_store_path'])
+
+# the model scoring runs in `inference_workers` processes instead of the web server threads,
+# 0 scores in the request thread, requests above `inference_queue_depth` waiting ones
+# and requests not scored within `inference_timeout` seconds get a 503 response
+APP.config['inference_workers'] = int(os.environ.get('INFERENCE_WORKERS', 2))
+APP.config['inference_queue_depth'] = 64
+APP.config['inference_timeout'] = 5.0
+APP.config['inference_retry_after'] = 1
+
+INFERENCE_EXECUTOR = InferenceExecutor(webapp_interface.ml_model_batch_evaluator,
+                                       max_workers=APP.config['inference_workers'],
+                                       max_queue_depth=APP.config['inference_queue_depth'],
+                                       timeout=APP.config['inference_timeout'],
+                                       max_batch_size=APP.config['api_batch_max_size'],
+                                       retry_after=APP.config['inference_retry_after']) \
+    if APP.config['inference_workers'] > 0 else None
+
+# concurrent requests arriving within `micro_batch_window_ms` are scored together,
+# up to `micro_batch_max_size` texts, `micro_batching` False scores each request alone,
+# the requests waiting for a micro-batch are bounded by the inference queue depth and timeout
+APP.config['micro_batching'] = True
+APP.config['micro_batch_window_ms'] = 2
+APP.config['micro_batch_max_size'] = 64
+
+MICRO_BATCHER = MicroBatcher(INFERENCE_EXECUTOR.evaluate if INFERENCE_EXECUTOR
+                             else webapp_interface.ml_model_batch_evaluator,
+                             window_ms=APP.config['micro_batch_window_ms'],
+                             max_batch_size=APP.config['micro_batch_max_size'],
+                             max_concurrent_batches=max(APP.config['inference_workers'], 1),
+                             max_queue_depth=APP.config['inference_queue_depth'],
+                             timeout=APP.config['inference_timeout'],
+                             retry_after=APP.config['inference_retry_after']) \
+    if APP.config['micro_batching'] else None
+
+# MODEL_REGISTRY_DIR env. variable points to the versioned models directory, each process
+# polls its ACTIVE file every `model_registry_poll_interval` seconds, loads and warms up
+# a newly activated version in the background and swaps it in,
+# ADMIN_TOKEN env. variable enables the /admin/models routes for `Authorization: Bearer` requests
+APP.config['model_registry_dir'] = model_registry.REGISTRY_DIR_PATH
+APP.config['model_registry_poll_interval'] = 5.0
+APP.config['admin_token'] = os.environ.get('ADMIN_TOKEN')
+
+
+def _models_swapper(version):
+    """
+    function loading and warming up a model registry version, the scoring processes
+    are replaced first, forked with the loaded set, then this process models
+    and the prediction cache namespace
+    :param version:
+    :return:
+    """
+    models_dir = model_registry.version_dir(version, APP.config['model_registry_dir'])
+    model_set = webapp_interface.load_model_set(models_dir)
+    webapp_interface.warm_up(model_set)
+
+    if INFERENCE_EXECUTOR is not None:
+        INFERENCE_EXECUTOR.restart(initializer=webapp_interface.serve_model_set,
+                                   initargs=(model_set,),
+                                   warm_up_input_strings=webapp_interface.WARM_UP_INPUT_STRINGS)
+
+    webapp_interface.activate_model_set(model_set)
+
+
+MODEL_WATCHER = ModelRegistryWatcher(_models_swapper, lambda: webapp_interface.MODELS_VERSION,
+                                     registry_dir=APP.config['model_registry_dir'],
+                                     poll_interval=APP.config['model_registry_poll_interval']) \
+    if APP.config['model_registry_dir'] else None
+
+# per-stage request latency histograms and validation rejection counters served by /metrics,
+# REQUEST_METRICS=off env. variable turns the timers into no-ops and disables the route
+APP.config['request_metrics'] = os.environ.get('REQUEST_METRICS', 'on') != 'off'
+REQUEST_METRICS.enabled = APP.config['request_metrics']
+
 
 def get_db():
     """
-    get db connection function
+    get pooled db connection function
     :return:
     """
     database = getattr(g, '_database', None)
     if database is None:
-        database = g._database = Database.connect(DB_OBJ)
+        database = g._database = DB_OBJ.acquire()
     return database
 
 
 def _stats_to_table_writer(sentiment_result):
     """
-    function storing stats data in a table
+    function queueing stats data to be stored in a table
+    by the background stats writer
     :param sentiment_result:
     :return: status
     """
-    cur = get_db().cursor()
-    data_tuple = (datetime.now(), sentiment_result)
-    cur.execute(DB_OBJ.db_insert_stats_query, data_tuple)
-    get_db().commit()
+    with REQUEST_METRICS.stage('stats_writer'):
+        STATS_WRITER.write(sentiment_result)
+
+
+def _sentiment_batch_preparator(input_texts):
+    """
+    function validating the input texts and looking them up in the prediction cache,
+    cached predictions skip the language detection and the ml models
+    :param input_texts:
+    :return: tuple (batch_results, cache_misses), cache_misses are
+    (index, cache_key, input_text_for_eval) tuples to be evaluated
+    """
+    prediction_cache = webapp_interface.PREDICTION_CACHE
+    batch_results = []
+    cache_misses = []
+
+    for input_text in input_texts:
+        with REQUEST_METRICS.stage('validation'):
+            input_text_for_eval, error_message = Webapp.input_text_preparator(input_text)
+
+        if error_message:
+            REQUEST_METRICS.reject(Webapp.REJECTION_REASONS[error_message])
+            batch_results.append((None, error_message))
+            continue
+
+        cache_key = prediction_cache.key(input_text_for_eval)
+        sentiment_result = prediction_cache.get(cache_key)
+
+        if sentiment_result is None:
+            error_message = Webapp.input_language_validator(
+                input_text, APP.config['acceptable_detected_language_codes'])
+            if error_message:
+                REQUEST_METRICS.reject(Webapp.REJECTION_REASONS[error_message])
+            else:
+                cache_misses.append((len(batch_results), cache_key, input_text_for_eval))
+
+        batch_results.append((sentiment_result, error_message))
+
+    return batch_results, cache_misses
+
+
+def _sentiment_batch_completer(batch_results, cache_misses, sentiment_results):
+    """
+    function caching the evaluated cache misses and filling them in the batch results
+    :param batch_results:
+    :param cache_misses:
+    :param sentiment_results: ml models results of the cache misses
+    :return: list of (sentiment_result, error_message) tuples in the input order
+    """
+    prediction_cache = webapp_interface.PREDICTION_CACHE
+
+    for (index, cache_key, _), sentiment_result in zip(cache_misses, sentiment_results):
+        prediction_cache.set(cache_key, sentiment_result)
+        batch_results[index] = (sentiment_result, None)
+
+    return batch_results
+
+
+def _sentiment_batch_evaluator(input_texts):
+    """
+    function validating and evaluating the input texts,
+    the cache misses are evaluated together in one batch
+    :param input_texts:
+    :return: list of (sentiment_result, error_message) tuples in the input order
+    """
+    batch_results, cache_misses = _sentiment_batch_preparator(input_texts)
+
+    input_texts_for_eval = [input_text_for_eval for _, _, input_text_for_eval in cache_misses]
+    if not input_texts_for_eval:
+        sentiment_results = []
+    else:
+        # the scoring stage includes the queueing for the micro-batch and the scoring process
+        with REQUEST_METRICS.stage('scoring'):
+            if MICRO_BATCHER is not None:
+                sentiment_results = MICRO_BATCHER.evaluate(input_texts_for_eval)
+            elif INFERENCE_EXECUTOR is not None:
+                sentiment_results = INFERENCE_EXECUTOR.evaluate(input_texts_for_eval)
+            else:
+                sentiment_results = \
+                    webapp_interface.ml_model_batch_evaluator(input_texts_for_eval)
+
+    return _sentiment_batch_completer(batch_results, cache_misses, sentiment_results)
+
+
+def _api_batch_validator(input_texts):
+    """
+    function validating the batch api request body
+    :param input_texts: the decoded JSON body
+    :return: error message or None
+    """
+    if not isinstance(input_texts, list) or not input_texts:
+        REQUEST_METRICS.reject('invalid_batch')
+        return 'Sorry, need to submit a non-empty JSON array of texts'
+
+    if len(input_texts) > APP.config['api_batch_max_size']:
+        REQUEST_METRICS.reject('batch_too_large')
+        return f'Sorry, need to submit at most ' \
+               f'{APP.config["api_batch_max_size"]} texts in one batch'
+
+    return None
+
+
+def _api_batch_results(batch_results):
+    """
+    function mapping the evaluated batch to the batch api results,
+    queueing the stats of the successful predictions
+    :param batch_results: list of (sentiment_result, error_message) tuples
+    :return: list of result dicts
+    """
+    api_batch_results = []
+
+    for sentiment_result, error_message in batch_results:
+        if error_message:
+            api_batch_results.append({'status': 400, 'error': error_message})
+        else:
+            api_batch_results.append({'status': 200, 'sentiment_result': sentiment_result})
+
+            _stats_to_table_writer(sentiment_result=
+                                   sentiment_result.get('overall_sentiment').get('sentiment'))
+
+    return api_batch_results
+
+
+def _api_stream_results(input_lines):
+    """
+    generator evaluating the decoded NDJSON stream lines batch by batch,
+    only one batch of texts and results is held in memory at a time
+    :param input_lines: iterator of (input_text, error_message) tuples
+    :return: generator of NDJSON strings, one result line per input line
+    """
+    while True:
+        batch = list(islice(input_lines, APP.config['api_stream_batch_size']))
+        if not batch:
+            return
+
+        for _, error_message in batch:
+            if error_message:
+                REQUEST_METRICS.reject(Webapp.REJECTION_REASONS[error_message])
+
+        try:
+            sentiment_results = iter(_sentiment_batch_evaluator(
+                [input_text for input_text, error_message in batch if not error_message]))
+            api_stream_results = _api_batch_results(
+                [(None, error_message) if error_message else next(sentiment_results)
+                 for _, error_message in batch])
+        except InferenceUnavailable as error:
+            # the response status is already sent, the batch lines report the overload
+            api_stream_results = [
+                {'status': 400, 'error': error_message} if error_message else
+                {'status': 503, 'error': str(error), 'retry_after': error.retry_after}
+                for _, error_message in batch]
+
+        yield ''.join(json.dumps(api_stream_result, separators=(',', ':')) + '\n'
+                      for api_stream_result in api_stream_results)
+
+
+@APP.before_request
+def start_model_watcher():
+    """
+    start the model registry watcher thread of this process function
+    :return:
+    """
+    if MODEL_WATCHER is not None:
+        MODEL_WATCHER.ensure_started()
+
+
+@APP.after_request
+def models_version_header(response):
+    """
+    report the served models version in the api responses function
+    :param response:
+    :return:
+    """
+    if request.path.startswith(APP.config["api_prefix"]):
+        response.headers['X-Models-Version'] = webapp_interface.MODELS_VERSION
+    return response
 
 
 @APP.teardown_appcontext
 def close_connection(exception):
     """
-    close database connection function
+    return the database connection to the pool function
     :return:
     """
     database = getattr(g, '_database', None)
     if database is not None:
-        database.close()
+        DB_OBJ.release(database, discard=exception is not None)
 
 
 @APP.route('/favicon.ico')
@@ -148,6 +454,27 @@ def not_found(error):
     return render_template('error_page.html', template_error_message=error)
 
 
+@APP.errorhandler(InferenceUnavailable)
+def inference_unavailable(error):
+    """
+    overloaded inference executor error handler function
+    :param error:
+    :return:error html page or api response with the Retry-After header
+    """
+    if request.path.startswith(APP.config["api_prefix"]):
+        response = jsonify({
+            'status': 503,
+            'error': str(error),
+            'mimetype': 'application/json'
+        })
+    else:
+        response = APP.make_response(render_template('error_page.html',
+                                                     template_error_message=error))
+    response.status_code = 503
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response
+
+
 @APP.route('/', methods=['GET', 'POST'])
 def main():
     """
@@ -160,38 +487,12 @@ def main():
     if request.method == 'POST':
         input_text = request.form.get('Input_Text')
 
-        if not input_text:
-            return render_template('index.html',
-                                   template_input_string=input_text,
-                                   template_error_message="Sorry, need to submit "
-                                                          "at least 3 non stop-words")
-
-        input_text_lowered = input_text.lower()
-        input_text_lowered_list = Webapp.input_string_preparator(input_text_lowered)
-
-        if len([i for i in input_text_lowered_list if i != '']) < 3:
-            return render_template('index.html',
-                                   template_input_string=input_text,
-                                   template_error_message="Sorry, need to submit "
-                                                          "at least 3 non stop-words")
+        sentiment_result, error_message = _sentiment_batch_evaluator([input_text])[0]
 
-        if all([len(i) < 3 for i in input_text_lowered_list]):
+        if error_message:
             return render_template('index.html',
                                    template_input_string=input_text,
-                                   template_error_message="Sorry, need to submit at "
-                                                          "least 1 word with 3 and more "
-                                                          "characters")
-
-        detected_lang = detect(input_text)
-
-        if detected_lang not in APP.config['acceptable_detected_language_codes']:
-            return render_template('index.html',
-                                   template_input_string=input_text,
-                                   template_error_message="Sorry, need to submit "
-                                                          "text written in Czech")
-
-        input_text_for_eval = ' '.join(input_text_lowered_list)
-        sentiment_result = webapp_interface.ml_model_evaluator([input_text_for_eval])
+                                   template_error_message=error_message)
 
         _stats_to_table_writer(sentiment_result=
                                sentiment_result.get('overall_sentiment').get('sentiment'))
@@ -210,52 +511,18 @@ def api():
     """
     if request.method == 'POST':
         input_text = request.form.get('Input_Text')
-        if not input_text:
-            response = jsonify({
-                'status': 400,
-                'error': 'Sorry, need to submit at least 3 non stop-words',
-                'mimetype': 'application/json'
-            })
-            response.status_code = 400
-            return response
-
-        input_text_lowered = input_text.lower()
-        input_text_lowered_list = Webapp.input_string_preparator(input_text_lowered)
-
-        if len([i for i in input_text_lowered_list if i != '']) < 3:
-            response = jsonify({
-                'status': 400,
-                'error': 'Sorry, need to submit '
-                         'at least 3 non stop-words',
-                'mimetype': 'application/json'
-            })
-            response.status_code = 400
-            return response
 
-        if all([len(i) < 3 for i in input_text_lowered_list]):
-            response = jsonify({
-                'status': 400,
-                'error': 'Sorry, need to submit '
-                         'at least 1 word with 3 and more characters',
-                'mimetype': 'application/json'
-            })
-            response.status_code = 400
-            return response
+        sentiment_result, error_message = _sentiment_batch_evaluator([input_text])[0]
 
-        detected_lang = detect(input_text)
-        if detected_lang not in APP.config['acceptable_detected_language_codes']:
+        if error_message:
             response = jsonify({
                 'status': 400,
-                'error': 'Sorry, need to submit '
-                         'text written in Czech',
+                'error': error_message,
                 'mimetype': 'application/json'
             })
             response.status_code = 400
             return response
 
-        input_text_list_for_eval = ' '.join(input_text_lowered_list)
-        sentiment_result = webapp_interface.ml_model_evaluator([input_text_list_for_eval])
-
         _stats_to_table_writer(sentiment_result=
                                sentiment_result.get('overall_sentiment').get('sentiment'))
 
@@ -268,6 +535,222 @@ def api():
         return response
 
 
+@APP.route(APP.config["api_prefix"] + 'batch/', methods=['POST'])
+def api_batch():
+    """
+    CURL POST example:
+    curl -X POST -H "Content-Type: application/json" -d '["first text", "second text"]'
+    http://127.0.0.1:5000/api/v1/prediction/batch/
+    :return:
+    """
+    input_texts = request.get_json(silent=True)
+
+    error_message = _api_batch_validator(input_texts)
+    if error_message:
+        response = jsonify({
+            'status': 400,
+            'error': error_message,
+            'mimetype': 'application/json'
+        })
+        response.status_code = 400
+        return response
+
+    batch_results = _api_batch_results(_sentiment_batch_evaluator(input_texts))
+
+    response = jsonify({
+        'status': 200,
+        'sentiment_results': batch_results,
+        'mimetype': 'application/json'
+    })
+    response.status_code = 200
+    return response
+
+
+@APP.route(APP.config["api_prefix"] + 'stream/', methods=['POST'])
+def api_stream():
+    """
+    CURL POST example:
+    printf '"first text"\\n"second text"\\n' | curl -X POST -T -
+    -H "Content-Type: application/x-ndjson" http://127.0.0.1:5000/api/v1/prediction/stream/
+    :return:
+    """
+    input_lines = Webapp.ndjson_input_reader(request.stream,
+                                             APP.config['api_stream_max_line_size'])
+
+    return APP.response_class(stream_with_context(_api_stream_results(input_lines)),
+                              mimetype='application/x-ndjson')
+
+
+@APP.route('/metrics/cache', methods=['GET'])
+def metrics_cache():
+    """
+    the route returning the prediction cache counters
+    :return:
+    """
+    response = jsonify({
+        'status': 200,
+        'prediction_cache': webapp_interface.PREDICTION_CACHE.metrics(),
+        'models_version': webapp_interface.MODELS_VERSION,
+        'mimetype': 'application/json'
+    })
+    response.status_code = 200
+    return response
+
+
+@APP.route('/metrics/inference', methods=['GET'])
+def metrics_inference():
+    """
+    the route returning the inference executor counters and the micro-batching histograms
+    :return:
+    """
+    response = jsonify({
+        'status': 200,
+        'inference_executor': INFERENCE_EXECUTOR.metrics() if INFERENCE_EXECUTOR else None,
+        'micro_batcher': MICRO_BATCHER.metrics() if MICRO_BATCHER else None,
+        'mimetype': 'application/json'
+    })
+    response.status_code = 200
+    return response
+
+
+@APP.route('/metrics', methods=['GET'])
+def metrics():
+    """
+    the route returning the request stage latencies, the validation rejections,
+    the prediction cache, inference executor and micro-batching metrics
+    in the Prometheus text format, the metrics are per web server process
+    :return:
+    """
+    if not APP.config['request_metrics']:
+        abort(404)
+
+    request_metrics = REQUEST_METRICS.snapshot()
+    cache_metrics = webapp_interface.PREDICTION_CACHE.metrics()
+
+    lines = prometheus_histogram(
+        'sentiment_request_stage_seconds', 'Prediction request stage latency.',
+        [({'stage': stage}, snapshot) for stage, snapshot in request_metrics['stages'].items()])
+    lines += prometheus_metric(
+        'sentiment_validation_rejections_total', 'counter', 'Rejected input texts by reason.',
+        [({'reason': reason}, count) for reason, count in request_metrics['rejections'].items()])
+    lines += prometheus_metric(
+        'sentiment_prediction_cache_total', 'counter', 'Prediction cache lookups by result.',
+        [({'result': 'hit'}, cache_metrics['hits']), ({'result': 'miss'}, cache_metrics['misses'])])
+    lines += prometheus_metric(
+        'sentiment_prediction_cache_size', 'gauge', 'In-memory prediction cache entries.',
+        [({}, cache_metrics['size'])])
+    lines += prometheus_metric(
+        'sentiment_models_info', 'gauge', 'Served models version.',
+        [({'version': webapp_interface.MODELS_VERSION}, 1)])
+
+    if MODEL_WATCHER is not None:
+        lines += prometheus_metric(
+            'sentiment_model_reloads_total', 'counter', 'Model version swaps by result.',
+            [({'result': 'success'}, MODEL_WATCHER.reloads),
+             ({'result': 'failure'}, MODEL_WATCHER.reload_failures)])
+
+    unavailable_samples = []
+    if INFERENCE_EXECUTOR is not None:
+        executor_metrics = INFERENCE_EXECUTOR.metrics()
+        lines += prometheus_metric(
+            'sentiment_inference_queued', 'gauge', 'Requests waiting for a scoring process.',
+            [({}, executor_metrics['queued'])])
+        unavailable_samples += [
+            ({'queue': 'inference_executor', 'reason': 'queue_full'}, executor_metrics['rejected']),
+            ({'queue': 'inference_executor', 'reason': 'timeout'}, executor_metrics['timeouts'])]
+
+    if MICRO_BATCHER is not None:
+        micro_batcher_metrics = MICRO_BATCHER.metrics()
+        unavailable_samples += [
+            ({'queue': 'micro_batcher', 'reason': 'queue_full'}, micro_batcher_metrics['rejected']),
+            ({'queue': 'micro_batcher', 'reason': 'timeout'}, micro_batcher_metrics['timeouts'])]
+        lines += prometheus_histogram('sentiment_micro_batch_size', 'Texts scored together.',
+                                      [({}, micro_batcher_metrics['batch_size'])])
+        lines += prometheus_histogram('sentiment_micro_batch_queue_delay_seconds',
+                                      'Wait for the micro-batch to be scored.',
+                                      [({}, micro_batcher_metrics['queue_delay_seconds'])])
+
+    if unavailable_samples:
+        lines += prometheus_metric('sentiment_inference_unavailable_total', 'counter',
+                                   'Requests answered with 503 by queue and reason.',
+                                   unavailable_samples)
+
+    return APP.response_class('\n'.join(lines) + '\n',
+                              mimetype='text/plain; version=0.0.4')
+
+
+def _admin_authorized():
+    """
+    function checking the admin routes bearer token, the routes
+    do not exist without the model registry and the admin token configured
+    :return:
+    """
+    if MODEL_WATCHER is None or not APP.config['admin_token']:
+        abort(404)
+
+    return hmac.compare_digest(request.headers.get('Authorization', '').encode('utf8'),
+                               f'Bearer {APP.config["admin_token"]}'.encode('utf8'))
+
+
+@APP.route('/admin/models', methods=['GET'])
+def admin_models():
+    """
+    the route returning the served models version and the model registry versions
+    :return:
+    """
+    if not _admin_authorized():
+        response = jsonify({'status': 401, 'error': 'Unauthorized', 'mimetype': 'application/json'})
+        response.status_code = 401
+        return response
+
+    response = jsonify({
+        'status': 200,
+        'models_version': webapp_interface.MODELS_VERSION,
+        'versions': model_registry.list_versions(APP.config['model_registry_dir']),
+        'model_registry': MODEL_WATCHER.metrics(),
+        'mimetype': 'application/json'
+    })
+    response.status_code = 200
+    return response
+
+
+@APP.route('/admin/models/activate', methods=['POST'])
+def admin_models_activate():
+    """
+    the route activating a model registry version, this process swaps it in
+    in the background, the other processes on their next ACTIVE file poll
+    CURL POST example:
+    curl -X POST -H "Authorization: Bearer $ADMIN_TOKEN" -F version=2020-01-31
+    http://127.0.0.1:5000/admin/models/activate
+    :return:
+    """
+    if not _admin_authorized():
+        response = jsonify({'status': 401, 'error': 'Unauthorized', 'mimetype': 'application/json'})
+        response.status_code = 401
+        return response
+
+    version = request.form.get('version') or (request.get_json(silent=True) or {}).get('version')
+    try:
+        model_registry.activate(version, APP.config['model_registry_dir'])
+    except ModelRegistryError as registry_err:
+        response = jsonify({'status': 400, 'error': str(registry_err),
+                            'mimetype': 'application/json'})
+        response.status_code = 400
+        return response
+
+    MODEL_WATCHER.retry()
+    threading.Thread(target=MODEL_WATCHER.check, name='model-swap', daemon=True).start()
+
+    response = jsonify({
+        'status': 202,
+        'models_version': webapp_interface.MODELS_VERSION,
+        'activated_version': version,
+        'mimetype': 'application/json'
+    })
+    response.status_code = 202
+    return response
+
+
 @APP.route('/api_docs', methods=['GET'])
 def api_docs():
     """
@@ -305,12 +788,13 @@ def stats(period="day"):
     else:
         period_from = date.today() - timedelta(days=1)
 
-    # fetch the stats data from the DB
+    # fetch the pre-aggregated daily stats from the DB,
+    # at most 31 days x 3 sentiment values rows
     cur = get_db().cursor()
-    cur.execute(DB_OBJ.db_select_stats_query_all, [period_from])
-    raw_data = cur.fetchall()
+    cur.execute(DB_OBJ.db_select_rollup_stats_query, [period_from])
+    rollup_data = cur.fetchall()
 
-    chart_data = Webapp.chart_data_preparator(raw_data)
+    chart_data = Webapp.rollup_chart_data_preparator(rollup_data)
 
     return render_template('stats.html',
                            template_period=period,
@@ -343,4 +827,6 @@ def stats(period="day"):
 
 
 if __name__ == "__main__":
-    serve(APP, host='127.0.0.1', port=5000)
+    if INFERENCE_EXECUTOR is not None:
+        INFERENCE_EXECUTOR.start()
+    serve(APP, host='127.0.0.1', port=5000, threads=APP.config['waitress_threads'])
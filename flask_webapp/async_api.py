@@ -0,0 +1,458 @@
+"""
+asyncio api server module
+
+An optional front end serving the prediction api routes from one asyncio
+event loop instead of the waitress threads, so an idle keep-alive connection
+costs a socket and a suspended coroutine instead of a server thread, and
+thousands of them are held open by one process.
+The routes keep the api() / api_batch() contract of flask_webapp.app: the same
+form field and JSON body, the same result and error payloads and status codes.
+The input validation (stemming, language detection) and the prediction cache
+lookups and stores, possibly Sqlite3 ones, run on the event loop default thread
+pool, the model scoring is awaited on the inference executor processes (or on
+a thread when the models are scored in process) and the stats rows are handed
+to the queue of the stats writer thread, so the event loop only parses and
+answers the requests.
+
+run from the repository root: python -m flask_webapp.async_api
+"""
+import os
+import io
+import json
+import signal
+import asyncio
+import resource
+from http import HTTPStatus
+from urllib.parse import urlsplit
+from flask import json as flask_json
+from werkzeug.exceptions import NotFound, MethodNotAllowed
+from werkzeug.formparser import parse_form_data
+
+
+class HttpError(Exception):
+    """
+    malformed request, answered with the status and the connection closed
+    """
+    def __init__(self, status):
+        super().__init__(HTTPStatus(status).phrase)
+        self.status = status
+
+
+class HttpRequest:
+    """
+    parsed http request class
+    """
+    def __init__(self, method, target, version, headers, body):
+        """
+        :param method:
+        :param target: request line path with the optional query string
+        :param version: 'HTTP/1.0' or 'HTTP/1.1'
+        :param headers: dict of lowercase header names -> values
+        :param body: bytes
+        """
+        url = urlsplit(target)
+        self.method = method
+        self.path = url.path
+        self.query_string = url.query
+        self.version = version
+        self.headers = headers
+        self.body = body
+
+        connection = headers.get('connection', '').lower()
+        self.keep_alive = 'close' not in connection if version == 'HTTP/1.1' \
+            else 'keep-alive' in connection
+
+    def __repr__(self):
+        return f"HttpRequest({self.method} {self.path})"
+
+    def form(self):
+        """
+        urlencoded or multipart form fields method
+        :return: werkzeug MultiDict
+        """
+        _, form, _ = parse_form_data({'REQUEST_METHOD': self.method,
+                                      'CONTENT_TYPE': self.headers.get('content-type', ''),
+                                      'CONTENT_LENGTH': str(len(self.body)),
+                                      'wsgi.input': io.BytesIO(self.body)})
+        return form
+
+    def json(self):
+        """
+        decoded JSON body method, as flask request.get_json(silent=True)
+        :return: the decoded body or None when it is not JSON
+        """
+        mimetype = self.headers.get('content-type', '').split(';')[0].strip().lower()
+        if mimetype != 'application/json' and \
+                not (mimetype.startswith('application/') and mimetype.endswith('+json')):
+            return None
+
+        try:
+            return json.loads(self.body)
+        except ValueError:
+            return None
+
+
+class AsyncHttpServer:
+    """
+    asyncio HTTP/1.1 keep-alive server class
+    """
+    def __init__(self, handler, keep_alive_timeout=75, max_body_size=8 * 1024 * 1024,
+                 max_header_size=64 * 1024):
+        """
+        :param handler: coroutine function taking a HttpRequest,
+        returning a (status, headers list, body bytes) tuple
+        :param keep_alive_timeout: seconds an idle connection is kept open
+        :param max_body_size: larger request bodies are answered with 413
+        :param max_header_size: larger request heads are answered with 431
+        """
+        self.handler = handler
+        self.keep_alive_timeout = keep_alive_timeout
+        self.max_body_size = max_body_size
+        self.max_header_size = max_header_size
+
+        self.active_connections = 0
+        self.requests = 0
+        self.in_flight = 0
+
+        self._server = None
+        self._idle_writers = set()
+        self._closing = False
+
+    def __repr__(self):
+        return f"AsyncHttpServer(keep_alive_timeout={self.keep_alive_timeout}, " \
+               f"max_body_size={self.max_body_size})"
+
+    async def start(self, host='127.0.0.1', port=5000, sock=None, backlog=4096):
+        """
+        start listening method
+        :param host:
+        :param port: 0 picks a free port
+        :param sock: optional already bound socket
+        :param backlog:
+        :return: the bound (host, port)
+        """
+        if sock is not None:
+            self._server = await asyncio.start_server(self._serve_connection, sock=sock,
+                                                      backlog=backlog,
+                                                      limit=self.max_header_size)
+        else:
+            self._server = await asyncio.start_server(self._serve_connection, host=host,
+                                                      port=port, backlog=backlog,
+                                                      reuse_address=True,
+                                                      limit=self.max_header_size)
+        return self._server.sockets[0].getsockname()[:2]
+
+    async def close(self, graceful_timeout=10):
+        """
+        stop accepting, close the idle connections and let the in-flight
+        requests finish for at most graceful_timeout seconds method
+        :param graceful_timeout:
+        :return:
+        """
+        self._closing = True
+        self._server.close()
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + graceful_timeout
+        while self.active_connections and loop.time() < deadline:
+            for writer in list(self._idle_writers):
+                writer.close()
+            await asyncio.sleep(0.05)
+
+    async def _read_chunked_body(self, reader):
+        """
+        read a chunked transfer-encoding body method
+        :param reader:
+        :return: bytes
+        """
+        body = bytearray()
+        while True:
+            try:
+                chunk_size = int((await reader.readuntil(b'\r\n')).split(b';')[0], 16)
+            except ValueError:
+                raise HttpError(400) from None
+
+            if chunk_size == 0:
+                # skip the optional trailer fields
+                while await reader.readuntil(b'\r\n') != b'\r\n':
+                    pass
+                return bytes(body)
+
+            if len(body) + chunk_size > self.max_body_size:
+                raise HttpError(413)
+            body += await reader.readexactly(chunk_size)
+            await reader.readexactly(2)
+
+    async def _read_request(self, reader, writer):
+        """
+        read one request method
+        :param reader:
+        :param writer:
+        :return: HttpRequest or None when the client closed or idled out
+        """
+        self._idle_writers.add(writer)
+        try:
+            head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'),
+                                          self.keep_alive_timeout)
+        except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+            return None
+        except asyncio.LimitOverrunError:
+            raise HttpError(431) from None
+        finally:
+            self._idle_writers.discard(writer)
+
+        # empty lines are allowed before a request line
+        lines = head.decode('latin-1').lstrip('\r\n').split('\r\n')[:-2]
+        request_line = lines[0].split(' ') if lines else []
+        if len(request_line) != 3 or request_line[2] not in ('HTTP/1.0', 'HTTP/1.1'):
+            raise HttpError(400)
+
+        headers = {}
+        for line in lines[1:]:
+            name, separator, value = line.partition(':')
+            if not separator:
+                raise HttpError(400)
+            headers[name.strip().lower()] = value.strip()
+
+        chunked = 'chunked' in headers.get('transfer-encoding', '').lower()
+        try:
+            content_length = int(headers.get('content-length', 0))
+        except ValueError:
+            raise HttpError(400) from None
+        if content_length < 0:
+            raise HttpError(400)
+        if content_length > self.max_body_size:
+            raise HttpError(413)
+
+        if (chunked or content_length) and \
+                headers.get('expect', '').lower() == '100-continue':
+            writer.write(b'HTTP/1.1 100 Continue\r\n\r\n')
+
+        body = await self._read_chunked_body(reader) if chunked \
+            else await reader.readexactly(content_length)
+
+        return HttpRequest(*request_line, headers, body)
+
+    @staticmethod
+    def _response(status, headers, body, keep_alive, version='HTTP/1.1'):
+        """
+        serialize the response method
+        :return: bytes
+        """
+        head = [f'HTTP/1.1 {status} {HTTPStatus(status).phrase}',
+                *(f'{name}: {value}' for name, value in headers),
+                f'Content-Length: {len(body)}']
+        if not keep_alive:
+            head.append('Connection: close')
+        elif version == 'HTTP/1.0':
+            head.append('Connection: keep-alive')
+        return ('\r\n'.join(head) + '\r\n\r\n').encode('latin-1') + body
+
+    async def _serve_connection(self, reader, writer):
+        """
+        serve the requests of one connection until it is closed method
+        :param reader:
+        :param writer:
+        :return:
+        """
+        self.active_connections += 1
+        try:
+            keep_alive = True
+            while keep_alive and not self._closing:
+                try:
+                    request = await self._read_request(reader, writer)
+                except HttpError as http_err:
+                    writer.write(self._response(http_err.status,
+                                                [('Content-Type', 'text/plain; charset=utf-8')],
+                                                str(http_err).encode('utf8'), keep_alive=False))
+                    await writer.drain()
+                    break
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    break
+                if request is None:
+                    break
+
+                self.requests += 1
+                self.in_flight += 1
+                try:
+                    status, headers, body = await self.handler(request)
+                except Exception as general_err:
+                    print(f"Async api {request} failed: {general_err!r}")
+                    status, headers, body = 500, [('Content-Type', 'text/plain; charset=utf-8')], \
+                        HTTPStatus(500).phrase.encode('utf8')
+                finally:
+                    self.in_flight -= 1
+
+                keep_alive = request.keep_alive and not self._closing
+                writer.write(self._response(status, headers, body, keep_alive, request.version))
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.active_connections -= 1
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+
+def create_prediction_api():
+    """
+    function binding the prediction api routes to the flask app validation,
+    prediction cache, inference executor and stats writer
+    :return: handler coroutine function for AsyncHttpServer
+    """
+    from flask_webapp import app as webapp
+    from ml_models import webapp_interface
+    from ml_models.inference_executor import InferenceUnavailable
+    from utils.metrics import REQUEST_METRICS
+
+    api_prefix = webapp.APP.config['api_prefix']
+
+    def _json_response(status, payload, headers=()):
+        # the jsonify output, sorted keys and compact separators by the app json settings
+        with webapp.APP.app_context():
+            body = flask_json.dumps({'status': status, **payload,
+                                     'mimetype': 'application/json'},
+                                    indent=None, separators=(',', ':')) + '\n'
+        return status, [('Content-Type', 'application/json'),
+                        ('X-Models-Version', webapp_interface.MODELS_VERSION), *headers], \
+            body.encode('utf8')
+
+    async def _sentiment_batch_evaluator(input_texts):
+        loop = asyncio.get_running_loop()
+        batch_results, cache_misses = await loop.run_in_executor(
+            None, webapp._sentiment_batch_preparator, input_texts)
+        input_texts_for_eval = [input_text_for_eval for _, _, input_text_for_eval in cache_misses]
+        inference_executor = webapp.INFERENCE_EXECUTOR
+
+        if not input_texts_for_eval:
+            sentiment_results = []
+        elif inference_executor is not None:
+            # the executor merges the requests waiting for a scoring process itself,
+            # the awaiting coroutine holds no thread
+            future = inference_executor.submit(input_texts_for_eval)
+            try:
+                with REQUEST_METRICS.stage('scoring'):
+                    sentiment_results = await asyncio.wait_for(asyncio.wrap_future(future),
+                                                               inference_executor.timeout)
+            except asyncio.TimeoutError:
+                raise inference_executor.timed_out(future) from None
+        else:
+            evaluator = webapp.MICRO_BATCHER.evaluate if webapp.MICRO_BATCHER is not None \
+                else webapp_interface.ml_model_batch_evaluator
+            with REQUEST_METRICS.stage('scoring'):
+                sentiment_results = await loop.run_in_executor(None, evaluator,
+                                                               input_texts_for_eval)
+
+        if not cache_misses:
+            return batch_results
+        return await loop.run_in_executor(None, webapp._sentiment_batch_completer,
+                                          batch_results, cache_misses, sentiment_results)
+
+    async def _handler(request):
+        if webapp.MODEL_WATCHER is not None:
+            webapp.MODEL_WATCHER.ensure_started()
+        if request.path not in (api_prefix, api_prefix + 'batch/'):
+            return _json_response(404, {'error': str(NotFound())})
+        if request.method != 'POST':
+            return _json_response(405, {'error': str(MethodNotAllowed())}, [('Allow', 'POST')])
+
+        try:
+            if request.path == api_prefix:
+                input_text = request.form().get('Input_Text')
+                sentiment_result, error_message = \
+                    (await _sentiment_batch_evaluator([input_text]))[0]
+
+                if error_message:
+                    return _json_response(400, {'error': error_message})
+
+                webapp._stats_to_table_writer(
+                    sentiment_result=sentiment_result.get('overall_sentiment').get('sentiment'))
+                return _json_response(200, {'sentiment_result': sentiment_result})
+
+            input_texts = request.json()
+            error_message = webapp._api_batch_validator(input_texts)
+            if error_message:
+                return _json_response(400, {'error': error_message})
+
+            batch_results = webapp._api_batch_results(
+                await _sentiment_batch_evaluator(input_texts))
+            return _json_response(200, {'sentiment_results': batch_results})
+
+        except InferenceUnavailable as unavailable_err:
+            return _json_response(503, {'error': str(unavailable_err)},
+                                  [('Retry-After', str(unavailable_err.retry_after))])
+
+    return _handler
+
+
+def _raise_open_files_limit(max_open_files=65536):
+    """
+    function raising the soft open files limit, each keep-alive connection is a file descriptor
+    :param max_open_files:
+    :return:
+    """
+    soft_limit, hard_limit = resource.getrlimit(resource.RLIMIT_NOFILE)
+    target_limit = max_open_files if hard_limit == resource.RLIM_INFINITY \
+        else min(max_open_files, hard_limit)
+    if soft_limit < target_limit:
+        try:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (target_limit, hard_limit))
+        except (ValueError, OSError) as limit_err:
+            print(f"Open files limit stays {soft_limit}: {limit_err}")
+
+
+def serve_async_api(handler, host='127.0.0.1', port=5000, keep_alive_timeout=75,
+                    max_body_size=8 * 1024 * 1024, graceful_timeout=10, on_exit=None):
+    """
+    function running the asyncio api server until SIGTERM / SIGINT
+    :param handler: coroutine function, e.g. create_prediction_api()
+    :param host:
+    :param port:
+    :param keep_alive_timeout: seconds an idle connection is kept open
+    :param max_body_size: request body bytes limit
+    :param graceful_timeout: seconds given to the in-flight requests on stop
+    :param on_exit: function called after the server stopped
+    :return:
+    """
+    _raise_open_files_limit()
+
+    async def _serve():
+        server = AsyncHttpServer(handler, keep_alive_timeout=keep_alive_timeout,
+                                 max_body_size=max_body_size)
+        bound_host, bound_port = await server.start(host, port)
+        print(f"Async api server {os.getpid()} serving on http://{bound_host}:{bound_port}")
+
+        stopping = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        loop.add_signal_handler(signal.SIGTERM, stopping.set)
+        loop.add_signal_handler(signal.SIGINT, stopping.set)
+
+        await stopping.wait()
+        await server.close(graceful_timeout)
+
+    asyncio.run(_serve())
+
+    if on_exit is not None:
+        on_exit()
+
+
+if __name__ == "__main__":
+    from flask_webapp.app import APP, STATS_WRITER, INFERENCE_EXECUTOR
+
+    def _on_exit():
+        if INFERENCE_EXECUTOR is not None:
+            INFERENCE_EXECUTOR.shutdown()
+        STATS_WRITER.close()
+
+    if INFERENCE_EXECUTOR is not None:
+        INFERENCE_EXECUTOR.start()
+    serve_async_api(create_prediction_api(),
+                    host=os.environ.get('HOST', '127.0.0.1'),
+                    port=int(os.environ.get('PORT', 5000)),
+                    keep_alive_timeout=APP.config['async_keep_alive_timeout'],
+                    max_body_size=APP.config['async_max_body_size'],
+                    graceful_timeout=APP.config['prefork_graceful_timeout'],
+                    on_exit=_on_exit)
@@ -9,13 +9,15 @@ class Connect:
     """
     connect sqlite3 class
     """
-    def __init__(self):
+    def __init__(self, db_file=None):
         """ create a database connection to the SQLite database
             specified by db_file
+        :param db_file: defaults to stats.db next to this module
         :return: Connection object or sqlite3 error is raised
         """
 
-        self.db_file = os.path.abspath(os.path.join(os.path.dirname(__file__), 'stats.db'))
+        self.db_file = db_file or \
+            os.path.abspath(os.path.join(os.path.dirname(__file__), 'stats.db'))
 
     def __repr__(self):
         return str(self.db_file)
@@ -27,8 +29,23 @@ class Connect:
         """
         try:
             conn = sqlite3.connect(self.db_file)
+            # WAL lets the stats readers and the stats writer thread work concurrently
+            conn.execute('PRAGMA journal_mode=WAL')
 
         except sqlite3.Error as general_err:
             raise general_err
 
         return conn
+
+    @staticmethod
+    def is_healthy(conn):
+        """
+        connection health check method
+        :param conn:
+        :return:
+        """
+        try:
+            conn.execute('SELECT 1').fetchone()
+        except sqlite3.Error:
+            return False
+        return True
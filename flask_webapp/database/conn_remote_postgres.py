@@ -11,13 +11,14 @@ class Connect:
     """
     connect Postgres class
     """
-    def __init__(self):
+    def __init__(self, db_url=None):
         """ create a database connection to the Postgres database
             specified by db_url
+        :param db_url: defaults to the DATABASE_URL environment variable
         :return: Connection object or psycopg2 error is raised
         """
 
-        self.db_url = os.environ.get('DATABASE_URL')
+        self.db_url = db_url or os.environ.get('DATABASE_URL')
 
     def __repr__(self):
         return str(self.db_url)
@@ -49,3 +50,20 @@ class Connect:
             raise psycopg2_err
 
         return conn
+
+    @staticmethod
+    def is_healthy(conn):
+        """
+        connection health check method
+        :param conn:
+        :return:
+        """
+        if conn.closed:
+            return False
+        try:
+            with conn.cursor() as cur:
+                cur.execute('SELECT 1')
+            conn.rollback()
+        except psycopg2.Error:
+            return False
+        return True
@@ -0,0 +1,320 @@
+"""
+database connection pool module
+"""
+import os
+import threading
+import time
+
+
+class PoolTimeout(Exception):
+    """
+    no connection became available within the acquire timeout
+    """
+
+
+class PoolMetrics:
+    """
+    connection pool counters class
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checked_out = 0
+        self.checkouts = 0
+        self.waits = 0
+        self.wait_time = 0.0
+        self.connections_created = 0
+        self.connections_recycled = 0
+        self.health_check_failures = 0
+
+    def increment(self, **counters):
+        """
+        increment the counters atomically method
+        :param counters: counter name -> increment
+        :return:
+        """
+        with self._lock:
+            for name, value in counters.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def as_dict(self):
+        """
+        counters snapshot method
+        :return: dict
+        """
+        with self._lock:
+            return {'checked_out': self.checked_out,
+                    'checkouts': self.checkouts,
+                    'waits': self.waits,
+                    'wait_time_seconds': round(self.wait_time, 6),
+                    'connections_created': self.connections_created,
+                    'connections_recycled': self.connections_recycled,
+                    'health_check_failures': self.health_check_failures}
+
+
+class _PooledConnection:
+    """
+    idle connection with its creation and last use times
+    """
+    __slots__ = ('conn', 'created_at', 'released_at')
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.created_at = time.monotonic()
+        self.released_at = self.created_at
+
+
+def _close_quietly(conn):
+    try:
+        conn.close()
+    except Exception:
+        pass
+
+
+class ConnectionPool:
+    """
+    thread-safe bounded connection pool class,
+    callers wait for a released connection when all max_connections are checked out
+    """
+    def __init__(self, connector, max_connections=4, max_lifetime=3600,
+                 health_check_interval=30, acquire_timeout=30):
+        """
+        :param connector: object with connect() and is_healthy(conn) methods
+        :param max_connections: pool size, the web server threads count
+        :param max_lifetime: seconds after which a connection is closed and replaced
+        :param health_check_interval: idle seconds after which a connection
+        gets health checked on checkout
+        :param acquire_timeout: seconds to wait for a free connection
+        """
+        self.connector = connector
+        self.max_connections = max_connections
+        self.max_lifetime = max_lifetime
+        self.health_check_interval = health_check_interval
+        self.acquire_timeout = acquire_timeout
+        self.metrics = PoolMetrics()
+
+        self._condition = threading.Condition()
+        self._idle = []
+        self._checked_out = {}
+        self._in_use = 0
+        self._pid = os.getpid()
+
+    def __repr__(self):
+        return f"ConnectionPool({self.connector}, max_connections={self.max_connections})"
+
+    def _reset_after_fork(self):
+        """
+        forget the connections inherited from the parent process without closing them,
+        closing would terminate the parent's database sessions
+        :return:
+        """
+        self._condition = threading.Condition()
+        self._idle = []
+        self._checked_out = {}
+        self._in_use = 0
+        self.metrics = PoolMetrics()
+        self._pid = os.getpid()
+
+    def _is_usable(self, pooled):
+        """
+        check the idle connection lifetime and health method
+        :param pooled:
+        :return:
+        """
+        now = time.monotonic()
+        if now - pooled.created_at > self.max_lifetime:
+            self.metrics.increment(connections_recycled=1)
+            return False
+        if now - pooled.released_at > self.health_check_interval and \
+                not self.connector.is_healthy(pooled.conn):
+            self.metrics.increment(health_check_failures=1)
+            return False
+        return True
+
+    def acquire(self):
+        """
+        check out a connection method
+        :return: connection
+        """
+        if self._pid != os.getpid():
+            self._reset_after_fork()
+
+        started = None
+        while True:
+            with self._condition:
+                while not self._idle and self._in_use >= self.max_connections:
+                    if started is None:
+                        started = time.monotonic()
+                        self.metrics.increment(waits=1)
+                    remaining = self.acquire_timeout - (time.monotonic() - started)
+                    if remaining <= 0 or not self._condition.wait(remaining):
+                        self.metrics.increment(wait_time=time.monotonic() - started)
+                        raise PoolTimeout(f"No database connection available "
+                                          f"within {self.acquire_timeout}s")
+
+                # reserve the slot, the health check and the connect run outside of the lock
+                self._in_use += 1
+                pooled = self._idle.pop() if self._idle else None
+
+            if pooled is None:
+                break
+
+            if self._is_usable(pooled):
+                with self._condition:
+                    self._checked_out[id(pooled.conn)] = pooled
+                    self._record_checkout(started)
+                return pooled.conn
+
+            _close_quietly(pooled.conn)
+            with self._condition:
+                self._in_use -= 1
+                self._condition.notify()
+
+        try:
+            pooled = _PooledConnection(self.connector.connect())
+        except Exception:
+            with self._condition:
+                self._in_use -= 1
+                self._condition.notify()
+            raise
+
+        with self._condition:
+            self._checked_out[id(pooled.conn)] = pooled
+            self.metrics.increment(connections_created=1)
+            self._record_checkout(started)
+        return pooled.conn
+
+    def _record_checkout(self, started):
+        waited = time.monotonic() - started if started is not None else 0.0
+        self.metrics.increment(checkouts=1, checked_out=1, wait_time=waited)
+
+    def release(self, conn, discard=False):
+        """
+        return a checked out connection to the pool method
+        :param conn:
+        :param discard: close the connection instead of reusing it
+        :return:
+        """
+        if self._pid != os.getpid():
+            return
+
+        with self._condition:
+            pooled = self._checked_out.pop(id(conn), None)
+            if pooled is None:
+                return
+            self.metrics.increment(checked_out=-1)
+
+        # the slot stays reserved, the rollback and the close run outside of the lock
+        if discard:
+            _close_quietly(conn)
+            pooled = None
+        else:
+            try:
+                # end any transaction left open by the request
+                conn.rollback()
+                pooled.released_at = time.monotonic()
+            except Exception:
+                _close_quietly(conn)
+                pooled = None
+
+        with self._condition:
+            self._in_use -= 1
+            if pooled is not None:
+                self._idle.append(pooled)
+            self._condition.notify()
+
+    def close(self):
+        """
+        close all idle connections method
+        :return:
+        """
+        with self._condition:
+            for pooled in self._idle:
+                _close_quietly(pooled.conn)
+            self._idle = []
+
+
+class ThreadLocalConnectionPool:
+    """
+    per-thread persistent connection class,
+    for drivers whose connections may not be shared between threads (Sqlite3)
+    """
+    def __init__(self, connector, max_lifetime=3600, health_check_interval=30):
+        """
+        :param connector: object with connect() and is_healthy(conn) methods
+        :param max_lifetime: seconds after which a connection is closed and replaced
+        :param health_check_interval: idle seconds after which a connection
+        gets health checked on checkout
+        """
+        self.connector = connector
+        self.max_lifetime = max_lifetime
+        self.health_check_interval = health_check_interval
+        self.metrics = PoolMetrics()
+
+        self._local = threading.local()
+        self._pid = os.getpid()
+
+    def __repr__(self):
+        return f"ThreadLocalConnectionPool({self.connector})"
+
+    def acquire(self):
+        """
+        check out the calling thread's connection method
+        :return: connection
+        """
+        if self._pid != os.getpid():
+            # connections inherited from the parent process are left alone
+            self._local = threading.local()
+            self.metrics = PoolMetrics()
+            self._pid = os.getpid()
+
+        pooled = getattr(self._local, 'pooled', None)
+        now = time.monotonic()
+
+        if pooled is not None:
+            if now - pooled.created_at > self.max_lifetime:
+                self.metrics.increment(connections_recycled=1)
+                _close_quietly(pooled.conn)
+                pooled = None
+            elif now - pooled.released_at > self.health_check_interval and \
+                    not self.connector.is_healthy(pooled.conn):
+                self.metrics.increment(health_check_failures=1)
+                _close_quietly(pooled.conn)
+                pooled = None
+
+        if pooled is None:
+            pooled = self._local.pooled = _PooledConnection(self.connector.connect())
+            self.metrics.increment(connections_created=1)
+
+        self.metrics.increment(checkouts=1, checked_out=1)
+        return pooled.conn
+
+    def release(self, conn, discard=False):
+        """
+        release the calling thread's connection method, it stays open for the next request
+        :param conn:
+        :param discard: close the connection instead of reusing it
+        :return:
+        """
+        pooled = getattr(self._local, 'pooled', None)
+        if pooled is None or pooled.conn is not conn:
+            return
+
+        self.metrics.increment(checked_out=-1)
+        try:
+            if discard:
+                raise ValueError('discarded')
+            conn.rollback()
+            pooled.released_at = time.monotonic()
+        except Exception:
+            _close_quietly(conn)
+            self._local.pooled = None
+
+    def close(self):
+        """
+        close the calling thread's connection method
+        :return:
+        """
+        pooled = getattr(self._local, 'pooled', None)
+        if pooled is not None:
+            _close_quietly(pooled.conn)
+            self._local.pooled = None
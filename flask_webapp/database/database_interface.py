@@ -2,6 +2,7 @@
 database interface module
 """
 from flask_webapp.database import conn_local_sqlite, conn_remote_postgres
+from flask_webapp.database.connection_pool import ConnectionPool, ThreadLocalConnectionPool
 
 
 def _connect_from_environment(environment):
@@ -14,9 +15,12 @@ def _connect_from_environment(environment):
         _mapping = {
             "local": {
                 "conn": conn_local_sqlite.Connect,
+                # a Sqlite3 connection may be used only by the thread which created it
+                "pool": ThreadLocalConnectionPool,
             },
             "remote": {
                 "conn": conn_remote_postgres.Connect,
+                "pool": ConnectionPool,
             }
         }
         return _mapping[environment]
@@ -40,6 +44,11 @@ def _get_query_from_environment(environment, query_name):
                 "insert_stats_query": QueryLocal.DB_INSERT_STATS_QUERY,
                 "check_table_exists": QueryLocal.DB_CHECK_TABLE_EXISTS,
                 "select_stats_query_all": QueryLocal.DB_SELECT_RAW_STATS_DATA,
+                "create_rollup_table": QueryLocal.DB_CREATE_ROLLUP_TABLE,
+                "check_rollup_table_exists": QueryLocal.DB_CHECK_ROLLUP_TABLE_EXISTS,
+                "upsert_rollup_query": QueryLocal.DB_UPSERT_ROLLUP_QUERY,
+                "backfill_rollup_query": QueryLocal.DB_BACKFILL_ROLLUP_QUERY,
+                "select_rollup_stats_query": QueryLocal.DB_SELECT_ROLLUP_STATS_DATA,
             },
             "remote": {
                 "drop_table": QueryCommon.DB_DROP_TABLE,
@@ -47,7 +56,12 @@ def _get_query_from_environment(environment, query_name):
                 "create_table": QueryRemote.DB_CREATE_TABLE,
                 "insert_stats_query": QueryRemote.DB_INSERT_STATS_QUERY,
                 "check_table_exists": QueryRemote.DB_CHECK_TABLE_EXISTS,
-                "select_stats_query_all": QueryRemote.DB_SELECT_RAW_STATS_DATA
+                "select_stats_query_all": QueryRemote.DB_SELECT_RAW_STATS_DATA,
+                "create_rollup_table": QueryRemote.DB_CREATE_ROLLUP_TABLE,
+                "check_rollup_table_exists": QueryRemote.DB_CHECK_ROLLUP_TABLE_EXISTS,
+                "upsert_rollup_query": QueryRemote.DB_UPSERT_ROLLUP_QUERY,
+                "backfill_rollup_query": QueryRemote.DB_BACKFILL_ROLLUP_QUERY,
+                "select_rollup_stats_query": QueryRemote.DB_SELECT_ROLLUP_STATS_DATA,
             }
         }
         return _mapping[environment][query_name]
@@ -81,6 +95,41 @@ class QueryRemote:
     FROM stats
     WHERE request_datetime::timestamp >= %s; """
 
+    # create the daily stats rollup table
+    DB_CREATE_ROLLUP_TABLE = """
+    CREATE TABLE IF NOT EXISTS stats_daily(
+    stats_date DATE NOT NULL,
+    sentiment_prediction VARCHAR NOT NULL,
+    prediction_count INTEGER NOT NULL,
+    PRIMARY KEY (stats_date, sentiment_prediction)); """
+
+    # check if rollup table exists
+    DB_CHECK_ROLLUP_TABLE_EXISTS = """
+    SELECT 1 FROM information_schema.tables 
+    WHERE table_name = 'stats_daily'; """
+
+    # increment the daily stats rollup counts
+    DB_UPSERT_ROLLUP_QUERY = """
+    INSERT INTO stats_daily("stats_date", "sentiment_prediction", "prediction_count") 
+    VALUES (%s, %s, %s)
+    ON CONFLICT (stats_date, sentiment_prediction) DO UPDATE 
+    SET prediction_count = stats_daily.prediction_count + EXCLUDED.prediction_count; """
+
+    # backfill the daily stats rollup from the raw stats table
+    DB_BACKFILL_ROLLUP_QUERY = """
+    INSERT INTO stats_daily("stats_date", "sentiment_prediction", "prediction_count") 
+    SELECT request_datetime::date, sentiment_prediction, count(*) 
+    FROM stats
+    GROUP BY request_datetime::date, sentiment_prediction
+    ON CONFLICT (stats_date, sentiment_prediction) DO UPDATE 
+    SET prediction_count = EXCLUDED.prediction_count; """
+
+    # select daily stats rollup data
+    DB_SELECT_ROLLUP_STATS_DATA = """
+    SELECT to_char(stats_date, 'YYYY-MM-DD'), sentiment_prediction, prediction_count 
+    FROM stats_daily
+    WHERE stats_date >= %s; """
+
 
 class QueryLocal:
     """
@@ -108,6 +157,43 @@ class QueryLocal:
     FROM stats
     WHERE request_datetime >= ?; """
 
+    # create the daily stats rollup table
+    DB_CREATE_ROLLUP_TABLE = """
+    CREATE TABLE IF NOT EXISTS stats_daily (
+    stats_date date NOT NULL,
+    sentiment_prediction string NOT NULL,
+    prediction_count integer NOT NULL,
+    PRIMARY KEY (stats_date, sentiment_prediction)); """
+
+    # check if rollup table exists
+    DB_CHECK_ROLLUP_TABLE_EXISTS = """
+    SELECT 1 FROM sqlite_master 
+    WHERE type='table' AND name='stats_daily'; """
+
+    # increment the daily stats rollup counts
+    DB_UPSERT_ROLLUP_QUERY = """
+    INSERT INTO 'stats_daily'('stats_date', 'sentiment_prediction', 'prediction_count') 
+    VALUES (?, ?, ?)
+    ON CONFLICT (stats_date, sentiment_prediction) DO UPDATE 
+    SET prediction_count = prediction_count + excluded.prediction_count; """
+
+    # backfill the daily stats rollup from the raw stats table,
+    # the WHERE clause resolves the INSERT SELECT upsert parsing ambiguity
+    DB_BACKFILL_ROLLUP_QUERY = """
+    INSERT INTO 'stats_daily'('stats_date', 'sentiment_prediction', 'prediction_count') 
+    SELECT date(request_datetime), sentiment_prediction, count(*) 
+    FROM stats
+    WHERE 1
+    GROUP BY date(request_datetime), sentiment_prediction
+    ON CONFLICT (stats_date, sentiment_prediction) DO UPDATE 
+    SET prediction_count = excluded.prediction_count; """
+
+    # select daily stats rollup data
+    DB_SELECT_ROLLUP_STATS_DATA = """
+    SELECT stats_date, sentiment_prediction, prediction_count 
+    FROM stats_daily
+    WHERE stats_date >= ?; """
+
 
 class QueryCommon:
     """
@@ -127,8 +213,19 @@ class Database:
     main database interaction class
     """
 
-    def __init__(self, env):
+    def __init__(self, env, db_location=None, pool_size=4, pool_max_lifetime=3600):
+        """
+        :param env: local | remote
+        :param db_location: optional Sqlite3 file path or Postgres url,
+        defaults to the environment specific location
+        :param pool_size: Postgres pool size, should match the web server threads count
+        :param pool_max_lifetime: seconds after which a pooled connection is recycled
+        """
         self.environment = env
+        self.db_location = db_location
+        self.pool_size = pool_size
+        self.pool_max_lifetime = pool_max_lifetime
+        self._pool = None
 
         self.db_drop_table = \
             _get_query_from_environment(self.environment, query_name="drop_table")
@@ -148,15 +245,70 @@ class Database:
         self.db_select_stats_query_all = \
             _get_query_from_environment(self.environment, query_name="select_stats_query_all")
 
+        self.db_create_rollup_table = \
+            _get_query_from_environment(self.environment, query_name="create_rollup_table")
+
+        self.db_check_rollup_table_exists = \
+            _get_query_from_environment(self.environment, query_name="check_rollup_table_exists")
+
+        self.db_upsert_rollup_query = \
+            _get_query_from_environment(self.environment, query_name="upsert_rollup_query")
+
+        self.db_backfill_rollup_query = \
+            _get_query_from_environment(self.environment, query_name="backfill_rollup_query")
+
+        self.db_select_rollup_stats_query = \
+            _get_query_from_environment(self.environment, query_name="select_rollup_stats_query")
+
     def connect(self):
         """
         connect to database method
         :return:
         """
         _mapped_conn_obj = _connect_from_environment(self.environment)["conn"]
-        conn = _mapped_conn_obj()
+        conn = _mapped_conn_obj(self.db_location)
         return conn.connect()
 
+    @property
+    def pool(self):
+        """
+        lazily created connection pool property
+        :return:
+        """
+        if self._pool is None:
+            _mapping = _connect_from_environment(self.environment)
+            connector = _mapping["conn"](self.db_location)
+            if _mapping["pool"] is ConnectionPool:
+                self._pool = ConnectionPool(connector,
+                                            max_connections=self.pool_size,
+                                            max_lifetime=self.pool_max_lifetime)
+            else:
+                self._pool = _mapping["pool"](connector, max_lifetime=self.pool_max_lifetime)
+        return self._pool
+
+    def acquire(self):
+        """
+        check out a pooled connection method
+        :return:
+        """
+        return self.pool.acquire()
+
+    def release(self, conn, discard=False):
+        """
+        return a pooled connection method
+        :param conn:
+        :param discard: close the connection instead of reusing it
+        :return:
+        """
+        self.pool.release(conn, discard=discard)
+
+    def pool_metrics(self):
+        """
+        connection pool metrics method
+        :return: dict
+        """
+        return self.pool.metrics.as_dict()
+
     def db_builder(self):
         """
         db builder method
@@ -170,8 +322,12 @@ class Database:
             cur.execute(self.db_check_table_exists)
 
             table_exists_query_result = cur.fetchone()
+            table_exists = bool(table_exists_query_result and table_exists_query_result[0] == 1)
 
-            if table_exists_query_result and table_exists_query_result[0] == 1:
+            # the rollup has to be backfilled before the stats table can get dropped
+            self.db_rollup_migration(cur, table_exists)
+
+            if table_exists:
                 # check the count of all rows in the stats table
                 cur.execute(self.db_select_count_rows_query)
                 rowcount = cur.fetchone()[0]
@@ -186,3 +342,25 @@ class Database:
             cur.execute(self.db_create_table)
 
         return 0
+
+    def db_rollup_migration(self, cur, stats_table_exists):
+        """
+        create the daily stats rollup table and backfill it
+        from the existing stats table on the first run method
+        :param cur:
+        :param stats_table_exists:
+        :return:
+        """
+        cur.execute(self.db_check_rollup_table_exists)
+        rollup_table_exists_query_result = cur.fetchone()
+
+        if rollup_table_exists_query_result and rollup_table_exists_query_result[0] == 1:
+            return 0
+
+        cur.execute(self.db_create_rollup_table)
+
+        if stats_table_exists:
+            cur.execute(self.db_backfill_rollup_query)
+            print("Backfilled the stats_daily rollup table from the stats table")
+
+        return 0
@@ -0,0 +1,234 @@
+"""
+asynchronous batched stats writer module
+"""
+import os
+import queue
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+# sentinel put to the queue to stop the worker thread
+_STOP = object()
+
+
+class StatsWriter:
+    """
+    stats sink class,
+    predictions are put to an in-process queue drained by a worker thread
+    which inserts them with executemany in one transaction every batch_size rows
+    or flush_interval_ms milliseconds, whatever comes first
+    """
+    def __init__(self, database, batch_size=100, flush_interval_ms=500,
+                 max_queue_size=10000, synchronous=False):
+        """
+        :param database: database_interface.Database instance
+        :param batch_size: rows written in one transaction at most
+        :param flush_interval_ms: maximum delay of a queued row
+        :param max_queue_size: rows queued above this limit are dropped
+        :param synchronous: write each row in the calling thread, used by tests
+        """
+        self.database = database
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_queue_size = max_queue_size
+        self.synchronous = synchronous
+
+        self.rows_written = 0
+        self.rows_dropped = 0
+        self.batches_written = 0
+        self.write_errors = 0
+
+        self._lock = threading.Lock()
+        # the request threads and the worker thread update the counters
+        self._counters_lock = threading.Lock()
+        self._queue = None
+        self._worker = None
+        self._pid = None
+
+    def __repr__(self):
+        return f"StatsWriter(batch_size={self.batch_size}, " \
+               f"flush_interval_ms={int(self.flush_interval * 1000)}, " \
+               f"synchronous={self.synchronous})"
+
+    def _ensure_worker(self):
+        """
+        start the worker thread lazily, also in a forked child process
+        where the parent's thread does not exist
+        :return:
+        """
+        if self._pid == os.getpid() and self._worker is not None:
+            return
+
+        with self._lock:
+            if self._pid != os.getpid() or self._worker is None:
+                self._queue = queue.Queue(maxsize=self.max_queue_size)
+                self._worker = threading.Thread(target=self._worker_loop,
+                                                name='stats-writer', daemon=True)
+                self._pid = os.getpid()
+                self._worker.start()
+
+    def _increment(self, **counters):
+        """
+        increment the counters atomically method
+        :param counters: counter name -> increment
+        :return:
+        """
+        with self._counters_lock:
+            for name, value in counters.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def _write_rows(self, conn, rows):
+        """
+        write the rows and the daily rollup increments in one transaction method
+        :param conn:
+        :param rows: list of (request_datetime, sentiment_result) tuples
+        :return:
+        """
+        rollup_counts = Counter((request_datetime.date().isoformat(), sentiment_result)
+                                for request_datetime, sentiment_result in rows)
+
+        cur = conn.cursor()
+        cur.executemany(self.database.db_insert_stats_query, rows)
+        cur.executemany(self.database.db_upsert_rollup_query,
+                        [(stats_date, sentiment_result, prediction_count)
+                         for (stats_date, sentiment_result), prediction_count
+                         in rollup_counts.items()])
+        conn.commit()
+
+        self._increment(rows_written=len(rows), batches_written=1)
+
+    def _flush_batch(self, conn, rows):
+        """
+        write the batch, reconnect on the next batch if the write fails
+        :param conn:
+        :param rows:
+        :return: the connection to use for the next batch or None
+        """
+        try:
+            if conn is None:
+                conn = self.database.connect()
+            self._write_rows(conn, rows)
+        except Exception as general_err:
+            self._increment(write_errors=1, rows_dropped=len(rows))
+            print(f"Stats writer failed to write {len(rows)} rows: {general_err}")
+            if conn is not None:
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+            return None
+        return conn
+
+    def _worker_loop(self):
+        """
+        worker thread loop draining the queue
+        :return:
+        """
+        work_queue = self._queue
+        conn = None
+        rows = []
+        deadline = None
+        stopping = False
+
+        while not stopping:
+            timeout = None if deadline is None else max(deadline - time.monotonic(), 0)
+            try:
+                item = work_queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            if item is _STOP:
+                stopping = True
+            elif isinstance(item, threading.Event):
+                # flush request, write what is queued so far and wake up the caller
+                if rows:
+                    conn = self._flush_batch(conn, rows)
+                    rows, deadline = [], None
+                item.set()
+                continue
+            elif item is not None:
+                rows.append(item)
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+
+            if rows and (stopping or len(rows) >= self.batch_size or
+                         time.monotonic() >= deadline):
+                conn = self._flush_batch(conn, rows)
+                rows, deadline = [], None
+
+        if conn is not None:
+            conn.close()
+
+    def write(self, sentiment_result, request_datetime=None):
+        """
+        queue one prediction stats row method, never blocks the caller
+        :param sentiment_result:
+        :param request_datetime: defaults to now
+        :return:
+        """
+        row = (request_datetime or datetime.now(), sentiment_result)
+
+        if self.synchronous:
+            conn = self.database.connect()
+            try:
+                self._write_rows(conn, [row])
+            finally:
+                conn.close()
+            return
+
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            self._increment(rows_dropped=1)
+
+    def flush(self, timeout=None):
+        """
+        block until all the rows queued so far are written method
+        :param timeout: seconds
+        :return: True if flushed within the timeout
+        """
+        if self.synchronous or self._worker is None or self._pid != os.getpid():
+            return True
+
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        flushed = threading.Event()
+        try:
+            self._queue.put(flushed, timeout=timeout)
+        except queue.Full:
+            return False
+        return flushed.wait(max(0, deadline - time.monotonic()) if deadline is not None
+                            else None)
+
+    def close(self, timeout=10):
+        """
+        write the pending rows and stop the worker thread method
+        :param timeout: seconds
+        :return:
+        """
+        if self.synchronous or self._worker is None or self._pid != os.getpid():
+            return
+
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            print(f"Stats writer queue stayed full for {timeout}s, "
+                  f"{self._queue.qsize()} rows are not written")
+            return
+        self._worker.join(max(0, deadline - time.monotonic()) if deadline is not None else None)
+        self._worker = None
+
+    def metrics(self):
+        """
+        stats writer counters method
+        :return: dict
+        """
+        with self._counters_lock:
+            counters = {'rows_written': self.rows_written,
+                        'rows_dropped': self.rows_dropped,
+                        'batches_written': self.batches_written,
+                        'write_errors': self.write_errors}
+        return {**counters,
+                'rows_queued': self._queue.qsize() if self._queue is not None else 0}
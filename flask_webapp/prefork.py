@@ -0,0 +1,224 @@
+"""
+prefork web server module
+
+The master process imports the app (models, database schema) once, binds the
+listening socket, freezes the loaded objects out of the garbage collector and
+forks the worker processes. The workers serve the shared socket by waitress,
+so the memory pages of the models stay shared copy-on-write between them.
+A worker is recycled after max_requests (+ random jitter) requests: it stops
+accepting, drains the in-flight requests, runs on_worker_exit (e.g. flushes
+the stats writer) and exits, the master forks a replacement.
+SIGTERM / SIGINT on the master stops the workers the same way.
+
+run from the repository root: python -m flask_webapp.prefork
+"""
+import os
+import gc
+import time
+import random
+import signal
+import socket
+import threading
+from waitress import wasyncore
+from waitress.server import create_server
+
+
+class _WorkerState:
+    """
+    worker process stop flag and served requests counter
+    """
+    def __init__(self, max_requests):
+        self.max_requests = max_requests
+        self.requests = 0
+        self.stopping = False
+        self.lock = threading.Lock()
+        # wakes the server loop up, set once the server exists
+        self.wake_up = None
+
+
+def _counting_app(app, state):
+    """
+    function wrapping the wsgi app, requests the worker stop after max_requests
+    :param app:
+    :param state:
+    :return: wsgi app
+    """
+    def _app(environ, start_response):
+        with state.lock:
+            state.requests += 1
+            recycle = state.max_requests and state.requests >= state.max_requests \
+                and not state.stopping
+            if recycle:
+                state.stopping = True
+        if recycle:
+            state.wake_up()
+        return app(environ, start_response)
+
+    return _app
+
+
+def _busy(channel):
+    return bool(channel.requests or channel.total_outbufs_len)
+
+
+def _serve_worker(app, listen_socket, threads, max_requests, graceful_timeout, on_worker_start,
+                  on_worker_exit):
+    """
+    worker process function serving until stopped or recycled
+    :return: never returns, exits the process
+    """
+    state = _WorkerState(max_requests)
+
+    # before the server threads exist, e.g. forks the scoring processes
+    if on_worker_start is not None:
+        on_worker_start()
+
+    def _stop(signum, frame):
+        state.stopping = True
+
+    signal.signal(signal.SIGTERM, _stop)
+    signal.signal(signal.SIGINT, _stop)
+
+    server = create_server(_counting_app(app, state), sockets=[listen_socket], threads=threads)
+    state.wake_up = server.pull_trigger
+
+    while not state.stopping:
+        wasyncore.loop(timeout=0.5, map=server._map, use_poll=True, count=1)
+
+    # stop accepting, the other workers keep serving the shared socket
+    server.accepting = False
+    server.del_channel()
+    listen_socket.close()
+
+    # drain the in-flight requests, idle keep-alive connections are closed
+    deadline = time.monotonic() + graceful_timeout
+    while time.monotonic() < deadline:
+        for channel in list(server.active_channels.values()):
+            if not _busy(channel):
+                channel.handle_close()
+        if not server.active_channels:
+            break
+        wasyncore.loop(timeout=0.1, map=server._map, use_poll=True, count=1)
+
+    server.task_dispatcher.shutdown(timeout=graceful_timeout)
+
+    exit_code = 0
+    try:
+        if on_worker_exit is not None:
+            on_worker_exit()
+    except Exception as general_err:
+        print(f"Worker {os.getpid()} exit hook failed: {general_err}")
+        exit_code = 1
+
+    # skip the atexit hooks and the finalizers inherited from the master
+    os._exit(exit_code)
+
+
+def serve_prefork(app, host='127.0.0.1', port=5000, workers=2, threads=4,
+                  max_requests=10000, max_requests_jitter=1000, graceful_timeout=10,
+                  on_worker_start=None, on_worker_exit=None, listen_socket=None):
+    """
+    function running the prefork master process until SIGTERM / SIGINT
+    :param app: wsgi app, already loaded by the master
+    :param host:
+    :param port:
+    :param workers: worker processes count
+    :param threads: waitress threads per worker
+    :param max_requests: requests served by a worker before it is recycled, 0 disables
+    :param max_requests_jitter: random extra requests, so the workers do not recycle together
+    :param graceful_timeout: seconds given to the in-flight requests on a worker stop
+    :param on_worker_start: function called in the worker before it starts serving
+    :param on_worker_exit: function called in the worker before it exits
+    :param listen_socket: optional already bound socket
+    :return:
+    """
+    if listen_socket is None:
+        listen_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        listen_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        listen_socket.bind((host, port))
+    listen_socket.listen(1024)
+    listen_socket.setblocking(False)
+
+    stopping = []
+
+    def _stop(signum, frame):
+        stopping.append(signum)
+
+    signal.signal(signal.SIGTERM, _stop)
+    signal.signal(signal.SIGINT, _stop)
+
+    # everything loaded so far is never collected, the gc does not touch (copy)
+    # the pages of these objects in the workers
+    gc.collect()
+    gc.freeze()
+
+    def _fork_worker():
+        worker_max_requests = max_requests + random.randint(0, max_requests_jitter) \
+            if max_requests else 0
+        pid = os.fork()
+        if pid == 0:
+            try:
+                _serve_worker(app, listen_socket, threads, worker_max_requests,
+                              graceful_timeout, on_worker_start, on_worker_exit)
+            finally:
+                os._exit(1)
+        return pid
+
+    worker_pids = {_fork_worker() for _ in range(workers)}
+    print(f"Prefork master {os.getpid()} serving on "
+          f"http://{listen_socket.getsockname()[0]}:{listen_socket.getsockname()[1]} "
+          f"with {workers} workers {sorted(worker_pids)}")
+
+    while not stopping:
+        pid, _ = os.waitpid(-1, os.WNOHANG)
+        if pid == 0:
+            time.sleep(0.2)
+            continue
+        if pid in worker_pids:
+            worker_pids.discard(pid)
+            if not stopping:
+                worker_pids.add(_fork_worker())
+
+    for pid in worker_pids:
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+
+    deadline = time.monotonic() + graceful_timeout + 5
+    while worker_pids and time.monotonic() < deadline:
+        pid, _ = os.waitpid(-1, os.WNOHANG)
+        if pid == 0:
+            time.sleep(0.1)
+        else:
+            worker_pids.discard(pid)
+
+    for pid in worker_pids:
+        os.kill(pid, signal.SIGKILL)
+        os.waitpid(pid, 0)
+
+    listen_socket.close()
+
+
+if __name__ == "__main__":
+    from flask_webapp.app import APP, STATS_WRITER, INFERENCE_EXECUTOR
+
+    def _on_worker_start():
+        if INFERENCE_EXECUTOR is not None:
+            INFERENCE_EXECUTOR.start()
+
+    def _on_worker_exit():
+        if INFERENCE_EXECUTOR is not None:
+            INFERENCE_EXECUTOR.shutdown()
+        STATS_WRITER.close()
+
+    serve_prefork(APP,
+                  host=os.environ.get('HOST', '127.0.0.1'),
+                  port=int(os.environ.get('PORT', 5000)),
+                  workers=APP.config['prefork_workers'],
+                  threads=APP.config['waitress_threads'],
+                  max_requests=APP.config['prefork_max_requests'],
+                  max_requests_jitter=APP.config['prefork_max_requests_jitter'],
+                  graceful_timeout=APP.config['prefork_graceful_timeout'],
+                  on_worker_start=_on_worker_start,
+                  on_worker_exit=_on_worker_exit)
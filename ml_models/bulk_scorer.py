@@ -0,0 +1,263 @@
+"""
+bulk scoring module
+
+Scores archived reviews offline without the web api. The input csv / jsonl
+file is streamed by generators: read -> chunks of rows -> process pool
+workers (normalize, language gate, vectorize and score the chunk) -> results
+written in the input order, chunk by chunk. At most max_workers * 2 chunks
+are in flight, so the memory stays bounded whatever the input size.
+The output holds one line per input row, an interrupted run resumes after
+the last written row with --resume (or from any row with --offset).
+
+run from the repository root:
+python -m ml_models.bulk_scorer reviews.csv scores.jsonl [--resume] [--offset N]
+"""
+import os
+import io
+import csv
+import json
+import time
+import argparse
+from collections import deque
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor
+
+DEFAULT_CHUNK_SIZE = 1000
+# bytes read at once by resume_offset
+RESUME_BLOCK_SIZE = 1024 * 1024
+
+OUTPUT_CSV_FIELDS = ('row', 'sentiment', 'probability', 'error')
+
+
+def read_texts(input_path, text_column=0):
+    """
+    generator reading the texts of a csv or jsonl file
+    :param input_path: .jsonl / .ndjson lines are JSON objects, other files are csv
+    :param text_column: csv column index or name (the first row is then the header),
+    jsonl object key
+    :return: generator of texts, None for an invalid row
+    """
+    with open(input_path, encoding='utf8', newline='') as input_file:
+        if input_path.endswith(('.jsonl', '.ndjson')):
+            for line in input_file:
+                if not line.strip():
+                    continue
+                # a malformed line is scored as an invalid row, the run goes on
+                try:
+                    json_object = json.loads(line)
+                except ValueError:
+                    json_object = None
+                yield json_object.get(text_column) if isinstance(json_object, dict) else None
+            return
+
+        reader = csv.reader(input_file)
+        if isinstance(text_column, str) and not text_column.isdigit():
+            text_column = next(reader).index(text_column)
+        text_column = int(text_column)
+        for row in reader:
+            yield row[text_column] if len(row) > text_column else None
+
+
+def chunks(rows, chunk_size):
+    """
+    generator grouping the rows to lists of chunk_size rows
+    :param rows: iterable
+    :param chunk_size:
+    :return: generator of lists
+    """
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _init_worker(language_gate):
+    """
+    function configuring the scoring worker process
+    :param language_gate: 'ngram' or 'langdetect'
+    :return:
+    """
+    from utils.language_gate import configure_language_gate
+    configure_language_gate(language_gate)
+
+
+def score_chunk(texts, languages=None):
+    """
+    function validating and scoring a chunk of texts the way the api does,
+    the valid texts are vectorized and scored together
+    :param texts:
+    :param languages: acceptable detected language codes,
+    defaults to the web app acceptable_detected_language_codes
+    :return: list of (sentiment_result, error_message) tuples
+    """
+    from utils.utilities import Webapp
+    from ml_models import webapp_interface
+
+    if languages is None:
+        from flask_webapp.app import APP
+        languages = APP.config['acceptable_detected_language_codes']
+
+    results = []
+    valid_texts = []
+    for text in texts:
+        input_text_for_eval, error_message = Webapp.input_text_preparator(text)
+        if not error_message:
+            error_message = Webapp.input_language_validator(text, languages)
+        if not error_message:
+            valid_texts.append((len(results), input_text_for_eval))
+        results.append((None, error_message))
+
+    sentiment_results = webapp_interface.ml_model_batch_evaluator(
+        [input_text_for_eval for _, input_text_for_eval in valid_texts])
+    for (index, _), sentiment_result in zip(valid_texts, sentiment_results):
+        results[index] = (sentiment_result, None)
+
+    return results
+
+
+def resume_offset(output_path):
+    """
+    function counting the rows already written, a partially written last line
+    of an interrupted run is truncated, the file is read block by block
+    :param output_path:
+    :return: rows count
+    """
+    if not os.path.isfile(output_path):
+        return 0
+
+    rows = 0
+    complete_length = 0
+    with open(output_path, 'rb+') as output_file:
+        position = 0
+        for block in iter(lambda: output_file.read(RESUME_BLOCK_SIZE), b''):
+            block_rows = block.count(b'\n')
+            if block_rows:
+                rows += block_rows
+                complete_length = position + block.rfind(b'\n') + 1
+            position += len(block)
+
+        if complete_length < position:
+            output_file.truncate(complete_length)
+
+    # the csv header is not a row
+    if output_path.endswith('.csv') and rows:
+        rows -= 1
+    return rows
+
+
+def _output_lines(first_row, results, as_csv):
+    """
+    function serializing a chunk of results
+    :param first_row: input row number of the first result
+    :param results: list of (sentiment_result, error_message) tuples
+    :param as_csv:
+    :return: str
+    """
+    output_rows = []
+    for row, (sentiment_result, error_message) in enumerate(results, first_row):
+        overall_sentiment = sentiment_result['overall_sentiment'] if sentiment_result else {}
+        output_rows.append((row, overall_sentiment.get('sentiment'),
+                            float(overall_sentiment['probability']) if sentiment_result
+                            else None, error_message))
+
+    if not as_csv:
+        return ''.join(json.dumps(dict(zip(OUTPUT_CSV_FIELDS, output_row)),
+                                  ensure_ascii=False) + '\n' for output_row in output_rows)
+
+    output_buffer = io.StringIO()
+    csv.writer(output_buffer, lineterminator='\n').writerows(output_rows)
+    return output_buffer.getvalue()
+
+
+def bulk_score(input_path, output_path, text_column=0, chunk_size=DEFAULT_CHUNK_SIZE,
+               max_workers=None, offset=0, scorer=score_chunk, language_gate='ngram',
+               progress_interval=10):
+    """
+    function streaming the input rows through the process pool to the output file
+    :param input_path: csv or jsonl file
+    :param output_path: .csv or jsonl file, appended to when offset > 0
+    :param text_column: see read_texts()
+    :param chunk_size: rows scored by one worker task
+    :param max_workers: scoring processes, defaults to the cpu count
+    :param offset: input rows to skip, e.g. resume_offset(output_path)
+    :param scorer: module level function scoring a list of texts
+    :param language_gate: language gate of the workers
+    :param progress_interval: seconds between the progress reports
+    :return: rows scored in this run
+    """
+    max_workers = max_workers or os.cpu_count()
+    max_in_flight = max_workers * 2
+    as_csv = output_path.endswith('.csv')
+
+    rows = islice(read_texts(input_path, text_column), offset, None)
+    in_flight = deque()
+    scored_rows = 0
+    started = last_report = time.monotonic()
+
+    with open(output_path, 'a' if offset else 'w', encoding='utf8', newline='') as output_file, \
+            ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                                initargs=(language_gate,)) as pool:
+        if as_csv and not offset:
+            csv.writer(output_file, lineterminator='\n').writerow(OUTPUT_CSV_FIELDS)
+
+        def _write_oldest():
+            first_row, future = in_flight.popleft()
+            results = future.result()
+            output_file.write(_output_lines(first_row, results, as_csv))
+            output_file.flush()
+            return len(results)
+
+        next_row = offset
+        for chunk in chunks(rows, chunk_size):
+            in_flight.append((next_row, pool.submit(scorer, chunk)))
+            next_row += len(chunk)
+
+            # the oldest chunk is written first, the output keeps the input order
+            while len(in_flight) >= max_in_flight or (in_flight and in_flight[0][1].done()):
+                scored_rows += _write_oldest()
+
+            if time.monotonic() - last_report >= progress_interval:
+                last_report = time.monotonic()
+                print(f"Scored {offset + scored_rows} rows, "
+                      f"{scored_rows / (last_report - started):.0f} rows/s", flush=True)
+
+        while in_flight:
+            scored_rows += _write_oldest()
+
+    elapsed = time.monotonic() - started
+    print(f"Scored {scored_rows} rows (rows {offset}-{offset + scored_rows}) in {elapsed:.1f}s, "
+          f"{scored_rows / elapsed if elapsed else 0:.0f} rows/s", flush=True)
+    return scored_rows
+
+
+if __name__ == "__main__":
+    PARSER = argparse.ArgumentParser(description='score a csv / jsonl file of reviews')
+    PARSER.add_argument('input_path', help='csv file or .jsonl / .ndjson file')
+    PARSER.add_argument('output_path', help='.csv or .jsonl results file')
+    PARSER.add_argument('--text-column', default='0',
+                        help='csv column index or header name, jsonl key (default 0 / text)')
+    PARSER.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    PARSER.add_argument('--workers', type=int, default=None)
+    PARSER.add_argument('--language-gate', default=os.environ.get('LANGUAGE_GATE', 'ngram'))
+    RESUME = PARSER.add_mutually_exclusive_group()
+    RESUME.add_argument('--offset', type=int, default=0, help='input rows to skip')
+    RESUME.add_argument('--resume', action='store_true',
+                        help='continue after the rows already in the output file')
+    ARGS = PARSER.parse_args()
+
+    TEXT_COLUMN = ARGS.text_column
+    if ARGS.input_path.endswith(('.jsonl', '.ndjson')) and TEXT_COLUMN == '0':
+        TEXT_COLUMN = 'text'
+
+    # the forked scoring processes share the models and the web app config loaded here
+    from flask_webapp.app import APP
+    from ml_models import webapp_interface
+    print(f"Scoring {ARGS.input_path} by the models version {webapp_interface.MODELS_VERSION}, "
+          f"accepted languages {APP.config['acceptable_detected_language_codes']}")
+
+    OFFSET = resume_offset(ARGS.output_path) if ARGS.resume else ARGS.offset
+    bulk_score(ARGS.input_path, ARGS.output_path, text_column=TEXT_COLUMN,
+               chunk_size=ARGS.chunk_size, max_workers=ARGS.workers, offset=OFFSET,
+               language_gate=ARGS.language_gate)
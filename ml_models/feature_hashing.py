@@ -0,0 +1,49 @@
+"""
+feature hashing module
+
+A HashingVectorizer can replace the CountVectorizer of each trainer. The
+n-grams are hashed (murmurhash3) into a fixed 2^k columns feature space, so
+the vectorizer keeps no vocabulary dict: its memory does not grow with the
+corpus, transform does no vocabulary lookups and the pickled vectorizer is
+a few hundred bytes. The model coefficients take 2^k columns instead.
+Signed hashing (alternate_sign) makes the colliding n-grams cancel out on
+average, the naive bayes counts must stay non-negative so its hashing is unsigned.
+
+FEATURE_HASHING=on env. variable makes the trainers use the hashing vectorizers,
+FEATURE_HASHING_BITS sets k (default 18)
+"""
+import os
+
+FEATURE_HASHING = os.environ.get('FEATURE_HASHING', 'off') == 'on'
+
+N_FEATURES_EXPONENT = int(os.environ.get('FEATURE_HASHING_BITS', 18))
+
+
+def hashing_vectorizer(ngram_range=(1, 1), alternate_sign=True,
+                       n_features_exponent=N_FEATURES_EXPONENT, norm=None):
+    """
+    function creating a stateless vectorizer counting the hashed n-grams,
+    a drop-in replacement of CountVectorizer(ngram_range=ngram_range)
+    :param ngram_range:
+    :param alternate_sign: signed hashing, False for the models needing non-negative counts
+    :param n_features_exponent: k of the 2^k features
+    :param norm: None for the counts, 'l2' for the unit length rows
+    :return: HashingVectorizer
+    """
+    # imported here, the web app importing this module scores the memory-mapped
+    # artifacts without importing sklearn at all
+    from sklearn.feature_extraction.text import HashingVectorizer
+
+    return HashingVectorizer(ngram_range=ngram_range, n_features=2 ** n_features_exponent,
+                             alternate_sign=alternate_sign, norm=norm)
+
+
+def is_hashing_vectorizer(vectorizer):
+    """
+    function telling the hashing vectorizers from the vocabulary based ones
+    :param vectorizer:
+    :return:
+    """
+    from sklearn.feature_extraction.text import HashingVectorizer
+
+    return isinstance(vectorizer, HashingVectorizer)
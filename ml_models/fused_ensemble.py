@@ -0,0 +1,450 @@
+"""
+fused linear ensemble scorer module
+
+All three sentiment models end in a linear score per class:
+- MultinomialNB joint log likelihood over CountVectorizer counts
+- LogisticRegression decision function over CountVectorizer counts
+- SGDClassifier (log loss) decision function over l2 normalized tf-idf
+
+The compile step merges the three vocabularies into one term index with a
+(n_terms, 3) weight matrix, so the runtime scorer tokenizes the input once,
+does one dict lookup per n-gram and a few array gathers per input string.
+"""
+import os
+import re
+import json
+import shutil
+import tempfile
+import numpy as np
+
+# weight matrix columns
+NB_COLUMN = 0
+LR_COLUMN = 1
+SVM_COLUMN = 2
+
+FUSED_ENSEMBLE_FILE_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__),
+                                                        'fused_ensemble.npz'))
+
+# directory of the .npy arrays and the manifest.json memory-mapped by the web server workers,
+# MODEL_ARTIFACTS_DIR env. variable points the web app to another exported directory
+MODEL_ARTIFACTS_DIR_PATH = os.path.abspath(
+    os.environ.get('MODEL_ARTIFACTS_DIR') or os.path.join(os.path.dirname(__file__), 'artifacts'))
+
+MANIFEST_FILE_NAME = 'manifest.json'
+MANIFEST_FORMAT_VERSION = 1
+
+_ARTIFACT_ARRAYS = ('terms', 'weights', 'svm_idf', 'bias', 'scale', 'ensemble_weights')
+
+
+def _check_vectorizer(vectorizer):
+    """
+    function checking the vectorizer analyzer can be replicated by the fused tokenizer
+    :param vectorizer:
+    :return:
+    """
+    if not hasattr(vectorizer, 'vocabulary_'):
+        raise ValueError(f"Only vocabulary based vectorizers can be fused, the feature hashing "
+                         f"models are scored by the sklearn pipelines: {vectorizer}")
+
+    if vectorizer.analyzer != 'word' or vectorizer.tokenizer is not None or \
+            vectorizer.preprocessor is not None or vectorizer.stop_words is not None or \
+            vectorizer.strip_accents is not None or not vectorizer.lowercase or \
+            vectorizer.binary:
+        raise ValueError(f"Unsupported vectorizer configuration for fusing: {vectorizer}")
+
+
+def _logistic_scale(model):
+    """
+    function returning the scale of the binary decision function inside the sigmoid,
+    binary multinomial logistic regression is a softmax over [-d, d]
+    :param model:
+    :return:
+    """
+    multi_class = getattr(model, 'multi_class', 'auto')
+    if multi_class == 'multinomial':
+        return 2.0
+    return 1.0
+
+
+def compile_fused_ensemble(vector_nb, model_nb, vector_lr, model_lr, model_svm, ensemble_weights):
+    """
+    function compiling the three fitted sklearn models into one FusedEnsemble
+    :param vector_nb: fitted CountVectorizer of the naive bayes model
+    :param model_nb: fitted MultinomialNB
+    :param vector_lr: fitted CountVectorizer of the logistic regression model
+    :param model_lr: fitted LogisticRegression
+    :param model_svm: fitted Pipeline (vect, tfidf, clf) or a GridSearchCV wrapping it
+    :param ensemble_weights: (nb, lr, svm) weights of the overall probability
+    :return: FusedEnsemble
+    """
+    pipeline_svm = getattr(model_svm, 'best_estimator_', model_svm)
+    vector_svm, tfidf_svm, clf_svm = [step for _, step in pipeline_svm.steps]
+
+    for model in (model_nb, model_lr, clf_svm):
+        if len(model.classes_) != 2:
+            raise ValueError(f"Only binary models can be fused: {model}")
+
+    for vectorizer in (vector_nb, vector_lr, vector_svm):
+        _check_vectorizer(vectorizer)
+
+    token_patterns = {vector_nb.token_pattern, vector_lr.token_pattern, vector_svm.token_pattern}
+    if len(token_patterns) != 1:
+        raise ValueError(f"All vectorizers need to share the token pattern: {token_patterns}")
+
+    terms = sorted(set(vector_nb.vocabulary_) |
+                   set(vector_lr.vocabulary_) |
+                   set(vector_svm.vocabulary_))
+    term_index = {term: index for index, term in enumerate(terms)}
+
+    weights = np.zeros((len(terms), 3), dtype=np.float64)
+    svm_idf = np.zeros(len(terms), dtype=np.float64)
+
+    # naive bayes log likelihood ratio of class 1 over class 0
+    nb_delta = model_nb.feature_log_prob_[1] - model_nb.feature_log_prob_[0]
+    for term, column in vector_nb.vocabulary_.items():
+        weights[term_index[term], NB_COLUMN] = nb_delta[column]
+
+    for term, column in vector_lr.vocabulary_.items():
+        weights[term_index[term], LR_COLUMN] = model_lr.coef_[0][column]
+
+    idf = tfidf_svm.idf_ if tfidf_svm.use_idf else None
+    for term, column in vector_svm.vocabulary_.items():
+        weights[term_index[term], SVM_COLUMN] = clf_svm.coef_[0][column]
+        svm_idf[term_index[term]] = idf[column] if idf is not None else 1.0
+
+    bias = np.array([model_nb.class_log_prior_[1] - model_nb.class_log_prior_[0],
+                     model_lr.intercept_[0],
+                     clf_svm.intercept_[0]], dtype=np.float64)
+
+    scale = np.array([1.0, _logistic_scale(model_lr), 1.0], dtype=np.float64)
+
+    max_ngram = max(vector_nb.ngram_range[1], vector_lr.ngram_range[1],
+                    vector_svm.ngram_range[1])
+
+    return FusedEnsemble(terms=np.array(terms),
+                         weights=weights,
+                         svm_idf=svm_idf,
+                         bias=bias,
+                         scale=scale,
+                         ensemble_weights=np.array(ensemble_weights, dtype=np.float64),
+                         token_pattern=token_patterns.pop(),
+                         max_ngram=max_ngram,
+                         svm_sublinear_tf=tfidf_svm.sublinear_tf,
+                         svm_norm=tfidf_svm.norm)
+
+
+def _export_dir_prefix(artifacts_dir):
+    """
+    function naming the hidden export directories the artifacts_dir symlink points to
+    :param artifacts_dir:
+    :return: str
+    """
+    return f'.{os.path.basename(os.path.abspath(artifacts_dir))}-'
+
+
+def remove_artifacts(artifacts_dir=MODEL_ARTIFACTS_DIR_PATH):
+    """
+    function removing the exported artifacts, the symlink first, then the export directories
+    :param artifacts_dir:
+    :return: list of the removed paths
+    """
+    artifacts_dir = os.path.abspath(artifacts_dir)
+    removed = []
+    if os.path.islink(artifacts_dir):
+        os.remove(artifacts_dir)
+        removed.append(artifacts_dir)
+    elif os.path.isdir(artifacts_dir):
+        shutil.rmtree(artifacts_dir)
+        removed.append(artifacts_dir)
+
+    parent_dir = os.path.dirname(artifacts_dir)
+    prefix = _export_dir_prefix(artifacts_dir)
+    for file_name in os.listdir(parent_dir) if os.path.isdir(parent_dir) else []:
+        export_dir = os.path.join(parent_dir, file_name)
+        if file_name.startswith(prefix) and os.path.isdir(export_dir) \
+                and not os.path.islink(export_dir):
+            shutil.rmtree(export_dir, ignore_errors=True)
+            removed.append(export_dir)
+    return removed
+
+
+class FusedEnsemble:
+    """
+    fused linear ensemble scorer class
+    """
+    def __init__(self, terms, weights, svm_idf, bias, scale, ensemble_weights,
+                 token_pattern, max_ngram, svm_sublinear_tf, svm_norm):
+        if svm_norm not in ('l2', None):
+            raise ValueError(f"Unsupported tf-idf norm for fusing: {svm_norm}")
+
+        self.terms = terms
+        self.weights = weights
+        self.svm_idf = svm_idf
+        self.bias = bias
+        self.scale = scale
+        self.ensemble_weights = ensemble_weights
+        self.token_pattern = token_pattern
+        self.max_ngram = int(max_ngram)
+        self.svm_sublinear_tf = bool(svm_sublinear_tf)
+        self.svm_norm = svm_norm
+
+        self._token_re = re.compile(token_pattern)
+        # a private term -> index dict is faster to look up, memory-mapped terms are
+        # binary searched in place so the forked workers share their pages
+        if isinstance(terms, np.memmap):
+            self._term_index = None
+            self._term_indexes = self._searched_term_indexes
+        else:
+            self._term_index = {term.decode('utf8') if isinstance(term, bytes) else term: index
+                                for index, term in enumerate(terms.tolist())}
+            self._term_indexes = self._mapped_term_indexes
+
+    def __repr__(self):
+        return f"FusedEnsemble(terms={len(self.terms)}, max_ngram={self.max_ngram})"
+
+    def save(self, file_path=FUSED_ENSEMBLE_FILE_PATH):
+        """
+        save the compiled arrays to a numpy .npz file method
+        :param file_path:
+        :return:
+        """
+        np.savez(file_path,
+                 terms=self.terms,
+                 weights=self.weights,
+                 svm_idf=self.svm_idf,
+                 bias=self.bias,
+                 scale=self.scale,
+                 ensemble_weights=self.ensemble_weights,
+                 token_pattern=np.array(self.token_pattern),
+                 max_ngram=np.array(self.max_ngram),
+                 svm_sublinear_tf=np.array(self.svm_sublinear_tf),
+                 svm_norm=np.array(self.svm_norm or ''))
+
+    @classmethod
+    def load(cls, file_path=FUSED_ENSEMBLE_FILE_PATH):
+        """
+        load the compiled arrays from a numpy .npz file method
+        :param file_path:
+        :return: FusedEnsemble
+        """
+        with np.load(file_path, allow_pickle=False) as arrays:
+            return cls(terms=arrays['terms'],
+                       weights=arrays['weights'],
+                       svm_idf=arrays['svm_idf'],
+                       bias=arrays['bias'],
+                       scale=arrays['scale'],
+                       ensemble_weights=arrays['ensemble_weights'],
+                       token_pattern=str(arrays['token_pattern']),
+                       max_ngram=int(arrays['max_ngram']),
+                       svm_sublinear_tf=bool(arrays['svm_sublinear_tf']),
+                       svm_norm=str(arrays['svm_norm']) or None)
+
+    def export(self, artifacts_dir=MODEL_ARTIFACTS_DIR_PATH):
+        """
+        export the arrays as .npy files with a manifest.json method,
+        the arrays are written to a new hidden sibling directory and the artifacts_dir
+        symlink is swapped to it atomically, so a loading worker sees either the previous
+        or the new export, the previous export is kept for the workers still loading it
+        and the older ones are removed
+        :param artifacts_dir:
+        :return: the manifest dict
+        """
+        artifacts_dir = os.path.abspath(artifacts_dir)
+        parent_dir = os.path.dirname(artifacts_dir)
+        os.makedirs(parent_dir, exist_ok=True)
+        prefix = _export_dir_prefix(artifacts_dir)
+        temp_dir = tempfile.mkdtemp(dir=parent_dir, prefix=prefix)
+
+        manifest = {'format_version': MANIFEST_FORMAT_VERSION,
+                    'token_pattern': self.token_pattern,
+                    'max_ngram': self.max_ngram,
+                    'svm_sublinear_tf': self.svm_sublinear_tf,
+                    'svm_norm': self.svm_norm,
+                    'arrays': {}}
+
+        for name in _ARTIFACT_ARRAYS:
+            array = np.ascontiguousarray(getattr(self, name))
+            if name == 'terms' and array.dtype.kind == 'U':
+                # utf8 bytes keep the sort order and take a quarter of the fixed width unicode
+                array = np.char.encode(array, 'utf8')
+            np.save(os.path.join(temp_dir, f'{name}.npy'), array, allow_pickle=False)
+            manifest['arrays'][name] = {'file': f'{name}.npy',
+                                        'dtype': array.dtype.str,
+                                        'shape': list(array.shape)}
+
+        with open(os.path.join(temp_dir, MANIFEST_FILE_NAME), 'w', encoding='utf8') as manifest_file:
+            json.dump(manifest, manifest_file, indent=2)
+
+        previous_dir = os.path.realpath(artifacts_dir) if os.path.islink(artifacts_dir) else None
+        if os.path.isdir(artifacts_dir) and not os.path.islink(artifacts_dir):
+            # a directory exported before the symlink swapping is moved aside once
+            previous_dir = tempfile.mkdtemp(dir=parent_dir, prefix=prefix)
+            os.rename(artifacts_dir, previous_dir)
+
+        # the relative link keeps working when the parent directory is moved
+        link_path = temp_dir + '.link'
+        os.symlink(os.path.basename(temp_dir), link_path)
+        os.replace(link_path, artifacts_dir)
+
+        for file_name in os.listdir(parent_dir):
+            export_dir = os.path.join(parent_dir, file_name)
+            if file_name.startswith(prefix) and export_dir not in (temp_dir, previous_dir) \
+                    and os.path.isdir(export_dir) and not os.path.islink(export_dir):
+                shutil.rmtree(export_dir, ignore_errors=True)
+        return manifest
+
+    @classmethod
+    def load_artifacts(cls, artifacts_dir=MODEL_ARTIFACTS_DIR_PATH, mmap_mode='r'):
+        """
+        load the exported arrays method, memory-mapped read-only by default
+        so all the processes loading the same files share the physical pages
+        :param artifacts_dir:
+        :param mmap_mode: numpy.load mmap_mode, None reads the arrays to private memory
+        :return: FusedEnsemble
+        """
+        # the symlink is resolved once, a concurrent export does not mix the arrays
+        artifacts_dir = os.path.realpath(artifacts_dir)
+        with open(os.path.join(artifacts_dir, MANIFEST_FILE_NAME), encoding='utf8') as manifest_file:
+            manifest = json.load(manifest_file)
+
+        if manifest['format_version'] != MANIFEST_FORMAT_VERSION:
+            raise ValueError(f"Unsupported model artifacts format: {manifest['format_version']}")
+
+        arrays = {}
+        for name, array_manifest in manifest['arrays'].items():
+            array = np.load(os.path.join(artifacts_dir, array_manifest['file']),
+                            mmap_mode=mmap_mode, allow_pickle=False)
+            if array.dtype.str != array_manifest['dtype'] or \
+                    list(array.shape) != array_manifest['shape']:
+                raise ValueError(f"Model artifact {name} does not match the manifest")
+            arrays[name] = array
+
+        return cls(token_pattern=manifest['token_pattern'],
+                   max_ngram=manifest['max_ngram'],
+                   svm_sublinear_tf=manifest['svm_sublinear_tf'],
+                   svm_norm=manifest['svm_norm'],
+                   **arrays)
+
+    def _term_counts(self, input_string):
+        """
+        tokenize the input string once and count the known n-grams method
+        :param input_string:
+        :return: tuple (term indexes, term counts)
+        """
+        tokens = self._token_re.findall(input_string.lower())
+
+        ngrams = list(tokens)
+        for ngram_size in range(2, self.max_ngram + 1):
+            ngrams.extend([' '.join(tokens[position:position + ngram_size])
+                           for position in range(len(tokens) - ngram_size + 1)])
+
+        return np.unique(self._term_indexes(ngrams), return_counts=True)
+
+    def _mapped_term_indexes(self, ngrams):
+        """
+        look up the known n-grams in the term index dict method
+        :param ngrams:
+        :return: np.ndarray of term indexes
+        """
+        term_index = self._term_index
+        return np.array([term_index[ngram] for ngram in ngrams if ngram in term_index],
+                        dtype=np.intp)
+
+    def _searched_term_indexes(self, ngrams):
+        """
+        binary search the known n-grams in the sorted terms array method
+        :param ngrams:
+        :return: np.ndarray of term indexes
+        """
+        if not ngrams or not len(self.terms):
+            return np.zeros(0, dtype=np.intp)
+
+        if self.terms.dtype.kind == 'S':
+            ngrams = [ngram.encode('utf8') for ngram in ngrams]
+        ngrams = np.array(ngrams)
+        # search with the terms dtype so the terms array is never cast (copied),
+        # the truncated n-grams are then ruled out by comparing the full strings
+        positions = np.searchsorted(self.terms, ngrams.astype(self.terms.dtype))
+        positions[positions == len(self.terms)] = 0
+        return positions[self.terms[positions] == ngrams].astype(np.intp)
+
+    def model_probabilities(self, input_strings):
+        """
+        compute the class 0 probabilities of each model method
+        :param input_strings:
+        :return: np.ndarray of shape (len(input_strings), 3)
+        """
+        decisions = np.empty((len(input_strings), 3), dtype=np.float64)
+
+        for row, input_string in enumerate(input_strings):
+            indexes, counts = self._term_counts(input_string)
+            weights = self.weights[indexes]
+            counts = counts.astype(np.float64)
+
+            decisions[row, NB_COLUMN] = counts @ weights[:, NB_COLUMN]
+            decisions[row, LR_COLUMN] = counts @ weights[:, LR_COLUMN]
+
+            term_frequencies = np.log(counts) + 1.0 if self.svm_sublinear_tf else counts
+            tfidf = term_frequencies * self.svm_idf[indexes]
+            svm_decision = tfidf @ weights[:, SVM_COLUMN]
+            if self.svm_norm == 'l2':
+                norm = np.sqrt(tfidf @ tfidf)
+                svm_decision = svm_decision / norm if norm > 0 else 0.0
+            decisions[row, SVM_COLUMN] = svm_decision
+
+        decisions += self.bias
+        return 1.0 / (1.0 + np.exp(decisions * self.scale))
+
+    def predict_proba(self, input_strings):
+        """
+        compute the weighted overall class 0 probability method,
+        matches the webapp_interface.ml_model_evaluator weighted average
+        :param input_strings:
+        :return: np.ndarray of shape (len(input_strings),)
+        """
+        probabilities = self.model_probabilities(input_strings)
+
+        return (probabilities[:, NB_COLUMN] * self.ensemble_weights[NB_COLUMN]) + \
+               (probabilities[:, LR_COLUMN] * self.ensemble_weights[LR_COLUMN]) + \
+               (probabilities[:, SVM_COLUMN] * self.ensemble_weights[SVM_COLUMN])
+
+
+def verify_fused_ensemble(fused_ensemble, vector_nb, model_nb, vector_lr, model_lr, model_svm,
+                          input_strings):
+    """
+    function comparing the fused ensemble with the sklearn models predictions
+    :return: maximum absolute difference of the overall probability
+    """
+    expected = (model_nb.predict_proba(vector_nb.transform(input_strings))[:, 0] *
+                fused_ensemble.ensemble_weights[NB_COLUMN]) + \
+               (model_lr.predict_proba(vector_lr.transform(input_strings))[:, 0] *
+                fused_ensemble.ensemble_weights[LR_COLUMN]) + \
+               (model_svm.predict_proba(input_strings)[:, 0] *
+                fused_ensemble.ensemble_weights[SVM_COLUMN])
+
+    return float(np.max(np.abs(expected - fused_ensemble.predict_proba(input_strings))))
+
+
+if __name__ == "__main__":
+    from ml_models import precisions, webapp_interface
+    from utils.utilities import ProjectCommon
+
+    SKLEARN_MODELS = webapp_interface.load_sklearn_models()
+
+    FUSED_ENSEMBLE = compile_fused_ensemble(*SKLEARN_MODELS,
+                                            precisions.ensemble_weights(
+                                                precisions.load_precisions()))
+
+    VERIFY_INPUT_STRINGS = [ProjectCommon.remove_all(text.lower()) for text in
+                            ('Skvělé funkcionální testy', 'Hrozné funkcionální testy',
+                             'Tenhle film byl naprosto úžasný, herci skvělí a hudba nádherná',
+                             'Nuda, špatný scénář a ještě horší herecké výkony')]
+
+    MAX_ABS_DIFF = verify_fused_ensemble(FUSED_ENSEMBLE, *SKLEARN_MODELS, VERIFY_INPUT_STRINGS)
+
+    if MAX_ABS_DIFF > 1e-6:
+        raise SystemExit(f"Fused ensemble differs from the sklearn models by {MAX_ABS_DIFF}")
+
+    FUSED_ENSEMBLE.export()
+    print(f"Compiled {FUSED_ENSEMBLE} to {MODEL_ARTIFACTS_DIR_PATH}, "
+          f"max abs difference {MAX_ABS_DIFF}")
@@ -0,0 +1,240 @@
+"""
+incremental training module
+
+Out-of-core training of the three models: the scraped reviews csv is read
+and cleaned in chunks (corpus_cache.read_record_chunks) and each chunk is fed
+to MultinomialNB.partial_fit and SGDClassifier.partial_fit through the
+stateless hashing vectorizers, so no vocabulary has to be fitted on the whole
+corpus first and only the chunks being cleaned are held in memory.
+The model state and the byte offset reached in each input file are
+checkpointed after every chunk. A later run resumes from the checkpoint and
+trains the newly appended reviews (or new input files) only.
+
+The logistic regression is an SGDClassifier with the log loss (LogisticRegression
+has no partial_fit), the svm pipeline has no tf-idf step (the idf weights need
+the whole corpus), its hashed counts are l2 normalized instead.
+Every HOLDOUT_MODULO-th record (by a hash of its text) is held out for the accuracy.
+
+run from the repository root:
+python -m ml_models.incremental_training [--input reviews.csv ...] [--output-dir DIR]
+"""
+import os
+import zlib
+import pickle
+import argparse
+import tempfile
+from sklearn.linear_model import SGDClassifier
+from sklearn.naive_bayes import MultinomialNB
+from sklearn.pipeline import Pipeline
+from data_preparation import corpus_cache
+from ml_models.feature_hashing import N_FEATURES_EXPONENT, hashing_vectorizer
+from ml_models.naive_bayes import data_processor_naive_bayes
+from ml_models.logistic_regression import data_processor_logistic_regression
+from ml_models.support_vector_machine.data_processor_support_vector_machine import SGD_LOG_LOSS
+
+CHECKPOINT_DIR_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__),
+                                                   'incremental_checkpoint'))
+
+CHECKPOINT_FILE_NAME = 'checkpoint.pkl'
+
+HOLDOUT_MODULO = 5
+HOLDOUT_MAX_RECORDS = 10000
+
+
+class IncrementalModels:
+    """
+    partially fitted models class, the vectorizers are stateless and are not checkpointed
+    """
+    def __init__(self, n_features_exponent=N_FEATURES_EXPONENT, checkpoint=None):
+        """
+        :param n_features_exponent: k of the 2^k hashed features
+        :param checkpoint: dict of a saved state, None starts untrained models
+        """
+        checkpoint = checkpoint or {
+            'n_features_exponent': n_features_exponent,
+            'model_nb': MultinomialNB(),
+            'model_lr': SGDClassifier(loss=SGD_LOG_LOSS, penalty='l2', alpha=1e-4,
+                                      random_state=42),
+            'model_svm': SGDClassifier(loss=SGD_LOG_LOSS, penalty='l2', alpha=1e-5,
+                                       random_state=42),
+            'offsets': {},
+            'records': 0}
+
+        if checkpoint['n_features_exponent'] != n_features_exponent:
+            raise ValueError(f"The checkpoint models have 2^{checkpoint['n_features_exponent']} "
+                             f"features, not 2^{n_features_exponent}")
+
+        self.n_features_exponent = n_features_exponent
+        self.model_nb = checkpoint['model_nb']
+        self.model_lr = checkpoint['model_lr']
+        self.model_svm = checkpoint['model_svm']
+        # input file path -> byte offset of its first not trained row
+        self.offsets = checkpoint['offsets']
+        self.records = checkpoint['records']
+
+        self.vector_nb = data_processor_naive_bayes.build_vectorizer(True, n_features_exponent)
+        self.vector_lr = data_processor_logistic_regression.build_vectorizer(True,
+                                                                             n_features_exponent)
+        self.vector_svm = hashing_vectorizer(n_features_exponent=n_features_exponent, norm='l2')
+
+    def __repr__(self):
+        return f"IncrementalModels(2^{self.n_features_exponent}, records={self.records})"
+
+    def partial_fit(self, texts, ranks):
+        """
+        train the models on one chunk of records method
+        :param texts: cleaned texts
+        :param ranks:
+        :return:
+        """
+        labels = ['neg' if rank < 0 else 'pos' for rank in ranks]
+        self.model_nb.partial_fit(self.vector_nb.transform(texts),
+                                  [0 if rank < 0 else 1 for rank in ranks], classes=[0, 1])
+        self.model_lr.partial_fit(self.vector_lr.transform(texts), labels,
+                                  classes=['neg', 'pos'])
+        self.model_svm.partial_fit(self.vector_svm.transform(texts), labels,
+                                   classes=['neg', 'pos'])
+        self.records += len(texts)
+
+    def score(self, texts, ranks):
+        """
+        models accuracy method
+        :param texts: cleaned texts
+        :param ranks:
+        :return: dict of model type -> accuracy
+        """
+        labels = ['neg' if rank < 0 else 'pos' for rank in ranks]
+        return {'naive_bayes': self.model_nb.score(self.vector_nb.transform(texts),
+                                                   [0 if rank < 0 else 1 for rank in ranks]),
+                'logistic_regression': self.model_lr.score(self.vector_lr.transform(texts),
+                                                           labels),
+                'support_vector_machine': self.model_svm.score(self.vector_svm.transform(texts),
+                                                               labels)}
+
+    def save_checkpoint(self, checkpoint_dir=CHECKPOINT_DIR_PATH):
+        """
+        replace the checkpoint file atomically method,
+        the plain sklearn objects are pickled, so it loads also when this module is run as main
+        :param checkpoint_dir:
+        :return:
+        """
+        os.makedirs(checkpoint_dir, exist_ok=True)
+        file_descriptor, temp_path = tempfile.mkstemp(dir=checkpoint_dir, prefix='.checkpoint-')
+        with os.fdopen(file_descriptor, 'wb') as checkpoint_file:
+            pickle.dump({'n_features_exponent': self.n_features_exponent,
+                         'model_nb': self.model_nb,
+                         'model_lr': self.model_lr,
+                         'model_svm': self.model_svm,
+                         'offsets': self.offsets,
+                         'records': self.records}, checkpoint_file)
+        os.replace(temp_path, os.path.join(checkpoint_dir, CHECKPOINT_FILE_NAME))
+
+    @classmethod
+    def load_checkpoint(cls, checkpoint_dir=CHECKPOINT_DIR_PATH,
+                        n_features_exponent=N_FEATURES_EXPONENT):
+        """
+        load the checkpointed models, untrained ones when there is no checkpoint method
+        :param checkpoint_dir:
+        :param n_features_exponent:
+        :return: IncrementalModels
+        """
+        checkpoint_file_path = os.path.join(checkpoint_dir, CHECKPOINT_FILE_NAME)
+        if not os.path.isfile(checkpoint_file_path):
+            return cls(n_features_exponent)
+        with open(checkpoint_file_path, 'rb') as checkpoint_file:
+            return cls(n_features_exponent, pickle.load(checkpoint_file))
+
+    def write_models(self, output_dir):
+        """
+        write the models in the ml_models/ layout loaded by webapp_interface method,
+        the output directory can be published to the model registry
+        :param output_dir:
+        :return:
+        """
+        model_files = {('naive_bayes', 'vectorizer.pkl'): self.vector_nb,
+                       ('naive_bayes', 'model.pkl'): self.model_nb,
+                       ('logistic_regression', 'vectorizer.pkl'): self.vector_lr,
+                       ('logistic_regression', 'model.pkl'): self.model_lr,
+                       ('support_vector_machine', 'model.pkl'):
+                           Pipeline([('vect', self.vector_svm), ('clf', self.model_svm)])}
+
+        for (model_type, file_name), model in model_files.items():
+            os.makedirs(os.path.join(output_dir, model_type), exist_ok=True)
+            with open(os.path.join(output_dir, model_type, file_name), 'wb') as model_file:
+                pickle.dump(model, model_file)
+
+
+def _is_holdout(text):
+    """
+    function holding out a fixed part of the records, the same ones in every run
+    :param text:
+    :return:
+    """
+    return zlib.crc32(text.encode('utf8')) % HOLDOUT_MODULO == 0
+
+
+def incremental_training(input_paths=(corpus_cache.REVIEWS_FILE_PATH,),
+                         checkpoint_dir=CHECKPOINT_DIR_PATH, output_dir=None,
+                         chunk_size=corpus_cache.DEFAULT_CHUNK_SIZE, language='cs',
+                         n_features_exponent=N_FEATURES_EXPONENT, max_workers=None):
+    """
+    function training the checkpointed models on the not yet trained rows of the input files
+    :param input_paths: scraped reviews csv files, appended to between the runs
+    :param checkpoint_dir:
+    :param output_dir: directory the models are written to, None writes no models
+    :param chunk_size: rows read, cleaned and trained at once
+    :param language: detected language code of the trained records, None for all records
+    :param n_features_exponent: k of the 2^k hashed features, fixed for a checkpoint
+    :param max_workers: cleaning process pool size, defaults to the cpu count
+    :return: tuple (IncrementalModels, dict of model type -> accuracy on this run's holdout)
+    """
+    models = IncrementalModels.load_checkpoint(checkpoint_dir, n_features_exponent)
+
+    holdout_texts, holdout_ranks = [], []
+    for input_path in input_paths:
+        input_path = os.path.abspath(input_path)
+        start_offset = models.offsets.get(input_path, 0)
+        if os.path.getsize(input_path) < start_offset:
+            raise ValueError(f"{input_path} is shorter than its trained part, "
+                             f"a rewritten corpus needs a new checkpoint directory")
+
+        for records, end_offset in corpus_cache.read_record_chunks(
+                input_path, chunk_size, start_offset, language, max_workers):
+            train_records = []
+            for text, rank in records:
+                if not _is_holdout(text):
+                    train_records.append((text, rank))
+                elif len(holdout_texts) < HOLDOUT_MAX_RECORDS:
+                    holdout_texts.append(text)
+                    holdout_ranks.append(rank)
+
+            if train_records:
+                models.partial_fit([text for text, _ in train_records],
+                                   [rank for _, rank in train_records])
+            models.offsets[input_path] = end_offset
+            models.save_checkpoint(checkpoint_dir)
+            print(f"Trained {len(train_records)} records of {input_path} "
+                  f"up to byte {end_offset}, {models.records} records in total")
+
+    if output_dir:
+        models.write_models(output_dir)
+
+    return models, models.score(holdout_texts, holdout_ranks) if holdout_texts else {}
+
+
+if __name__ == "__main__":
+    PARSER = argparse.ArgumentParser(description='incremental out-of-core training')
+    PARSER.add_argument('--input', nargs='+', default=[corpus_cache.REVIEWS_FILE_PATH],
+                        help='scraped reviews csv files')
+    PARSER.add_argument('--checkpoint-dir', default=CHECKPOINT_DIR_PATH)
+    PARSER.add_argument('--output-dir', help='directory the models are written to')
+    PARSER.add_argument('--chunk-size', type=int, default=corpus_cache.DEFAULT_CHUNK_SIZE)
+    PARSER.add_argument('--bits', type=int, default=N_FEATURES_EXPONENT,
+                        help='k of the 2^k hashed features')
+    PARSER.add_argument('--workers', type=int, help='cleaning processes, the cpu count default')
+    ARGS = PARSER.parse_args()
+
+    MODELS, ACCURACY = incremental_training(ARGS.input, ARGS.checkpoint_dir, ARGS.output_dir,
+                                            ARGS.chunk_size, n_features_exponent=ARGS.bits,
+                                            max_workers=ARGS.workers)
+    print(f"{MODELS}, holdout accuracy: {ACCURACY}")
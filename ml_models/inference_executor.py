@@ -0,0 +1,352 @@
+"""
+bounded inference executor module
+
+The web server threads hand the model scoring over to a pool of processes
+instead of running it while holding the GIL. Requests waiting for a free
+scoring process are merged into one batch, so one predict_proba call per
+model serves all of them. The waiting queue is bounded: a full queue and
+a timed out request raise InferenceUnavailable, which the web app answers
+with a fast 503 and a Retry-After header.
+"""
+import os
+import threading
+import multiprocessing
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from utils.metrics import REQUEST_METRICS
+
+# seconds a new scoring process has to load the models and score the warm-up texts
+WARM_UP_TIMEOUT = 120
+
+
+class InferenceUnavailable(Exception):
+    """
+    the request can not be scored now, the client should retry later
+    """
+    def __init__(self, message, retry_after=1):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class InferenceQueueFull(InferenceUnavailable):
+    """
+    max_queue_depth requests are already waiting
+    """
+
+
+class InferenceTimeout(InferenceUnavailable):
+    """
+    the request was not scored within the timeout
+    """
+
+
+def default_mp_context():
+    """
+    function returning the scoring processes start method context,
+    the scoring processes are forked from the web server process with its models loaded,
+    so the model pages stay shared copy-on-write with the prefork master,
+    start() forks them before the web server threads are started
+    :return:
+    """
+    return multiprocessing.get_context('fork')
+
+
+def _evaluate_collecting_metrics(evaluator, input_strings, metrics_enabled):
+    """
+    function run in a scoring process, returning the stage latencies
+    observed while scoring together with the results
+    :param evaluator:
+    :param input_strings:
+    :param metrics_enabled: the web server process request metrics flag
+    :return: tuple (results, list of (stage, seconds) observations)
+    """
+    REQUEST_METRICS.collect(metrics_enabled)
+    try:
+        results = evaluator(input_strings)
+    finally:
+        observations = REQUEST_METRICS.collected()
+    return results, observations
+
+
+class InferenceExecutor:
+    """
+    bounded process pool inference executor class
+    """
+    def __init__(self, evaluator, max_workers=2, max_queue_depth=64, timeout=5.0,
+                 max_batch_size=256, retry_after=1, mp_context=None, initializer=None,
+                 initargs=()):
+        """
+        :param evaluator: module level function scoring a list of input strings,
+        returning a list of results in the same order
+        :param max_workers: scoring processes count
+        :param max_queue_depth: requests allowed to wait for a scoring process
+        :param timeout: seconds a request waits for its result
+        :param max_batch_size: input strings merged into one evaluator call at most
+        :param retry_after: seconds suggested to the rejected clients
+        :param mp_context: multiprocessing context, defaults to default_mp_context()
+        :param initializer: function run by each scoring process on start
+        :param initargs: initializer arguments
+        """
+        self.evaluator = evaluator
+        self.max_workers = max_workers
+        self.max_queue_depth = max_queue_depth
+        self.timeout = timeout
+        self.max_batch_size = max_batch_size
+        self.retry_after = retry_after
+        self.mp_context = mp_context
+        self.initializer = initializer
+        self.initargs = initargs
+
+        self.rejected = 0
+        self.timeouts = 0
+        self.batches = 0
+        self.requests = 0
+
+        self._condition = threading.Condition()
+        self._pending = deque()
+        self._in_flight = 0
+        self._pool = None
+        self._dispatcher = None
+        self._pid = None
+
+    def __repr__(self):
+        return f"InferenceExecutor(max_workers={self.max_workers}, " \
+               f"max_queue_depth={self.max_queue_depth}, timeout={self.timeout})"
+
+    def _ensure_started(self):
+        """
+        start the process pool and the dispatcher thread lazily,
+        also in a forked web server worker where the parent's ones do not exist
+        :return:
+        """
+        if self._pid == os.getpid():
+            return
+
+        with self._condition:
+            if self._pid != os.getpid():
+                self._condition = threading.Condition()
+                self._pending = deque()
+                self._in_flight = 0
+                self._pool = self._new_pool()
+                self._dispatcher = threading.Thread(target=self._dispatch_loop,
+                                                    name='inference-dispatcher', daemon=True)
+                self._pid = os.getpid()
+                self._dispatcher.start()
+
+    def start(self):
+        """
+        start the scoring processes now method, e.g. in a forked web server worker
+        before it starts its threads, a fork context pool forks all its processes
+        on the first task
+        :return:
+        """
+        self._ensure_started()
+        self._pool.submit(os.getpid).result(timeout=WARM_UP_TIMEOUT)
+
+    def _new_pool(self):
+        """
+        create the scoring processes pool method, the processes start on demand
+        :return: ProcessPoolExecutor
+        """
+        return ProcessPoolExecutor(max_workers=self.max_workers,
+                                   mp_context=self.mp_context or default_mp_context(),
+                                   initializer=self.initializer, initargs=self.initargs)
+
+    def submit(self, input_strings):
+        """
+        queue the input strings for scoring method
+        :param input_strings:
+        :return: concurrent.futures.Future of the results list
+        """
+        self._ensure_started()
+        future = Future()
+
+        with self._condition:
+            if len(self._pending) >= self.max_queue_depth:
+                self.rejected += 1
+                raise InferenceQueueFull(f"Inference queue is full ({self.max_queue_depth})",
+                                         retry_after=self.retry_after)
+            self._pending.append((list(input_strings), future))
+            self._condition.notify()
+
+        return future
+
+    def evaluate(self, input_strings):
+        """
+        score the input strings, blocking for at most the timeout method
+        :param input_strings:
+        :return: list of results
+        """
+        if not input_strings:
+            return []
+
+        future = self.submit(input_strings)
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            raise self.timed_out(future) from None
+
+    def timed_out(self, future):
+        """
+        drop the request not scored within the timeout method,
+        a still queued request is dropped, a running one is left to finish
+        :param future: the submitted request future
+        :return: InferenceTimeout to raise
+        """
+        future.cancel()
+        with self._condition:
+            self.timeouts += 1
+        return InferenceTimeout(f"Inference did not finish within {self.timeout}s",
+                                retry_after=self.retry_after)
+
+    def _next_batch(self):
+        """
+        wait for a free scoring process and merge the queued requests method
+        :return: list of (input_strings, future) tuples
+        """
+        with self._condition:
+            while self._in_flight >= self.max_workers or not self._pending:
+                self._condition.wait()
+
+            batch = []
+            batch_size = 0
+            while self._pending and \
+                    (not batch or batch_size + len(self._pending[0][0]) <= self.max_batch_size):
+                input_strings, future = self._pending.popleft()
+                # the timed out requests are cancelled before they get scored
+                if future.set_running_or_notify_cancel():
+                    batch.append((input_strings, future))
+                    batch_size += len(input_strings)
+
+            if batch:
+                self._in_flight += 1
+                self.batches += 1
+                self.requests += len(batch)
+            return batch
+
+    def _dispatch_loop(self):
+        """
+        dispatcher thread loop submitting the merged batches to the process pool
+        :return:
+        """
+        while True:
+            batch = self._next_batch()
+            if not batch:
+                continue
+
+            merged_input_strings = [input_string for input_strings, _ in batch
+                                    for input_string in input_strings]
+            pool = self._pool
+            try:
+                pool_future = pool.submit(_evaluate_collecting_metrics, self.evaluator,
+                                          merged_input_strings, REQUEST_METRICS.enabled)
+            except (BrokenProcessPool, RuntimeError) as pool_err:
+                self._restart_pool(pool)
+                self._finish_batch(batch, exception=pool_err)
+                continue
+
+            pool_future.add_done_callback(
+                lambda finished, batch=batch, pool=pool:
+                self._finish_batch(batch, finished=finished, pool=pool))
+
+    def _finish_batch(self, batch, finished=None, exception=None, pool=None):
+        """
+        hand each request its own slice of the merged results method
+        :param batch:
+        :param finished: the process pool future
+        :param exception:
+        :param pool: the process pool which scored the batch
+        :return:
+        """
+        results = None
+        if exception is None:
+            exception = finished.exception()
+            if isinstance(exception, BrokenProcessPool):
+                self._restart_pool(pool)
+            elif exception is None:
+                results, observations = finished.result()
+                REQUEST_METRICS.merge(observations)
+
+        position = 0
+        for input_strings, future in batch:
+            if exception is not None:
+                future.set_exception(exception)
+            else:
+                future.set_result(results[position:position + len(input_strings)])
+            position += len(input_strings)
+
+        with self._condition:
+            self._in_flight -= 1
+            self._condition.notify()
+
+    def _restart_pool(self, broken_pool):
+        """
+        replace a broken process pool, e.g. after a scoring process was killed,
+        a pool already replaced by restart() is left alone
+        :param broken_pool:
+        :return:
+        """
+        with self._condition:
+            if self._pool is not broken_pool:
+                return
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = self._new_pool()
+
+    def restart(self, initializer=None, initargs=(), warm_up_input_strings=None):
+        """
+        replace the scoring processes, e.g. after the models were reloaded method,
+        the new processes are warmed up before they take over and the old ones
+        finish the batches in flight, so no request fails during the swap
+        :param initializer: function run by each new scoring process, e.g. swapping in
+        the models loaded by this process
+        :param initargs: initializer arguments
+        :param warm_up_input_strings: scored by the new processes before the swap
+        :return:
+        """
+        previous_initializer = self.initializer, self.initargs
+        self.initializer, self.initargs = initializer, initargs
+        # a not started executor creates its pool with the new initializer later
+        if self._pid != os.getpid():
+            return
+
+        new_pool = self._new_pool()
+        try:
+            if warm_up_input_strings:
+                # one warm-up task per process, the pool starts a process per waiting task
+                warm_ups = [new_pool.submit(self.evaluator, list(warm_up_input_strings))
+                            for _ in range(self.max_workers)]
+                for warm_up in warm_ups:
+                    warm_up.result(timeout=WARM_UP_TIMEOUT)
+        except Exception:
+            new_pool.shutdown(wait=False, cancel_futures=True)
+            self.initializer, self.initargs = previous_initializer
+            raise
+
+        with self._condition:
+            old_pool, self._pool = self._pool, new_pool
+        old_pool.shutdown(wait=False)
+
+    def shutdown(self):
+        """
+        stop the scoring processes method
+        :return:
+        """
+        if self._pid == os.getpid() and self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+
+    def metrics(self):
+        """
+        inference executor counters method
+        :return: dict
+        """
+        with self._condition:
+            return {'queued': len(self._pending),
+                    'in_flight_batches': self._in_flight,
+                    'batches': self.batches,
+                    'requests': self.requests,
+                    'merged_requests_per_batch':
+                        round(self.requests / self.batches, 2) if self.batches else 0.0,
+                    'rejected': self.rejected,
+                    'timeouts': self.timeouts}
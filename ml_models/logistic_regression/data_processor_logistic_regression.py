@@ -1,88 +1,85 @@
 """
 data processor for logistic regression
 """
-import random
 import pickle
 import os
-from langdetect import detect, lang_detect_exception
 from sklearn.feature_extraction.text import CountVectorizer
-from sklearn import model_selection, linear_model
-from utils.utilities import ProjectCommon
+from sklearn import metrics, linear_model
+from sklearn.pipeline import Pipeline
+from data_preparation import corpus_cache
+from ml_models import training_orchestrator
+from ml_models.feature_hashing import FEATURE_HASHING, N_FEATURES_EXPONENT, \
+    hashing_vectorizer
 
 CZECH_STOPWORDS_FILE_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '..',
                                                          'data_preparation', 'czech_stopwords.txt'))
 
-TEMP_FILE_PATH = '../../data_preparation/reviews_with_ranks.csv'
+TEMP_FILE_PATH = corpus_cache.REVIEWS_FILE_PATH
+MODEL_DIR_PATH = os.path.abspath(os.path.dirname(__file__))
 PERSIST_MODEL_TO_FILE = True
 
 
-def _read_temp_file_generator():
+def build_vectorizer(feature_hashing=FEATURE_HASHING,
+                     n_features_exponent=N_FEATURES_EXPONENT):
     """
-    read temp file generator
-    :return: yield rows
+    function creating the logistic regression bigrams vectorizer,
+    the stateless hashing vectorizer has no min_df, the rare bigrams get
+    small coefficients from the regularization instead
+    :param feature_hashing: HashingVectorizer instead of the vocabulary based CountVectorizer
+    :param n_features_exponent: k of the 2^k hashed features
+    :return:
     """
-    for row in open(TEMP_FILE_PATH, encoding="utf8"):
-        try:
-            yield (row.split(',')[0].replace('"', ''),
-                   "neg" if int(row.split(',')[1]) < 0 else "pos")
-        except IndexError:
-            yield '#NA'
+    if feature_hashing:
+        return hashing_vectorizer(ngram_range=(2, 2), n_features_exponent=n_features_exponent)
+    return CountVectorizer(min_df=5, ngram_range=(2, 2))
 
 
-def logistic_regression(persist_model_to_file):
+def train_logistic_regression(Train_X, Train_Y, Test_X, feature_hashing=FEATURE_HASHING,
+                              max_workers=training_orchestrator.TRAINING_WORKERS):
     """
-    function for training and testing the ML model
-    :param persist_model_to_file:
-    :return:
+    function for training the ML model on a train/test split
+    :param Train_X: cleaned texts
+    :param Train_Y: 'neg'/'pos' labels
+    :param Test_X: cleaned texts
+    :param feature_hashing: see build_vectorizer()
+    :param max_workers: grid search processes, see training_orchestrator.grid_search()
+    :return: tuple (dict of model file name -> fitted object, Test_X 'neg'/'pos' predictions)
     """
-    temp_file_reviews_work = []
-
-    temp_file_gen = _read_temp_file_generator()
-
-    for tfg in temp_file_gen:
-        if len(tfg) == 2:
-            try:
-                _detected_lang = detect(ProjectCommon.remove_non_alpha_chars_and_html(tfg[0]))
-            except lang_detect_exception.LangDetectException:
-                continue
-            if _detected_lang == 'cs':
-                temp_file_reviews_work.append((ProjectCommon.remove_all(tfg[0]), tfg[1]))
-
-    temp_file_reviews_work = [x for x in temp_file_reviews_work if x[1] == "pos"][:11500] + \
-                             [x for x in temp_file_reviews_work if x[1] == "neg"][:11500]
+    # the bigrams are vectorized once per fold, the best C is refitted once
+    param_grid = {'clf__C': [0.001, 0.01, 0.1, 1, 10]}
+    grid = training_orchestrator.grid_search(
+        Pipeline([('vect', build_vectorizer(feature_hashing)),
+                  ('clf', linear_model.LogisticRegression(max_iter=1000))]),
+        param_grid, Train_X, Train_Y, cv=5, max_workers=max_workers)
+    grid.print_report()
+    vect = grid.best_estimator_.named_steps['vect']
+    lr = grid.best_estimator_.named_steps['clf']
 
-    random.shuffle(temp_file_reviews_work)
+    return {'vectorizer.pkl': vect, 'model.pkl': lr}, list(lr.predict(vect.transform(Test_X)))
 
-    Train_X, Test_X, Train_Y, Test_Y = model_selection.train_test_split([x[0] for x in temp_file_reviews_work],
-                                                                        [x[1] for x in temp_file_reviews_work],
-                                                                        test_size=0.2)
 
-    vect = CountVectorizer(min_df=5, ngram_range=(2, 2))
-    Train_X = vect.fit(Train_X).transform(Train_X)
-    Test_X = vect.transform(Test_X)
+def logistic_regression(persist_model_to_file, feature_hashing=FEATURE_HASHING):
+    """
+    function for training and testing the ML model
+    :param persist_model_to_file:
+    :param feature_hashing: see build_vectorizer()
+    :return:
+    """
+    # class-balanced split of the cleaned Czech reviews of the shared preprocessed corpus cache
+    Train_X, Test_X, Train_Y, Test_Y = corpus_cache.load_corpus(TEMP_FILE_PATH).balanced_split()
 
-    param_grid = {'C': [0.001, 0.01, 0.1, 1, 10]}
-    grid = model_selection.GridSearchCV(linear_model.LogisticRegression(max_iter=1000), param_grid, cv=5)
-    grid.fit(Train_X, Train_Y)
-    lr = grid.best_estimator_
-    lr.fit(Train_X, Train_Y)
+    model_files, predictions = train_logistic_regression(Train_X, Train_Y, Test_X,
+                                                         feature_hashing)
 
     if persist_model_to_file:
-        pickle.dump(vect, open('vectorizer.pkl', 'wb'))
-        pickle.dump(lr, open('model.pkl', 'wb'))
+        for file_name, model in model_files.items():
+            pickle.dump(model, open(os.path.join(MODEL_DIR_PATH, file_name), 'wb'))
 
     # # accuracy score calculation: 0.821
-    # lr.predict(Test_X)
-    # print("Score: {:.2f}".format(lr.score(Test_X, Test_Y)))
-
-    # # adhoc input prediction:
-    # input_string = input_string[0]
-    # input_string = [x for x in input_string.split()]
-    # print(input_string)
-    # print("prediction: {}". format(lr.predict(vect.transform(input_string))))
+    # print("Score: {:.2f}".format(metrics.accuracy_score(Test_Y, predictions)))
 
     # return accuracy score
-    return lr.score(Test_X, Test_Y)
+    return metrics.accuracy_score(Test_Y, predictions)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,212 @@
+"""
+micro-batching module
+
+Concurrent single text requests are collected for a short window, or until
+max_batch_size texts are waiting, and scored by one evaluator call, so each
+model runs one sparse transform and predict_proba for the whole group.
+The waiting queue is bounded as the inference executor one: a full queue and
+a request not scored within the timeout raise InferenceUnavailable.
+"""
+import os
+import time
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from ml_models.inference_executor import InferenceQueueFull, InferenceTimeout
+from utils.metrics import Histogram
+
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+# seconds
+QUEUE_DELAY_BUCKETS = (0.0005, 0.001, 0.002, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25)
+
+
+class MicroBatcher:
+    """
+    time window / batch size micro-batcher class
+    """
+    def __init__(self, evaluator, window_ms=2, max_batch_size=64, max_concurrent_batches=1,
+                 max_queue_depth=None, timeout=None, retry_after=1):
+        """
+        :param evaluator: function scoring a list of input strings,
+        returning a list of results in the same order
+        :param window_ms: milliseconds the first waiting request waits for others
+        :param max_batch_size: texts scored together at most, a larger request
+        is scored alone and never split
+        :param max_concurrent_batches: batches scored at once, more than 1 is useful
+        when the evaluator hands the batches to scoring processes
+        :param max_queue_depth: requests allowed to wait for a batch, None unbounded
+        :param timeout: seconds a request waits for its result, queueing included,
+        None waits forever
+        :param retry_after: seconds suggested to the rejected clients
+        """
+        self.evaluator = evaluator
+        self.window = window_ms / 1000
+        self.max_batch_size = max_batch_size
+        self.max_concurrent_batches = max_concurrent_batches
+        self.max_queue_depth = max_queue_depth
+        self.timeout = timeout
+        self.retry_after = retry_after
+
+        self.rejected = 0
+        self.timeouts = 0
+
+        self.batch_size_histogram = Histogram(BATCH_SIZE_BUCKETS)
+        self.queue_delay_histogram = Histogram(QUEUE_DELAY_BUCKETS)
+
+        self._condition = threading.Condition()
+        self._pending = deque()
+        self._pending_size = 0
+        self._free_slots = None
+        self._batch_pool = None
+        self._collector = None
+        self._pid = None
+
+    def __repr__(self):
+        return f"MicroBatcher(window_ms={self.window * 1000:g}, " \
+               f"max_batch_size={self.max_batch_size})"
+
+    def _ensure_started(self):
+        """
+        start the collector thread lazily, also in a forked web server worker
+        :return:
+        """
+        if self._pid == os.getpid():
+            return
+
+        with self._condition:
+            if self._pid != os.getpid():
+                self._condition = threading.Condition()
+                self._pending = deque()
+                self._pending_size = 0
+                self._free_slots = threading.Semaphore(self.max_concurrent_batches)
+                self._batch_pool = ThreadPoolExecutor(max_workers=self.max_concurrent_batches,
+                                                      thread_name_prefix='micro-batch')
+                self._collector = threading.Thread(target=self._collect_loop,
+                                                   name='micro-batcher', daemon=True)
+                self._pid = os.getpid()
+                self._collector.start()
+
+    def evaluate(self, input_strings):
+        """
+        score the input strings together with the concurrent requests method
+        :param input_strings:
+        :return: list of results
+        """
+        if not input_strings:
+            return []
+
+        self._ensure_started()
+        request = (list(input_strings), Future(), time.monotonic())
+
+        with self._condition:
+            if self.max_queue_depth is not None and len(self._pending) >= self.max_queue_depth:
+                self.rejected += 1
+                raise InferenceQueueFull(f"Inference queue is full ({self.max_queue_depth})",
+                                         retry_after=self.retry_after)
+            self._pending.append(request)
+            self._pending_size += len(request[0])
+            self._condition.notify()
+
+        try:
+            return request[1].result(timeout=self.timeout)
+        except FutureTimeoutError:
+            raise self._timed_out(request) from None
+
+    def _timed_out(self, request):
+        """
+        drop the request not scored within the timeout method,
+        a still queued request is removed, a batch being scored is left to finish
+        :param request: the queued (input_strings, future, enqueued) tuple
+        :return: InferenceTimeout to raise
+        """
+        with self._condition:
+            self.timeouts += 1
+            try:
+                self._pending.remove(request)
+            except ValueError:
+                pass
+            else:
+                self._pending_size -= len(request[0])
+        return InferenceTimeout(f"Inference did not finish within {self.timeout}s",
+                                retry_after=self.retry_after)
+
+    def _next_batch(self):
+        """
+        wait for the window to pass or the batch to fill up method
+        :return: list of (input_strings, future, enqueued) tuples
+        """
+        with self._condition:
+            # the timed out requests leave the queue, it can empty while the window passes
+            while True:
+                while not self._pending:
+                    self._condition.wait()
+
+                deadline = self._pending[0][2] + self.window
+                while self._pending and self._pending_size < self.max_batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+                if self._pending:
+                    break
+
+            batch = [self._pending.popleft()]
+            batch_size = len(batch[0][0])
+            while self._pending and \
+                    batch_size + len(self._pending[0][0]) <= self.max_batch_size:
+                batch.append(self._pending.popleft())
+                batch_size += len(batch[-1][0])
+            self._pending_size -= batch_size
+
+        now = time.monotonic()
+        self.batch_size_histogram.observe(batch_size)
+        for _, _, enqueued in batch:
+            self.queue_delay_histogram.observe(now - enqueued)
+
+        return batch
+
+    def _collect_loop(self):
+        """
+        collector thread loop, a batch is collected once a scoring slot is free
+        so the requests keep merging while all the slots are busy
+        :return:
+        """
+        while True:
+            self._free_slots.acquire()
+            batch = self._next_batch()
+            self._batch_pool.submit(self._run_batch, batch)
+
+    def _run_batch(self, batch):
+        """
+        score the merged batch and hand each caller its own results method
+        :param batch:
+        :return:
+        """
+        try:
+            results = self.evaluator([input_string for input_strings, _, _ in batch
+                                      for input_string in input_strings])
+        except Exception as general_err:
+            for _, future, _ in batch:
+                future.set_exception(general_err)
+        else:
+            position = 0
+            for input_strings, future, _ in batch:
+                future.set_result(results[position:position + len(input_strings)])
+                position += len(input_strings)
+        finally:
+            self._free_slots.release()
+
+    def metrics(self):
+        """
+        micro-batcher counters, batch size and queueing delay histograms method
+        :return: dict
+        """
+        with self._condition:
+            queued = len(self._pending)
+        return {'window_ms': self.window * 1000,
+                'max_batch_size': self.max_batch_size,
+                'queued': queued,
+                'rejected': self.rejected,
+                'timeouts': self.timeouts,
+                'batch_size': self.batch_size_histogram.snapshot(),
+                'queue_delay_seconds': self.queue_delay_histogram.snapshot()}
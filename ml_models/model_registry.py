@@ -0,0 +1,277 @@
+"""
+model registry module
+
+A deployed model set is a version directory of the registry directory:
+<registry>/<version>/ holds the memory-mapped artifacts exported by
+`python -m ml_models.fused_ensemble` (manifest.json, *.npy), a compiled
+fused_ensemble.npz or the pickled sklearn models in the naive_bayes/,
+logistic_regression/ and support_vector_machine/ layout of ml_models/ with their
+precisions.json, as written by `python -m ml_models.train_models --output-dir DIR`.
+The versions are immutable once published, the ACTIVE file names the
+version loaded by the web server processes and is replaced atomically.
+Each web server process watches the ACTIVE file, loads and warms up the
+new version in the background and swaps it in, the requests in flight
+finish with the model set they started with.
+
+MODEL_REGISTRY_DIR env. variable enables the registry, run from the repository root:
+python -m ml_models.model_registry list
+python -m ml_models.model_registry publish SOURCE_DIR VERSION [--activate]
+python -m ml_models.model_registry activate VERSION
+"""
+import os
+import re
+import time
+import shutil
+import argparse
+import tempfile
+import threading
+
+REGISTRY_DIR_PATH = os.path.abspath(os.environ['MODEL_REGISTRY_DIR']) \
+    if os.environ.get('MODEL_REGISTRY_DIR') else None
+
+ACTIVE_FILE_NAME = 'ACTIVE'
+
+_VERSION_RE = re.compile(r'^[A-Za-z0-9][A-Za-z0-9._-]*$')
+
+
+class ModelRegistryError(Exception):
+    """
+    unknown or invalid model version
+    """
+
+
+def version_dir(version, registry_dir=REGISTRY_DIR_PATH):
+    """
+    function returning the directory of a registered version
+    :param version:
+    :param registry_dir:
+    :return: directory path
+    """
+    if not isinstance(version, str) or not _VERSION_RE.match(version):
+        raise ModelRegistryError(f"Invalid model version name: {version!r}")
+    return os.path.join(registry_dir, version)
+
+
+def list_versions(registry_dir=REGISTRY_DIR_PATH):
+    """
+    function listing the published versions
+    :param registry_dir:
+    :return: sorted list of version names
+    """
+    if not registry_dir or not os.path.isdir(registry_dir):
+        return []
+    return sorted(entry for entry in os.listdir(registry_dir)
+                  if _VERSION_RE.match(entry) and os.path.isdir(os.path.join(registry_dir, entry)))
+
+
+def active_version(registry_dir=REGISTRY_DIR_PATH):
+    """
+    function reading the active version name
+    :param registry_dir:
+    :return: version name or None when the registry has no active version
+    """
+    if not registry_dir:
+        return None
+    try:
+        with open(os.path.join(registry_dir, ACTIVE_FILE_NAME), encoding='utf8') as active_file:
+            return active_file.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def active_version_dir(registry_dir=REGISTRY_DIR_PATH):
+    """
+    function returning the directory of the active version
+    :param registry_dir:
+    :return: directory path or None when the registry has no active version
+    """
+    version = active_version(registry_dir)
+    return version_dir(version, registry_dir) if version else None
+
+
+def publish(source_dir, version, registry_dir=REGISTRY_DIR_PATH):
+    """
+    function copying a model set directory to the registry as a new version,
+    the version directory appears at once, fully copied
+    :param source_dir:
+    :param version:
+    :param registry_dir:
+    :return: the version directory
+    """
+    target_dir = version_dir(version, registry_dir)
+    if os.path.exists(target_dir):
+        raise ModelRegistryError(f"Model version {version} is already published")
+
+    os.makedirs(registry_dir, exist_ok=True)
+    temp_dir = tempfile.mkdtemp(dir=registry_dir, prefix='.publish-')
+    try:
+        # e.g. ml_models/ itself, the training scripts are not a part of the model set,
+        # the artifacts symlink is copied as the directory it points to
+        shutil.copytree(source_dir, os.path.join(temp_dir, version),
+                        ignore=shutil.ignore_patterns('__pycache__', '*.py', '.artifacts-*'))
+        os.rename(os.path.join(temp_dir, version), target_dir)
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+    return target_dir
+
+
+def activate(version, registry_dir=REGISTRY_DIR_PATH):
+    """
+    function replacing the ACTIVE file atomically, the web server processes
+    watching the registry swap to the version
+    :param version:
+    :param registry_dir:
+    :return:
+    """
+    if not os.path.isdir(version_dir(version, registry_dir)):
+        raise ModelRegistryError(f"Model version {version} is not published")
+
+    file_descriptor, temp_path = tempfile.mkstemp(dir=registry_dir, prefix='.active-')
+    with os.fdopen(file_descriptor, 'w', encoding='utf8') as active_file:
+        active_file.write(version + '\n')
+    os.replace(temp_path, os.path.join(registry_dir, ACTIVE_FILE_NAME))
+
+
+class ModelRegistryWatcher:
+    """
+    ACTIVE file polling class,
+    a background thread per process calls the swapper when the active version
+    differs from the loaded one
+    """
+    def __init__(self, swapper, loaded_version, registry_dir=REGISTRY_DIR_PATH,
+                 poll_interval=5.0):
+        """
+        :param swapper: function loading, warming up and swapping in a version,
+        an exception keeps the loaded version
+        :param loaded_version: function returning the version being served
+        :param registry_dir:
+        :param poll_interval: seconds between the ACTIVE file reads
+        """
+        self.swapper = swapper
+        self.loaded_version = loaded_version
+        self.registry_dir = registry_dir
+        self.poll_interval = poll_interval
+
+        self.reloads = 0
+        self.reload_failures = 0
+        self.last_reload = None
+
+        self._lock = threading.Lock()
+        self._failed_version = None
+        self._watcher = None
+        self._pid = None
+
+    def __repr__(self):
+        return f"ModelRegistryWatcher({self.registry_dir}, poll_interval={self.poll_interval})"
+
+    def ensure_started(self):
+        """
+        start the watcher thread lazily, also in a forked web server worker
+        where the parent's thread does not exist
+        :return:
+        """
+        if self._pid == os.getpid():
+            return
+
+        with self._lock:
+            if self._pid != os.getpid():
+                self._lock = threading.Lock()
+                self._watcher = threading.Thread(target=self._watch_loop,
+                                                 name='model-registry-watcher', daemon=True)
+                self._pid = os.getpid()
+                self._watcher.start()
+
+    def _watch_loop(self):
+        """
+        watcher thread loop, the first check runs at once so a worker forked
+        with an old version catches up before serving many requests
+        :return:
+        """
+        while True:
+            try:
+                self.check()
+            except Exception as general_err:
+                print(f"Model registry watcher check failed: {general_err}")
+            time.sleep(self.poll_interval)
+
+    def check(self):
+        """
+        swap to the active version if it is not the loaded one method,
+        a version which failed to load is not retried until activated again
+        :return: the swapped in version or None
+        """
+        with self._lock:
+            version = active_version(self.registry_dir)
+            if version is None or version == self.loaded_version() or \
+                    version == self._failed_version:
+                return None
+
+            started = time.monotonic()
+            try:
+                self.swapper(version)
+            except Exception as swap_err:
+                self.reload_failures += 1
+                self._failed_version = version
+                self.last_reload = {'version': version, 'result': 'failure',
+                                    'error': str(swap_err),
+                                    'seconds': round(time.monotonic() - started, 3)}
+                print(f"Model version {version} was not swapped in: {swap_err}")
+                return None
+
+            self.reloads += 1
+            self._failed_version = None
+            self.last_reload = {'version': version, 'result': 'success', 'error': None,
+                                'seconds': round(time.monotonic() - started, 3)}
+            print(f"Model version {version} swapped in by process {os.getpid()} "
+                  f"in {self.last_reload['seconds']}s")
+            return version
+
+    def retry(self):
+        """
+        forget the failed version so the next check tries it again method,
+        e.g. when it is activated again
+        :return:
+        """
+        with self._lock:
+            self._failed_version = None
+
+    def metrics(self):
+        """
+        watcher counters method
+        :return: dict
+        """
+        return {'active_version': active_version(self.registry_dir),
+                'reloads': self.reloads,
+                'reload_failures': self.reload_failures,
+                'last_reload': self.last_reload}
+
+
+if __name__ == "__main__":
+    PARSER = argparse.ArgumentParser(description='versioned model registry')
+    PARSER.add_argument('--registry', default=REGISTRY_DIR_PATH,
+                        help='registry directory (default MODEL_REGISTRY_DIR env. variable)')
+    COMMANDS = PARSER.add_subparsers(dest='command', required=True)
+    COMMANDS.add_parser('list', help='list the published versions')
+    PUBLISH = COMMANDS.add_parser('publish', help='publish a model set directory')
+    PUBLISH.add_argument('source_dir')
+    PUBLISH.add_argument('version')
+    PUBLISH.add_argument('--activate', action='store_true')
+    ACTIVATE = COMMANDS.add_parser('activate', help='make a published version active')
+    ACTIVATE.add_argument('version')
+    ARGS = PARSER.parse_args()
+
+    if not ARGS.registry:
+        PARSER.error('set --registry or the MODEL_REGISTRY_DIR env. variable')
+
+    if ARGS.command == 'list':
+        ACTIVE_VERSION = active_version(ARGS.registry)
+        for VERSION in list_versions(ARGS.registry):
+            print(f"{'*' if VERSION == ACTIVE_VERSION else ' '} {VERSION}")
+    elif ARGS.command == 'publish':
+        print(f"Published {publish(ARGS.source_dir, ARGS.version, ARGS.registry)}")
+        if ARGS.activate:
+            activate(ARGS.version, ARGS.registry)
+            print(f"Activated {ARGS.version}")
+    else:
+        activate(ARGS.version, ARGS.registry)
+        print(f"Activated {ARGS.version}")
@@ -1,86 +1,82 @@
 """
 data processor for logistic regression
 """
-import random
 import pickle
 import os
-from langdetect import detect, lang_detect_exception
 from sklearn.feature_extraction.text import CountVectorizer
 from sklearn.naive_bayes import MultinomialNB
-from sklearn import metrics, model_selection
-from utils.utilities import ProjectCommon
+from sklearn import metrics
+from data_preparation import corpus_cache
+from ml_models.feature_hashing import FEATURE_HASHING, N_FEATURES_EXPONENT, \
+    hashing_vectorizer
 
 CZECH_STOPWORDS_FILE_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '..',
                                                          'data_preparation', 'czech_stopwords.txt'))
 
-TEMP_FILE_PATH = '../../data_preparation/reviews_with_ranks.csv'
+TEMP_FILE_PATH = corpus_cache.REVIEWS_FILE_PATH
+MODEL_DIR_PATH = os.path.abspath(os.path.dirname(__file__))
 PERSIST_MODEL_TO_FILE = True
 
 
-def _read_temp_file_generator():
+def build_vectorizer(feature_hashing=FEATURE_HASHING,
+                     n_features_exponent=N_FEATURES_EXPONENT):
     """
-    read temp file generator
-    :return: yield rows
+    function creating the naive bayes vectorizer,
+    the hashed counts are unsigned, MultinomialNB needs non-negative features
+    :param feature_hashing: HashingVectorizer instead of the vocabulary based CountVectorizer
+    :param n_features_exponent: k of the 2^k hashed features
+    :return:
     """
-    for row in open(TEMP_FILE_PATH, encoding="utf8"):
-        try:
-            yield (row.split(',')[0].replace('"', ''),
-                   0 if int(row.split(',')[1]) < 0 else 1)
-        except IndexError:
-            yield '#NA'
+    if feature_hashing:
+        return hashing_vectorizer(alternate_sign=False, n_features_exponent=n_features_exponent)
+    return CountVectorizer()
 
 
-def naive_bayes(persist_model_to_file):
+def train_naive_bayes(Train_X, Train_Y, Test_X, feature_hashing=FEATURE_HASHING,
+                      max_workers=None):
     """
-    function for training and testing the ML model
-    :param persist_model_to_file:
-    :return:
+    function for training the ML model on a train/test split
+    :param Train_X: cleaned texts
+    :param Train_Y: 'neg'/'pos' labels
+    :param Test_X: cleaned texts
+    :param feature_hashing: see build_vectorizer()
+    :param max_workers: not used, there is no grid search, the trainers share the signature
+    :return: tuple (dict of model file name -> fitted object, Test_X 'neg'/'pos' predictions)
     """
-    temp_file_reviews_work = []
-
-    temp_file_gen = _read_temp_file_generator()
+    vect = build_vectorizer(feature_hashing)
+    Train_X = vect.fit_transform([x for x in Train_X])
+    Test_X = vect.transform([x for x in Test_X])
 
-    for tfg in temp_file_gen:
-        if len(tfg) == 2:
-            try:
-                _detected_lang = detect(ProjectCommon.remove_non_alpha_chars_and_html(tfg[0]))
-            except lang_detect_exception.LangDetectException:
-                continue
-            if _detected_lang == 'cs':
-                temp_file_reviews_work.append((ProjectCommon.remove_all(tfg[0]), tfg[1]))
+    nb = MultinomialNB()
+    nb.fit(Train_X, [0 if x == 'neg' else 1 for x in Train_Y])
 
-    temp_file_reviews_work = [x for x in temp_file_reviews_work if x[1] == 0][:11500] + \
-                             [x for x in temp_file_reviews_work if x[1] == 1][:11500]
+    predictions = ['neg' if x == 0 else 'pos' for x in nb.predict(Test_X)]
 
-    random.shuffle(temp_file_reviews_work)
+    return {'vectorizer.pkl': vect, 'model.pkl': nb}, predictions
 
-    Train_X, Test_X, Train_Y, Test_Y = model_selection. \
-        train_test_split([x[0] for x in temp_file_reviews_work],
-                         [x[1] for x in temp_file_reviews_work],
-                         test_size=0.2)
 
-    vect = CountVectorizer()
-    Train_X = vect.fit_transform([x for x in Train_X])
-    Test_X = vect.transform([x for x in Test_X])
+def naive_bayes(persist_model_to_file, feature_hashing=FEATURE_HASHING):
+    """
+    function for training and testing the ML model
+    :param persist_model_to_file:
+    :param feature_hashing: see build_vectorizer()
+    :return:
+    """
+    # class-balanced split of the cleaned Czech reviews of the shared preprocessed corpus cache
+    Train_X, Test_X, Train_Y, Test_Y = corpus_cache.load_corpus(TEMP_FILE_PATH).balanced_split()
 
-    nb = MultinomialNB()
-    nb.fit(Train_X, Train_Y)
+    model_files, predictions = train_naive_bayes(Train_X, Train_Y, Test_X, feature_hashing)
 
     if persist_model_to_file:
-        pickle.dump(vect, open('vectorizer.pkl', 'wb'))
-        pickle.dump(nb, open('model.pkl', 'wb'))
+        for file_name, model in model_files.items():
+            pickle.dump(model, open(os.path.join(MODEL_DIR_PATH, file_name), 'wb'))
 
     # # accuracy score calculation: 0.903
-    predictions = nb.predict(Test_X)
-    fpr, tpr, thresholds = metrics.roc_curve([x for x in Test_Y], predictions, pos_label=1)
+    fpr, tpr, thresholds = metrics.roc_curve([0 if x == 'neg' else 1 for x in Test_Y],
+                                             [0 if x == 'neg' else 1 for x in predictions],
+                                             pos_label=1)
     # print("Multinomial naive bayes AUC: {0}".format(metrics.auc(fpr, tpr)))
 
-    # # adhoc input prediction:
-    # input_string = input_string[0]
-    # input_string = [x for x in input_string.split()]
-    # print(input_string)
-    # print("prediction: {}". format(nb.predict(vect.transform(input_string))))
-
     # return accuracy score
     return metrics.auc(fpr, tpr)
 
@@ -0,0 +1,57 @@
+"""
+model precisions module
+
+The test precisions measured by `python -m ml_models.train_models` are written
+to precisions.json next to the models, the overall sentiment is the average of
+the model probabilities weighted by them. The module loads no models on import,
+so the training scripts share it with webapp_interface.
+"""
+import os
+import json
+
+MODELS_DIR_PATH = os.path.abspath(os.path.dirname(__file__))
+
+MODEL_TYPES = ('naive_bayes', 'logistic_regression', 'support_vector_machine')
+
+PRECISIONS_FILE_NAME = 'precisions.json'
+
+# the precisions of the models trained before the precisions file was written
+DEFAULT_PRECISIONS = {'naive_bayes': 0.886, 'logistic_regression': 0.837,
+                      'support_vector_machine': 0.846}
+
+
+def load_precisions(models_dir=MODELS_DIR_PATH):
+    """
+    function reading the measured test precisions of the models
+    :param models_dir: ml_models/ or a model registry version directory
+    :return: dict of model type -> precision, the DEFAULT_PRECISIONS without the file
+    """
+    try:
+        with open(os.path.join(models_dir, PRECISIONS_FILE_NAME), encoding='utf8') \
+                as precisions_file:
+            precisions = json.load(precisions_file)
+    except FileNotFoundError:
+        return dict(DEFAULT_PRECISIONS)
+    return {model_type: float(precisions[model_type]) for model_type in MODEL_TYPES}
+
+
+def write_precisions(precisions, models_dir=MODELS_DIR_PATH):
+    """
+    function writing the measured test precisions of the models
+    :param precisions: dict of model type -> precision
+    :param models_dir: ml_models/ or a directory to publish to the model registry
+    :return:
+    """
+    with open(os.path.join(models_dir, PRECISIONS_FILE_NAME), 'w', encoding='utf8') \
+            as precisions_file:
+        json.dump(precisions, precisions_file, indent=2)
+
+
+def ensemble_weights(precisions):
+    """
+    function normalizing the precisions to the overall sentiment weights
+    :param precisions: dict of model type -> precision
+    :return: tuple (nb weight, lr weight, svm weight) summing to 1
+    """
+    precision_sum = sum(precisions[model_type] for model_type in MODEL_TYPES)
+    return tuple(precisions[model_type] / precision_sum for model_type in MODEL_TYPES)
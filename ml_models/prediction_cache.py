@@ -0,0 +1,210 @@
+"""
+prediction result cache module
+"""
+import os
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class DiskStore:
+    """
+    Sqlite3 backed prediction store shared by the web server worker processes
+    """
+    # prune the expired and the oldest rows every PRUNE_EVERY writes
+    PRUNE_EVERY = 1000
+
+    def __init__(self, store_path, ttl, max_rows=100000):
+        self.store_path = store_path
+        self.ttl = ttl
+        self.max_rows = max_rows
+        self._local = threading.local()
+        self._writes = 0
+
+        conn = self._connection()
+        with conn:
+            conn.execute("""
+            CREATE TABLE IF NOT EXISTS prediction_cache (
+            cache_key text PRIMARY KEY,
+            prediction text NOT NULL,
+            created real NOT NULL); """)
+
+    def __repr__(self):
+        return f"DiskStore({self.store_path})"
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        # a connection inherited from the parent process must not be used
+        if conn is None or self._local.pid != os.getpid():
+            conn = self._local.conn = sqlite3.connect(self.store_path, timeout=1)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, cache_key):
+        """
+        get a not expired prediction method
+        :param cache_key:
+        :return: prediction dict or None
+        """
+        try:
+            row = self._connection().execute(
+                "SELECT prediction FROM prediction_cache WHERE cache_key = ? AND created >= ?;",
+                (cache_key, time.time() - self.ttl)).fetchone()
+        except sqlite3.Error:
+            return None
+        return json.loads(row[0]) if row else None
+
+    def set(self, cache_key, prediction):
+        """
+        store a prediction method, the cache is best effort so write errors are ignored
+        :param cache_key:
+        :param prediction:
+        :return:
+        """
+        conn = self._connection()
+        try:
+            with conn:
+                conn.execute("INSERT OR REPLACE INTO prediction_cache "
+                             "(cache_key, prediction, created) VALUES (?, ?, ?);",
+                             (cache_key, json.dumps(prediction), time.time()))
+                self._writes += 1
+                if self._writes % self.PRUNE_EVERY == 0:
+                    self._prune(conn)
+        except sqlite3.Error:
+            pass
+
+    def _prune(self, conn):
+        conn.execute("DELETE FROM prediction_cache WHERE created < ?;", (time.time() - self.ttl,))
+        conn.execute("DELETE FROM prediction_cache WHERE cache_key IN ("
+                     "SELECT cache_key FROM prediction_cache "
+                     "ORDER BY created DESC LIMIT -1 OFFSET ?);", (self.max_rows,))
+
+    def clear(self):
+        """
+        delete all the stored predictions method
+        :return:
+        """
+        conn = self._connection()
+        try:
+            with conn:
+                conn.execute("DELETE FROM prediction_cache;")
+        except sqlite3.Error:
+            pass
+
+
+class PredictionCache:
+    """
+    bounded LRU + TTL prediction cache class,
+    keyed by a hash of the models version and the normalized input text
+    """
+    def __init__(self, maxsize=10000, ttl=3600, store_path=None, namespace=''):
+        """
+        :param maxsize: in-memory entries count limit, bounds the memory used
+        :param ttl: seconds an entry stays valid
+        :param store_path: optional Sqlite3 file shared by the worker processes
+        :param namespace: models version, changing it invalidates all entries
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.namespace = namespace
+        self.store = DiskStore(store_path, ttl) if store_path else None
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def __repr__(self):
+        return f"PredictionCache(maxsize={self.maxsize}, ttl={self.ttl}, store={self.store})"
+
+    def key(self, input_text_for_eval):
+        """
+        cache key of the normalized input text method
+        :param input_text_for_eval:
+        :return:
+        """
+        return hashlib.sha256(f'{self.namespace}\0{input_text_for_eval}'.encode('utf8'))\
+            .hexdigest()
+
+    def get(self, cache_key):
+        """
+        get a cached prediction method
+        :param cache_key:
+        :return: prediction dict or None
+        """
+        if self.maxsize <= 0:
+            return None
+
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry is not None:
+                if entry[0] >= time.monotonic():
+                    self._entries.move_to_end(cache_key)
+                    self.hits += 1
+                    return entry[1]
+                del self._entries[cache_key]
+
+        prediction = self.store.get(cache_key) if self.store is not None else None
+
+        with self._lock:
+            if prediction is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._put(cache_key, prediction)
+        return prediction
+
+    def _put(self, cache_key, prediction):
+        self._entries[cache_key] = (time.monotonic() + self.ttl, prediction)
+        self._entries.move_to_end(cache_key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def set(self, cache_key, prediction):
+        """
+        cache a prediction method
+        :param cache_key:
+        :param prediction:
+        :return:
+        """
+        if self.maxsize <= 0:
+            return
+
+        with self._lock:
+            self._put(cache_key, prediction)
+
+        if self.store is not None:
+            self.store.set(cache_key, prediction)
+
+    def invalidate(self, namespace):
+        """
+        drop all the cached predictions, used on models reload method,
+        the shared store entries of other namespaces are never read again
+        :param namespace: the new models version
+        :return:
+        """
+        with self._lock:
+            self.namespace = namespace
+            self._entries.clear()
+
+    def metrics(self):
+        """
+        cache counters method
+        :return: dict
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {'hits': self.hits,
+                    'misses': self.misses,
+                    'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+                    'evictions': self.evictions,
+                    'size': len(self._entries),
+                    'maxsize': self.maxsize,
+                    'shared_store': self.store is not None}
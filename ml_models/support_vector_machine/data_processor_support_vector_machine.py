@@ -1,99 +1,160 @@
 """
 data processor for logistic regression
 """
-import random
+import copy
 import pickle
+import time
 import numpy as np
 import os
-from langdetect import detect, lang_detect_exception
+import sklearn
 from sklearn.feature_extraction.text import CountVectorizer
 from sklearn.linear_model import SGDClassifier
-from sklearn import metrics, model_selection
-from sklearn.model_selection import GridSearchCV
 from sklearn.feature_extraction.text import TfidfTransformer
 from sklearn.pipeline import Pipeline
-from utils.utilities import ProjectCommon
+from data_preparation import corpus_cache
+from ml_models import training_orchestrator
+from ml_models.feature_hashing import FEATURE_HASHING, N_FEATURES_EXPONENT, \
+    hashing_vectorizer
 
 CZECH_STOPWORDS_FILE_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '..',
                                                          'data_preparation', 'czech_stopwords.txt'))
 
-TEMP_FILE_PATH = '../../data_preparation/reviews_with_ranks.csv'
+TEMP_FILE_PATH = corpus_cache.REVIEWS_FILE_PATH
+MODEL_DIR_PATH = os.path.abspath(os.path.dirname(__file__))
 PERSIST_MODEL_TO_FILE = True
 
+# the SGDClassifier 'log' loss was renamed to 'log_loss' in scikit-learn 1.1
+SGD_LOG_LOSS = 'log_loss' \
+    if tuple(int(x) for x in sklearn.__version__.split('.')[:2]) >= (1, 1) else 'log'
 
-def _read_temp_file_generator():
-    """
-    read temp file generator
-    :return: yield rows
-    """
-    for row in open(TEMP_FILE_PATH, encoding="utf8"):
-        try:
-            yield (row.split(',')[0].replace('"', ''),
-                   'neg' if int(row.split(',')[1]) < 0 else 'pos')
-        except IndexError:
-            yield '#NA'
 
-
-def support_vector_machine(persist_model_to_file):
+def slim_model(model):
     """
-    function for training and testing the ML model
-    :param persist_model_to_file:
-    :return:
+    function stripping the fitted model to an inference only pipeline:
+    the grid search best estimator only, without the vectorizer stop_words_
+    and with float32 coefficients, the vocabulary is kept whole
+    because every term contributes to the tf-idf l2 norm
+    :param model: fitted GridSearchCV or Pipeline
+    :return: Pipeline
     """
-    temp_file_reviews_work = []
-
-    temp_file_gen = _read_temp_file_generator()
+    pipeline = copy.deepcopy(getattr(model, 'best_estimator_', model))
 
-    for tfg in temp_file_gen:
-        if len(tfg) == 2:
-            try:
-                _detected_lang = detect(ProjectCommon.remove_non_alpha_chars_and_html(tfg[0]))
-            except lang_detect_exception.LangDetectException:
-                continue
-            if _detected_lang == 'cs':
-                temp_file_reviews_work.append((ProjectCommon.remove_all(tfg[0]), tfg[1]))
+    vectorizer = pipeline.named_steps['vect']
+    if hasattr(vectorizer, 'stop_words_'):
+        del vectorizer.stop_words_
 
-    temp_file_reviews_work = [x for x in temp_file_reviews_work if x[1] == 'neg'][:11500] + \
-                             [x for x in temp_file_reviews_work if x[1] == 'pos'][:11500]
+    classifier = pipeline.named_steps['clf']
+    classifier.coef_ = classifier.coef_.astype(np.float32)
 
-    random.shuffle(temp_file_reviews_work)
+    return pipeline
 
-    Train_X, Test_X, Train_Y, Test_Y = model_selection.train_test_split([x[0] for x in temp_file_reviews_work],
-                                                                        [x[1] for x in temp_file_reviews_work],
-                                                                        test_size=0.2)
 
-    text_clf = Pipeline([
-        ('vect', CountVectorizer()),
+def slim_model_report(model, slimmed_model, input_strings, max_abs_diff=1e-5):
+    """
+    function comparing the persisted size, the per request predict_proba latency
+    and the predictions of the full and the slimmed model
+    :param model:
+    :param slimmed_model:
+    :param input_strings:
+    :param max_abs_diff: allowed probability difference of the float32 coefficients
+    :return: dict
+    """
+    def _latency_us(predictor):
+        started = time.perf_counter()
+        for input_string in input_strings:
+            predictor.predict_proba([input_string])
+        return (time.perf_counter() - started) / len(input_strings) * 1e6
+
+    probabilities = model.predict_proba(input_strings)
+    slimmed_probabilities = slimmed_model.predict_proba(input_strings)
+    abs_diff = float(np.max(np.abs(probabilities - slimmed_probabilities)))
+
+    return {'pickle_bytes': len(pickle.dumps(model)),
+            'slim_pickle_bytes': len(pickle.dumps(slimmed_model)),
+            'predict_proba_us': round(_latency_us(model), 1),
+            'slim_predict_proba_us': round(_latency_us(slimmed_model), 1),
+            'max_abs_diff': abs_diff,
+            'equivalent': abs_diff <= max_abs_diff and
+                          (model.predict(input_strings) == slimmed_model.predict(input_strings)).all()}
+
+
+def build_pipeline(feature_hashing=FEATURE_HASHING,
+                   n_features_exponent=N_FEATURES_EXPONENT):
+    """
+    function creating the not fitted tf-idf SGDClassifier pipeline
+    :param feature_hashing: HashingVectorizer instead of the vocabulary based CountVectorizer,
+    the tf-idf weights then belong to the hashed features
+    :param n_features_exponent: k of the 2^k hashed features
+    :return: Pipeline
+    """
+    return Pipeline([
+        ('vect', hashing_vectorizer(n_features_exponent=n_features_exponent)
+         if feature_hashing else CountVectorizer()),
         ('tfidf', TfidfTransformer()),
-        ('clf', SGDClassifier(loss='log', penalty='l2',
+        ('clf', SGDClassifier(loss=SGD_LOG_LOSS, penalty='l2',
                               alpha=1e-3, random_state=42,
                               max_iter=5, tol=None)),
     ])
 
-    text_clf.fit(Train_X, Train_Y)
-    predicted = text_clf.predict(Test_X)
+
+def train_support_vector_machine(Train_X, Train_Y, Test_X, feature_hashing=FEATURE_HASHING,
+                                 max_workers=training_orchestrator.TRAINING_WORKERS):
+    """
+    function for training the ML model on a train/test split
+    :param Train_X: cleaned texts
+    :param Train_Y: 'neg'/'pos' labels
+    :param Test_X: cleaned texts
+    :param feature_hashing: see build_pipeline()
+    :param max_workers: grid search processes, see training_orchestrator.grid_search()
+    :return: tuple (dict of model file name -> fitted object, Test_X 'neg'/'pos' predictions)
+    """
     parameters = {
         'vect__ngram_range': [(1, 1), (1, 2)],
         'tfidf__use_idf': (True, False),
         'clf__alpha': (1e-2, 1e-3),
     }
 
-    gs_clf = GridSearchCV(text_clf, parameters, cv=5, n_jobs=-1)
-    gs_clf = gs_clf.fit(Train_X, Train_Y)
+    # the counts and the tf-idf matrices are computed once per fold and ngram_range/use_idf,
+    # only the classifier is fitted per candidate, the best candidate is refitted once
+    gs_clf = training_orchestrator.grid_search(build_pipeline(feature_hashing), parameters,
+                                               Train_X, Train_Y, cv=5,
+                                               max_workers=max_workers)
+    gs_clf.print_report()
+    predicted = gs_clf.best_estimator_.predict(Test_X)
+
+    # persist the inference only pipeline, checked against the grid search predictions
+    slim_clf = slim_model(gs_clf)
+    report = slim_model_report(gs_clf.best_estimator_, slim_clf, Test_X[:1000])
+    print(f"Slimmed SVM model {report['pickle_bytes']} -> {report['slim_pickle_bytes']} bytes, "
+          f"predict_proba {report['predict_proba_us']} -> {report['slim_predict_proba_us']} us, "
+          f"max abs difference {report['max_abs_diff']:.2e}")
+    if not report['equivalent']:
+        raise ValueError(f"Slimmed model predictions differ: {report}")
+
+    return {'model.pkl': slim_clf}, list(predicted)
+
+
+def support_vector_machine(persist_model_to_file, feature_hashing=FEATURE_HASHING):
+    """
+    function for training and testing the ML model
+    :param persist_model_to_file:
+    :param feature_hashing: see build_pipeline()
+    :return:
+    """
+    # class-balanced split of the cleaned Czech reviews of the shared preprocessed corpus cache
+    Train_X, Test_X, Train_Y, Test_Y = corpus_cache.load_corpus(TEMP_FILE_PATH).balanced_split()
+
+    model_files, predicted = train_support_vector_machine(Train_X, Train_Y, Test_X,
+                                                          feature_hashing)
 
     if persist_model_to_file:
-        pickle.dump(gs_clf, open('model.pkl', 'wb'))
+        for file_name, model in model_files.items():
+            pickle.dump(model, open(os.path.join(MODEL_DIR_PATH, file_name), 'wb'))
 
     # # accuracy score calculation: 0.847
-    # print(np.mean(predicted == Test_Y))
     # print(metrics.classification_report(Test_Y, predicted, target_names = ['neg', 'pos']))
 
-    # # adhoc input prediction:
-    # input_string = ''
-    # print(input_string)
-    # print("prediction: {}". format(gs_clf.predict([input_string])[0]))
-
-    return np.mean(predicted == Test_Y)
+    return np.mean(np.array(predicted) == np.array(Test_Y))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,205 @@
+"""
+unified training module
+
+The scraped reviews corpus is read and cleaned once (the shared preprocessed
+corpus cache) and split once into the class-balanced train and test sets,
+the naive bayes, the logistic regression and the svm models are then trained
+concurrently, each in its own process. The models are written together with
+their test precisions (precisions.json), the overall sentiment weights read by
+webapp_interface, and with the fused ensemble compiled from the new models.
+
+run from the repository root:
+python -m ml_models.train_models [--corpus reviews.csv] [--output-dir DIR] [--seed N]
+"""
+import os
+import json
+import time
+import pickle
+import argparse
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from sklearn import metrics
+from data_preparation import corpus_cache
+from ml_models import fused_ensemble, training_orchestrator
+from ml_models import precisions as model_precisions
+from ml_models.feature_hashing import FEATURE_HASHING
+from ml_models.naive_bayes import data_processor_naive_bayes
+from ml_models.logistic_regression import data_processor_logistic_regression
+from ml_models.support_vector_machine import data_processor_support_vector_machine
+
+MODELS_DIR_PATH = model_precisions.MODELS_DIR_PATH
+
+TRAINERS = {'naive_bayes': data_processor_naive_bayes.train_naive_bayes,
+            'logistic_regression': data_processor_logistic_regression.train_logistic_regression,
+            'support_vector_machine':
+                data_processor_support_vector_machine.train_support_vector_machine}
+
+
+def _train(model_type, train_texts, train_labels, test_texts, test_labels, feature_hashing,
+           grid_search_workers):
+    """
+    process pool worker function training and testing one model
+    :param model_type:
+    :param train_texts:
+    :param train_labels:
+    :param test_texts:
+    :param test_labels:
+    :param feature_hashing:
+    :param grid_search_workers: the model grid search processes
+    :return: tuple (model type, dict of model file name -> fitted object, test measurements)
+    """
+    started = time.perf_counter()
+    model_files, predictions = TRAINERS[model_type](train_texts, train_labels, test_texts,
+                                                    feature_hashing, grid_search_workers)
+    return model_type, model_files, {
+        'precision': float(metrics.precision_score(test_labels, predictions, average='macro')),
+        'accuracy': float(metrics.accuracy_score(test_labels, predictions)),
+        'seconds': round(time.perf_counter() - started, 1)}
+
+
+def _write_fused_ensemble(output_dir, results, precisions, verify_input_strings):
+    """
+    function compiling the fused ensemble of the trained vocabulary based models,
+    a fused ensemble left from the previous models would be served instead of them
+    :param output_dir:
+    :param results: dict of model type -> (dict of model file name -> fitted object, _)
+    :param precisions: dict of model type -> precision
+    :param verify_input_strings: texts the fused and the sklearn predictions are compared on
+    :return: the max abs difference from the sklearn models
+    """
+    sklearn_models = (results['naive_bayes'][0]['vectorizer.pkl'],
+                      results['naive_bayes'][0]['model.pkl'],
+                      results['logistic_regression'][0]['vectorizer.pkl'],
+                      results['logistic_regression'][0]['model.pkl'],
+                      results['support_vector_machine'][0]['model.pkl'])
+    fused = fused_ensemble.compile_fused_ensemble(*sklearn_models,
+                                                  model_precisions.ensemble_weights(precisions))
+    max_abs_diff = fused_ensemble.verify_fused_ensemble(fused, *sklearn_models,
+                                                        verify_input_strings)
+    if max_abs_diff > 1e-6:
+        raise ValueError(f"Fused ensemble differs from the sklearn models by {max_abs_diff}")
+
+    if output_dir == MODELS_DIR_PATH:
+        fused.export(fused_ensemble.MODEL_ARTIFACTS_DIR_PATH)
+        fused.save(fused_ensemble.FUSED_ENSEMBLE_FILE_PATH)
+    else:
+        # a model registry version directory holds the artifacts next to the models,
+        # export() swaps a symlink to its own directory, the files are moved in, the manifest last
+        with tempfile.TemporaryDirectory(dir=output_dir) as temp_dir:
+            fused.export(os.path.join(temp_dir, 'artifacts'))
+            for file_name in sorted(os.listdir(os.path.join(temp_dir, 'artifacts')),
+                                    key=lambda x: x == fused_ensemble.MANIFEST_FILE_NAME):
+                os.replace(os.path.join(temp_dir, 'artifacts', file_name),
+                           os.path.join(output_dir, file_name))
+        fused.save(os.path.join(output_dir,
+                                os.path.basename(fused_ensemble.FUSED_ENSEMBLE_FILE_PATH)))
+    return max_abs_diff
+
+
+def _remove_fused_ensemble(output_dir):
+    """
+    function removing the fused ensemble compiled from the previous vocabulary based models,
+    the feature hashing models can not be fused and it would be served instead of them
+    :param output_dir:
+    :return: list of the removed paths
+    """
+    if output_dir == MODELS_DIR_PATH:
+        artifacts_dir = fused_ensemble.MODEL_ARTIFACTS_DIR_PATH
+        fused_ensemble_file_path = fused_ensemble.FUSED_ENSEMBLE_FILE_PATH
+    else:
+        artifacts_dir = os.path.join(output_dir, 'artifacts')
+        fused_ensemble_file_path = os.path.join(
+            output_dir, os.path.basename(fused_ensemble.FUSED_ENSEMBLE_FILE_PATH))
+
+    removed = []
+    # a model registry version directory holds the arrays next to the models,
+    # the manifest is removed first, so the arrays are no longer loaded as artifacts
+    manifest_file_path = os.path.join(output_dir, fused_ensemble.MANIFEST_FILE_NAME)
+    if output_dir != MODELS_DIR_PATH and os.path.isfile(manifest_file_path):
+        with open(manifest_file_path, encoding='utf8') as manifest_file:
+            manifest = json.load(manifest_file)
+        os.remove(manifest_file_path)
+        removed.append(manifest_file_path)
+        for array_manifest in manifest['arrays'].values():
+            array_file_path = os.path.join(output_dir, array_manifest['file'])
+            if os.path.isfile(array_file_path):
+                os.remove(array_file_path)
+                removed.append(array_file_path)
+
+    removed += fused_ensemble.remove_artifacts(artifacts_dir)
+    if os.path.isfile(fused_ensemble_file_path):
+        os.remove(fused_ensemble_file_path)
+        removed.append(fused_ensemble_file_path)
+    return removed
+
+
+def train_models(corpus_path=corpus_cache.REVIEWS_FILE_PATH, output_dir=MODELS_DIR_PATH,
+                 feature_hashing=FEATURE_HASHING, random_state=None, max_workers=None,
+                 language='cs', cache_dir=corpus_cache.CORPUS_CACHE_DIR):
+    """
+    function training the three models from one corpus pass and writing them together
+    :param corpus_path: scraped reviews csv
+    :param output_dir: ml_models/ or a directory to publish to the model registry
+    :param feature_hashing: see feature_hashing module
+    :param random_state: seed of the train/test split
+    :param max_workers: training processes, one per model by default
+    :param language: detected language code of the reviews, None for all reviews
+    :param cache_dir: the preprocessed corpus cache directory
+    :return: dict of model type -> test measurements
+    """
+    output_dir = os.path.abspath(output_dir)
+    train_texts, test_texts, train_labels, test_labels = \
+        corpus_cache.load_corpus(corpus_path, cache_dir).balanced_split(language,
+                                                                        random_state=random_state)
+    print(f"Training on {len(train_texts)} reviews, testing on {len(test_texts)} reviews")
+
+    # the process pool pickles the split once per model, each trainer runs its own
+    # grid search process pool, the TRAINING_WORKERS env. variable (default the cpu count)
+    # processes are split between the concurrently trained models
+    grid_search_workers = max(1, (training_orchestrator.TRAINING_WORKERS or os.cpu_count() or 1)
+                              // len(TRAINERS))
+    results = {}
+    with ProcessPoolExecutor(max_workers=max_workers or len(TRAINERS)) as executor:
+        futures = [executor.submit(_train, model_type, train_texts, train_labels, test_texts,
+                                   test_labels, feature_hashing, grid_search_workers)
+                   for model_type in TRAINERS]
+        for future in futures:
+            model_type, model_files, measurements = future.result()
+            results[model_type] = (model_files, measurements)
+            print(f"Trained {model_type} in {measurements['seconds']}s, "
+                  f"precision {measurements['precision']:.4f}")
+
+    # the models are written once all of them are trained, a fused ensemble
+    # left from the vocabulary based models is removed before the hashing models are written
+    if feature_hashing:
+        for removed_path in _remove_fused_ensemble(output_dir):
+            print(f"Removed the fused ensemble of the previous models {removed_path}")
+
+    for model_type, (model_files, _) in results.items():
+        os.makedirs(os.path.join(output_dir, model_type), exist_ok=True)
+        for file_name, model in model_files.items():
+            with open(os.path.join(output_dir, model_type, file_name), 'wb') as model_file:
+                pickle.dump(model, model_file)
+
+    precisions = {model_type: round(measurements['precision'], 4)
+                  for model_type, (_, measurements) in results.items()}
+    model_precisions.write_precisions(precisions, output_dir)
+
+    if not feature_hashing:
+        max_abs_diff = _write_fused_ensemble(output_dir, results, precisions, test_texts[:1000])
+        print(f"Fused ensemble max abs difference {max_abs_diff}")
+
+    return {model_type: measurements for model_type, (_, measurements) in results.items()}
+
+
+if __name__ == "__main__":
+    PARSER = argparse.ArgumentParser(description='train the three models from one corpus pass')
+    PARSER.add_argument('--corpus', default=corpus_cache.REVIEWS_FILE_PATH,
+                        help='scraped reviews csv')
+    PARSER.add_argument('--output-dir', default=MODELS_DIR_PATH,
+                        help='models directory, ml_models/ by default')
+    PARSER.add_argument('--seed', type=int, help='train/test split seed')
+    ARGS = PARSER.parse_args()
+
+    print(json.dumps(train_models(ARGS.corpus, ARGS.output_dir, random_state=ARGS.seed),
+                     indent=2))
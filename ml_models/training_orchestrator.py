@@ -0,0 +1,252 @@
+"""
+training orchestrator module
+
+A grid search over a text Pipeline (vectorizer and transformer steps followed
+by the classifier) shared by the trainers. Unlike GridSearchCV, which fits the
+whole pipeline, vectorizer included, for every candidate in every fold, the
+feature steps are fitted once per fold and distinct step parameters: the
+transformed fold matrices are cached and only the classifier is fitted per
+candidate. The (candidate, fold) fits run over a process pool, the workers
+receive the cached matrices once, when started. The best candidate is refitted
+once on the whole training data.
+
+TRAINING_WORKERS env. variable sets the process pool size (default the cpu count),
+1 runs the fits in the calling process, train_models splits it between the models
+trained concurrently
+"""
+import os
+import time
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from sklearn.base import clone
+from sklearn.model_selection import StratifiedKFold
+
+TRAINING_WORKERS = int(os.environ.get('TRAINING_WORKERS', 0)) or None
+
+# (fold number, feature steps parameters key) -> (train matrix, validation matrix),
+# the fold labels and the classifier, set in each worker process by _init_worker()
+_WORKER_STATE = {}
+
+
+def _candidates(param_grid):
+    """
+    function expanding the parameter grid to the candidate parameter dicts,
+    in the ParameterGrid order (a list of grids is also accepted)
+    :param param_grid:
+    :return: list of dicts
+    """
+    grids = param_grid if isinstance(param_grid, list) else [param_grid]
+    candidates = []
+    for grid in grids:
+        keys = sorted(grid)
+        candidates.extend(dict(zip(keys, values))
+                          for values in itertools.product(*(grid[key] for key in keys)))
+    return candidates
+
+
+def _step_params(pipeline, params):
+    """
+    function splitting the candidate parameters by the pipeline step
+    :param pipeline:
+    :param params: dict of 'step__parameter' -> value
+    :return: dict of step name -> dict of parameter -> value
+    """
+    step_params = {name: {} for name, _ in pipeline.steps}
+    for key, value in params.items():
+        step_name, param_name = key.split('__', 1)
+        if step_name not in step_params:
+            raise ValueError(f"Invalid parameter {key!r}, the pipeline steps are "
+                             f"{list(step_params)}")
+        step_params[step_name][param_name] = value
+    return step_params
+
+
+def _features_key(pipeline, step_params, step_count):
+    """
+    function keying the output of the first step_count feature steps by their parameters
+    :param pipeline:
+    :param step_params:
+    :param step_count:
+    :return: str
+    """
+    return repr([(name, sorted(step_params[name].items()))
+                 for name, _ in pipeline.steps[:step_count]])
+
+
+def _init_worker(fold_features, fold_labels, classifier):
+    """
+    process pool worker initializer keeping the cached fold matrices
+    :param fold_features:
+    :param fold_labels: list of (train labels, validation labels) per fold
+    :param classifier: the not fitted pipeline last step
+    :return:
+    """
+    _WORKER_STATE['fold_features'] = fold_features
+    _WORKER_STATE['fold_labels'] = fold_labels
+    _WORKER_STATE['classifier'] = classifier
+
+
+def _fit_candidate(candidate_number, fold_number, features_key, classifier_params):
+    """
+    process pool worker function fitting and scoring the classifier of one candidate
+    on one cached fold
+    :param candidate_number:
+    :param fold_number:
+    :param features_key:
+    :param classifier_params:
+    :return: tuple (candidate number, fold number, score, fit seconds, score seconds)
+    """
+    train_matrix, validation_matrix = _WORKER_STATE['fold_features'][(fold_number, features_key)]
+    train_labels, validation_labels = _WORKER_STATE['fold_labels'][fold_number]
+
+    started = time.perf_counter()
+    classifier = clone(_WORKER_STATE['classifier']).set_params(**classifier_params)
+    classifier.fit(train_matrix, train_labels)
+    fitted = time.perf_counter()
+    score = classifier.score(validation_matrix, validation_labels)
+
+    return candidate_number, fold_number, float(score), fitted - started, \
+        time.perf_counter() - fitted
+
+
+class GridSearchResult:
+    """
+    grid search outcome class, the best_* attributes are named as the GridSearchCV ones
+    """
+    def __init__(self, best_estimator, best_params, best_score, candidates, vectorize_seconds,
+                 search_seconds, refit_seconds):
+        """
+        :param best_estimator: the best candidate pipeline refitted on the whole training data
+        :param best_params:
+        :param best_score: mean validation score of the best candidate
+        :param candidates: list of per candidate dicts (params, mean_score, std_score, rank,
+        fit_seconds, score_seconds)
+        :param vectorize_seconds: the feature steps fitting and transforming of all the folds
+        :param search_seconds: the wall time of the candidate fits
+        :param refit_seconds:
+        """
+        self.best_estimator_ = best_estimator
+        self.best_params_ = best_params
+        self.best_score_ = best_score
+        self.candidates = candidates
+        self.vectorize_seconds = vectorize_seconds
+        self.search_seconds = search_seconds
+        self.refit_seconds = refit_seconds
+
+    def __repr__(self):
+        return f"GridSearchResult({self.best_params_}, score={self.best_score_:.4f})"
+
+    def report(self):
+        """
+        per candidate timing report method
+        :return: dict
+        """
+        return {'vectorize_seconds': round(self.vectorize_seconds, 3),
+                'search_seconds': round(self.search_seconds, 3),
+                'refit_seconds': round(self.refit_seconds, 3),
+                'best_params': self.best_params_,
+                'best_score': round(self.best_score_, 4),
+                'candidates': self.candidates}
+
+    def print_report(self):
+        """
+        print the per candidate timing report method
+        :return:
+        """
+        print(f"vectorize {self.vectorize_seconds:.2f}s, candidate fits "
+              f"{self.search_seconds:.2f}s, refit {self.refit_seconds:.2f}s")
+        print(f"{'rank':>4}{'mean score':>12}{'std':>8}{'fit s':>9}{'score s':>9}  params")
+        for candidate in sorted(self.candidates, key=lambda x: x['rank']):
+            print(f"{candidate['rank']:>4}{candidate['mean_score']:>12.4f}"
+                  f"{candidate['std_score']:>8.4f}{candidate['fit_seconds']:>9.3f}"
+                  f"{candidate['score_seconds']:>9.3f}  {candidate['params']}")
+
+
+def grid_search(pipeline, param_grid, texts, labels, cv=5, max_workers=TRAINING_WORKERS):
+    """
+    function searching the pipeline parameter grid by a stratified k-fold cross-validation,
+    the classifier score (accuracy) selects the best candidate
+    :param pipeline: not fitted Pipeline, the last step is the classifier
+    :param param_grid: dict (or list of dicts) of 'step__parameter' -> list of values
+    :param texts: training texts
+    :param labels: training labels
+    :param cv: folds count
+    :param max_workers: process pool size, None the cpu count, 1 fits in this process
+    :return: GridSearchResult
+    """
+    texts = np.asarray(texts, dtype=object)
+    labels = np.asarray(labels)
+    candidates = _candidates(param_grid)
+    feature_step_count = len(pipeline.steps) - 1
+    candidate_step_params = [_step_params(pipeline, params) for params in candidates]
+    candidate_features_keys = [_features_key(pipeline, step_params, feature_step_count)
+                               for step_params in candidate_step_params]
+
+    # the feature steps are fitted once per fold and distinct parameters of the steps so far,
+    # the intermediate matrices are dropped once the fold is done
+    started = time.perf_counter()
+    fold_features, fold_labels = {}, []
+    for fold_number, (train_index, validation_index) in \
+            enumerate(StratifiedKFold(n_splits=cv).split(texts, labels)):
+        fold_labels.append((labels[train_index], labels[validation_index]))
+        step_outputs = {_features_key(pipeline, {}, 0): (list(texts[train_index]),
+                                                          list(texts[validation_index]))}
+        for step_params in candidate_step_params:
+            for step_number, (name, step) in enumerate(pipeline.steps[:feature_step_count]):
+                features_key = _features_key(pipeline, step_params, step_number + 1)
+                if features_key not in step_outputs:
+                    train_input, validation_input = \
+                        step_outputs[_features_key(pipeline, step_params, step_number)]
+                    transformer = clone(step).set_params(**step_params[name])
+                    step_outputs[features_key] = (
+                        transformer.fit_transform(train_input, labels[train_index]),
+                        transformer.transform(validation_input))
+            features_key = _features_key(pipeline, step_params, feature_step_count)
+            fold_features[(fold_number, features_key)] = step_outputs[features_key]
+    vectorize_seconds = time.perf_counter() - started
+
+    classifier_name, classifier = pipeline.steps[-1]
+    tasks = [(candidate_number, fold_number, candidate_features_keys[candidate_number],
+              candidate_step_params[candidate_number][classifier_name])
+             for candidate_number in range(len(candidates)) for fold_number in range(cv)]
+
+    started = time.perf_counter()
+    if max_workers == 1:
+        _init_worker(fold_features, fold_labels, classifier)
+        fits = [_fit_candidate(*task) for task in tasks]
+        _WORKER_STATE.clear()
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                                 initargs=(fold_features, fold_labels, classifier)) as executor:
+            fits = list(executor.map(_fit_candidate, *zip(*tasks)))
+    search_seconds = time.perf_counter() - started
+
+    scores = np.zeros((len(candidates), cv))
+    fit_seconds = np.zeros(len(candidates))
+    score_seconds = np.zeros(len(candidates))
+    for candidate_number, fold_number, score, fit_time, score_time in fits:
+        scores[candidate_number, fold_number] = score
+        fit_seconds[candidate_number] += fit_time
+        score_seconds[candidate_number] += score_time
+
+    mean_scores = scores.mean(axis=1)
+    # the first of the equally scored candidates wins, as in GridSearchCV
+    best_candidate = int(np.argmax(mean_scores))
+    ranks = (-mean_scores).argsort(kind='stable').argsort() + 1
+    candidate_reports = [{'params': params,
+                          'mean_score': round(float(mean_scores[candidate_number]), 4),
+                          'std_score': round(float(scores[candidate_number].std()), 4),
+                          'rank': int(ranks[candidate_number]),
+                          'fit_seconds': round(float(fit_seconds[candidate_number]), 3),
+                          'score_seconds': round(float(score_seconds[candidate_number]), 3)}
+                         for candidate_number, params in enumerate(candidates)]
+
+    started = time.perf_counter()
+    best_estimator = clone(pipeline).set_params(**candidates[best_candidate])
+    best_estimator.fit(list(texts), labels)
+    refit_seconds = time.perf_counter() - started
+
+    return GridSearchResult(best_estimator, candidates[best_candidate],
+                            float(mean_scores[best_candidate]), candidate_reports,
+                            vectorize_seconds, search_seconds, refit_seconds)
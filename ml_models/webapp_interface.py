@@ -3,59 +3,222 @@ ml models interface for Flask web application
 """
 import os
 import pickle
+import hashlib
+from ml_models import fused_ensemble, model_registry
+from ml_models.precisions import PRECISIONS_FILE_NAME, DEFAULT_PRECISIONS, load_precisions, \
+    ensemble_weights
+from ml_models.feature_hashing import is_hashing_vectorizer
+from ml_models.prediction_cache import PredictionCache
+from utils.metrics import REQUEST_METRICS
 
+MODELS_DIR_PATH = os.path.abspath(os.path.dirname(__file__))
 
-def _pickle_load(model_type, file_name):
+
+def _pickle_load(model_type, file_name, models_dir=MODELS_DIR_PATH):
     """
     load pickled data model file function
     :param model_type:
     :param file_name:
+    :param models_dir:
     :return:
     """
     return pickle.load(
-        open(os.path.abspath(os.path.join(os.path.dirname(__file__), model_type, file_name)), 'rb')
+        open(os.path.abspath(os.path.join(models_dir, model_type, file_name)), 'rb')
     )
 
 
-# pickle load ml models
-VECTOR_NB = _pickle_load('naive_bayes', 'vectorizer.pkl')
-MODEL_NB = _pickle_load('naive_bayes', 'model.pkl')
-VECTOR_LR = _pickle_load('logistic_regression', 'vectorizer.pkl')
-MODEL_LR = _pickle_load('logistic_regression', 'model.pkl')
-MODEL_SVM = _pickle_load('support_vector_machine', 'model.pkl')
+MODEL_FILES = (('naive_bayes', 'vectorizer.pkl'),
+               ('naive_bayes', 'model.pkl'),
+               ('logistic_regression', 'vectorizer.pkl'),
+               ('logistic_regression', 'model.pkl'),
+               ('support_vector_machine', 'model.pkl'))
 
-# prepare the overall sentiment model weights
-PRECISION_NB = 0.886
-PRECISION_LR = 0.837
-PRECISION_SVM = 0.846
-PRECISION_SUM = PRECISION_NB + PRECISION_LR + PRECISION_SVM
-PRECISION_NB_WEIGHT_AVG = PRECISION_NB / PRECISION_SUM
-PRECISION_LR_WEIGHT_AVG = PRECISION_LR / PRECISION_SUM
-PRECISION_SVM_WEIGHT_AVG = PRECISION_SVM / PRECISION_SUM
+# prepared texts scored by a loaded model set before it is swapped in
+WARM_UP_INPUT_STRINGS = ('skvel funkcionaln test', 'hrozn funkcionaln test',
+                         'film naprost uzasn herc skvel hudb nadhern')
 
 
-def ml_model_evaluator(input_string):
+def _models_fingerprint():
     """
-    function for machine learning model evaluation
-    :param input_string:
-    :return: prediction_output dict
+    function hashing the model artifact files identity, it is the models version
+    shared by all the worker processes loading the same files
+    :return:
     """
-    prediction_output = dict()
-    # prediction_naive_bayes = MODEL_NB.predict(VECTOR_NB.transform(input_string))
-    # prediction_logistic_regression = MODEL_LR.predict(VECTOR_LR.transform(input_string))
-    # prediction_support_vector_machine = MODEL_SVM.predict(input_string)
+    fingerprint = hashlib.sha256()
+    file_paths = [os.path.abspath(os.path.join(MODELS_DIR_PATH, *model_file))
+                  for model_file in MODEL_FILES] + \
+        [os.path.join(MODELS_DIR_PATH, PRECISIONS_FILE_NAME),
+         fused_ensemble.FUSED_ENSEMBLE_FILE_PATH,
+         os.path.join(fused_ensemble.MODEL_ARTIFACTS_DIR_PATH, fused_ensemble.MANIFEST_FILE_NAME)]
 
-    prediction_naive_bayes_prob = \
-        MODEL_NB.predict_proba(VECTOR_NB.transform(input_string))[0][0]
-    prediction_logistic_regression_prob = \
-        MODEL_LR.predict_proba(VECTOR_LR.transform(input_string))[0][0]
-    prediction_support_vector_machine_prob = \
-        MODEL_SVM.predict_proba(input_string)[0][0]
+    for file_path in file_paths:
+        if os.path.isfile(file_path):
+            file_stat = os.stat(file_path)
+            fingerprint.update(f'{file_path}:{file_stat.st_size}:{file_stat.st_mtime_ns};'
+                               .encode('utf8'))
 
-    prediction_output_overall_proba = \
-        round((prediction_naive_bayes_prob * PRECISION_NB_WEIGHT_AVG) +
-              (prediction_logistic_regression_prob * PRECISION_LR_WEIGHT_AVG) +
-              (prediction_support_vector_machine_prob * PRECISION_SVM_WEIGHT_AVG), 2)
+    return fingerprint.hexdigest()[:16]
+
+
+def load_sklearn_models(models_dir=MODELS_DIR_PATH):
+    """
+    function unpickling the sklearn models
+    :param models_dir: ml_models/ or a model registry version directory
+    :return: tuple (vector_nb, model_nb, vector_lr, model_lr, model_svm)
+    """
+    return tuple(_pickle_load(model_type, file_name, models_dir)
+                 for model_type, file_name in MODEL_FILES)
+
+
+def _models_mtime(models_dir=MODELS_DIR_PATH):
+    """
+    function returning the modification time of the last written pickled model
+    :param models_dir: ml_models/ or a model registry version directory
+    :return: nanoseconds, 0 without the pickled models
+    """
+    model_file_paths = [os.path.join(models_dir, *model_file) for model_file in MODEL_FILES]
+    return max((os.stat(file_path).st_mtime_ns for file_path in model_file_paths
+                if os.path.isfile(file_path)), default=0)
+
+
+class ModelSet:
+    """
+    ml models of one version class,
+    a loaded set is never modified, a reload builds a new one and swaps it in
+    """
+    def __init__(self, version, fused_ensemble_scorer=None, sklearn_models=None, weights=None):
+        """
+        :param version: the models version
+        :param fused_ensemble_scorer: FusedEnsemble, replaces the sklearn models when set
+        :param sklearn_models: tuple (vector_nb, model_nb, vector_lr, model_lr, model_svm)
+        :param weights: tuple (nb weight, lr weight, svm weight) of the sklearn models,
+        the fused ensemble has its own compiled in
+        """
+        self.version = version
+        self.fused_ensemble = fused_ensemble_scorer
+        self.weights = weights or ensemble_weights(DEFAULT_PRECISIONS)
+        self.vector_nb, self.model_nb, self.vector_lr, self.model_lr, self.model_svm = \
+            sklearn_models or (None,) * len(MODEL_FILES)
+
+    def __repr__(self):
+        return f"ModelSet({self.version}, fused={self.fused_ensemble is not None})"
+
+
+def load_model_set(models_dir=None):
+    """
+    function loading the ml models,
+    the memory-mapped artifacts exported by `python -m ml_models.fused_ensemble`
+    are preferred, the pickled sklearn models are then not loaded at all,
+    artifacts older than the pickled models are not used
+    :param models_dir: model registry version directory, None loads the ml_models/ ones
+    :return: ModelSet
+    """
+    if models_dir is None:
+        artifacts_dir = fused_ensemble.MODEL_ARTIFACTS_DIR_PATH
+        fused_ensemble_file_path = fused_ensemble.FUSED_ENSEMBLE_FILE_PATH
+        version = _models_fingerprint()
+    else:
+        artifacts_dir = models_dir
+        fused_ensemble_file_path = os.path.join(
+            models_dir, os.path.basename(fused_ensemble.FUSED_ENSEMBLE_FILE_PATH))
+        version = os.path.basename(os.path.normpath(models_dir))
+
+    # the fused ensemble is compiled from the pickled models, a fused ensemble older
+    # than them is left from the previous models, e.g. before a feature hashing retrain
+    models_mtime = _models_mtime(models_dir or MODELS_DIR_PATH)
+    manifest_file_path = os.path.join(artifacts_dir, fused_ensemble.MANIFEST_FILE_NAME)
+    if os.path.isfile(manifest_file_path) and \
+            os.stat(manifest_file_path).st_mtime_ns >= models_mtime:
+        return ModelSet(version, fused_ensemble.FusedEnsemble.load_artifacts(artifacts_dir))
+
+    # pickle load ml models
+    sklearn_models = load_sklearn_models(models_dir or MODELS_DIR_PATH)
+
+    # the fused ensemble scorer replaces the three sklearn pipelines
+    # at prediction time when available, the feature hashing models can not be fused,
+    # a fused ensemble file next to them is left from the vocabulary based models
+    feature_hashing = any(is_hashing_vectorizer(vectorizer) for vectorizer in
+                          (sklearn_models[0], sklearn_models[2],
+                           getattr(sklearn_models[4], 'best_estimator_', sklearn_models[4])[0]))
+    fused_ensemble_scorer = fused_ensemble.FusedEnsemble.load(fused_ensemble_file_path) \
+        if os.path.isfile(fused_ensemble_file_path) and not feature_hashing and \
+        os.stat(fused_ensemble_file_path).st_mtime_ns >= models_mtime else None
+
+    return ModelSet(version, fused_ensemble_scorer, sklearn_models,
+                    ensemble_weights(load_precisions(models_dir or MODELS_DIR_PATH)))
+
+
+def warm_up(model_set):
+    """
+    function scoring a few dummy texts by a loaded model set,
+    touches the memory-mapped pages and fails before a broken set is swapped in
+    :param model_set:
+    :return:
+    """
+    for input_string in WARM_UP_INPUT_STRINGS:
+        _model_set_batch_evaluator(model_set, [input_string])
+    _model_set_batch_evaluator(model_set, list(WARM_UP_INPUT_STRINGS))
+
+
+def activate_model_set(model_set):
+    """
+    function swapping the served model set, one global rebinding, so a request
+    in flight keeps scoring by the set it started with,
+    the prediction cache is invalidated for the new version
+    :param model_set:
+    :return: the models version
+    """
+    serve_model_set(model_set)
+    PREDICTION_CACHE.invalidate(MODELS_VERSION)
+    return MODELS_VERSION
+
+
+def serve_model_set(model_set):
+    """
+    function swapping the scored model set only, the scoring processes initializer,
+    a scoring process forked after the web server process loaded the set shares its pages
+    and has no prediction cache to invalidate
+    :param model_set:
+    :return:
+    """
+    global ACTIVE_MODELS, MODELS_VERSION
+
+    ACTIVE_MODELS = model_set
+    MODELS_VERSION = model_set.version
+
+
+def load_models(models_dir=None):
+    """
+    function (re)loading, warming up and swapping in the ml models
+    :param models_dir: model registry version directory, None loads the ml_models/ ones
+    :return: the models version
+    """
+    model_set = load_model_set(models_dir)
+    warm_up(model_set)
+    return activate_model_set(model_set)
+
+
+def configure_prediction_cache(maxsize, ttl, store_path=None):
+    """
+    function replacing the prediction cache
+    :param maxsize: in-memory entries count limit
+    :param ttl: seconds an entry stays valid
+    :param store_path: optional Sqlite3 file shared by the worker processes
+    :return:
+    """
+    global PREDICTION_CACHE
+    PREDICTION_CACHE = PredictionCache(maxsize=maxsize, ttl=ttl, store_path=store_path,
+                                       namespace=MODELS_VERSION)
+    return PREDICTION_CACHE
+
+
+def _sentiment_evaluator(prediction_output_overall_proba):
+    """
+    function mapping the overall probability to the sentiment output dict
+    :param prediction_output_overall_proba:
+    :return: prediction_output dict
+    """
+    prediction_output = dict()
 
     if prediction_output_overall_proba <= 0.45:
         prediction_output['overall_sentiment'] = {'sentiment': 'positive',
@@ -68,3 +231,76 @@ def ml_model_evaluator(input_string):
                                                   'probability': prediction_output_overall_proba}
 
     return prediction_output
+
+
+def _model_set_batch_evaluator(model_set, input_strings):
+    """
+    function evaluating a batch of input strings by the models of a model set,
+    each model vectorizes and predicts the whole batch as one sparse matrix
+    :param model_set: ModelSet
+    :param input_strings: list of prepared input strings
+    :return: list of prediction_output dicts in the input order
+    """
+    if not input_strings:
+        return []
+
+    if model_set.fused_ensemble is not None:
+        # the fused models share one tokenization, there is no per model stage
+        with REQUEST_METRICS.stage('fused_ensemble_predict_proba'):
+            overall_probas = model_set.fused_ensemble.predict_proba(input_strings)
+        return [_sentiment_evaluator(round(overall_proba, 2)) for overall_proba in overall_probas]
+
+    with REQUEST_METRICS.stage('nb_transform'):
+        input_matrix_nb = model_set.vector_nb.transform(input_strings)
+    with REQUEST_METRICS.stage('nb_predict_proba'):
+        prediction_naive_bayes_prob = model_set.model_nb.predict_proba(input_matrix_nb)[:, 0]
+
+    with REQUEST_METRICS.stage('lr_transform'):
+        input_matrix_lr = model_set.vector_lr.transform(input_strings)
+    with REQUEST_METRICS.stage('lr_predict_proba'):
+        prediction_logistic_regression_prob = \
+            model_set.model_lr.predict_proba(input_matrix_lr)[:, 0]
+
+    # the svm pipeline steps one by one, the same as model_svm.predict_proba(input_strings),
+    # a not slimmed model is the grid search wrapping the pipeline
+    svm_pipeline = getattr(model_set.model_svm, 'best_estimator_', model_set.model_svm)
+    with REQUEST_METRICS.stage('svm_transform'):
+        input_matrix_svm = svm_pipeline[:-1].transform(input_strings)
+    with REQUEST_METRICS.stage('svm_predict_proba'):
+        prediction_support_vector_machine_prob = \
+            svm_pipeline[-1].predict_proba(input_matrix_svm)[:, 0]
+
+    weight_nb, weight_lr, weight_svm = model_set.weights
+    prediction_output_overall_proba = \
+        (prediction_naive_bayes_prob * weight_nb) + \
+        (prediction_logistic_regression_prob * weight_lr) + \
+        (prediction_support_vector_machine_prob * weight_svm)
+
+    return [_sentiment_evaluator(round(overall_proba, 2))
+            for overall_proba in prediction_output_overall_proba]
+
+
+def ml_model_batch_evaluator(input_strings):
+    """
+    function for machine learning model evaluation of a batch of input strings
+    by the active model set
+    :param input_strings: list of prepared input strings
+    :return: list of prediction_output dicts in the input order
+    """
+    return _model_set_batch_evaluator(ACTIVE_MODELS, input_strings)
+
+
+def ml_model_evaluator(input_string):
+    """
+    function for machine learning model evaluation
+    :param input_string:
+    :return: prediction_output dict
+    """
+    return ml_model_batch_evaluator(input_string)[0]
+
+
+# cache of the predictions keyed by the models version and the normalized input text
+PREDICTION_CACHE = PredictionCache()
+
+# the active version of the model registry, when configured, is served
+load_models(model_registry.active_version_dir())
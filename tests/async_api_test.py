@@ -0,0 +1,84 @@
+"""
+asyncio api server Pytest testing suite
+"""
+import json
+import asyncio
+import urllib.parse
+from flask_webapp.async_api import AsyncHttpServer
+
+
+async def _echo_handler(request):
+    payload = {'method': request.method, 'path': request.path,
+               'form': request.form().to_dict(), 'json': request.json()}
+    return 200, [('Content-Type', 'application/json')], json.dumps(payload).encode('utf8')
+
+
+async def _read_response(reader):
+    head = await reader.readuntil(b'\r\n\r\n')
+    status_line, *header_lines = head.decode('latin-1').split('\r\n')[:-2]
+    headers = {name.lower(): value.strip() for name, _, value in
+               (line.partition(':') for line in header_lines)}
+    body = await reader.readexactly(int(headers.get('content-length', 0)))
+    return int(status_line.split(' ')[1]), headers, body
+
+
+def _run(scenario, **server_kwargs):
+    async def _main():
+        server = AsyncHttpServer(_echo_handler, **server_kwargs)
+        _, port = await server.start(port=0)
+        try:
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            result = await scenario(reader, writer)
+            writer.close()
+            return result
+        finally:
+            await server.close(graceful_timeout=1)
+
+    return asyncio.run(_main())
+
+
+def test_keep_alive_serves_pipelined_requests_on_one_connection():
+    async def _scenario(reader, writer):
+        form_body = urllib.parse.urlencode({'Input_Text': 'Skvělé testy'}).encode('utf8')
+        writer.write(b'POST /api/v1/prediction/ HTTP/1.1\r\nHost: x\r\n'
+                     b'Content-Type: application/x-www-form-urlencoded\r\n'
+                     b'Content-Length: ' + str(len(form_body)).encode() + b'\r\n\r\n' +
+                     form_body +
+                     b'POST /api/v1/prediction/batch/ HTTP/1.1\r\nHost: x\r\n'
+                     b'Content-Type: application/json\r\nTransfer-Encoding: chunked\r\n\r\n'
+                     b'5\r\n["a",\r\n5\r\n "b"]\r\n0\r\n\r\n')
+        return [await _read_response(reader), await _read_response(reader)]
+
+    (first_status, first_headers, first_body), (second_status, _, second_body) = \
+        _run(_scenario)
+
+    assert first_status == 200 and 'connection' not in first_headers
+    assert json.loads(first_body)['form'] == {'Input_Text': 'Skvělé testy'}
+    assert second_status == 200
+    assert json.loads(second_body)['json'] == ['a', 'b']
+
+
+def test_connection_close_and_oversized_body():
+    async def _close_scenario(reader, writer):
+        writer.write(b'GET /x HTTP/1.1\r\nHost: x\r\nConnection: close\r\n\r\n')
+        response = await _read_response(reader)
+        return response, await reader.read()
+
+    (status, headers, _), rest = _run(_close_scenario)
+    assert status == 200 and headers['connection'] == 'close' and rest == b''
+
+    async def _oversized_scenario(reader, writer):
+        writer.write(b'POST /x HTTP/1.1\r\nHost: x\r\nContent-Length: 2048\r\n\r\n')
+        return await _read_response(reader)
+
+    status, headers, _ = _run(_oversized_scenario, max_body_size=1024)
+    assert status == 413 and headers['connection'] == 'close'
+
+
+def test_malformed_request_line_is_rejected():
+    async def _scenario(reader, writer):
+        writer.write(b'NONSENSE\r\n\r\n')
+        return await _read_response(reader)
+
+    status, _, _ = _run(_scenario)
+    assert status == 400
@@ -0,0 +1,118 @@
+"""
+asyncio prediction api Pytest testing suite, the responses are compared to the Flask api ones
+"""
+import json
+import asyncio
+import threading
+import urllib.parse
+import pytest
+from flask_webapp import app as webapp
+from flask_webapp.app import APP
+from flask_webapp.async_api import HttpRequest, create_prediction_api
+from ml_models.inference_executor import InferenceQueueFull
+from ml_models.prediction_cache import PredictionCache
+
+API_PREFIX = APP.config['api_prefix']
+
+
+def _stub_evaluator(input_strings):
+    return [{'overall_sentiment': {'sentiment': 'positive', 'probability': 0.1}}
+            for _ in input_strings]
+
+
+@pytest.fixture
+def stub_models(monkeypatch):
+    # the in-process scoring path of both apps, by a stub instead of the ml models
+    monkeypatch.setattr(webapp, 'INFERENCE_EXECUTOR', None)
+    monkeypatch.setattr(webapp, 'MICRO_BATCHER', None)
+    monkeypatch.setattr(webapp.webapp_interface, 'ml_model_batch_evaluator', _stub_evaluator)
+    monkeypatch.setattr(webapp.webapp_interface, 'PREDICTION_CACHE', PredictionCache())
+    return monkeypatch
+
+
+def _async_response(method, path, content_type='', body=b''):
+    handler = create_prediction_api()
+    request = HttpRequest(method, path, 'HTTP/1.1', {'content-type': content_type}, body)
+    status, headers, response_body = asyncio.run(handler(request))
+    return status, dict(headers), response_body
+
+
+def _assert_same_response(flask_response, async_response):
+    status, headers, body = async_response
+    assert status == flask_response.status_code
+    assert body == flask_response.data
+    assert headers.get('Retry-After') == flask_response.headers.get('Retry-After')
+
+
+def _form_body(input_text):
+    return urllib.parse.urlencode({'Input_Text': input_text}).encode('utf8')
+
+
+def test_async_api_matches_flask_api(stub_models):
+    preparator_threads = []
+    sentiment_batch_preparator = webapp._sentiment_batch_preparator
+
+    def _recording_preparator(input_texts):
+        preparator_threads.append(threading.current_thread())
+        return sentiment_batch_preparator(input_texts)
+
+    stub_models.setattr(webapp, '_sentiment_batch_preparator', _recording_preparator)
+    client = APP.test_client()
+
+    for input_text in ('Skvělé funkcionální testy', 'a jsi', 'ein zwei polizei'):
+        flask_response = client.post(API_PREFIX, data={'Input_Text': input_text})
+        preparator_threads.clear()
+        _assert_same_response(
+            flask_response,
+            _async_response('POST', API_PREFIX, 'application/x-www-form-urlencoded',
+                            _form_body(input_text)))
+
+        # the validation and the language detection do not block the event loop thread
+        assert len(preparator_threads) == 1
+        assert preparator_threads[0] is not threading.main_thread()
+
+
+def test_async_api_batch_matches_flask_api_batch(stub_models):
+    client = APP.test_client()
+
+    for input_texts in (['Skvělé funkcionální testy', 'a jsi', 'ein zwei polizei'], [],
+                        'not an array', ['text'] * (APP.config['api_batch_max_size'] + 1)):
+        _assert_same_response(
+            client.post(API_PREFIX + 'batch/', json=input_texts),
+            _async_response('POST', API_PREFIX + 'batch/', 'application/json',
+                            json.dumps(input_texts).encode('utf8')))
+
+    _assert_same_response(
+        client.post(API_PREFIX + 'batch/', data='["not", "json"]', content_type='text/plain'),
+        _async_response('POST', API_PREFIX + 'batch/', 'text/plain', b'["not", "json"]'))
+
+
+def test_async_api_not_found_and_not_allowed_match_flask(stub_models):
+    client = APP.test_client()
+
+    _assert_same_response(client.post(API_PREFIX + 'unknown/'),
+                          _async_response('POST', API_PREFIX + 'unknown/'))
+    _assert_same_response(client.get(API_PREFIX), _async_response('GET', API_PREFIX))
+    _assert_same_response(client.get(API_PREFIX + 'batch/'),
+                          _async_response('GET', API_PREFIX + 'batch/'))
+
+
+def test_async_api_overload_matches_flask_503(stub_models):
+    def _overloaded_evaluator(input_strings):
+        raise InferenceQueueFull('Inference queue is full (64)', retry_after=4)
+
+    stub_models.setattr(webapp.webapp_interface, 'ml_model_batch_evaluator',
+                        _overloaded_evaluator)
+    client = APP.test_client()
+
+    flask_response = client.post(API_PREFIX, data={'Input_Text': 'Skvělé funkcionální testy'})
+    async_response = _async_response('POST', API_PREFIX, 'application/x-www-form-urlencoded',
+                                     _form_body('Skvělé funkcionální testy'))
+    assert async_response[0] == 503
+    assert async_response[1]['Retry-After'] == '4'
+    _assert_same_response(flask_response, async_response)
+
+    _assert_same_response(
+        client.post(API_PREFIX + 'batch/', json=['Skvělé funkcionální testy']),
+        _async_response('POST', API_PREFIX + 'batch/', 'application/json',
+                        json.dumps(['Skvělé funkcionální testy']).encode('utf8')))
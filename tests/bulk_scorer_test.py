@@ -0,0 +1,157 @@
+"""
+bulk scorer Pytest testing suite
+"""
+import os
+import sys
+import json
+import subprocess
+import pytest
+from ml_models import model_registry, bulk_scorer
+from ml_models.bulk_scorer import bulk_score, chunks, read_texts, resume_offset
+from ml_models.incremental_training import IncrementalModels
+from utils.utilities import Webapp
+
+REPOSITORY_DIR_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def length_scorer(texts):
+    """
+    scores each text by its length, errors on the empty ones
+    """
+    return [({'overall_sentiment': {'sentiment': 'positive', 'probability': len(text) / 100}},
+             None) if text else (None, 'empty text') for text in texts]
+
+
+def _write_reviews_csv(file_path, count):
+    with open(file_path, 'w', encoding='utf8') as reviews_file:
+        reviews_file.write('review,rank\n')
+        for index in range(count):
+            reviews_file.write(f'"{"x" * (index % 7)}, text {index}",{index % 5}\n')
+
+
+def test_read_texts_and_chunks(tmp_path):
+    _write_reviews_csv(tmp_path / 'reviews.csv', 5)
+    with open(tmp_path / 'reviews.jsonl', 'w', encoding='utf8') as jsonl_file:
+        jsonl_file.write('{"text": "first"}\n\n{"text": "second"}\nnot json\n[1]\n{"text": 3}\n')
+
+    assert list(read_texts(str(tmp_path / 'reviews.csv'), 'review'))[:2] == \
+        [', text 0', 'x, text 1']
+    assert list(read_texts(str(tmp_path / 'reviews.jsonl'), 'text')) == \
+        ['first', 'second', None, None, 3]
+    assert list(chunks(range(5), 2)) == [[0, 1], [2, 3], [4]]
+
+
+def test_bulk_score_keeps_order_and_resumes(tmp_path):
+    _write_reviews_csv(tmp_path / 'reviews.csv', 25)
+    output_path = str(tmp_path / 'scores.jsonl')
+
+    assert bulk_score(str(tmp_path / 'reviews.csv'), output_path, text_column='review',
+                      chunk_size=4, max_workers=2, scorer=length_scorer) == 25
+    with open(output_path, encoding='utf8') as output_file:
+        complete_output = output_file.read()
+    assert [json.loads(line)['row'] for line in complete_output.splitlines()] == list(range(25))
+
+    # an interrupted run, 10 complete rows and a partially written one
+    with open(output_path, 'w', encoding='utf8') as output_file:
+        output_file.write(''.join(complete_output.splitlines(keepends=True)[:10]) + '{"row": 1')
+
+    offset = resume_offset(output_path)
+    assert offset == 10
+    assert bulk_score(str(tmp_path / 'reviews.csv'), output_path, text_column='review',
+                      chunk_size=4, max_workers=2, offset=offset, scorer=length_scorer) == 15
+    with open(output_path, encoding='utf8') as output_file:
+        assert output_file.read() == complete_output
+
+
+def test_bulk_score_csv_output(tmp_path):
+    _write_reviews_csv(tmp_path / 'reviews.csv', 3)
+    output_path = str(tmp_path / 'scores.csv')
+
+    bulk_score(str(tmp_path / 'reviews.csv'), output_path, text_column='review',
+               chunk_size=2, max_workers=1, scorer=length_scorer)
+
+    with open(output_path, encoding='utf8') as output_file:
+        assert output_file.read().splitlines() == ['row,sentiment,probability,error',
+                                                   '0,positive,0.08,',
+                                                   '1,positive,0.09,',
+                                                   '2,positive,0.1,']
+    assert resume_offset(output_path) == 3
+
+
+
+def test_resume_offset_reads_blocks(tmp_path, monkeypatch):
+    monkeypatch.setattr(bulk_scorer, 'RESUME_BLOCK_SIZE', 4)
+    output_path = tmp_path / 'scores.jsonl'
+    output_path.write_bytes(b'{"row": 0}\n{"row": 1}\n\n{"row": 3}\n{"row": 4')
+
+    # the lines span the blocks, the partially written last line is truncated
+    assert resume_offset(str(output_path)) == 4
+    assert output_path.read_bytes() == b'{"row": 0}\n{"row": 1}\n\n{"row": 3}\n'
+    assert resume_offset(str(output_path)) == 4
+
+    output_path.write_bytes(b'{"row": 0')
+    assert resume_offset(str(output_path)) == 0
+    assert output_path.read_bytes() == b''
+
+
+# bulk scores the texts by the real score_chunk and evaluates them by the api batch evaluator
+SCORE_CHUNK_SCRIPT = '''
+import json, sys
+from flask_webapp import app as webapp
+from ml_models.bulk_scorer import bulk_score
+input_path, output_path = sys.argv[1:]
+bulk_score(input_path, output_path, text_column='text', chunk_size=3, max_workers=1)
+with open(input_path, encoding='utf8') as input_file:
+    texts = [json.loads(line)['text'] for line in input_file]
+print(json.dumps(webapp._sentiment_batch_evaluator(texts)))
+'''
+
+MIXED_TEXTS = ['Tenhle film byl naprosto úžasný, herci byli skvělí a hudba nádherná.',
+               'a jsi',
+               'Hrozný film, nuda a špatný scénář, herci hráli opravdu hrozně.',
+               'ab cd ef gh',
+               'This movie was absolutely wonderful and the actors were great',
+               '']
+
+
+@pytest.fixture
+def registry_dir(tmp_path, train_texts, train_labels):
+    # tiny hashing models in the webapp layout, published as the active registry version
+    registry_dir = tmp_path / 'registry'
+    models = IncrementalModels(n_features_exponent=10)
+    for _ in range(5):
+        models.partial_fit(train_texts, [-1 if label == 'neg' else 1 for label in train_labels])
+    models.write_models(str(registry_dir / 'v1'))
+    model_registry.activate('v1', str(registry_dir))
+    return registry_dir
+
+
+def test_score_chunk_validates_and_scores_as_the_api(tmp_path, registry_dir):
+    input_path = tmp_path / 'reviews.jsonl'
+    input_path.write_text(''.join(json.dumps({'text': text}) + '\n' for text in MIXED_TEXTS),
+                          encoding='utf8')
+    output_path = tmp_path / 'scores.jsonl'
+
+    environment = {key: value for key, value in os.environ.items()
+                   if key != 'PREDICTION_CACHE_PATH'}
+    completed = subprocess.run(
+        [sys.executable, '-c', SCORE_CHUNK_SCRIPT, str(input_path), str(output_path)],
+        cwd=REPOSITORY_DIR_PATH, capture_output=True, text=True, check=True, timeout=300,
+        env={**environment, 'MODEL_REGISTRY_DIR': str(registry_dir), 'INFERENCE_WORKERS': '0'})
+    api_results = json.loads(completed.stdout.splitlines()[-1])
+
+    with open(output_path, encoding='utf8') as output_file:
+        bulk_results = [json.loads(line) for line in output_file]
+
+    assert [bulk_result['error'] for bulk_result in bulk_results] == \
+        [None, Webapp.ERROR_TOO_FEW_WORDS, None, Webapp.ERROR_TOO_SHORT_WORDS,
+         Webapp.ERROR_NOT_CZECH, Webapp.ERROR_TOO_FEW_WORDS]
+    for bulk_result, (sentiment_result, error_message) in zip(bulk_results, api_results):
+        assert bulk_result['error'] == error_message
+        if sentiment_result:
+            assert bulk_result['sentiment'] == \
+                sentiment_result['overall_sentiment']['sentiment']
+            assert bulk_result['probability'] == \
+                float(sentiment_result['overall_sentiment']['probability'])
+        else:
+            assert bulk_result['sentiment'] is None
@@ -0,0 +1,43 @@
+"""
+shared Pytest fixtures, a tiny stemmed review corpus the models are trained on
+"""
+import pytest
+import sklearn
+
+# the SGDClassifier 'log' loss was renamed to 'log_loss' in scikit-learn 1.1
+SGD_LOG_LOSS = 'log_loss' if tuple(int(x) for x in sklearn.__version__.split('.')[:2]) >= (1, 1) \
+    else 'log'
+
+TRAIN_TEXTS = ['skvel film herc skvel', 'hrozn nud film', 'uzasn hudb skvel herc',
+               'spatn scenar hrozn herc', 'krasn film uzasn', 'nud spatn hrozn scenar',
+               'skvel uzasn krasn hudb', 'hrozn nud spatn film'] * 3
+TRAIN_LABELS = ['pos', 'neg', 'pos', 'neg', 'pos', 'neg', 'pos', 'neg'] * 3
+
+EVAL_TEXTS = ['skvel film', 'hrozn scenar nud', 'neznam slov', '', 'skvel skvel hrozn film herc']
+
+ENSEMBLE_WEIGHTS = (0.35, 0.32, 0.33)
+
+
+@pytest.fixture
+def sgd_log_loss():
+    return SGD_LOG_LOSS
+
+
+@pytest.fixture
+def train_texts():
+    return list(TRAIN_TEXTS)
+
+
+@pytest.fixture
+def train_labels():
+    return list(TRAIN_LABELS)
+
+
+@pytest.fixture
+def eval_texts():
+    return list(EVAL_TEXTS)
+
+
+@pytest.fixture
+def ensemble_weights():
+    return ENSEMBLE_WEIGHTS
@@ -0,0 +1,190 @@
+"""
+database connection pool Pytest testing suite
+"""
+import sqlite3
+import threading
+import time
+import pytest
+from flask_webapp.database.connection_pool import ConnectionPool, PoolTimeout
+from flask_webapp.database.database_interface import Database
+
+
+class SharedSqliteConnector:
+    """
+    Postgres connector stand-in, Sqlite3 connections usable from any thread
+    """
+    def __init__(self, db_file):
+        self.db_file = db_file
+        self.healthy = True
+
+    def connect(self):
+        return sqlite3.connect(self.db_file, check_same_thread=False)
+
+    def is_healthy(self, conn):
+        return self.healthy
+
+
+def test_sqlite_pool_reuses_thread_connection_in_wal_mode(tmp_path):
+    database = Database('local', db_location=str(tmp_path / 'stats.db'))
+
+    conn = database.acquire()
+    assert conn.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+    database.release(conn)
+
+    assert database.acquire() is conn
+    database.release(conn)
+    assert database.pool_metrics()['connections_created'] == 1
+    assert database.pool_metrics()['checkouts'] == 2
+    assert database.pool_metrics()['checked_out'] == 0
+
+
+def test_sqlite_pool_connection_per_thread(tmp_path):
+    database = Database('local', db_location=str(tmp_path / 'stats.db'))
+    connections = []
+
+    def _worker():
+        conn = database.acquire()
+        conn.execute('SELECT 1')
+        connections.append(conn)
+        database.release(conn)
+
+    threads = [threading.Thread(target=_worker) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(set(id(conn) for conn in connections)) == 3
+
+
+def test_sqlite_pool_recycles_after_max_lifetime(tmp_path):
+    database = Database('local', db_location=str(tmp_path / 'stats.db'), pool_max_lifetime=0)
+
+    conn = database.acquire()
+    database.release(conn)
+    time.sleep(0.01)
+
+    assert database.acquire() is not conn
+    assert database.pool_metrics()['connections_recycled'] == 1
+
+
+def test_pool_bounds_connections_and_counts_waits(tmp_path):
+    pool = ConnectionPool(SharedSqliteConnector(str(tmp_path / 'stats.db')),
+                          max_connections=2, acquire_timeout=5)
+    first, second = pool.acquire(), pool.acquire()
+
+    threading.Timer(0.05, pool.release, args=(first,)).start()
+    third = pool.acquire()
+
+    assert third is first
+    metrics = pool.metrics.as_dict()
+    assert metrics['connections_created'] == 2
+    assert metrics['waits'] == 1
+    assert metrics['wait_time_seconds'] > 0
+    assert metrics['checked_out'] == 2
+
+    pool.release(second)
+    pool.release(third)
+    assert pool.metrics.as_dict()['checked_out'] == 0
+
+
+def test_pool_acquire_timeout(tmp_path):
+    pool = ConnectionPool(SharedSqliteConnector(str(tmp_path / 'stats.db')),
+                          max_connections=1, acquire_timeout=0.05)
+    conn = pool.acquire()
+
+    with pytest.raises(PoolTimeout):
+        pool.acquire()
+
+    pool.release(conn)
+    assert pool.acquire() is conn
+
+
+def test_pool_replaces_unhealthy_and_discarded_connections(tmp_path):
+    connector = SharedSqliteConnector(str(tmp_path / 'stats.db'))
+    pool = ConnectionPool(connector, max_connections=1, health_check_interval=0)
+
+    conn = pool.acquire()
+    pool.release(conn)
+    connector.healthy = False
+    replacement = pool.acquire()
+    assert replacement is not conn
+    assert pool.metrics.as_dict()['health_check_failures'] == 1
+
+    connector.healthy = True
+    pool.release(replacement, discard=True)
+    assert pool.acquire() is not replacement
+
+
+def test_pool_health_check_runs_outside_of_the_lock(tmp_path):
+    connector = SharedSqliteConnector(str(tmp_path / 'stats.db'))
+    pool = ConnectionPool(connector, max_connections=2, health_check_interval=0)
+    conn = pool.acquire()
+    pool.release(conn)
+
+    health_checked = threading.Event()
+    release_health_check = threading.Event()
+
+    def _slow_is_healthy(_):
+        health_checked.set()
+        return release_health_check.wait(10)
+
+    connector.is_healthy = _slow_is_healthy
+    checked_out = []
+    slow_acquire = threading.Thread(target=lambda: checked_out.append(pool.acquire()))
+    slow_acquire.start()
+    assert health_checked.wait(10)
+
+    # the other threads acquire and release while the idle connection is being checked
+    started = time.monotonic()
+    other = pool.acquire()
+    pool.release(other)
+    assert time.monotonic() - started < 1
+    assert not checked_out
+
+    release_health_check.set()
+    slow_acquire.join()
+    assert checked_out == [conn]
+
+
+class SlowRollbackConnection:
+    """
+    connection whose rollback waits, a slow network round trip stand-in
+    """
+    def __init__(self, rolling_back, release_rollback):
+        self.rolling_back = rolling_back
+        self.release_rollback = release_rollback
+
+    def rollback(self):
+        self.rolling_back.set()
+        self.release_rollback.wait(10)
+
+    def close(self):
+        pass
+
+
+def test_pool_release_rollback_runs_outside_of_the_lock(tmp_path):
+    connector = SharedSqliteConnector(str(tmp_path / 'stats.db'))
+    rolling_back = threading.Event()
+    release_rollback = threading.Event()
+    connector.connect = lambda: SlowRollbackConnection(rolling_back, release_rollback)
+    pool = ConnectionPool(connector, max_connections=2)
+
+    conn = pool.acquire()
+    slow_release = threading.Thread(target=pool.release, args=(conn,))
+    slow_release.start()
+    assert rolling_back.wait(10)
+
+    # the slot of the connection being rolled back stays reserved
+    started = time.monotonic()
+    other = pool.acquire()
+    assert time.monotonic() - started < 1
+    pool.acquire_timeout = 0.1
+    with pytest.raises(PoolTimeout):
+        pool.acquire()
+
+    release_rollback.set()
+    slow_release.join()
+    pool.release(other)
+    assert pool.metrics.as_dict()['checked_out'] == 0
+    assert {pool.acquire(), pool.acquire()} == {conn, other}
@@ -0,0 +1,59 @@
+"""
+preprocessed corpus cache Pytest testing suite
+"""
+import os
+from data_preparation import corpus_cache
+from utils.utilities import ProjectCommon
+
+REVIEW_ROWS = ['"Skvělé funkcionální testy, herci skvělí",2\n',
+               '"Hrozné funkcionální testy",-1\n',
+               'malformed row\n',
+               '"Tenhle film byl naprosto úžasný",1\n']
+
+
+def _reviews_file(tmp_path):
+    input_path = str(tmp_path / 'reviews.csv')
+    with open(input_path, 'w', encoding='utf8') as input_file:
+        input_file.writelines(REVIEW_ROWS)
+    return input_path
+
+
+def test_corpus_cache_preprocess(tmp_path):
+    input_path = _reviews_file(tmp_path)
+    corpus = corpus_cache.load_corpus(input_path, cache_dir=str(tmp_path / 'cache'),
+                                      chunk_size=2, max_workers=1)
+
+    assert len(corpus) == 3
+    assert corpus.texts[0] == ProjectCommon.remove_all('Skvělé funkcionální testy, herci skvělí')
+    assert corpus.ranks == [2, -1, 1]
+    assert corpus.records(language=None)[1] == \
+        (ProjectCommon.remove_all('Hrozné funkcionální testy'), -1)
+
+
+def test_corpus_cache_key_changes_with_input(tmp_path):
+    input_path = _reviews_file(tmp_path)
+    cache_key = corpus_cache.corpus_cache_key(input_path)
+
+    with open(input_path, 'a', encoding='utf8') as input_file:
+        input_file.write('"Nuda",-2\n')
+
+    assert corpus_cache.corpus_cache_key(input_path) != cache_key
+    assert corpus_cache.corpus_cache_key(input_path, chunk_size=10) != \
+        corpus_cache.corpus_cache_key(input_path)
+
+
+def test_corpus_cache_resumes_finished_chunks(tmp_path):
+    input_path = _reviews_file(tmp_path)
+    cache_dir = str(tmp_path / 'cache')
+    chunks_dir = os.path.join(cache_dir, corpus_cache.corpus_cache_key(input_path, 2), 'chunks')
+    os.makedirs(chunks_dir)
+    # the first chunk left behind by an interrupted run is not processed again
+    corpus_cache._write_columns(os.path.join(chunks_dir, 'chunk_000000.npz'),
+                                ['resumed'], [5], ['cs'])
+
+    corpus = corpus_cache.load_corpus(input_path, cache_dir=cache_dir,
+                                      chunk_size=2, max_workers=1)
+
+    assert corpus.texts[0] == 'resumed'
+    assert corpus.ranks == [5, 1]
+    assert not os.path.isdir(chunks_dir)
@@ -0,0 +1,52 @@
+"""
+czech stemmer Pytest testing suite
+"""
+import json
+import os
+from data_preparation import czech_stemmer
+
+# outputs of the original suffix rule functions implementation
+EXPECTED_FILE_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__),
+                                                  'czech_stemmer_expected.json'))
+
+with open(EXPECTED_FILE_PATH, encoding='utf8') as expected_file:
+    EXPECTED = json.load(expected_file)
+
+
+def test_cz_stem_aggressive_parity():
+    for word, stem in EXPECTED['aggressive'].items():
+        assert czech_stemmer._cz_stem(word, aggressive=True) == stem
+
+
+def test_cz_stem_light_parity():
+    for word, stem in EXPECTED['light'].items():
+        assert czech_stemmer._cz_stem(word, aggressive=False) == stem
+
+
+def test_stemmer_parity():
+    for string, stemmed in EXPECTED['stemmer'].items():
+        assert czech_stemmer.stemmer(string) == stemmed
+
+
+def test_stemmer_cache_counters_and_bound():
+    stemmer = czech_stemmer.CzechStemmer(cache_size=2)
+
+    assert stemmer.stem('hradech hradech') == 'hrad hrad'
+    assert stemmer.cache_info() == {'hits': 1, 'misses': 1, 'maxsize': 2, 'currsize': 1}
+
+    stemmer.stem('domeček kočička ptáček')
+    assert stemmer.cache_info()['currsize'] == 2
+
+    stemmer.cache_clear()
+    assert stemmer.cache_info() == {'hits': 0, 'misses': 0, 'maxsize': 2, 'currsize': 0}
+
+
+def test_configure_stemmer_cache():
+    default_stemmer = czech_stemmer._STEMMER
+    try:
+        czech_stemmer.configure_stemmer_cache(0)
+        czech_stemmer.stemmer('hradech hradech')
+        assert czech_stemmer.stemmer_cache_info() == {'hits': 0, 'misses': 2,
+                                                      'maxsize': 0, 'currsize': 0}
+    finally:
+        czech_stemmer._STEMMER = default_stemmer
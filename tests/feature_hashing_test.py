@@ -0,0 +1,45 @@
+"""
+feature hashing Pytest testing suite
+"""
+import pickle
+import pytest
+from sklearn.naive_bayes import MultinomialNB
+from sklearn.linear_model import LogisticRegression
+from ml_models.fused_ensemble import compile_fused_ensemble
+from ml_models.naive_bayes import data_processor_naive_bayes
+from ml_models.logistic_regression import data_processor_logistic_regression
+from ml_models.support_vector_machine.data_processor_support_vector_machine import \
+    build_pipeline, slim_model, slim_model_report
+
+
+def test_naive_bayes_hashed_counts_are_non_negative(train_texts, train_labels):
+    vector_nb = data_processor_naive_bayes.build_vectorizer(True, n_features_exponent=10)
+    input_matrix = vector_nb.fit_transform(train_texts)
+
+    assert input_matrix.shape == (len(train_texts), 2 ** 10)
+    assert input_matrix.min() >= 0
+    model_nb = MultinomialNB().fit(input_matrix, train_labels)
+    assert list(model_nb.predict(vector_nb.transform(['skvel film', 'hrozn scenar nud']))) == \
+        ['pos', 'neg']
+    # no vocabulary is kept, the pickled vectorizer does not grow with the corpus
+    assert len(pickle.dumps(vector_nb)) < 1000
+
+
+def test_hashing_svm_pipeline_slims_equivalently(train_texts, train_labels, eval_texts):
+    model_svm = build_pipeline(True, n_features_exponent=12).fit(train_texts, train_labels)
+    report = slim_model_report(model_svm, slim_model(model_svm), eval_texts)
+
+    assert report['equivalent']
+    assert report['max_abs_diff'] < 1e-5
+
+
+def test_hashing_models_are_not_fused(train_texts, train_labels, ensemble_weights):
+    vector_nb = data_processor_naive_bayes.build_vectorizer(True, n_features_exponent=10)
+    model_nb = MultinomialNB().fit(vector_nb.fit_transform(train_texts), train_labels)
+    vector_lr = data_processor_logistic_regression.build_vectorizer(True, n_features_exponent=10)
+    model_lr = LogisticRegression().fit(vector_lr.fit_transform(train_texts), train_labels)
+    model_svm = build_pipeline(True, n_features_exponent=10).fit(train_texts, train_labels)
+
+    with pytest.raises(ValueError):
+        compile_fused_ensemble(vector_nb, model_nb, vector_lr, model_lr, model_svm,
+                               ensemble_weights)
@@ -0,0 +1,112 @@
+"""
+fused linear ensemble Pytest testing suite
+"""
+import os
+import numpy as np
+import pytest
+from sklearn.feature_extraction.text import CountVectorizer, TfidfTransformer
+from sklearn.linear_model import LogisticRegression, SGDClassifier
+from sklearn.naive_bayes import MultinomialNB
+from sklearn.pipeline import Pipeline
+from ml_models.fused_ensemble import MANIFEST_FILE_NAME, FusedEnsemble, compile_fused_ensemble, \
+    remove_artifacts, verify_fused_ensemble
+
+
+@pytest.fixture
+def fitted_models(sgd_log_loss, train_texts, train_labels):
+    def _fitted_models(svm_ngram_range=(1, 2), use_idf=True, sublinear_tf=False):
+        vector_nb = CountVectorizer().fit(train_texts)
+        model_nb = MultinomialNB().fit(vector_nb.transform(train_texts),
+                                       [0 if x == 'neg' else 1 for x in train_labels])
+
+        vector_lr = CountVectorizer(ngram_range=(2, 2)).fit(train_texts)
+        model_lr = LogisticRegression().fit(vector_lr.transform(train_texts), train_labels)
+
+        model_svm = Pipeline([
+            ('vect', CountVectorizer(ngram_range=svm_ngram_range)),
+            ('tfidf', TfidfTransformer(use_idf=use_idf, sublinear_tf=sublinear_tf)),
+            ('clf', SGDClassifier(loss=sgd_log_loss, penalty='l2', alpha=1e-3,
+                                  random_state=42, max_iter=5, tol=None)),
+        ]).fit(train_texts, train_labels)
+
+        return vector_nb, model_nb, vector_lr, model_lr, model_svm
+
+    return _fitted_models
+
+
+def test_fused_ensemble_matches_sklearn_models(fitted_models, ensemble_weights, eval_texts):
+    models = fitted_models()
+    fused = compile_fused_ensemble(*models, ensemble_weights)
+
+    assert verify_fused_ensemble(fused, *models, eval_texts) < 1e-9
+
+
+def test_fused_ensemble_matches_sklearn_models_sublinear_tf_no_idf(fitted_models, ensemble_weights,
+                                                                   eval_texts):
+    models = fitted_models(svm_ngram_range=(1, 1), use_idf=False, sublinear_tf=True)
+    fused = compile_fused_ensemble(*models, ensemble_weights)
+
+    assert verify_fused_ensemble(fused, *models, eval_texts) < 1e-9
+
+
+def test_fused_ensemble_save_load_round_trip(tmp_path, fitted_models, ensemble_weights, eval_texts):
+    models = fitted_models()
+    fused = compile_fused_ensemble(*models, ensemble_weights)
+    fused.save(str(tmp_path / 'fused_ensemble.npz'))
+    loaded = FusedEnsemble.load(str(tmp_path / 'fused_ensemble.npz'))
+
+    assert (loaded.predict_proba(eval_texts) == fused.predict_proba(eval_texts)).all()
+
+
+def test_fused_ensemble_export_load_artifacts_memory_mapped(tmp_path, fitted_models,
+                                                            ensemble_weights, eval_texts):
+    models = fitted_models()
+    fused = compile_fused_ensemble(*models, ensemble_weights)
+    artifacts_dir = str(tmp_path / 'artifacts')
+    fused.export(artifacts_dir)
+    loaded = FusedEnsemble.load_artifacts(artifacts_dir)
+
+    assert isinstance(loaded.weights, np.memmap)
+    assert not loaded.weights.flags.writeable
+    assert (loaded.predict_proba(eval_texts) == fused.predict_proba(eval_texts)).all()
+
+    # the export swaps the symlink, the previous export stays for the workers loading it
+    previous_dir = os.path.realpath(artifacts_dir)
+    fused.export(artifacts_dir)
+    assert os.path.islink(artifacts_dir)
+    assert os.path.isdir(previous_dir) and os.path.realpath(artifacts_dir) != previous_dir
+    assert (loaded.predict_proba(eval_texts) == fused.predict_proba(eval_texts)).all()
+
+    # the exports before the previous one are removed
+    fused.export(artifacts_dir)
+    assert not os.path.exists(previous_dir)
+    assert len(os.listdir(str(tmp_path))) == 3
+    assert (FusedEnsemble.load_artifacts(artifacts_dir).predict_proba(eval_texts) ==
+            fused.predict_proba(eval_texts)).all()
+
+
+def test_fused_ensemble_export_replaces_a_plain_directory(tmp_path, fitted_models, ensemble_weights,
+                                                          eval_texts):
+    fused = compile_fused_ensemble(*fitted_models(), ensemble_weights)
+    artifacts_dir = tmp_path / 'artifacts'
+    artifacts_dir.mkdir()
+    (artifacts_dir / MANIFEST_FILE_NAME).write_text('{}', encoding='utf8')
+
+    fused.export(str(artifacts_dir))
+    assert artifacts_dir.is_symlink()
+    assert (FusedEnsemble.load_artifacts(str(artifacts_dir)).predict_proba(eval_texts) ==
+            fused.predict_proba(eval_texts)).all()
+
+    assert len(remove_artifacts(str(artifacts_dir))) == 3
+    assert os.listdir(str(tmp_path)) == []
+
+
+def test_fused_ensemble_load_artifacts_private_memory(tmp_path, fitted_models, ensemble_weights,
+                                                      eval_texts):
+    models = fitted_models()
+    fused = compile_fused_ensemble(*models, ensemble_weights)
+    fused.export(str(tmp_path / 'artifacts'))
+    loaded = FusedEnsemble.load_artifacts(str(tmp_path / 'artifacts'), mmap_mode=None)
+
+    assert not isinstance(loaded.weights, np.memmap)
+    assert (loaded.predict_proba(eval_texts) == fused.predict_proba(eval_texts)).all()
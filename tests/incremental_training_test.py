@@ -0,0 +1,53 @@
+"""
+incremental training Pytest testing suite
+"""
+import os
+import pickle
+from ml_models.incremental_training import IncrementalModels, incremental_training
+
+
+def _write_rows(file_path, texts, labels, mode='w'):
+    with open(file_path, mode, encoding='utf8') as reviews_file:
+        for text, label in zip(texts, labels):
+            reviews_file.write(f'"{text}",{-1 if label == "neg" else 1}\n')
+
+
+def test_incremental_training_resumes_from_the_checkpoint(tmp_path, train_texts, train_labels):
+    reviews_file_path = str(tmp_path / 'reviews.csv')
+    checkpoint_dir = str(tmp_path / 'checkpoint')
+    _write_rows(reviews_file_path, train_texts, train_labels)
+
+    models, _ = incremental_training([reviews_file_path], checkpoint_dir, chunk_size=5,
+                                     language=None, n_features_exponent=10, max_workers=1)
+    trained_records = models.records
+    assert 0 < trained_records <= len(train_texts)
+    assert models.offsets[reviews_file_path] == os.path.getsize(reviews_file_path)
+
+    # the new scraped reviews only, a row being written is left for the next run
+    _write_rows(reviews_file_path, train_texts[:8], train_labels[:8], mode='a')
+    file_size = os.path.getsize(reviews_file_path)
+    with open(reviews_file_path, 'a', encoding='utf8') as reviews_file:
+        reviews_file.write('"skvel film')
+
+    models, _ = incremental_training([reviews_file_path], checkpoint_dir, chunk_size=5,
+                                     language=None, n_features_exponent=10, max_workers=1)
+    assert trained_records < models.records <= trained_records + 8
+    assert models.offsets[reviews_file_path] == file_size
+
+    assert IncrementalModels.load_checkpoint(checkpoint_dir, 10).records == models.records
+
+
+def test_incremental_models_written_in_the_webapp_layout(tmp_path, train_texts, train_labels):
+    models = IncrementalModels(n_features_exponent=10)
+    for _ in range(5):
+        models.partial_fit(train_texts, [-1 if label == 'neg' else 1 for label in train_labels])
+    models.write_models(str(tmp_path))
+
+    vector_nb = pickle.load(open(tmp_path / 'naive_bayes' / 'vectorizer.pkl', 'rb'))
+    model_nb = pickle.load(open(tmp_path / 'naive_bayes' / 'model.pkl', 'rb'))
+    model_svm = pickle.load(open(tmp_path / 'support_vector_machine' / 'model.pkl', 'rb'))
+
+    assert list(model_nb.predict(vector_nb.transform(['skvel film', 'hrozn scenar nud']))) == [1, 0]
+    assert list(model_svm.predict(['skvel film', 'hrozn scenar nud'])) == ['pos', 'neg']
+    assert model_svm[:-1].transform(['skvel film']).shape == (1, 2 ** 10)
+    assert (tmp_path / 'logistic_regression' / 'model.pkl').is_file()
@@ -0,0 +1,82 @@
+"""
+inference executor Pytest testing suite
+"""
+import time
+import multiprocessing
+import pytest
+from ml_models.inference_executor import InferenceExecutor, InferenceQueueFull, InferenceTimeout
+
+FORK_CONTEXT = multiprocessing.get_context('fork')
+
+# stands for the models loaded by the web server process before the scoring processes start
+LOADED_MODELS = []
+
+
+def slow_batch_evaluator(input_strings):
+    """
+    scores each input string with the size of the batch it was merged to
+    """
+    time.sleep(0.3)
+    return [(input_string, len(input_strings)) for input_string in input_strings]
+
+
+def test_inference_executor_merges_waiting_requests():
+    executor = InferenceExecutor(slow_batch_evaluator, max_workers=1, mp_context=FORK_CONTEXT)
+    try:
+        # occupies the only scoring process, the next requests wait and get merged
+        first = executor.submit(['a'])
+        time.sleep(0.1)
+        waiting = [executor.submit([f'b{i}', f'c{i}']) for i in range(3)]
+
+        assert first.result(timeout=10) == [('a', 1)]
+        assert [future.result(timeout=10) for future in waiting] == \
+            [[(f'b{i}', 6), (f'c{i}', 6)] for i in range(3)]
+        assert executor.metrics()['batches'] == 2
+        assert executor.metrics()['requests'] == 4
+    finally:
+        executor.shutdown()
+
+
+def test_inference_executor_queue_full():
+    executor = InferenceExecutor(slow_batch_evaluator, max_workers=1, max_queue_depth=1,
+                                 retry_after=3, mp_context=FORK_CONTEXT)
+    try:
+        executor.submit(['a'])
+        time.sleep(0.1)
+        executor.submit(['b'])
+
+        with pytest.raises(InferenceQueueFull) as queue_full:
+            executor.submit(['c'])
+        assert queue_full.value.retry_after == 3
+        assert executor.metrics()['rejected'] == 1
+    finally:
+        executor.shutdown()
+
+
+def test_inference_executor_timeout():
+    executor = InferenceExecutor(slow_batch_evaluator, max_workers=1, timeout=0.05,
+                                 mp_context=FORK_CONTEXT)
+    try:
+        with pytest.raises(InferenceTimeout):
+            executor.evaluate(['a'])
+        assert executor.metrics()['timeouts'] == 1
+        assert executor.evaluate([]) == []
+    finally:
+        executor.shutdown()
+
+
+def loaded_models_evaluator(input_strings):
+    return [(input_string, tuple(LOADED_MODELS)) for input_string in input_strings]
+
+
+def test_inference_executor_start_forks_with_the_loaded_models():
+    LOADED_MODELS.append('v1')
+    executor = InferenceExecutor(loaded_models_evaluator, max_workers=2)
+    try:
+        executor.start()
+        # the scoring processes use the models loaded before they were forked,
+        # they neither import nor load them again
+        assert executor.evaluate(['a']) == [('a', ('v1',))]
+    finally:
+        executor.shutdown()
+        LOADED_MODELS.clear()
@@ -0,0 +1,49 @@
+"""
+language gate Pytest testing suite
+"""
+from utils.language_gate import NgramLanguageGate, LangdetectGate
+
+NGRAM_GATE = NgramLanguageGate.from_langdetect_profiles()
+
+
+def test_ngram_gate_czech_specific_chars_short_circuit():
+    # a single Czech specific letter decides without scoring
+    assert NGRAM_GATE.detect('ř') == 'cs'
+    assert NGRAM_GATE.detect('Ůžasné') == 'cs'
+
+
+def test_ngram_gate_detects_languages():
+    assert NGRAM_GATE.detect('Ten film byl naprosto uzasny a herci skveli') == 'cs'
+    assert NGRAM_GATE.detect('Tento film bol naozaj vynikajúci, herci boli skvelí') == 'sk'
+    assert NGRAM_GATE.detect('This movie was really great, the actors were brilliant') == 'en'
+    assert NGRAM_GATE.detect('ein zwei polizei') == 'de'
+
+
+def test_ngram_gate_undetected():
+    assert NGRAM_GATE.detect('') is None
+    assert NGRAM_GATE.detect('123 456') is None
+
+
+def test_ngram_gate_train_on_corpora():
+    language_gate = NgramLanguageGate.train({'cs': {'a': 5, 'ch': 3, 'ou ': 2},
+                                             'en': {'e': 5, 'th': 3, 'the': 2}})
+
+    assert language_gate.detect('the the') == 'en'
+    assert language_gate.detect('ou chacha') == 'cs'
+
+
+def test_ngram_gate_save_load(tmp_path):
+    file_path = str(tmp_path / 'language_gate.npz')
+    NGRAM_GATE.save(file_path)
+    language_gate = NgramLanguageGate.load(file_path)
+
+    assert language_gate.languages == NGRAM_GATE.languages
+    assert language_gate.detect('Film był naprawdę świetny') == 'pl'
+
+
+def test_langdetect_gate_seeded_deterministic():
+    language_gate = LangdetectGate(seed=0)
+    detected = {language_gate.detect('skvele funkcionalni testy') for _ in range(10)}
+
+    assert len(detected) == 1
+    assert language_gate.detect('') is None
@@ -0,0 +1,58 @@
+"""
+reference copy of the original chained str.replace text pipeline,
+used as the oracle of the normalization parity tests and benchmarks,
+the words are stemmed by the original czech stemmer copy
+"""
+import re
+from tests import legacy_czech_stemmer
+from utils.utilities import ProjectCommon, CZECH_STOPWORDS_FILE_PATH
+
+
+def remove_czech_stopwords(text) -> str:
+    replacements = {x: '' for x in
+                    ProjectCommon.read_czech_stopwords(CZECH_STOPWORDS_FILE_PATH)}
+    output = [w for w in text.split(' ') if w not in replacements]
+
+    return ' '.join(output)
+
+
+def remove_html(raw_text) -> str:
+    clean_r = re.compile('<.*?>')
+    clean_text = re.sub(clean_r, '', raw_text)
+
+    return clean_text
+
+
+def remove_non_alpha_chars(text) -> str:
+    replacements = {'"': '', '.': '', '(': '', ')': '', ',': '',
+                    '-': '', '?': '', '!': '', ':': '', '/': '', '„': '',
+                    '  ': ' ', '   ': ' ', '%': '', '“': '', '*': '', '+': ''}
+
+    for i, j in replacements.items():
+        text = text.replace(i, j)
+
+    return text
+
+
+def remove_diacritics(text) -> str:
+    replacements = {'ě': 'e', 'š': 's', 'č': 'c', 'ř': 'r', 'ž': 'z', 'ý': 'y',
+                    'á': 'a', 'í': 'i', 'é': 'e', 'ů': 'u', 'ú': 'u'}
+
+    for i, j in replacements.items():
+        text = text.replace(i, j)
+
+    return text
+
+
+def remove_non_alpha_chars_and_html(text) -> str:
+    return remove_non_alpha_chars(remove_html(text.lstrip(' ').rstrip(' ')))
+
+
+def remove_all(text) -> str:
+    text = remove_czech_stopwords(remove_non_alpha_chars_and_html(text))
+    return remove_diacritics(legacy_czech_stemmer.stemmer(text))
+
+
+def input_string_preparator(input_string) -> list:
+    input_text_list_raw = re.split(';|,|[ ]|-|[?]|[!]|\n', input_string)
+    return [remove_all(x) for x in input_text_list_raw if x != '']
@@ -0,0 +1,140 @@
+"""
+micro-batcher Pytest testing suite
+"""
+import time
+import threading
+import pytest
+from ml_models.inference_executor import InferenceQueueFull, InferenceTimeout
+from ml_models.micro_batcher import MicroBatcher
+from utils.metrics import Histogram
+
+
+def _batch_sizes_evaluator(batch_sizes):
+    def _evaluator(input_strings):
+        batch_sizes.append(len(input_strings))
+        return [input_string.upper() for input_string in input_strings]
+    return _evaluator
+
+
+def _concurrent_evaluate(micro_batcher, requests):
+    results = [None] * len(requests)
+
+    def _client(index):
+        results[index] = micro_batcher.evaluate(requests[index])
+
+    threads = [threading.Thread(target=_client, args=(index,)) for index in range(len(requests))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_micro_batcher_merges_requests_within_window():
+    batch_sizes = []
+    micro_batcher = MicroBatcher(_batch_sizes_evaluator(batch_sizes), window_ms=200,
+                                 max_batch_size=64)
+    requests = [[f'text {index}'] for index in range(8)]
+
+    assert _concurrent_evaluate(micro_batcher, requests) == \
+        [[f'TEXT {index}'] for index in range(8)]
+    assert batch_sizes == [8]
+
+    metrics = micro_batcher.metrics()
+    assert metrics['batch_size']['count'] == 1
+    assert metrics['batch_size']['buckets']['8'] == 1
+    assert metrics['queue_delay_seconds']['count'] == 8
+
+
+def test_micro_batcher_max_batch_size():
+    batch_sizes = []
+    micro_batcher = MicroBatcher(_batch_sizes_evaluator(batch_sizes), window_ms=200,
+                                 max_batch_size=4)
+
+    _concurrent_evaluate(micro_batcher, [['a']] * 10)
+    assert batch_sizes == [4, 4, 2]
+
+    # a request larger than the max batch size is scored alone, never split
+    assert micro_batcher.evaluate(['c'] * 6) == ['C'] * 6
+    assert batch_sizes[-1] == 6
+
+
+def test_micro_batcher_propagates_errors():
+    def _failing_evaluator(input_strings):
+        raise ValueError('scoring failed')
+
+    micro_batcher = MicroBatcher(_failing_evaluator, window_ms=0)
+
+    with pytest.raises(ValueError):
+        micro_batcher.evaluate(['a'])
+    assert micro_batcher.evaluate([]) == []
+
+
+def test_micro_batcher_flood_is_rejected():
+    release = threading.Event()
+
+    def _blocked_evaluator(input_strings):
+        release.wait(10)
+        return input_strings
+
+    micro_batcher = MicroBatcher(_blocked_evaluator, window_ms=0, max_queue_depth=2,
+                                 retry_after=3)
+    outcomes = []
+
+    def _client(index):
+        try:
+            outcomes.append(micro_batcher.evaluate([f'text {index}']))
+        except InferenceQueueFull as queue_full:
+            outcomes.append(queue_full.retry_after)
+
+    # the first request occupies the only batch slot, the next two fill the queue
+    threads = [threading.Thread(target=_client, args=(index,)) for index in range(8)]
+    for thread in threads:
+        thread.start()
+        time.sleep(0.05)
+    time.sleep(0.1)
+    assert outcomes == [3] * 5
+    assert micro_batcher.metrics()['rejected'] == 5
+
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert sorted(outcomes[5:]) == [['text 0'], ['text 1'], ['text 2']]
+
+
+def test_micro_batcher_timeout_drops_queued_request():
+    release = threading.Event()
+    batches = []
+
+    def _blocked_evaluator(input_strings):
+        batches.append(list(input_strings))
+        release.wait(10)
+        return input_strings
+
+    micro_batcher = MicroBatcher(_blocked_evaluator, window_ms=0, timeout=0.2)
+    first = threading.Thread(target=lambda: pytest.raises(InferenceTimeout,
+                                                          micro_batcher.evaluate, ['a']))
+    first.start()
+    time.sleep(0.05)
+
+    # the queued request times out and is never scored
+    with pytest.raises(InferenceTimeout):
+        micro_batcher.evaluate(['b'])
+    assert micro_batcher.metrics()['queued'] == 0
+
+    release.set()
+    first.join()
+    assert micro_batcher.evaluate(['c']) == ['c']
+    assert batches == [['a'], ['c']]
+    assert micro_batcher.metrics()['timeouts'] == 2
+
+
+def test_histogram_cumulative_buckets():
+    histogram = Histogram((1, 5))
+    for value in (0.5, 1, 3, 10):
+        histogram.observe(value)
+
+    snapshot = histogram.snapshot()
+    assert snapshot['buckets'] == {'1': 2, '5': 3, '+Inf': 4}
+    assert snapshot['count'] == 4
+    assert snapshot['sum'] == 14.5
@@ -0,0 +1,93 @@
+"""
+model registry Pytest testing suite
+"""
+import multiprocessing
+import pytest
+from ml_models import model_registry
+from ml_models.model_registry import ModelRegistryError, ModelRegistryWatcher
+from ml_models.inference_executor import InferenceExecutor
+
+SUFFIX = ''
+
+
+def set_suffix(suffix):
+    """
+    scoring process initializer standing in for the models loading
+    """
+    global SUFFIX
+    SUFFIX = suffix
+
+
+def suffixed_evaluator(input_strings):
+    """
+    scores the input strings by the loaded suffix
+    """
+    return [input_string + SUFFIX for input_string in input_strings]
+
+
+def _publish_version(tmp_path, version):
+    source_dir = tmp_path / 'source' / version
+    source_dir.mkdir(parents=True)
+    (source_dir / 'manifest.json').write_text('{}')
+    (source_dir / 'data_processor.py').write_text('')
+    return model_registry.publish(str(source_dir), version, str(tmp_path / 'registry'))
+
+
+def test_publish_and_activate(tmp_path):
+    registry_dir = str(tmp_path / 'registry')
+    version_dir = _publish_version(tmp_path, '2020-01-31')
+
+    assert model_registry.list_versions(registry_dir) == ['2020-01-31']
+    assert model_registry.active_version(registry_dir) is None
+    assert (tmp_path / 'registry' / '2020-01-31' / 'manifest.json').is_file()
+    assert not (tmp_path / 'registry' / '2020-01-31' / 'data_processor.py').exists()
+
+    model_registry.activate('2020-01-31', registry_dir)
+    assert model_registry.active_version_dir(registry_dir) == version_dir
+
+    with pytest.raises(ModelRegistryError):
+        model_registry.publish(str(tmp_path / 'source' / '2020-01-31'), '2020-01-31', registry_dir)
+    with pytest.raises(ModelRegistryError):
+        model_registry.activate('2020-02-29', registry_dir)
+    with pytest.raises(ModelRegistryError):
+        model_registry.activate('../2020-01-31', registry_dir)
+
+
+def test_watcher_swaps_the_active_version_once(tmp_path):
+    registry_dir = str(tmp_path / 'registry')
+    for version in ('v1', 'v2', 'broken'):
+        _publish_version(tmp_path, version)
+    loaded = ['v1']
+
+    def _swapper(version):
+        if version == 'broken':
+            raise ValueError('broken model set')
+        loaded[0] = version
+
+    watcher = ModelRegistryWatcher(_swapper, lambda: loaded[0], registry_dir=registry_dir)
+    assert watcher.check() is None
+
+    model_registry.activate('v2', registry_dir)
+    assert watcher.check() == 'v2'
+    assert watcher.check() is None
+    assert loaded == ['v2']
+
+    model_registry.activate('broken', registry_dir)
+    assert watcher.check() is None
+    assert watcher.check() is None
+    assert loaded == ['v2']
+    assert watcher.metrics()['reloads'] == 1
+    assert watcher.metrics()['reload_failures'] == 1
+    assert watcher.metrics()['last_reload']['error'] == 'broken model set'
+
+
+def test_executor_restart_swaps_the_scoring_processes():
+    executor = InferenceExecutor(suffixed_evaluator, max_workers=2,
+                                 mp_context=multiprocessing.get_context('fork'))
+    try:
+        assert executor.evaluate(['a']) == ['a']
+        executor.restart(initializer=set_suffix, initargs=('-v2',),
+                         warm_up_input_strings=['warm up'])
+        assert executor.evaluate(['a', 'b']) == ['a-v2', 'b-v2']
+    finally:
+        executor.shutdown()
@@ -0,0 +1,70 @@
+"""
+prediction cache Pytest testing suite
+"""
+from ml_models.prediction_cache import PredictionCache
+
+PREDICTION = {'overall_sentiment': {'sentiment': 'positive', 'probability': 0.12}}
+
+
+def test_prediction_cache_hit_and_miss():
+    prediction_cache = PredictionCache(maxsize=10)
+    cache_key = prediction_cache.key('skvele funkcionalni testy')
+
+    assert prediction_cache.get(cache_key) is None
+    prediction_cache.set(cache_key, PREDICTION)
+    assert prediction_cache.get(cache_key) == PREDICTION
+
+    metrics = prediction_cache.metrics()
+    assert metrics['hits'] == 1
+    assert metrics['misses'] == 1
+    assert metrics['hit_ratio'] == 0.5
+    assert metrics['size'] == 1
+
+
+def test_prediction_cache_lru_eviction():
+    prediction_cache = PredictionCache(maxsize=2)
+
+    prediction_cache.set('a', PREDICTION)
+    prediction_cache.set('b', PREDICTION)
+    # touch 'a' so 'b' is the least recently used entry
+    prediction_cache.get('a')
+    prediction_cache.set('c', PREDICTION)
+
+    assert prediction_cache.get('b') is None
+    assert prediction_cache.get('a') == PREDICTION
+    assert prediction_cache.get('c') == PREDICTION
+    assert prediction_cache.metrics()['evictions'] == 1
+    assert prediction_cache.metrics()['size'] == 2
+
+
+def test_prediction_cache_ttl_expiry():
+    prediction_cache = PredictionCache(maxsize=10, ttl=-1)
+
+    prediction_cache.set('a', PREDICTION)
+
+    assert prediction_cache.get('a') is None
+    assert prediction_cache.metrics()['size'] == 0
+
+
+def test_prediction_cache_invalidate():
+    prediction_cache = PredictionCache(maxsize=10, namespace='v1')
+    cache_key = prediction_cache.key('skvele funkcionalni testy')
+    prediction_cache.set(cache_key, PREDICTION)
+
+    prediction_cache.invalidate('v2')
+
+    assert prediction_cache.get(cache_key) is None
+    assert prediction_cache.key('skvele funkcionalni testy') != cache_key
+
+
+def test_prediction_cache_shared_store(tmp_path):
+    store_path = str(tmp_path / 'prediction_cache.db')
+    first_worker_cache = PredictionCache(maxsize=10, store_path=store_path, namespace='v1')
+    second_worker_cache = PredictionCache(maxsize=10, store_path=store_path, namespace='v1')
+
+    cache_key = first_worker_cache.key('skvele funkcionalni testy')
+    first_worker_cache.set(cache_key, PREDICTION)
+
+    assert second_worker_cache.key('skvele funkcionalni testy') == cache_key
+    assert second_worker_cache.get(cache_key) == PREDICTION
+    assert second_worker_cache.metrics()['hits'] == 1
@@ -0,0 +1,69 @@
+"""
+prefork web server Pytest testing suite
+"""
+import os
+import sys
+import time
+import signal
+import subprocess
+import urllib.request
+
+SERVER_SCRIPT = '''
+import os, sys
+from flask import Flask
+from flask_webapp.prefork import serve_prefork
+
+app = Flask(__name__)
+
+@app.route('/')
+def pid():
+    return str(os.getpid())
+
+def on_worker_start():
+    open(os.path.join(sys.argv[1], f'start-{os.getpid()}'), 'w').close()
+
+def on_worker_exit():
+    open(os.path.join(sys.argv[1], str(os.getpid())), 'w').close()
+
+serve_prefork(app, port=int(sys.argv[2]), workers=2, threads=2, max_requests=5,
+              max_requests_jitter=0, graceful_timeout=2, on_worker_start=on_worker_start,
+              on_worker_exit=on_worker_exit)
+'''
+
+
+def _free_port():
+    import socket
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _get(url, timeout=10):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            with urllib.request.urlopen(url, timeout=5) as response:
+                return response.read().decode('utf8')
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.1)
+
+
+def test_prefork_recycles_workers_and_shuts_down(tmp_path):
+    port = _free_port()
+    master = subprocess.Popen([sys.executable, '-c', SERVER_SCRIPT, str(tmp_path), str(port)],
+                              cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    try:
+        worker_pids = {_get(f'http://127.0.0.1:{port}/') for _ in range(30)}
+    finally:
+        master.send_signal(signal.SIGTERM)
+        exit_code = master.wait(timeout=20)
+
+    # 2 workers recycled every 5 requests serve 30 requests by at least 6 processes
+    assert len(worker_pids) >= 6
+    assert str(master.pid) not in worker_pids
+    assert exit_code == 0
+    # every worker ran the start hook and the exit hook, on recycling and on the master shutdown
+    assert {f'start-{pid}' for pid in worker_pids} <= set(os.listdir(str(tmp_path)))
+    assert worker_pids <= set(os.listdir(str(tmp_path)))
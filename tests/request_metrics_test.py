@@ -0,0 +1,70 @@
+"""
+request metrics Pytest testing suite
+"""
+import time
+import multiprocessing
+from utils.metrics import RequestMetrics, REQUEST_METRICS, prometheus_histogram, \
+    prometheus_metric
+from ml_models.inference_executor import InferenceExecutor
+
+
+def test_stage_timer_and_rejections():
+    request_metrics = RequestMetrics(buckets=(0.001, 1.0))
+
+    with request_metrics.stage('detect'):
+        time.sleep(0.002)
+    request_metrics.reject('not_czech')
+    request_metrics.reject('not_czech')
+
+    snapshot = request_metrics.snapshot()
+    assert snapshot['stages']['detect']['count'] == 1
+    assert snapshot['stages']['detect']['buckets'] == {'0.001': 0, '1.0': 1, '+Inf': 1}
+    assert snapshot['rejections'] == {'not_czech': 2}
+
+
+def test_disabled_metrics_record_nothing():
+    request_metrics = RequestMetrics(enabled=False)
+
+    with request_metrics.stage('detect'):
+        pass
+    request_metrics.reject('not_czech')
+
+    assert request_metrics.snapshot() == {'stages': {}, 'rejections': {}}
+
+
+def test_prometheus_text_format():
+    request_metrics = RequestMetrics(buckets=(0.5,))
+    request_metrics.observe('validation', 0.25)
+
+    lines = prometheus_histogram('stage_seconds', 'Stage latency.',
+                                 [({'stage': 'validation'}, request_metrics.snapshot()
+                                   ['stages']['validation'])])
+    assert lines == ['# HELP stage_seconds Stage latency.',
+                     '# TYPE stage_seconds histogram',
+                     'stage_seconds_bucket{stage="validation",le="0.5"} 1',
+                     'stage_seconds_bucket{stage="validation",le="+Inf"} 1',
+                     'stage_seconds_sum{stage="validation"} 0.25',
+                     'stage_seconds_count{stage="validation"} 1']
+    assert prometheus_metric('rejections_total', 'counter', 'Rejections.',
+                             [({'reason': 'not_czech'}, 3)])[-1] == \
+        'rejections_total{reason="not_czech"} 3'
+
+
+def timed_batch_evaluator(input_strings):
+    """
+    records a stage in the scoring process
+    """
+    with REQUEST_METRICS.stage('test_scoring_stage'):
+        return [input_string.upper() for input_string in input_strings]
+
+
+def test_scoring_process_stages_are_merged():
+    executor = InferenceExecutor(timed_batch_evaluator, max_workers=1,
+                                 mp_context=multiprocessing.get_context('fork'))
+    try:
+        assert executor.evaluate(['a', 'b']) == ['A', 'B']
+        assert executor.evaluate(['c']) == ['C']
+    finally:
+        executor.shutdown()
+
+    assert REQUEST_METRICS.snapshot()['stages']['test_scoring_stage']['count'] == 2
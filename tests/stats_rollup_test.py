@@ -0,0 +1,77 @@
+"""
+daily stats rollup Pytest testing suite
+"""
+import random
+from datetime import date, datetime, timedelta
+from flask_webapp.database.database_interface import Database
+from flask_webapp.database.stats_writer import StatsWriter
+from utils.utilities import Webapp
+
+SENTIMENT_VALUES = ['negative', 'positive', 'uncertain']
+
+
+def _raw_rows(count):
+    random.seed(42)
+    return [(datetime(2020, 1, 1) + timedelta(minutes=random.randint(0, 60 * 24 * 30)),
+             random.choice(SENTIMENT_VALUES)) for _ in range(count)]
+
+
+def _rollup_rows(raw_rows):
+    counts = dict()
+    for request_datetime, sentiment in raw_rows:
+        key = (request_datetime.date().isoformat(), sentiment)
+        counts[key] = counts.get(key, 0) + 1
+    return [key + (count,) for key, count in counts.items()]
+
+
+def test_rollup_chart_data_preparator_parity():
+    raw_rows = _raw_rows(1000)
+    raw_chart_rows = [(x[0].date().isoformat(), x[1]) for x in raw_rows]
+
+    assert Webapp.rollup_chart_data_preparator(_rollup_rows(raw_rows)) == \
+           Webapp.chart_data_preparator(raw_chart_rows)
+
+
+def test_rollup_chart_data_preparator_empty():
+    assert Webapp.rollup_chart_data_preparator([]) == Webapp.chart_data_preparator([])
+
+
+def test_stats_writer_keeps_rollup_up_to_date(tmp_path):
+    database = Database('local', db_location=str(tmp_path / 'stats.db'))
+    database.db_builder()
+    stats_writer = StatsWriter(database, batch_size=7, flush_interval_ms=5)
+
+    raw_rows = _raw_rows(100)
+    for request_datetime, sentiment in raw_rows:
+        stats_writer.write(sentiment, request_datetime=request_datetime)
+    stats_writer.close()
+
+    conn = database.connect()
+    rollup_rows = conn.execute(database.db_select_rollup_stats_query,
+                               [date(2019, 12, 1)]).fetchall()
+    conn.close()
+
+    assert sorted(rollup_rows) == sorted(_rollup_rows(raw_rows))
+
+
+def test_rollup_migration_backfills_existing_stats(tmp_path):
+    database = Database('local', db_location=str(tmp_path / 'stats.db'))
+    raw_rows = _raw_rows(100)
+
+    # a stats table created before the rollup table existed
+    conn = database.connect()
+    with conn:
+        conn.execute(database.db_create_table)
+        conn.executemany(database.db_insert_stats_query, raw_rows)
+    conn.close()
+
+    database.db_builder()
+    # the second run must not backfill again
+    database.db_builder()
+
+    conn = database.connect()
+    rollup_rows = conn.execute(database.db_select_rollup_stats_query,
+                               [date(2019, 12, 1)]).fetchall()
+    conn.close()
+
+    assert sorted(rollup_rows) == sorted(_rollup_rows(raw_rows))
@@ -0,0 +1,135 @@
+"""
+stats writer Pytest testing suite
+"""
+import queue
+import threading
+import time
+from flask_webapp.database.database_interface import Database
+from flask_webapp.database.stats_writer import StatsWriter
+
+
+def _database(tmp_path):
+    database = Database('local', db_location=str(tmp_path / 'stats.db'))
+    database.db_builder()
+    return database
+
+
+def _row_count(database):
+    conn = database.connect()
+    try:
+        return conn.execute(database.db_select_count_rows_query).fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_stats_writer_synchronous(tmp_path):
+    database = _database(tmp_path)
+    stats_writer = StatsWriter(database, synchronous=True)
+
+    stats_writer.write('positive')
+    stats_writer.write('negative')
+
+    assert _row_count(database) == 2
+    assert stats_writer.metrics()['batches_written'] == 2
+
+
+def test_stats_writer_flushes_full_batches(tmp_path):
+    database = _database(tmp_path)
+    stats_writer = StatsWriter(database, batch_size=10, flush_interval_ms=60000)
+
+    for _ in range(25):
+        stats_writer.write('positive')
+
+    assert stats_writer.flush(timeout=5)
+    assert _row_count(database) == 25
+    assert stats_writer.metrics()['batches_written'] == 3
+    stats_writer.close()
+
+
+def test_stats_writer_flushes_on_interval(tmp_path):
+    database = _database(tmp_path)
+    stats_writer = StatsWriter(database, batch_size=1000, flush_interval_ms=10)
+
+    stats_writer.write('uncertain')
+    stats_writer.close()
+
+    assert _row_count(database) == 1
+
+
+def test_stats_writer_concurrent_writers(tmp_path):
+    database = _database(tmp_path)
+    stats_writer = StatsWriter(database, batch_size=50, flush_interval_ms=5)
+
+    def _writer():
+        for _ in range(100):
+            stats_writer.write('negative')
+
+    threads = [threading.Thread(target=_writer) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    stats_writer.close()
+
+    assert _row_count(database) == 800
+    assert stats_writer.metrics()['rows_dropped'] == 0
+
+
+def test_stats_writer_drops_rows_when_queue_full(tmp_path, monkeypatch):
+    stats_writer = StatsWriter(_database(tmp_path), max_queue_size=1)
+    # no worker thread draining the queue
+    monkeypatch.setattr(stats_writer, '_ensure_worker', lambda: None)
+    monkeypatch.setattr(stats_writer, '_queue', queue.Queue(maxsize=1))
+
+    stats_writer.write('positive')
+    stats_writer.write('positive')
+
+    assert stats_writer.metrics()['rows_dropped'] == 1
+
+
+def test_stats_writer_counts_concurrent_drops(tmp_path, monkeypatch):
+    stats_writer = StatsWriter(_database(tmp_path), max_queue_size=1)
+    monkeypatch.setattr(stats_writer, '_ensure_worker', lambda: None)
+    monkeypatch.setattr(stats_writer, '_queue', queue.Queue(maxsize=1))
+
+    def _writer():
+        for _ in range(2000):
+            stats_writer.write('negative')
+
+    threads = [threading.Thread(target=_writer) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # every dropped row is counted, none is lost to a racing increment
+    assert stats_writer.metrics()['rows_dropped'] == 8 * 2000 - 1
+    assert stats_writer.metrics()['rows_queued'] == 1
+
+
+def test_stats_writer_flush_and_close_do_not_block_on_a_full_queue(tmp_path, monkeypatch):
+    database = _database(tmp_path)
+    stats_writer = StatsWriter(database, batch_size=1, max_queue_size=1)
+    writing = threading.Event()
+    release_write = threading.Event()
+    write_rows = stats_writer._write_rows
+
+    def _blocked_write_rows(conn, rows):
+        writing.set()
+        release_write.wait(10)
+        write_rows(conn, rows)
+
+    monkeypatch.setattr(stats_writer, '_write_rows', _blocked_write_rows)
+    stats_writer.write('positive')
+    assert writing.wait(10)
+    # the worker is writing the first row, the second one fills the queue
+    stats_writer.write('negative')
+
+    started = time.monotonic()
+    assert not stats_writer.flush(timeout=0.2)
+    stats_writer.close(timeout=0.2)
+    assert time.monotonic() - started < 2
+
+    release_write.set()
+    stats_writer.close()
+    assert _row_count(database) == 2
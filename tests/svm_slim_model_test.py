@@ -0,0 +1,39 @@
+"""
+slimmed SVM model Pytest testing suite
+"""
+import numpy as np
+from sklearn.feature_extraction.text import CountVectorizer, TfidfTransformer
+from sklearn.linear_model import SGDClassifier
+from sklearn.model_selection import GridSearchCV
+from sklearn.pipeline import Pipeline
+from ml_models.support_vector_machine.data_processor_support_vector_machine import \
+    slim_model, slim_model_report
+
+
+def _grid_search(sgd_log_loss, train_texts, train_labels):
+    return GridSearchCV(Pipeline([
+        ('vect', CountVectorizer(min_df=2)),
+        ('tfidf', TfidfTransformer()),
+        ('clf', SGDClassifier(loss=sgd_log_loss, penalty='l2', alpha=1e-3,
+                              random_state=42, max_iter=5, tol=None)),
+    ]), {'vect__ngram_range': [(1, 1), (1, 2)]}, cv=3).fit(train_texts, train_labels)
+
+
+def test_slim_model_inference_only(sgd_log_loss, train_texts, train_labels):
+    gs_clf = _grid_search(sgd_log_loss, train_texts, train_labels)
+    slimmed_model = slim_model(gs_clf)
+
+    assert isinstance(slimmed_model, Pipeline)
+    assert not hasattr(slimmed_model.named_steps['vect'], 'stop_words_')
+    assert slimmed_model.named_steps['clf'].coef_.dtype == np.float32
+    # the grid search itself is left untouched
+    assert gs_clf.best_estimator_.named_steps['clf'].coef_.dtype == np.float64
+
+
+def test_slim_model_report_equivalent(sgd_log_loss, train_texts, train_labels, eval_texts):
+    gs_clf = _grid_search(sgd_log_loss, train_texts, train_labels)
+    report = slim_model_report(gs_clf, slim_model(gs_clf), eval_texts)
+
+    assert report['equivalent']
+    assert report['max_abs_diff'] < 1e-5
+    assert report['slim_pickle_bytes'] < report['pickle_bytes']
@@ -0,0 +1,59 @@
+"""
+text normalizer Pytest testing suite
+"""
+import csv
+import os
+from utils.utilities import ProjectCommon, Webapp
+from tests import legacy_text_pipeline
+
+SAMPLE_FILE_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '..',
+                                                'data_preparation',
+                                                'reviews_with_ranks_sample.csv'))
+
+# edge cases around html, punctuation, whitespace runs, stopwords and diacritics
+SYNTHETIC_TEXTS = [
+    '  Skvělé funkcionální testy  ',
+    'Hrozné, nudné a "úplně" zbytečné (!) - 100% odpad...',
+    '<b>Tenhle</b> film <i>byl</i> naprosto <a href="x">úžasný</a>',
+    'a  b   c    d     e      f       g        h',
+    'slovo % slovo  %  slovo * + “citace„',
+    'PŘÍŠERNĚ ŽLUŤOUČKÝ KŮŇ ÚPĚL ĎÁBELSKÉ ÓDY',
+    'Ještě jsem neviděl lepší film, režie i herci byli skvělí!',
+    'multi\nline\ttext;with,separators-and?questions!',
+    'snake_case words_with_digits 123 a1b2c3',
+    'že jsem ale ano aby byl byla bez',
+    '',
+    ' ',
+    '<unclosed tag and > stray <',
+    'dětech atech ětem atům oušek ajzn obinec ionář ovisk',
+]
+
+
+def _sample_texts():
+    with open(SAMPLE_FILE_PATH, encoding='utf8') as sample_file:
+        return [row[0] for row in csv.reader(sample_file) if row]
+
+
+def test_remove_all_parity():
+    for text in _sample_texts() + SYNTHETIC_TEXTS:
+        for variant in (text, text.lower()):
+            assert ProjectCommon.remove_all(variant) == legacy_text_pipeline.remove_all(variant)
+
+
+def test_remove_non_alpha_chars_and_html_parity():
+    for text in _sample_texts() + SYNTHETIC_TEXTS:
+        assert ProjectCommon.remove_non_alpha_chars_and_html(text) == \
+               legacy_text_pipeline.remove_non_alpha_chars_and_html(text)
+
+
+def test_remove_non_alpha_chars_whitespace_runs_parity():
+    for spaces_count in range(1, 12):
+        text = 'a' + ' ' * spaces_count + '%' + ' ' * spaces_count + 'b'
+        assert ProjectCommon.remove_non_alpha_chars(text) == \
+               legacy_text_pipeline.remove_non_alpha_chars(text)
+
+
+def test_input_string_preparator_parity():
+    for text in _sample_texts() + SYNTHETIC_TEXTS:
+        assert Webapp.input_string_preparator(text.lower()) == \
+               legacy_text_pipeline.input_string_preparator(text.lower())
@@ -0,0 +1,95 @@
+"""
+unified training Pytest testing suite
+"""
+import os
+import sys
+import json
+import pickle
+import subprocess
+import pytest
+from data_preparation.corpus_cache import Corpus
+from ml_models import model_registry
+from ml_models.fused_ensemble import FusedEnsemble, MANIFEST_FILE_NAME
+from ml_models.precisions import PRECISIONS_FILE_NAME, DEFAULT_PRECISIONS, load_precisions, \
+    write_precisions, ensemble_weights
+from ml_models.train_models import train_models
+
+
+REPOSITORY_DIR_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def reviews_file_path(tmp_path, train_texts, train_labels):
+    reviews_file_path = tmp_path / 'reviews.csv'
+    reviews_file_path.write_text(''.join(f'"{text}",{-1 if label == "neg" else 1}\n'
+                                         for text, label in zip(train_texts * 3, train_labels * 3)),
+                                 encoding='utf8')
+    return reviews_file_path
+
+
+def _served_model_set(registry_dir):
+    # webapp_interface loads the active registry version on import, in a new process
+    completed = subprocess.run(
+        [sys.executable, '-c', 'from ml_models import webapp_interface; '
+                               'print(webapp_interface.ACTIVE_MODELS)'],
+        cwd=REPOSITORY_DIR_PATH, env={**os.environ, 'MODEL_REGISTRY_DIR': str(registry_dir)},
+        capture_output=True, text=True, check=True, timeout=300)
+    return completed.stdout.splitlines()[-1]
+
+
+def test_balanced_split_is_class_balanced():
+    corpus = Corpus([f'text {x}' for x in range(30)], [-1] * 10 + [1] * 20, ['cs'] * 25 + ['sk'] * 5)
+    train_texts, test_texts, train_labels, test_labels = corpus.balanced_split(
+        class_size=8, test_size=0.25, random_state=0)
+
+    assert train_labels.count('neg') == train_labels.count('pos') == 6
+    assert test_labels.count('neg') == test_labels.count('pos') == 2
+    assert not set(train_texts) & set(test_texts)
+    assert corpus.balanced_split(class_size=8, test_size=0.25, random_state=0)[0] == train_texts
+
+
+def test_precisions_are_normalized_to_the_ensemble_weights(tmp_path):
+    assert load_precisions(str(tmp_path)) == DEFAULT_PRECISIONS
+
+    write_precisions({'naive_bayes': 0.9, 'logistic_regression': 0.6,
+                      'support_vector_machine': 0.5}, str(tmp_path))
+    assert ensemble_weights(load_precisions(str(tmp_path))) == (0.45, 0.3, 0.25)
+
+
+def test_train_models_writes_the_models_with_their_precisions(tmp_path, reviews_file_path,
+                                                              eval_texts):
+    models_dir = tmp_path / 'models'
+
+    measurements = train_models(str(reviews_file_path), str(models_dir), feature_hashing=False,
+                                random_state=0, language=None, cache_dir=str(tmp_path / 'cache'))
+
+    precisions = json.loads((models_dir / PRECISIONS_FILE_NAME).read_text(encoding='utf8'))
+    assert set(precisions) == {'naive_bayes', 'logistic_regression', 'support_vector_machine'}
+    assert all(0 < precisions[model_type] <= 1 and measurements[model_type]['precision'] > 0
+               for model_type in precisions)
+
+    model_svm = pickle.load(open(models_dir / 'support_vector_machine' / 'model.pkl', 'rb'))
+    assert list(model_svm.predict(['skvel film', 'hrozn scenar nud'])) == ['pos', 'neg']
+    assert (models_dir / 'naive_bayes' / 'vectorizer.pkl').is_file()
+    assert (models_dir / 'logistic_regression' / 'model.pkl').is_file()
+
+    fused = FusedEnsemble.load_artifacts(str(models_dir))
+    assert len(fused.predict_proba(eval_texts)) == len(eval_texts)
+
+
+def test_hashing_models_replace_the_fused_ensemble(tmp_path, reviews_file_path):
+    registry_dir = tmp_path / 'registry'
+    models_dir = registry_dir / 'v1'
+
+    train_models(str(reviews_file_path), str(models_dir), feature_hashing=False, random_state=0,
+                 language=None, cache_dir=str(tmp_path / 'cache'))
+    model_registry.activate('v1', str(registry_dir))
+    assert _served_model_set(registry_dir) == 'ModelSet(v1, fused=True)'
+
+    # the vocabulary based models fused ensemble would be served instead of the hashing models
+    train_models(str(reviews_file_path), str(models_dir), feature_hashing=True, random_state=0,
+                 language=None, cache_dir=str(tmp_path / 'cache'))
+    assert not (models_dir / MANIFEST_FILE_NAME).exists()
+    assert not (models_dir / 'fused_ensemble.npz').exists()
+    assert not list(models_dir.glob('*.npy'))
+    assert _served_model_set(registry_dir) == 'ModelSet(v1, fused=False)'
@@ -0,0 +1,40 @@
+"""
+training orchestrator Pytest testing suite
+"""
+import numpy as np
+from sklearn.feature_extraction.text import CountVectorizer
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import GridSearchCV
+from sklearn.pipeline import Pipeline
+from ml_models.training_orchestrator import grid_search
+from ml_models.support_vector_machine.data_processor_support_vector_machine import build_pipeline
+
+SVM_PARAMETERS = {'vect__ngram_range': [(1, 1), (1, 2)],
+                  'tfidf__use_idf': (True, False),
+                  'clf__alpha': (1e-2, 1e-3)}
+
+
+def test_grid_search_matches_grid_search_cv(train_texts, train_labels, eval_texts):
+    grid_search_cv = GridSearchCV(build_pipeline(False), SVM_PARAMETERS, cv=3) \
+        .fit(train_texts, train_labels)
+    result = grid_search(build_pipeline(False), SVM_PARAMETERS, train_texts, train_labels, cv=3,
+                         max_workers=1)
+
+    assert result.best_params_ == grid_search_cv.best_params_
+    assert np.allclose([candidate['mean_score'] for candidate in result.candidates],
+                       grid_search_cv.cv_results_['mean_test_score'], atol=1e-4)
+    assert (result.best_estimator_.predict_proba(eval_texts) ==
+            grid_search_cv.best_estimator_.predict_proba(eval_texts)).all()
+
+
+def test_grid_search_process_pool_timing_report(train_texts, train_labels):
+    result = grid_search(Pipeline([('vect', CountVectorizer(ngram_range=(2, 2))),
+                                   ('clf', LogisticRegression())]),
+                         {'clf__C': [0.01, 1, 10]}, train_texts, train_labels, cv=3, max_workers=2)
+    report = result.report()
+
+    assert len(report['candidates']) == 3
+    assert sorted(candidate['rank'] for candidate in report['candidates']) == [1, 2, 3]
+    assert all(candidate['fit_seconds'] > 0 for candidate in report['candidates'])
+    assert report['best_params'] in [candidate['params'] for candidate in report['candidates']]
+    assert result.best_estimator_.named_steps['clf'].C == report['best_params']['clf__C']
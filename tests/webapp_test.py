@@ -1,7 +1,13 @@
 """
 Flask app Pytest testing suite
 """
+import json
+import time
+import threading
+from flask_webapp import app as webapp
 from flask_webapp.app import APP
+from ml_models.micro_batcher import MicroBatcher
+from ml_models.prediction_cache import PredictionCache
 
 API_PREFIX = APP.config['api_prefix']
 
@@ -122,3 +128,93 @@ def test_api_post_valid_input_text_negative():
 
     assert response.status_code == 200
     assert b'"sentiment":"negative"' in response.data
+
+
+def test_api_batch_post_not_json_array():
+    response = APP.test_client().post(API_PREFIX + 'batch/', json={'Input_Text': 'text'})
+
+    assert response.status_code == 400
+    assert b'{"error":"Sorry, need to submit a non-empty JSON array of texts",' \
+           b'"mimetype":"application/json","status":400}' in response.data
+
+
+def test_api_batch_post_too_many_texts():
+    response = APP.test_client().post(API_PREFIX + 'batch/',
+                                      json=['Skvělé funkcionální testy'] *
+                                      (APP.config['api_batch_max_size'] + 1))
+
+    assert response.status_code == 400
+    assert b'"status":400' in response.data
+
+
+def test_api_batch_post_per_item_results():
+    response = APP.test_client().post(API_PREFIX + 'batch/',
+                                      json=['Skvělé funkcionální testy',
+                                            'a jsi',
+                                            'ein zwei polizei',
+                                            'Hrozné funkcionální testy'])
+    results = response.get_json()['sentiment_results']
+
+    assert response.status_code == 200
+    assert len(results) == 4
+    assert results[0]['sentiment_result']['overall_sentiment']['sentiment'] == 'positive'
+    assert results[1] == {'status': 400,
+                          'error': 'Sorry, need to submit at least 3 non stop-words'}
+    assert results[2] == {'status': 400,
+                          'error': 'Sorry, need to submit text written in Czech'}
+    assert results[3]['sentiment_result']['overall_sentiment']['sentiment'] == 'negative'
+
+
+def test_api_stream_post_per_line_results():
+    response = APP.test_client().post(API_PREFIX + 'stream/',
+                                      data='"Skvělé funkcionální testy"\n'
+                                           '"a jsi"\n'
+                                           'not a JSON text\n'
+                                           '\n'
+                                           '{"Input_Text": "Hrozné funkcionální testy"}\n',
+                                      content_type='application/x-ndjson')
+    results = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    assert len(results) == 4
+    assert results[0]['sentiment_result']['overall_sentiment']['sentiment'] == 'positive'
+    assert results[1] == {'status': 400,
+                          'error': 'Sorry, need to submit at least 3 non stop-words'}
+    assert results[2] == {'status': 400,
+                          'error': 'Sorry, need to submit one JSON text per line'}
+    assert results[3]['sentiment_result']['overall_sentiment']['sentiment'] == 'negative'
+
+
+def test_api_post_flooded_micro_batcher_answers_503(monkeypatch):
+    release = threading.Event()
+
+    def _blocked_evaluator(input_strings):
+        release.wait(10)
+        return webapp.webapp_interface.ml_model_batch_evaluator(input_strings)
+
+    monkeypatch.setattr(webapp, 'MICRO_BATCHER',
+                        MicroBatcher(_blocked_evaluator, window_ms=0, max_queue_depth=1,
+                                     retry_after=7))
+    # the cached prediction of an earlier test would not be scored
+    monkeypatch.setattr(webapp.webapp_interface, 'PREDICTION_CACHE', PredictionCache())
+    responses = []
+
+    def _client():
+        responses.append(APP.test_client().post(API_PREFIX,
+                                                data=dict(Input_Text='Skvělé funkcionální testy')))
+
+    # one request is scored, one waits in the queue, the others are rejected
+    threads = [threading.Thread(target=_client) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+        time.sleep(0.2)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    rejected = [response for response in responses if response.status_code == 503]
+    assert len(rejected) == 4
+    assert rejected[0].headers['Retry-After'] == '7'
+    assert rejected[0].get_json()['error'] == 'Inference queue is full (1)'
+    assert sorted(response.status_code for response in responses) == [200, 200] + [503] * 4
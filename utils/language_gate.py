@@ -0,0 +1,262 @@
+"""
+language gate module
+
+Validates the input text is written in one of the accepted languages.
+- NgramLanguageGate: compact naive bayes over character 1-3 grams, deterministic,
+  seeded from the langdetect language profiles and trainable on the project's reviews
+- LangdetectGate: the langdetect module with a fixed random seed
+"""
+import os
+import re
+import json
+import numpy as np
+
+LANGUAGE_GATE_FILE_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__),
+                                                       'language_gate.npz'))
+
+REVIEWS_FILE_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '..',
+                                                 'data_preparation', 'reviews_with_ranks.csv'))
+
+# Czech specific letters, not used by Slovak, Slovenian or Croatian
+CZECH_SPECIFIC_CHARS = frozenset('řůěŘŮĚ')
+
+# latin script languages of the langdetect profiles, text in other scripts
+# has no known n-grams and is rejected as undetected
+DEFAULT_LANGUAGES = ('cs', 'sk', 'sl', 'hr', 'pl', 'en', 'de', 'fr', 'es', 'it', 'pt', 'nl',
+                     'hu', 'ro', 'lt', 'lv', 'et', 'fi', 'sv', 'da', 'no', 'tr', 'sq',
+                     'ca', 'af', 'cy', 'id', 'tl', 'sw', 'so', 'vi')
+
+MAX_NGRAM = 3
+
+_NON_LETTERS_RE = re.compile(r'[\W\d_]+')
+
+
+def _ngrams(text):
+    """
+    function extracting the character n-grams of the space padded words
+    :param text:
+    :return: list of n-grams
+    """
+    padded_text = ' ' + _NON_LETTERS_RE.sub(' ', text.lower()).strip() + ' '
+    ngrams = []
+    for ngram_size in range(1, MAX_NGRAM + 1):
+        ngrams.extend([padded_text[position:position + ngram_size]
+                       for position in range(len(padded_text) - ngram_size + 1)])
+    # single spaces carry no information
+    return [ngram for ngram in ngrams if ngram != ' ' and ngram != '  ']
+
+
+def _langdetect_profile(language):
+    """
+    function reading a langdetect language profile
+    :param language:
+    :return: dict n-gram -> count
+    """
+    import langdetect
+    profile_path = os.path.join(os.path.dirname(langdetect.__file__), 'profiles', language)
+    with open(profile_path, encoding='utf8') as profile_file:
+        return json.load(profile_file)['freq']
+
+
+class NgramLanguageGate:
+    """
+    character n-gram naive bayes language gate class
+    """
+    def __init__(self, languages, terms, log_probs, min_known_ngrams=3):
+        """
+        :param languages: tuple of language codes, the log_probs columns
+        :param terms: np.ndarray of n-grams, the log_probs rows
+        :param log_probs: np.ndarray of shape (len(terms), len(languages))
+        :param min_known_ngrams: texts with fewer known n-grams are not detected
+        """
+        self.languages = tuple(languages)
+        self.terms = terms
+        self.log_probs = log_probs
+        self.min_known_ngrams = min_known_ngrams
+
+        self._term_index = {term: index for index, term in enumerate(terms.tolist())}
+
+    def __repr__(self):
+        return f"NgramLanguageGate(languages={len(self.languages)}, terms={len(self.terms)})"
+
+    @classmethod
+    def train(cls, corpora_counts, top_n=1000, alpha=0.5):
+        """
+        build the gate from n-gram counts method,
+        only the top_n most frequent n-grams of each language are kept
+        :param corpora_counts: dict language -> dict n-gram -> count
+        :param top_n:
+        :param alpha: additive smoothing
+        :return: NgramLanguageGate
+        """
+        languages = tuple(corpora_counts)
+        top_ngrams = {language: dict(sorted(counts.items(), key=lambda item: -item[1])[:top_n])
+                      for language, counts in corpora_counts.items()}
+        terms = sorted(set().union(*top_ngrams.values()))
+        term_index = {term: index for index, term in enumerate(terms)}
+
+        counts = np.zeros((len(terms), len(languages)), dtype=np.float64)
+        for column, language in enumerate(languages):
+            for term, count in top_ngrams[language].items():
+                counts[term_index[term], column] = count
+            # the discarded n-grams are left out of the normalization on purpose,
+            # languages are compared on their most frequent n-grams only
+        counts += alpha
+        log_probs = np.log(counts / counts.sum(axis=0))
+
+        return cls(languages=languages, terms=np.array(terms),
+                   log_probs=log_probs.astype(np.float32))
+
+    @classmethod
+    def from_langdetect_profiles(cls, languages=DEFAULT_LANGUAGES, corpora=None, top_n=1000):
+        """
+        build the gate from the langdetect profiles method
+        :param languages:
+        :param corpora: optional dict language -> iterable of texts
+        replacing the profile of that language, e.g. the project's Czech reviews
+        :param top_n:
+        :return: NgramLanguageGate
+        """
+        corpora_counts = {language: _langdetect_profile(language) for language in languages}
+
+        for language, texts in (corpora or {}).items():
+            counts = {}
+            for text in texts:
+                for ngram in _ngrams(text):
+                    counts[ngram] = counts.get(ngram, 0) + 1
+            if counts:
+                corpora_counts[language] = counts
+
+        return cls.train(corpora_counts, top_n=top_n)
+
+    def save(self, file_path=LANGUAGE_GATE_FILE_PATH):
+        """
+        save the gate to a numpy .npz file method
+        :param file_path:
+        :return:
+        """
+        np.savez_compressed(file_path,
+                            languages=np.array(self.languages),
+                            terms=self.terms,
+                            log_probs=self.log_probs,
+                            min_known_ngrams=np.array(self.min_known_ngrams))
+
+    @classmethod
+    def load(cls, file_path=LANGUAGE_GATE_FILE_PATH):
+        """
+        load the gate from a numpy .npz file method
+        :param file_path:
+        :return: NgramLanguageGate
+        """
+        with np.load(file_path, allow_pickle=False) as arrays:
+            return cls(languages=arrays['languages'].tolist(),
+                       terms=arrays['terms'],
+                       log_probs=arrays['log_probs'],
+                       min_known_ngrams=int(arrays['min_known_ngrams']))
+
+    def detect(self, text):
+        """
+        detect the text language method
+        :param text:
+        :return: language code or None when the text has too few known n-grams
+        """
+        if not CZECH_SPECIFIC_CHARS.isdisjoint(text):
+            return 'cs'
+
+        term_index = self._term_index
+        indexes = [term_index[ngram] for ngram in _ngrams(text) if ngram in term_index]
+        if len(indexes) < self.min_known_ngrams:
+            return None
+
+        scores = self.log_probs[indexes].sum(axis=0)
+        return self.languages[int(np.argmax(scores))]
+
+
+class LangdetectGate:
+    """
+    langdetect module language gate class,
+    the seed makes the randomized trials return the same language for the same text
+    """
+    def __init__(self, seed=0):
+        from langdetect import DetectorFactory
+        DetectorFactory.seed = seed
+        self.seed = seed
+
+    def __repr__(self):
+        return f"LangdetectGate(seed={self.seed})"
+
+    @staticmethod
+    def detect(text):
+        """
+        detect the text language method
+        :param text:
+        :return: language code or None when langdetect finds no features
+        """
+        from langdetect import detect, lang_detect_exception
+        try:
+            return detect(text)
+        except lang_detect_exception.LangDetectException:
+            return None
+
+
+def build_language_gate(name='ngram'):
+    """
+    function building a language gate by name
+    :param name: 'ngram' or 'langdetect'
+    :return: language gate
+    """
+    if name == 'langdetect':
+        return LangdetectGate()
+    if name == 'ngram':
+        if os.path.isfile(LANGUAGE_GATE_FILE_PATH):
+            return NgramLanguageGate.load()
+        return NgramLanguageGate.from_langdetect_profiles()
+    raise ValueError(f"Unknown language gate: {name}")
+
+
+_LANGUAGE_GATE = None
+
+
+def configure_language_gate(name):
+    """
+    function replacing the language gate used by detect_language()
+    :param name: 'ngram' or 'langdetect'
+    :return: language gate
+    """
+    global _LANGUAGE_GATE
+    _LANGUAGE_GATE = build_language_gate(name)
+    return _LANGUAGE_GATE
+
+
+def detect_language(text):
+    """
+    function detecting the text language by the configured gate,
+    the n-gram gate is built on the first call
+    :param text:
+    :return: language code or None
+    """
+    if _LANGUAGE_GATE is None:
+        configure_language_gate('ngram')
+    return _LANGUAGE_GATE.detect(text)
+
+
+def _read_reviews(file_path):
+    """
+    function reading the review texts of the scraped reviews csv
+    :param file_path:
+    :return: list of texts
+    """
+    with open(file_path, encoding='utf8') as reviews_file:
+        return [row.rsplit(',', 1)[0].replace('"', '') for row in reviews_file if ',' in row]
+
+
+if __name__ == "__main__":
+    import sys
+
+    REVIEWS_PATH = sys.argv[1] if len(sys.argv) > 1 else REVIEWS_FILE_PATH
+    CORPORA = {'cs': _read_reviews(REVIEWS_PATH)} if os.path.isfile(REVIEWS_PATH) else None
+
+    LANGUAGE_GATE = NgramLanguageGate.from_langdetect_profiles(corpora=CORPORA)
+    LANGUAGE_GATE.save()
+    print(f"Built {LANGUAGE_GATE} from {REVIEWS_PATH if CORPORA else 'the langdetect profiles'} "
+          f"to {LANGUAGE_GATE_FILE_PATH}")
@@ -0,0 +1,225 @@
+"""
+metrics module
+"""
+import time
+import bisect
+import threading
+import contextlib
+
+
+class Histogram:
+    """
+    thread-safe cumulative bucket histogram class
+    """
+    def __init__(self, buckets):
+        """
+        :param buckets: sorted upper bounds, an implicit +Inf bucket is added
+        """
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._count = 0
+
+    def __repr__(self):
+        return f"Histogram(buckets={self.buckets})"
+
+    def observe(self, value):
+        """
+        record one value method
+        :param value:
+        :return:
+        """
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+            self._count += 1
+
+    def snapshot(self):
+        """
+        histogram state method
+        :return: dict with the cumulative bucket counts, sum and count
+        """
+        with self._lock:
+            counts = list(self._counts)
+            total, count = self._sum, self._count
+
+        cumulative = 0
+        buckets = {}
+        for upper_bound, bucket_count in zip(self.buckets + ('+Inf',), counts):
+            cumulative += bucket_count
+            buckets[str(upper_bound)] = cumulative
+
+        return {'buckets': buckets,
+                'sum': round(total, 6),
+                'count': count,
+                'mean': round(total / count, 6) if count else 0.0}
+
+
+# seconds, from the tens of microseconds text preparation to the batch scoring
+STAGE_LATENCY_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+                         0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+class _StageTimer:
+    """
+    context manager observing the duration of its block
+    """
+    __slots__ = ('request_metrics', 'stage', 'started')
+
+    def __init__(self, request_metrics, stage):
+        self.request_metrics = request_metrics
+        self.stage = stage
+        self.started = None
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.request_metrics.observe(self.stage, time.perf_counter() - self.started)
+        return False
+
+
+_NOT_TIMED = contextlib.nullcontext()
+
+
+class RequestMetrics:
+    """
+    prediction request per-stage latency histograms and validation rejection counters class
+    """
+    def __init__(self, enabled=True, buckets=STAGE_LATENCY_BUCKETS):
+        """
+        :param enabled: False turns the timers into no-ops
+        :param buckets: stage latency histogram upper bounds in seconds
+        """
+        self.enabled = enabled
+        self.buckets = tuple(buckets)
+
+        self._lock = threading.Lock()
+        self._stage_histograms = {}
+        self._rejections = {}
+        # observations kept aside in a scoring process, see collect()
+        self._collected = None
+
+    def __repr__(self):
+        return f"RequestMetrics(enabled={self.enabled})"
+
+    def stage(self, stage):
+        """
+        time a with block as the stage method
+        :param stage: stage name
+        :return: context manager
+        """
+        if not self.enabled:
+            return _NOT_TIMED
+        return _StageTimer(self, stage)
+
+    def observe(self, stage, seconds):
+        """
+        record one stage duration method
+        :param stage:
+        :param seconds:
+        :return:
+        """
+        if self._collected is not None:
+            self._collected.append((stage, seconds))
+            return
+
+        histogram = self._stage_histograms.get(stage)
+        if histogram is None:
+            with self._lock:
+                histogram = self._stage_histograms.setdefault(stage, Histogram(self.buckets))
+        histogram.observe(seconds)
+
+    def reject(self, reason):
+        """
+        count one validation rejection method
+        :param reason:
+        :return:
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            self._rejections[reason] = self._rejections.get(reason, 0) + 1
+
+    def collect(self, enabled):
+        """
+        keep the following observations aside instead of recording them method,
+        a scoring process hands them over to the web server process with its results
+        :param enabled: the web server process metrics flag
+        :return:
+        """
+        self.enabled = enabled
+        self._collected = []
+
+    def collected(self):
+        """
+        stop keeping the observations aside method
+        :return: list of (stage, seconds) tuples kept since collect()
+        """
+        collected, self._collected = self._collected or [], None
+        return collected
+
+    def merge(self, observations):
+        """
+        record the observations collected in a scoring process method
+        :param observations: list of (stage, seconds) tuples
+        :return:
+        """
+        for stage, seconds in observations:
+            self.observe(stage, seconds)
+
+    def snapshot(self):
+        """
+        stage histograms and rejection counters method
+        :return: dict
+        """
+        with self._lock:
+            stage_histograms = dict(self._stage_histograms)
+            rejections = dict(self._rejections)
+
+        return {'stages': {stage: histogram.snapshot()
+                           for stage, histogram in sorted(stage_histograms.items())},
+                'rejections': dict(sorted(rejections.items()))}
+
+
+def _prometheus_labels(labels):
+    return '{' + ','.join(f'{name}="{value}"' for name, value in labels.items()) + '}' \
+        if labels else ''
+
+
+def prometheus_histogram(name, documentation, labelled_snapshots):
+    """
+    function rendering histogram snapshots in the Prometheus text format
+    :param name: metric name
+    :param documentation: HELP text
+    :param labelled_snapshots: list of (labels dict, Histogram.snapshot()) tuples
+    :return: list of lines
+    """
+    lines = [f'# HELP {name} {documentation}', f'# TYPE {name} histogram']
+    for labels, snapshot in labelled_snapshots:
+        for upper_bound, cumulative_count in snapshot['buckets'].items():
+            lines.append(f'{name}_bucket{_prometheus_labels({**labels, "le": upper_bound})} '
+                         f'{cumulative_count}')
+        lines.append(f'{name}_sum{_prometheus_labels(labels)} {snapshot["sum"]}')
+        lines.append(f'{name}_count{_prometheus_labels(labels)} {snapshot["count"]}')
+    return lines
+
+
+def prometheus_metric(name, metric_type, documentation, labelled_values):
+    """
+    function rendering counter or gauge values in the Prometheus text format
+    :param name: metric name, counters end with _total
+    :param metric_type: 'counter' or 'gauge'
+    :param documentation: HELP text
+    :param labelled_values: list of (labels dict, value) tuples
+    :return: list of lines
+    """
+    return [f'# HELP {name} {documentation}', f'# TYPE {name} {metric_type}'] + \
+        [f'{name}{_prometheus_labels(labels)} {value}' for labels, value in labelled_values]
+
+
+# the web server process (and each scoring process) request metrics
+REQUEST_METRICS = RequestMetrics()
@@ -3,9 +3,12 @@ utilities module
 """
 import os
 import re
+import json
 import functools
 from itertools import groupby, product
 from data_preparation import czech_stemmer
+from utils.language_gate import detect_language
+from utils.metrics import REQUEST_METRICS
 
 
 CZECH_STOPWORDS_FILE_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '..',
@@ -14,6 +17,91 @@ CZECH_STOPWORDS_FILE_PATH = os.path.abspath(os.path.join(os.path.dirname(__file_
 MARKDOWN_FILE_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'README.md'))
 
 
+# bump when the normalization output changes, cached preprocessed data depend on it
+NORMALIZER_VERSION = 1
+
+# characters removed before and after the double space collapsing, the split
+# matters because removing a character can create a new double space
+_NON_ALPHA_CHARS_RE = re.compile('[".(),\\-?!:/„]')
+_NON_ALPHA_CHARS_LATE_RE = re.compile('[%“*+]')
+# str.translate is several times slower than str.replace on non-ascii text in CPython,
+# so the diacritics are replaced only for the characters present in the text
+_DIACRITICS_REPLACEMENTS = tuple({'ě': 'e', 'š': 's', 'č': 'c', 'ř': 'r', 'ž': 'z', 'ý': 'y',
+                                  'á': 'a', 'í': 'i', 'é': 'e', 'ů': 'u', 'ú': 'u'}.items())
+_HTML_RE = re.compile('<.*?>')
+_INPUT_STRING_SPLIT_RE = re.compile(';|,|[ ]|-|[?]|[!]|\n')
+
+
+class TextNormalizer:
+    """
+    text normalization engine class,
+    character removals are done in one pass by precompiled regexes
+    and stopwords are looked up in a frozenset built once
+    """
+    def __init__(self, czech_stopwords):
+        self.czech_stopwords = frozenset(czech_stopwords)
+
+    @staticmethod
+    def trim(text) -> str:
+        """
+        remove left and right trims method
+        :param text:
+        :return:
+        """
+        return text.strip(' ')
+
+    @staticmethod
+    def remove_html(text) -> str:
+        """
+        remove html tags contents method
+        :param text:
+        :return:
+        """
+        return _HTML_RE.sub('', text)
+
+    @staticmethod
+    def remove_non_alpha_chars(text) -> str:
+        """
+        remove non alpha chars method
+        :param text:
+        :return:
+        """
+        text = _NON_ALPHA_CHARS_RE.sub('', text).replace('  ', ' ').replace('   ', ' ')
+        return _NON_ALPHA_CHARS_LATE_RE.sub('', text)
+
+    @staticmethod
+    def remove_diacritics(text) -> str:
+        """
+        replace Czech diacritics method
+        :param text:
+        :return:
+        """
+        for diacritic, replacement in _DIACRITICS_REPLACEMENTS:
+            if diacritic in text:
+                text = text.replace(diacritic, replacement)
+        return text
+
+    def remove_czech_stopwords(self, text) -> str:
+        """
+        remove czech stopwords method
+        :param text:
+        :return:
+        """
+        czech_stopwords = self.czech_stopwords
+        return ' '.join([w for w in text.split(' ') if w not in czech_stopwords])
+
+    def normalize(self, text) -> str:
+        """
+        run all the normalization steps method,
+        the output is the same as of the step by step replace functions chain
+        :param text:
+        :return:
+        """
+        text = self.remove_non_alpha_chars(_HTML_RE.sub('', text.strip(' ')))
+        text = czech_stemmer.stemmer(self.remove_czech_stopwords(text))
+        return self.remove_diacritics(text)
+
+
 class ProjectCommon:
     """
     project common helpers class
@@ -41,11 +129,7 @@ class ProjectCommon:
         :param text:
         :return:
         """
-        replacements = {x: '' for x in
-                        ProjectCommon.read_czech_stopwords(CZECH_STOPWORDS_FILE_PATH)}
-        output = [w for w in text.split(' ') if w not in replacements]
-
-        return ' '.join(output)
+        return TEXT_NORMALIZER.remove_czech_stopwords(text)
 
     @staticmethod
     def remove_html(raw_text) -> str:
@@ -54,10 +138,7 @@ class ProjectCommon:
         :param raw_text:
         :return:
         """
-        clean_r = re.compile('<.*?>')
-        clean_text = re.sub(clean_r, '', raw_text)
-
-        return clean_text
+        return TextNormalizer.remove_html(raw_text)
 
     @staticmethod
     def remove_non_alpha_chars(text) -> str:
@@ -66,14 +147,7 @@ class ProjectCommon:
         :param text:
         :return:
         """
-        replacements = {'"': '', '.': '', '(': '', ')': '', ',': '',
-                        '-': '', '?': '', '!': '', ':': '', '/': '', '„': '',
-                        '  ': ' ', '   ': ' ', '%': '', '“': '', '*': '', '+': ''}
-
-        for i, j in replacements.items():
-            text = text.replace(i, j)
-
-        return text
+        return TextNormalizer.remove_non_alpha_chars(text)
 
     @staticmethod
     def remove_diacritics(text) -> str:
@@ -82,13 +156,7 @@ class ProjectCommon:
         :param text:
         :return:
         """
-        replacements = {'ě': 'e', 'š': 's', 'č': 'c', 'ř': 'r', 'ž': 'z', 'ý':'y',
-                        'á': 'a', 'í': 'i', 'é': 'e', 'ů': 'u', 'ú': 'u'}
-
-        for i, j in replacements.items():
-            text = text.replace(i, j)
-
-        return text
+        return TextNormalizer.remove_diacritics(text)
 
     @staticmethod
     def trimmer(text) -> str:
@@ -97,9 +165,7 @@ class ProjectCommon:
         :param text:
         :return:
         """
-        text_output_trimmed = text.lstrip(' ').rstrip(' ')
-
-        return text_output_trimmed
+        return TextNormalizer.trim(text)
 
     @staticmethod
     def remove_non_alpha_chars_and_html(text) -> str:
@@ -108,14 +174,7 @@ class ProjectCommon:
         :param text:
         :return:
         """
-        text_output_trimmed = ProjectCommon.trimmer(text)
-
-        text_output_no_html = ProjectCommon.remove_html(text_output_trimmed)
-
-        text_output_no_html_no_non_alpha_chars = \
-            ProjectCommon.remove_non_alpha_chars(text_output_no_html)
-
-        return text_output_no_html_no_non_alpha_chars
+        return TextNormalizer.remove_non_alpha_chars(TextNormalizer.remove_html(text.strip(' ')))
 
     @staticmethod
     def remove_all(text) -> str:
@@ -124,26 +183,123 @@ class ProjectCommon:
         :param text:
         :return:
         """
-        text_output_no_html_no_non_alpha_chars = \
-            ProjectCommon.remove_non_alpha_chars_and_html(text)
-
-        text_output_no_html_no_non_alpha_chars_no_stopwords = \
-            ProjectCommon.remove_czech_stopwords(text_output_no_html_no_non_alpha_chars)
-
-        text_output_no_html_no_non_alpha_chars_no_stopwords_stemmed = \
-            czech_stemmer.stemmer(text_output_no_html_no_non_alpha_chars_no_stopwords)
+        return TEXT_NORMALIZER.normalize(text)
 
-        text_output_no_html_no_non_alpha_chars_no_stopwords_stemmed_no_diacritics = \
-            ProjectCommon.\
-                remove_diacritics(text_output_no_html_no_non_alpha_chars_no_stopwords_stemmed)
 
-        return text_output_no_html_no_non_alpha_chars_no_stopwords_stemmed_no_diacritics
+TEXT_NORMALIZER = TextNormalizer(ProjectCommon.read_czech_stopwords(CZECH_STOPWORDS_FILE_PATH))
 
 
 class Webapp:
     """
     web application helpers class
     """
+    # input text validation error messages shared by the html form and the api routes
+    ERROR_TOO_FEW_WORDS = "Sorry, need to submit at least 3 non stop-words"
+    ERROR_TOO_SHORT_WORDS = "Sorry, need to submit at least 1 word with 3 and more characters"
+    ERROR_NOT_CZECH = "Sorry, need to submit text written in Czech"
+    # NDJSON stream api line error messages
+    ERROR_INVALID_LINE = "Sorry, need to submit one JSON text per line"
+    ERROR_LINE_TOO_LONG = "Sorry, need to submit a shorter text per line"
+    # validation rejection reasons counted by the request metrics
+    REJECTION_REASONS = {ERROR_TOO_FEW_WORDS: 'too_few_words',
+                         ERROR_TOO_SHORT_WORDS: 'too_short_words',
+                         ERROR_NOT_CZECH: 'not_czech',
+                         ERROR_INVALID_LINE: 'invalid_line',
+                         ERROR_LINE_TOO_LONG: 'line_too_long'}
+
+    @staticmethod
+    def input_text_preparator(input_text) -> tuple:
+        """
+        function normalizing the input text and validating its words
+        :param input_text:
+        :return: tuple (input_text_for_eval, error_message), one of them is always None
+        """
+        if not input_text or not isinstance(input_text, str):
+            return None, Webapp.ERROR_TOO_FEW_WORDS
+
+        input_text_lowered = input_text.lower()
+        with REQUEST_METRICS.stage('input_string_preparator'):
+            input_text_lowered_list = Webapp.input_string_preparator(input_text_lowered)
+
+        if len([i for i in input_text_lowered_list if i != '']) < 3:
+            return None, Webapp.ERROR_TOO_FEW_WORDS
+
+        if all([len(i) < 3 for i in input_text_lowered_list]):
+            return None, Webapp.ERROR_TOO_SHORT_WORDS
+
+        return ' '.join(input_text_lowered_list), None
+
+    @staticmethod
+    def input_language_validator(input_text, acceptable_detected_language_codes):
+        """
+        function validating the input text language by the configured language gate
+        :param input_text:
+        :param acceptable_detected_language_codes:
+        :return: error_message or None
+        """
+        with REQUEST_METRICS.stage('detect'):
+            detected_lang = detect_language(input_text)
+
+        if detected_lang not in acceptable_detected_language_codes:
+            return Webapp.ERROR_NOT_CZECH
+
+        return None
+
+    @staticmethod
+    def input_text_validator(input_text, acceptable_detected_language_codes) -> tuple:
+        """
+        function validating the input text and preparing it for the ml model evaluation
+        :param input_text:
+        :param acceptable_detected_language_codes:
+        :return: tuple (input_text_for_eval, error_message), one of them is always None
+        """
+        input_text_for_eval, error_message = Webapp.input_text_preparator(input_text)
+
+        if error_message:
+            return None, error_message
+
+        error_message = Webapp.input_language_validator(input_text,
+                                                        acceptable_detected_language_codes)
+
+        if error_message:
+            return None, error_message
+
+        return input_text_for_eval, None
+
+    @staticmethod
+    def ndjson_input_reader(input_stream, max_line_size):
+        """
+        generator reading the input texts of a newline-delimited JSON stream line by line,
+        a line is a JSON string or an object with the Input_Text key, blank lines are skipped
+        :param input_stream: binary file-like object
+        :param max_line_size: maximum line length in bytes, longer lines are skipped
+        :return: generator of (input_text, error_message) tuples, one of them is always None
+        """
+        while True:
+            line = input_stream.readline(max_line_size + 1)
+            if not line:
+                return
+
+            if len(line) > max_line_size and not line.endswith(b'\n'):
+                # the rest of the line is read in bounded pieces and dropped
+                while line and not line.endswith(b'\n'):
+                    line = input_stream.readline(max_line_size)
+                yield None, Webapp.ERROR_LINE_TOO_LONG
+                continue
+
+            if not line.strip():
+                continue
+
+            try:
+                input_text = json.loads(line)
+            except ValueError:
+                yield None, Webapp.ERROR_INVALID_LINE
+                continue
+
+            if isinstance(input_text, dict):
+                input_text = input_text.get('Input_Text')
+            yield input_text, None
+
     @staticmethod
     def input_string_preparator(input_string) -> list:
         """
@@ -151,8 +307,8 @@ class Webapp:
         :param input_string:
         :return:
         """
-        input_text_list_raw = re.split(';|,|[ ]|-|[?]|[!]|\n', input_string)
-        input_text_list = [ProjectCommon.remove_all(x) for x in input_text_list_raw if x != '']
+        input_text_list_raw = _INPUT_STRING_SPLIT_RE.split(input_string)
+        input_text_list = [TEXT_NORMALIZER.normalize(x) for x in input_text_list_raw if x != '']
 
         return input_text_list
 
@@ -211,6 +367,39 @@ class Webapp:
 
         return all_charts_output
 
+    @staticmethod
+    def rollup_chart_data_preparator(input_data_set) -> dict:
+        """
+        function for transforming the daily stats rollup rows
+        to the same Charts.js compatible data structures as chart_data_preparator
+        :param input_data_set: rows (date, sentiment, count)
+        :return:
+        """
+        sentiment_values = ['negative', 'positive', 'uncertain']
+        dates = sorted(set(x[0] for x in input_data_set))
+
+        counts = dict()
+        for stats_date, sentiment, prediction_count in input_data_set:
+            counts[(stats_date, sentiment)] = \
+                counts.get((stats_date, sentiment), 0) + prediction_count
+
+        # every date has all the sentiment values, even with 0 predictions
+        for item in product(dates, sentiment_values):
+            counts.setdefault(item, 0)
+
+        sentiment_counts = dict()
+        for (_, sentiment), prediction_count in counts.items():
+            sentiment_counts[sentiment] = sentiment_counts.get(sentiment, 0) + prediction_count
+
+        return {'pie_by_sentiment': {
+                    'group_keys': sorted(sentiment_values),
+                    'output_data_set': [(sentiment_counts[sentiment], sentiment)
+                                        for sentiment in sorted(sentiment_counts)]},
+                'time_series': {
+                    'group_keys': dates,
+                    'output_data_set': [(counts[key], key[0], key[1])
+                                        for key in sorted(counts)]}}
+
     @staticmethod
     def markdown_reader():
         """